@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict, deque
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Parameterized read queries over the graph built by migrate_priority_workflows.py.
+# Query text never changes, so Neo4j reuses the cached plan for every call.
+QUERIES = {
+    'opportunities_for_company': """
+        MATCH (c:Company {name: $name})-[r:OPPORTUNITY_FOR]->(w:Workflow)
+        RETURN w.id AS id, w.code AS code, w.name AS name, w.domain AS domain,
+               r.priority AS priority, r.confidence AS confidence, r.reason AS reason
+        ORDER BY r.confidence DESC, w.code
+    """,
+    'agents_implementing_workflow': """
+        MATCH (a:Agent)-[:IMPLEMENTS]->(w:Workflow)
+        WHERE w.code = $workflow OR w.id = $workflow
+        RETURN a.id AS id, a.code AS code, a.name AS name,
+               a.agent_type AS agent_type, a.autonomy_level AS autonomy_level
+        ORDER BY a.code
+    """,
+    'collaborators_of_agent': """
+        MATCH (a:Agent {code: $code})-[:COLLABORATES_WITH]-(other:Agent)
+        RETURN DISTINCT other.id AS id, other.code AS code, other.name AS name,
+               other.agent_type AS agent_type
+        ORDER BY other.code
+    """,
+}
+
+RUN_VERSION_QUERY = """
+    MATCH (m:MigrationRun {name: 'priority_workflows'})
+    RETURN m.version AS version
+"""
+
+
+class QueryStats:
+    """Hit/miss counters and a rolling latency window for one query"""
+
+    def __init__(self, window=1024):
+        self.hits = 0
+        self.misses = 0
+        self.latencies_ms = deque(maxlen=window)
+
+    def percentile(self, pct):
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self):
+        total = self.hits + self.misses
+        return {
+            'calls': total,
+            'hit_rate': round(self.hits / total, 3) if total else None,
+            'p50_ms': self.percentile(50),
+            'p99_ms': self.percentile(99),
+        }
+
+
+class GraphQueryService:
+    """Cached read-side access to the migrated Neo4j graph"""
+
+    def __init__(self, driver, max_entries=2048, ttl_seconds=300, version_check_seconds=5):
+        self.driver = driver
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.cache = OrderedDict()
+        self.stats = {name: QueryStats() for name in QUERIES}
+        self.run_version = None
+        self.version_checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def _read(self, query, params):
+        """Run a read query in a managed read transaction"""
+        def work(tx):
+            return [record.data() for record in tx.run(query, **params)]
+        with self.driver.session() as session:
+            return session.execute_read(work)
+
+    def _check_run_version(self):
+        """Drop every cached result once a newer migration run has been stamped"""
+        now = time.monotonic()
+        if now - self.version_checked_at < self.version_check_seconds:
+            return
+        rows = self._read(RUN_VERSION_QUERY, {})
+        version = rows[0]['version'] if rows else None
+        with self.lock:
+            self.version_checked_at = now
+            if version != self.run_version:
+                self.cache.clear()
+                self.run_version = version
+
+    def query(self, name, **params):
+        """Serve a named query from cache, falling back to Neo4j"""
+        self._check_run_version()
+        key = (name, tuple(sorted(params.items())))
+        stats = self.stats[name]
+        started = time.perf_counter()
+
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.cache.move_to_end(key)
+                stats.hits += 1
+                stats.latencies_ms.append((time.perf_counter() - started) * 1000)
+                return entry[1]
+
+        result = self._read(QUERIES[name], params)
+
+        with self.lock:
+            self.cache[key] = (time.monotonic() + self.ttl_seconds, result)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+            stats.misses += 1
+            stats.latencies_ms.append((time.perf_counter() - started) * 1000)
+        return result
+
+    def opportunities_for_company(self, name):
+        return self.query('opportunities_for_company', name=name)
+
+    def agents_implementing_workflow(self, workflow):
+        return self.query('agents_implementing_workflow', workflow=workflow)
+
+    def collaborators_of_agent(self, code):
+        return self.query('collaborators_of_agent', code=code)
+
+    def report(self):
+        """Print cache hit rates and per-query latency percentiles"""
+        print("\n" + "="*70)
+        print("📊 GRAPH QUERY SERVICE STATS")
+        print("="*70)
+        print(f"   Run version: {self.run_version}")
+        print(f"   Cached results: {len(self.cache)}/{self.max_entries}")
+        for name, stats in self.stats.items():
+            s = stats.summary()
+            if not s['calls']:
+                continue
+            print(f"   {name}: {s['calls']} calls, hit rate {s['hit_rate']:.1%}, "
+                  f"p50 {s['p50_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms")
+        print("="*70)
+
+
+def create_service():
+    """Build a service on a pooled driver from the NEO4J_* environment"""
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")),
+        max_connection_pool_size=int(os.getenv("NEO4J_POOL_SIZE", "50"))
+    )
+    return GraphQueryService(driver)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ('company', 'workflow', 'agent'):
+        print("Usage: python graph_query_service.py [company|workflow|agent] <name|code> [repeat]")
+        sys.exit(1)
+
+    kind, value = sys.argv[1], sys.argv[2]
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    service = create_service()
+    lookup = {
+        'company': service.opportunities_for_company,
+        'workflow': service.agents_implementing_workflow,
+        'agent': service.collaborators_of_agent,
+    }[kind]
+
+    for _ in range(repeat):
+        rows = lookup(value)
+    for row in rows:
+        print(f"   • {row}")
+    print(f"\n   ✅ {len(rows)} rows")
+    service.report()
+    service.driver.close()
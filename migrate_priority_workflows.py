@@ -1,8 +1,15 @@
 import os
+import sys
+import uuid
+import argparse
 from neo4j import GraphDatabase
 from supabase import create_client
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from job_profiler import add_profile_arguments, JobProfiler, NullProfiler
+from workflow_version_store import VersionStore, CHECKPOINT_INTERVAL, build, group_versions, push
+
 load_dotenv()
 
 # Connections
@@ -16,27 +23,10 @@ neo4j_driver = GraphDatabase.driver(
     auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
 )
 
-def migrate_priority_workflows(session):
-    """Migrate priority workflows and their agents to Neo4j"""
-    
-    print("\n" + "="*70)
-    print("MIGRATING PRIORITY WORKFLOWS & AGENTS TO NEO4J")
-    print("="*70)
-    
-    # 1. Get workflows
-    workflows = supabase.table('workflows').select('*').execute()
-    versions = supabase.table('workflow_versions').select('*').execute()
-    agents = supabase.table('agents').select('*').execute()
-    
-    print(f"\n📊 Data Summary:")
-    print(f"   Workflows: {len(workflows.data)}")
-    print(f"   Versions: {len(versions.data)}")
-    print(f"   Agents: {len(agents.data)}")
-    
-    # 2. Create Workflow nodes
-    print(f"\n🔄 Creating Workflow nodes...")
+def write_workflows(session, workflows):
+    """MERGE Workflow nodes"""
     workflow_count = 0
-    for workflow in workflows.data:
+    for workflow in workflows:
         session.run("""
             MERGE (w:Workflow {id: $id})
             SET w.code = $code,
@@ -54,54 +44,23 @@ def migrate_priority_workflows(session):
         description=workflow.get('description'),
         summary=workflow.get('summary'))
         workflow_count += 1
-    
-    print(f"   ✅ Created {workflow_count} Workflow nodes")
-    
-    # 3. Create WorkflowVersion nodes and relationships
-    print(f"\n🔄 Creating WorkflowVersion nodes...")
-    version_count = 0
-    for version in versions.data:
-        session.run("""
-            MATCH (w:Workflow {id: $workflow_id})
-            MERGE (v:WorkflowVersion {id: $id})
-            SET v.workflow_name = $workflow_name,
-                v.domain = $domain,
-                v.subdomain = $subdomain,
-                v.agentic_potential = $agentic_potential,
-                v.complexity = $complexity,
-                v.autonomy_level = $autonomy_level,
-                v.transformation_theme = $transformation_theme,
-                v.ai_enabler_type = $ai_enabler_type,
-                v.expected_roi_levers = $expected_roi_levers,
-                v.operational_metrics_targeted = $operational_metrics_targeted,
-                v.technology_stack = $technology_stack,
-                v.agent_collaboration_pattern = $agent_collaboration_pattern,
-                v.implementation_wave = $implementation_wave
-            MERGE (w)-[:HAS_VERSION]->(v)
-        """,
-        id=str(version['id']),
-        workflow_id=str(version['workflow_id']),
-        workflow_name=version.get('workflow_name'),
-        domain=version.get('domain'),
-        subdomain=version.get('subdomain'),
-        agentic_potential=version.get('agentic_potential'),
-        complexity=version.get('complexity'),
-        autonomy_level=version.get('autonomy_level'),
-        transformation_theme=version.get('transformation_theme'),
-        ai_enabler_type=version.get('ai_enabler_type'),
-        expected_roi_levers=version.get('expected_roi_levers'),
-        operational_metrics_targeted=version.get('operational_metrics_targeted'),
-        technology_stack=version.get('technology_stack'),
-        agent_collaboration_pattern=version.get('agent_collaboration_pattern'),
-        implementation_wave=version.get('implementation_wave'))
-        version_count += 1
-    
-    print(f"   ✅ Created {version_count} WorkflowVersion nodes")
-    
-    # 4. Create Agent nodes and relationships
-    print(f"\n🔄 Creating Agent nodes...")
+    return workflow_count
+
+def write_versions(session, versions):
+    """Push WorkflowVersion nodes as deltas past each workflow's version_watermark
+
+    The versions are delta-encoded in memory and sent through
+    workflow_version_store.push, so a rerun only writes versions the graph
+    has not seen and a new version sends only the fields that changed.
+    """
+    store = VersionStore()
+    build(store, group_versions(versions), CHECKPOINT_INTERVAL)
+    return push(store, session)['versions']
+
+def write_agents(session, agents):
+    """MERGE Agent nodes linked to the workflows they implement"""
     agent_count = 0
-    for agent in agents.data:
+    for agent in agents:
         session.run("""
             MERGE (a:Agent {id: $id})
             SET a.code = $code,
@@ -136,13 +95,12 @@ def migrate_priority_workflows(session):
         collaboration_pattern=agent.get('collaboration_pattern'),
         workflow_id=str(agent['workflow_id']) if agent.get('workflow_id') else None)
         agent_count += 1
-    
-    print(f"   ✅ Created {agent_count} Agent nodes")
-    
-    # 5. Create agent collaboration relationships
-    print(f"\n🔄 Creating agent collaboration relationships...")
+    return agent_count
+
+def write_collaborations(session, agents):
+    """MERGE COLLABORATES_WITH between agents (every agent node must exist)"""
     collab_count = 0
-    for agent in agents.data:
+    for agent in agents:
         if agent.get('collaborates_with'):
             for collab_code in agent['collaborates_with']:
                 session.run("""
@@ -153,7 +111,49 @@ def migrate_priority_workflows(session):
                 agent_code=agent['code'],
                 collab_code=collab_code)
                 collab_count += 1
+    return collab_count
+
+def migrate_priority_workflows(session, profiler=None):
+    """Migrate priority workflows and their agents to Neo4j"""
+    profiler = profiler or NullProfiler()
+    
+    print("\n" + "="*70)
+    print("MIGRATING PRIORITY WORKFLOWS & AGENTS TO NEO4J")
+    print("="*70)
+    
+    # 1. Get workflows
+    with profiler.stage('fetch'):
+        workflows = supabase.table('workflows').select('*').execute()
+        versions = supabase.table('workflow_versions').select('*').execute()
+        agents = supabase.table('agents').select('*').execute()
+    
+    print(f"\n📊 Data Summary:")
+    print(f"   Workflows: {len(workflows.data)}")
+    print(f"   Versions: {len(versions.data)}")
+    print(f"   Agents: {len(agents.data)}")
+    
+    # 2. Create Workflow nodes
+    print(f"\n🔄 Creating Workflow nodes...")
+    with profiler.stage('workflows'):
+        workflow_count = write_workflows(session, workflows.data)
+    print(f"   ✅ Created {workflow_count} Workflow nodes")
+    
+    # 3. Create WorkflowVersion nodes and relationships
+    print(f"\n🔄 Creating WorkflowVersion nodes...")
+    with profiler.stage('versions'):
+        version_count = write_versions(session, versions.data)
+    print(f"   ✅ Pushed {version_count} new WorkflowVersion nodes")
+    
+    # 4. Create Agent nodes and relationships
+    print(f"\n🔄 Creating Agent nodes...")
+    with profiler.stage('agents'):
+        agent_count = write_agents(session, agents.data)
+    print(f"   ✅ Created {agent_count} Agent nodes")
     
+    # 5. Create agent collaboration relationships
+    print(f"\n🔄 Creating agent collaboration relationships...")
+    with profiler.stage('collaborations'):
+        collab_count = write_collaborations(session, agents.data)
     print(f"   ✅ Created {collab_count} collaboration relationships")
     
     print(f"\n" + "="*70)
@@ -297,35 +297,124 @@ def create_company_opportunities(session):
     total = bag_count + flight_count + hvp_count + dis_count
     print(f"\n   📊 Total opportunities created: {total}")
 
-def run_migration():
+def stamp_run_version(session):
+    """Record a new run version so read-side caches drop results from older runs"""
+    
+    run_version = uuid.uuid4().hex
+    session.run("""
+        MERGE (m:MigrationRun {name: 'priority_workflows'})
+        SET m.version = $version,
+            m.completed_at = datetime()
+    """, version=run_version)
+    print(f"\n   🏷️  Run version: {run_version}")
+    return run_version
+
+def print_summary(session):
+    """Print node and relationship totals from the graph"""
+    print("\n" + "="*70)
+    print("📊 FINAL SUMMARY")
+    print("="*70)
+    
+    stats = session.run("""
+        RETURN 
+            (SELECT COUNT(*) FROM (MATCH (w:Workflow) RETURN w)) as workflows,
+            (SELECT COUNT(*) FROM (MATCH (v:WorkflowVersion) RETURN v)) as versions,
+            (SELECT COUNT(*) FROM (MATCH (a:Agent) RETURN a)) as agents,
+            (SELECT COUNT(*) FROM (MATCH (d:Domain) RETURN d)) as domains,
+            (SELECT COUNT(*) FROM (MATCH ()-[r:OPPORTUNITY_FOR]->() RETURN r)) as opportunities
+    """).single()
+    
+    print(f"   Workflows: {stats['workflows']}")
+    print(f"   Versions: {stats['versions']}")
+    print(f"   Agents: {stats['agents']}")
+    print(f"   Domains: {stats['domains']}")
+    print(f"   Opportunities: {stats['opportunities']}")
+    print("="*70)
+
+def run_migration(profiler=None):
     """Main migration function"""
+    profiler = profiler or NullProfiler()
     with neo4j_driver.session() as session:
         # Run migrations
-        workflow_count, version_count, agent_count = migrate_priority_workflows(session)
-        create_domain_hierarchy(session)
-        create_company_opportunities(session)
+        with profiler.stage('migrate'):
+            workflow_count, version_count, agent_count = migrate_priority_workflows(session, profiler)
+        with profiler.stage('domain_hierarchy'):
+            create_domain_hierarchy(session)
+        with profiler.stage('opportunities'):
+            create_company_opportunities(session)
+        with profiler.stage('stamp'):
+            stamp_run_version(session)
         
         # Summary stats
-        print("\n" + "="*70)
-        print("📊 FINAL SUMMARY")
-        print("="*70)
+        with profiler.stage('summary'):
+            print_summary(session)
+
+# Shard interface for scripts/shard_coordinator.py. Workflows (and the
+# versions hanging off them) are partitioned by subdomain_id; agents are not
+# keyed by workflow, and collaborations, the domain hierarchy and
+# opportunities span shards, so they run once in finalize_shards after every
+# shard has finished.
+SHARD_COLUMN = 'subdomain_id'
+SHARD_CHUNK = 200
+
+def shard_keys():
+    """Return (subdomain_id, workflow count) pairs used to balance shards"""
+    workflows = supabase.table('workflows').select('subdomain_id').execute()
+    counts = {}
+    for wf in workflows.data:
+        counts[wf.get('subdomain_id')] = counts.get(wf.get('subdomain_id'), 0) + 1
+    return list(counts.items())
+
+def fetch_in(table, column, values):
+    """Select rows whose column is in values, chunked to keep URLs short"""
+    rows = []
+    for i in range(0, len(values), SHARD_CHUNK):
+        result = supabase.table(table).select('*').in_(column, values[i:i + SHARD_CHUNK]).execute()
+        rows.extend(result.data)
+    return rows
+
+def run_shard(shard):
+    """Write the workflows and versions for one shard of subdomains"""
+    keys = [k for k in shard['keys'] if k is not None]
+    workflows = fetch_in('workflows', 'subdomain_id', keys)
+    if None in shard['keys']:
+        workflows.extend(supabase.table('workflows').select('*').is_('subdomain_id', None).execute().data)
+    
+    workflow_ids = [wf['id'] for wf in workflows]
+    versions = fetch_in('workflow_versions', 'workflow_id', workflow_ids)
+    
+    with neo4j_driver.session() as session:
+        return {
+            'workflows': write_workflows(session, workflows),
+            'versions': write_versions(session, versions),
+        }
+
+def finalize_shards(counters):
+    """Write cross-shard nodes and relationships once every shard is done"""
+    agents = supabase.table('agents').select('*').execute()
+    
+    with neo4j_driver.session() as session:
+        print(f"\n🔄 Creating Agent nodes...")
+        counters['agents'] = write_agents(session, agents.data)
+        print(f"   ✅ Created {counters['agents']} Agent nodes")
         
-        stats = session.run("""
-            RETURN 
-                (SELECT COUNT(*) FROM (MATCH (w:Workflow) RETURN w)) as workflows,
-                (SELECT COUNT(*) FROM (MATCH (v:WorkflowVersion) RETURN v)) as versions,
-                (SELECT COUNT(*) FROM (MATCH (a:Agent) RETURN a)) as agents,
-                (SELECT COUNT(*) FROM (MATCH (d:Domain) RETURN d)) as domains,
-                (SELECT COUNT(*) FROM (MATCH ()-[r:OPPORTUNITY_FOR]->() RETURN r)) as opportunities
-        """).single()
+        print(f"\n🔄 Creating agent collaboration relationships...")
+        counters['collaborations'] = write_collaborations(session, agents.data)
+        print(f"   ✅ Created {counters['collaborations']} collaboration relationships")
         
-        print(f"   Workflows: {stats['workflows']}")
-        print(f"   Versions: {stats['versions']}")
-        print(f"   Agents: {stats['agents']}")
-        print(f"   Domains: {stats['domains']}")
-        print(f"   Opportunities: {stats['opportunities']}")
-        print("="*70)
+        create_domain_hierarchy(session)
+        create_company_opportunities(session)
+        stamp_run_version(session)
+        print_summary(session)
+    return counters
 
 if __name__ == "__main__":
-    run_migration()
-    neo4j_driver.close()
+    parser = argparse.ArgumentParser(description='Migrate priority workflows and agents to Neo4j')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    try:
+        with JobProfiler.from_args('migrate_priority_workflows', args) as profiler:
+            run_migration(profiler)
+    finally:
+        neo4j_driver.close()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Agent Collaboration Network Analytics
+
+This script loads the agent collaboration network (v_agent_collaboration_edges)
+into compressed sparse row (CSR) arrays with agent ids remapped to 0..n-1 and
+computes, in memory:
+
+  - in/out/total degree
+  - betweenness centrality (Brandes, unweighted)
+  - PageRank (vectorized power iteration)
+  - connected components (weakly connected)
+  - k-hop reachability counts
+
+Results are merged into agents.metadata under the "network" key (metadata ||
+patch through merge_agent_metadata, Migration 017, so other keys such as
+llm_enrichment.py's ai_enabler_type are kept) and the UI reads precomputed
+values instead of traversing the graph live.
+
+Usage:
+    python scripts/agent_network_analytics.py
+    python scripts/agent_network_analytics.py --hops 3 --dry-run
+
+Requirements:
+    pip install supabase python-dotenv numpy
+"""
+
+import os
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+UPDATE_CHUNK = 200
+
+
+class CSRGraph:
+    """Directed graph in CSR form over integer-remapped agent ids"""
+
+    def __init__(self, agent_ids: List[int], edges: List[Dict]):
+        self.agent_ids = np.asarray(sorted(set(agent_ids)), dtype=np.int64)
+        self.n = len(self.agent_ids)
+
+        src, dst, weight = [], [], []
+        for edge in edges:
+            src.append(edge['source_id'])
+            dst.append(edge['target_id'])
+            weight.append(float(edge.get('strength') or 0.5))
+            if edge.get('bidirectional'):
+                src.append(edge['target_id'])
+                dst.append(edge['source_id'])
+                weight.append(float(edge.get('strength') or 0.5))
+
+        # Remap agent ids to dense row numbers
+        src = np.searchsorted(self.agent_ids, np.asarray(src, dtype=np.int64))
+        dst = np.searchsorted(self.agent_ids, np.asarray(dst, dtype=np.int64))
+        weight = np.asarray(weight, dtype=np.float64)
+
+        # Collapse parallel edges (several collaboration types, or a bidirectional
+        # edge duplicating an explicit reverse edge), keeping the strongest weight
+        pair = src * max(self.n, 1) + dst
+        order = np.lexsort((-weight, pair))
+        pair, first = np.unique(pair[order], return_index=True)
+        keep = order[first]
+        self.src = src[keep]
+        self.indices = dst[keep]
+        self.weights = weight[keep]
+        self.indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.src, minlength=self.n), out=self.indptr[1:])
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def in_degree(self) -> np.ndarray:
+        return np.bincount(self.indices, minlength=self.n)
+
+    def pagerank(self, damping: float = 0.85, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+        """Weighted PageRank by power iteration over the edge arrays"""
+        if self.n == 0:
+            return np.zeros(0)
+        out_weight = np.bincount(self.src, weights=self.weights, minlength=self.n)
+        dangling = out_weight == 0
+        edge_share = self.weights / np.where(out_weight[self.src] > 0, out_weight[self.src], 1)
+        rank = np.full(self.n, 1.0 / self.n)
+        for _ in range(max_iter):
+            flow = np.bincount(self.indices, weights=rank[self.src] * edge_share, minlength=self.n)
+            new_rank = (1 - damping) / self.n + damping * (flow + rank[dangling].sum() / self.n)
+            if np.abs(new_rank - rank).sum() < tol:
+                return new_rank
+            rank = new_rank
+        return rank
+
+    def connected_components(self) -> np.ndarray:
+        """Weakly connected component label per node (min-label propagation)"""
+        labels = np.arange(self.n)
+        while True:
+            previous = labels.copy()
+            np.minimum.at(labels, self.indices, labels[self.src])
+            np.minimum.at(labels, self.src, labels[self.indices])
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                return labels
+
+    def k_hop_reach(self, k: int) -> np.ndarray:
+        """Number of distinct agents reachable within k outgoing hops"""
+        reach = np.zeros(self.n, dtype=np.int64)
+        for source in range(self.n):
+            visited = np.zeros(self.n, dtype=bool)
+            visited[source] = True
+            frontier = visited.copy()
+            for _ in range(k):
+                nxt = np.zeros(self.n, dtype=bool)
+                nxt[self.indices[frontier[self.src]]] = True
+                frontier = nxt & ~visited
+                if not frontier.any():
+                    break
+                visited |= frontier
+            reach[source] = visited.sum() - 1
+        return reach
+
+    def betweenness(self) -> np.ndarray:
+        """Brandes betweenness centrality on the unweighted directed graph, normalized"""
+        centrality = np.zeros(self.n)
+        for s in range(self.n):
+            sigma = np.zeros(self.n)
+            sigma[s] = 1
+            dist = np.full(self.n, -1, dtype=np.int64)
+            dist[s] = 0
+            order = []
+            queue = [s]
+            head = 0
+            while head < len(queue):
+                v = queue[head]
+                head += 1
+                order.append(v)
+                for w in self.indices[self.indptr[v]:self.indptr[v + 1]]:
+                    if dist[w] < 0:
+                        dist[w] = dist[v] + 1
+                        queue.append(w)
+                    if dist[w] == dist[v] + 1:
+                        sigma[w] += sigma[v]
+
+            delta = np.zeros(self.n)
+            for w in reversed(order):
+                neighbors = self.indices[self.indptr[w]:self.indptr[w + 1]]
+                successors = neighbors[dist[neighbors] == dist[w] + 1]
+                if len(successors):
+                    delta[w] = (sigma[w] / sigma[successors] * (1 + delta[successors])).sum()
+                if w != s:
+                    centrality[w] += delta[w]
+
+        if self.n > 2:
+            centrality /= (self.n - 1) * (self.n - 2)
+        return centrality
+
+
+def fetch_agents() -> List[Dict]:
+    """Fetch all active agents"""
+    response = supabase.table('agents').select('id, code, name, metadata').eq('active', True).execute()
+    return response.data
+
+
+def fetch_edges() -> List[Dict]:
+    """Fetch collaboration edges between active agents"""
+    response = supabase.table('v_agent_collaboration_edges').select(
+        'source_id, target_id, strength, bidirectional'
+    ).execute()
+    return response.data
+
+
+def compute_metrics(graph: CSRGraph, hops: int) -> Dict[str, np.ndarray]:
+    """Run every analysis and return per-node arrays"""
+    return {
+        'in_degree': graph.in_degree(),
+        'out_degree': graph.out_degree(),
+        'pagerank': graph.pagerank(),
+        'betweenness': graph.betweenness(),
+        'component': graph.connected_components(),
+        f'reach_{hops}_hop': graph.k_hop_reach(hops),
+    }
+
+
+def write_back(agents: List[Dict], graph: CSRGraph, metrics: Dict[str, np.ndarray]) -> int:
+    """Merge the network metrics into each agent's metadata"""
+    computed_at = datetime.now(timezone.utc).isoformat()
+    patches = []
+    for agent in agents:
+        row = np.searchsorted(graph.agent_ids, agent['id'])
+        network = {name: values[row].item() for name, values in metrics.items()}
+        network['pagerank'] = round(network['pagerank'], 6)
+        network['betweenness'] = round(network['betweenness'], 6)
+        network['component'] = int(graph.agent_ids[network['component']])
+        network['computed_at'] = computed_at
+        patches.append({'id': agent['id'], 'patch': {'network': network}})
+
+    updated = 0
+    for start in range(0, len(patches), UPDATE_CHUNK):
+        chunk = patches[start:start + UPDATE_CHUNK]
+        try:
+            supabase.rpc('merge_agent_metadata', {'p_patches': chunk}).execute()
+            updated += len(chunk)
+        except Exception as e:
+            print(f"  ⚠️  Error updating agents {chunk[0]['id']}..{chunk[-1]['id']}: {str(e)}")
+    return updated
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Compute agent collaboration network analytics')
+    parser.add_argument('--hops', type=int, default=2, help='Hop limit for reachability counts')
+    parser.add_argument('--dry-run', action='store_true', help='Print results without writing them back')
+    args = parser.parse_args()
+
+    print("🕸️  Starting Agent Network Analytics...")
+    print()
+
+    print("📊 Fetching agents and collaboration edges...")
+    agents = fetch_agents()
+    edges = fetch_edges()
+    print(f"   Found {len(agents)} agents and {len(edges)} edges")
+    print()
+
+    graph = CSRGraph([a['id'] for a in agents], edges)
+    metrics = compute_metrics(graph, args.hops)
+    components = len(np.unique(metrics['component']))
+
+    print("=" * 60)
+    print("📈 SUMMARY")
+    print("=" * 60)
+    print(f"Agents:                    {graph.n}")
+    print(f"Directed edges:            {len(graph.indices)}")
+    print(f"Connected components:      {components}")
+    print()
+
+    print("🏆 Top agents by PageRank:")
+    codes = {a['id']: a['code'] for a in agents}
+    for row in np.argsort(-metrics['pagerank'])[:5]:
+        agent_id = int(graph.agent_ids[row])
+        print(f"   • {codes.get(agent_id, agent_id)}: pagerank {metrics['pagerank'][row]:.4f}, "
+              f"betweenness {metrics['betweenness'][row]:.4f}, degree {metrics['in_degree'][row] + metrics['out_degree'][row]}")
+    print()
+
+    if args.dry_run:
+        print("ℹ️  Dry run, nothing written")
+        return
+
+    updated = write_back(agents, graph, metrics)
+    print(f"✅ Updated network metrics on {updated} agents")
+    print()
+
+
+if __name__ == "__main__":
+    main()
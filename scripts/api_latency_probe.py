@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+API Endpoint Latency Probe
+
+This script measures the registered api_endpoints instead of relying on the
+static avg_latency_ms / success_rate_percent defaults and hand-entered
+metadata.response_time_p95_ms that api_health_dashboard classifies on.
+
+Endpoints are called asynchronously with bounded concurrency. Each endpoint is
+probed at a small share of its rate_limit_per_hour. Latencies go into a
+streaming log-bucket quantile sketch (p50/p95/p99 within 1% relative error,
+constant memory). Sketches and success counters cover a rolling --window
+(kept as time slots that age out), so rollups written every --flush-interval
+describe the whole window rather than the few probes since the last write.
+
+Only GET endpoints are probed against real APIs. Probing a POST / PUT /
+PATCH / DELETE endpoint would make the call it stands for (an ancillary
+purchase, a miles accrual), so those run only when metadata.probe_safe is true,
+e.g. for an idempotent search or a sandbox URL; their body is
+metadata.probe_request, falling back to example_request.
+
+Requests carry the credentials for the endpoint's auth_type, read from the
+environment under metadata.probe_env_prefix (default API_PROBE):
+  oauth2 / bearer  <PREFIX>_TOKEN (an access token obtained beforehand)
+  api_key          <PREFIX>_API_KEY, sent in metadata.api_key_header (default X-API-Key)
+  basic            <PREFIX>_USER and <PREFIX>_PASSWORD
+  mtls             API_PROBE_CLIENT_CERT and API_PROBE_CLIENT_KEY (client-wide)
+Endpoints whose credentials are not configured are skipped and listed. 401 and
+403 responses are counted as auth failures and kept out of the latency and
+success statistics.
+
+Path templates such as {flight_number} are filled from --param, then
+metadata.probe_params, then top-level example_request values. Endpoints with
+placeholders left unfilled are skipped and listed.
+
+--stand-in serves every endpoint from a local HTTP server with synthetic
+latency and errors, so the probe can be exercised without touching airline
+APIs; every method is probed there and no credentials are needed.
+
+Usage:
+    python scripts/api_latency_probe.py --stand-in --duration 30
+    python scripts/api_latency_probe.py --concurrency 20 --flush-interval 300
+    python scripts/api_latency_probe.py --param flight_number=CM101 --window 21600
+    API_PROBE_TOKEN=... python scripts/api_latency_probe.py --dry-run --duration 600
+
+Requirements:
+    pip install supabase python-dotenv httpx
+"""
+
+import os
+import re
+import math
+import time
+import json
+import random
+import asyncio
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, quote
+import httpx
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+DEFAULT_RATE_LIMIT_PER_HOUR = 1000
+DEFAULT_ENV_PREFIX = 'API_PROBE'
+# Methods that can be probed without side effects
+SAFE_METHODS = {'GET', 'HEAD'}
+AUTH_FAILURE_STATUSES = {401, 403}
+WINDOW_SLOTS = 24
+PATH_PARAM = re.compile(r'\{(\w+)\}')
+
+
+class LatencySketch:
+    """Log-bucketed streaming quantile sketch with bounded relative error"""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value_ms: float):
+        index = math.ceil(math.log(max(value_ms, 0.01)) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value_ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return None
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def merge(self, other: 'LatencySketch'):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+
+
+class EndpointStats:
+    """Probe results for one endpoint over a rolling window of time slots"""
+
+    def __init__(self, window_seconds: float, slots: int = WINDOW_SLOTS):
+        self.slot_seconds = window_seconds / slots
+        self.slots = slots
+        self.window: Dict[int, List] = {}   # slot index → [sketch, successes, failures]
+        self.auth_failures = 0
+        self.lock = threading.Lock()
+
+    def _expire(self, current: int):
+        for index in [i for i in self.window if i <= current - self.slots]:
+            del self.window[index]
+
+    def record(self, latency_ms: float, ok: bool):
+        current = int(time.monotonic() // self.slot_seconds)
+        with self.lock:
+            slot = self.window.get(current)
+            if slot is None:
+                self._expire(current)
+                slot = self.window[current] = [LatencySketch(), 0, 0]
+            slot[0].add(latency_ms)
+            slot[1 if ok else 2] += 1
+
+    def record_auth_failure(self):
+        with self.lock:
+            self.auth_failures += 1
+
+    def summary(self) -> Tuple[LatencySketch, int, int]:
+        """(merged sketch, successes, failures) over the window"""
+        sketch, successes, failures = LatencySketch(), 0, 0
+        with self.lock:
+            self._expire(int(time.monotonic() // self.slot_seconds))
+            for slot_sketch, ok, failed in self.window.values():
+                sketch.merge(slot_sketch)
+                successes += ok
+                failures += failed
+        return sketch, successes, failures
+
+
+def probe_interval_seconds(endpoint: Dict, rate_share: float) -> float:
+    """Spacing between probes so they use only rate_share of the endpoint's hourly limit"""
+    limit = endpoint.get('rate_limit_per_hour')
+    if not limit and isinstance(endpoint.get('rate_limit'), dict):
+        per_minute = endpoint['rate_limit'].get('requests_per_minute')
+        limit = int(per_minute) * 60 if per_minute else None
+    limit = limit or DEFAULT_RATE_LIMIT_PER_HOUR
+    return 3600.0 / max(limit * rate_share, 1e-6)
+
+
+def probe_method(endpoint: Dict) -> str:
+    return (endpoint.get('http_method') or 'GET').upper()
+
+
+def probe_allowed(endpoint: Dict) -> bool:
+    """Safe methods always; anything else only when the endpoint is opted in"""
+    return probe_method(endpoint) in SAFE_METHODS or bool((endpoint.get('metadata') or {}).get('probe_safe'))
+
+
+def probe_credentials(endpoint: Dict) -> Tuple[Dict[str, str], Optional[Tuple[str, str]], List[str]]:
+    """(headers, basic auth, environment variables missing) for the endpoint's auth_type"""
+    metadata = endpoint.get('metadata') or {}
+    prefix = metadata.get('probe_env_prefix') or DEFAULT_ENV_PREFIX
+    auth_type = endpoint.get('auth_type') or 'none'
+    if auth_type in ('oauth2', 'bearer'):
+        token = os.getenv(f"{prefix}_TOKEN")
+        return ({'Authorization': f"Bearer {token}"} if token else {}), None, [] if token else [f"{prefix}_TOKEN"]
+    if auth_type == 'api_key':
+        key = os.getenv(f"{prefix}_API_KEY")
+        header = metadata.get('api_key_header') or 'X-API-Key'
+        return ({header: key} if key else {}), None, [] if key else [f"{prefix}_API_KEY"]
+    if auth_type == 'basic':
+        user, password = os.getenv(f"{prefix}_USER"), os.getenv(f"{prefix}_PASSWORD")
+        missing = [name for name, value in ((f"{prefix}_USER", user), (f"{prefix}_PASSWORD", password)) if not value]
+        return {}, (None if missing else (user, password)), missing
+    if auth_type == 'mtls':
+        missing = [name for name in ('API_PROBE_CLIENT_CERT', 'API_PROBE_CLIENT_KEY') if not os.getenv(name)]
+        return {}, None, missing
+    return {}, None, []
+
+
+async def probe_once(client: httpx.AsyncClient, endpoint: Dict, url: str, stats: EndpointStats,
+                     semaphore: asyncio.Semaphore, timeout: float, success_max_status: int,
+                     headers: Dict[str, str], auth: Optional[Tuple[str, str]]):
+    """Call an endpoint once and record latency and outcome (auth failures are counted apart)"""
+    method = probe_method(endpoint)
+    body = None
+    if method in ('POST', 'PUT', 'PATCH'):
+        body = (endpoint.get('metadata') or {}).get('probe_request') or endpoint.get('example_request')
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, json=body, headers=headers,
+                                            auth=auth or httpx.USE_CLIENT_DEFAULT, timeout=timeout)
+            if response.status_code in AUTH_FAILURE_STATUSES:
+                stats.record_auth_failure()
+                return
+            ok = response.status_code < success_max_status
+        except httpx.HTTPError:
+            ok = False
+        stats.record((time.perf_counter() - started) * 1000, ok)
+
+
+async def run_probes(endpoints: List[Dict], urls: Dict[int, str], stats: Dict[int, EndpointStats],
+                     credentials: Dict[int, Tuple[Dict[str, str], Optional[Tuple[str, str]]]], args):
+    """Probe every endpoint on its own schedule until the duration elapses"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    deadline = time.monotonic() + args.duration if args.duration else None
+    next_due = {e['id']: time.monotonic() + random.random() for e in endpoints}
+    intervals = {e['id']: max(probe_interval_seconds(e, args.rate_share), args.min_interval) for e in endpoints}
+    last_flush = time.monotonic()
+    pending = set()
+
+    cert = None
+    if os.getenv('API_PROBE_CLIENT_CERT') and not args.stand_in:
+        cert = (os.getenv('API_PROBE_CLIENT_CERT'), os.getenv('API_PROBE_CLIENT_KEY'))
+
+    async with httpx.AsyncClient(follow_redirects=True, cert=cert) as client:
+        while deadline is None or time.monotonic() < deadline:
+            now = time.monotonic()
+            for endpoint in endpoints:
+                if next_due[endpoint['id']] <= now:
+                    next_due[endpoint['id']] = now + intervals[endpoint['id']]
+                    pending.add(asyncio.create_task(probe_once(
+                        client, endpoint, urls[endpoint['id']], stats[endpoint['id']],
+                        semaphore, args.timeout, args.success_max_status, *credentials[endpoint['id']],
+                    )))
+            pending = {t for t in pending if not t.done()}
+
+            if now - last_flush >= args.flush_interval:
+                await asyncio.to_thread(flush_rollups, endpoints, stats, args.dry_run, args.window)
+                last_flush = now
+
+            await asyncio.sleep(max(0.0, min(next_due.values()) - time.monotonic()) or 0.01)
+
+        if pending:
+            await asyncio.gather(*pending)
+    flush_rollups(endpoints, stats, args.dry_run, args.window)
+
+
+def flush_rollups(endpoints: List[Dict], stats: Dict[int, EndpointStats], dry_run: bool, window_seconds: float):
+    """Write p50/p95/p99, mean latency and success rate over the rolling window back to api_endpoints"""
+    probed_at = datetime.now(timezone.utc).isoformat()
+    for endpoint in endpoints:
+        sketch, successes, failures = stats[endpoint['id']].summary()
+        samples = successes + failures
+        if stats[endpoint['id']].auth_failures:
+            print(f"   🔒 {endpoint['endpoint_name']:<40} {stats[endpoint['id']].auth_failures} auth failures "
+                  f"(401/403), not counted; check its {endpoint.get('auth_type')} credentials")
+        if not samples:
+            continue
+        p50, p95, p99 = (round(sketch.quantile(q)) for q in (0.50, 0.95, 0.99))
+        success_rate = round(100 * successes / samples, 2)
+        print(f"   📡 {endpoint['endpoint_name']:<40} p50 {p50:>5} ms  p95 {p95:>5} ms  "
+              f"p99 {p99:>5} ms  ok {success_rate:>6}%  (n={samples})")
+
+        if not dry_run:
+            metadata = dict(endpoint.get('metadata') or {})
+            metadata.update({
+                'response_time_p50_ms': p50,
+                'response_time_p95_ms': p95,
+                'response_time_p99_ms': p99,
+                'probe_samples': samples,
+                'probe_window_seconds': round(window_seconds),
+                'probed_at': probed_at,
+            })
+            try:
+                supabase.table('api_endpoints').update({
+                    'avg_latency_ms': round(sketch.mean()),
+                    'success_rate_percent': success_rate,
+                    'metadata': metadata,
+                }).eq('id', endpoint['id']).execute()
+                endpoint['metadata'] = metadata
+            except Exception as e:
+                print(f"  ⚠️  Error updating {endpoint['endpoint_name']}: {str(e)}")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for airline APIs with lognormal latency and occasional errors"""
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(random.lognormvariate(math.log(0.08), 0.6))
+        status = 503 if random.random() < 0.02 else 200
+        payload = json.dumps({'path': self.path, 'status': status}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in() -> str:
+    """Serve the stand-in API on a free local port and return its base URL"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def probe_params(endpoint: Dict, overrides: Dict[str, str]) -> Dict[str, str]:
+    """Values for path placeholders: --param, then metadata.probe_params, then example_request"""
+    params = {}
+    if isinstance(endpoint.get('example_request'), dict):
+        params.update({k: str(v) for k, v in endpoint['example_request'].items() if isinstance(v, (str, int))})
+    params.update({k: str(v) for k, v in ((endpoint.get('metadata') or {}).get('probe_params') or {}).items()})
+    params.update(overrides)
+    return params
+
+
+def resolve_url(url: str, params: Dict[str, str]) -> Tuple[str, List[str]]:
+    """Fill {placeholders} in a URL; returns (url, placeholders left unfilled)"""
+    missing = [name for name in PATH_PARAM.findall(url) if name not in params]
+    return PATH_PARAM.sub(lambda m: quote(params[m.group(1)], safe='') if m.group(1) in params else m.group(0), url), missing
+
+
+def fetch_endpoints() -> List[Dict]:
+    """Fetch AI-accessible endpoints"""
+    response = supabase.table('api_endpoints').select('*').eq('is_ai_accessible', True).execute()
+    return [e for e in response.data if e.get('active', True)]
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Measure api_endpoints latency and success rate')
+    parser.add_argument('--stand-in', action='store_true', help='Probe a local stand-in server instead of the real URLs')
+    parser.add_argument('--concurrency', type=int, default=10, help='Maximum in-flight probes')
+    parser.add_argument('--rate-share', type=float, default=0.01, help='Share of rate_limit_per_hour used for probing')
+    parser.add_argument('--min-interval', type=float, default=1.0, help='Minimum seconds between probes of one endpoint')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Probe timeout in seconds')
+    parser.add_argument('--success-max-status', type=int, default=400, help='Status codes below this count as success')
+    parser.add_argument('--flush-interval', type=float, default=300.0, help='Seconds between rollup writes')
+    parser.add_argument('--window', type=float, default=86400.0, help='Seconds of probe results each rollup covers')
+    parser.add_argument('--param', action='append', default=[], help='Path placeholder value, e.g. flight_number=CM101')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds')
+    parser.add_argument('--dry-run', action='store_true', help='Print rollups without writing them')
+    args = parser.parse_args()
+
+    print("📡 Starting API Latency Probe...")
+    print()
+
+    if any('=' not in p for p in args.param):
+        parser.error("--param takes name=value")
+    overrides = dict(p.split('=', 1) for p in args.param)
+    endpoints, urls, credentials = [], {}, {}
+    for endpoint in fetch_endpoints():
+        if not args.stand_in and not probe_allowed(endpoint):
+            print(f"   ⏭️  {endpoint['endpoint_name']}: {probe_method(endpoint)} is not probed "
+                  f"unless metadata.probe_safe is set, skipped")
+            continue
+        headers, auth, missing_env = probe_credentials(endpoint)
+        if missing_env and not args.stand_in:
+            print(f"   ⏭️  {endpoint['endpoint_name']}: {endpoint.get('auth_type')} credentials not configured "
+                  f"({', '.join(missing_env)}), skipped")
+            continue
+        credentials[endpoint['id']] = (headers, auth)
+        params = probe_params(endpoint, overrides)
+        url, missing = resolve_url(endpoint['endpoint_url'], params)
+        if missing and args.stand_in:
+            # The stand-in accepts any path
+            url, missing = resolve_url(url, {name: 'probe' for name in missing})
+        if missing:
+            print(f"   ⏭️  {endpoint['endpoint_name']}: no value for {', '.join('{' + m + '}' for m in missing)}, skipped")
+            continue
+        endpoints.append(endpoint)
+        urls[endpoint['id']] = url
+    print(f"📊 Probing {len(endpoints)} AI-accessible endpoints")
+
+    if args.stand_in:
+        base = start_stand_in()
+        urls = {i: base + urlparse(url).path for i, url in urls.items()}
+        print(f"   Using local stand-in at {base}")
+    print()
+
+    stats = {e['id']: EndpointStats(args.window) for e in endpoints}
+    try:
+        asyncio.run(run_probes(endpoints, urls, stats, credentials, args))
+    except KeyboardInterrupt:
+        flush_rollups(endpoints, stats, args.dry_run, args.window)
+
+    print()
+    print("✅ Probe run complete")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Bag Journey State Index with Real-time Misconnect Detection
+
+This service tails baggage_scan_events and keeps a compact in-memory state per
+bag tag (last scan, location, flight and leg pointer). Every open connection in
+baggage_connections is re-evaluated against mct_minutes and the actual inbound
+time as events arrive, and risk changes are written back to
+connection_risk_score / risk_level without periodic batch queries. Write-backs
+are batched by value and only touch connections that are still open.
+
+Every sweep interval the index also picks up connections created since the last
+poll, applies inbound_arrival_actual values recorded on tracked connections
+(re-scoring every connection fed by that inbound flight), and evicts completed
+connections, connections whose outbound flight left more than --bag-idle-hours
+ago, and bags with no open connection and no scan for that long.
+
+Usage:
+    python scripts/bag_journey_index.py
+    python scripts/bag_journey_index.py --poll-interval 0.5
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timezone
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+# Only connections that can still be missed are tracked
+OPEN_TRANSFER_STATUSES = ['PENDING', 'IN_TRANSIT']
+
+# Scan types that prove the bag reached the connecting airport
+INBOUND_SCAN_TYPES = {'OFFLOADED_AIRCRAFT', 'TRANSFER_IN', 'ARRIVAL', 'SORTATION'}
+
+# Scan types that prove the bag made the outbound flight
+OUTBOUND_SCAN_TYPES = {'LOADED_AIRCRAFT', 'CONTAINER_LOADED', 'TRANSFER_OUT'}
+
+# Risk level thresholds (HIGH matches the idx_connections_risk partial index)
+RISK_LEVELS = [
+    (0.90, 'CRITICAL'),
+    (0.70, 'HIGH'),
+    (0.40, 'MEDIUM'),
+    (0.00, 'LOW'),
+]
+
+PAGE_SIZE = 1000
+UPDATE_CHUNK = 200
+AGENT_CODE = 'BAG_JOURNEY_INDEX'
+
+
+def parse_ts(value: Optional[str]) -> Optional[float]:
+    """Parse a Postgres timestamptz string into epoch seconds"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def format_ts(epoch: float) -> str:
+    """Format epoch seconds as an ISO-8601 UTC timestamp"""
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def risk_level_for(score: float) -> str:
+    """Map a 0..1 risk score onto the baggage_connections risk_level values"""
+    for threshold, level in RISK_LEVELS:
+        if score >= threshold:
+            return level
+    return 'LOW'
+
+
+class BagState:
+    """Latest known position of one bag"""
+    __slots__ = ('last_scan_id', 'last_scan_time', 'scan_type', 'location', 'flight_number', 'leg')
+
+    def __init__(self):
+        self.last_scan_id = 0
+        self.last_scan_time = 0.0
+        self.scan_type = None
+        self.location = None
+        self.flight_number = None
+        self.leg = 1
+
+
+class ConnectionState:
+    """One leg-to-leg transfer from baggage_connections"""
+    __slots__ = (
+        'id', 'bag_tag_number', 'sequence', 'airport', 'inbound_flight', 'outbound_flight',
+        'inbound_scheduled', 'inbound_actual', 'outbound_scheduled', 'mct_minutes',
+        'is_same_terminal', 'is_interline', 'bag_arrived', 'completed', 'risk_score', 'risk_level',
+    )
+
+    def __init__(self, row: Dict):
+        self.id = row['id']
+        self.bag_tag_number = row['bag_tag_number']
+        self.sequence = row['connection_sequence']
+        self.airport = sys.intern(row['connection_airport'])
+        self.inbound_flight = sys.intern(row['inbound_flight_number'])
+        self.outbound_flight = sys.intern(row['outbound_flight_number'])
+        self.inbound_scheduled = parse_ts(row['inbound_arrival_scheduled'])
+        self.inbound_actual = parse_ts(row.get('inbound_arrival_actual'))
+        self.outbound_scheduled = parse_ts(row['outbound_departure_scheduled'])
+        self.mct_minutes = row.get('mct_minutes') or 0
+        self.is_same_terminal = row.get('is_same_terminal')
+        self.is_interline = bool(row.get('is_interline'))
+        self.bag_arrived = row.get('transfer_status') == 'IN_TRANSIT'
+        self.completed = False
+        self.risk_score = float(row['connection_risk_score']) if row.get('connection_risk_score') is not None else None
+        self.risk_level = row.get('risk_level')
+
+    def evaluate(self, now: float) -> float:
+        """Score how likely this bag is to miss the outbound flight"""
+        if self.completed:
+            return 0.0
+
+        inbound = self.inbound_actual or self.inbound_scheduled
+        available_minutes = (self.outbound_scheduled - inbound) / 60
+        buffer_minutes = available_minutes - self.mct_minutes
+
+        if buffer_minutes <= 0:
+            score = 1.0
+        else:
+            # Buffer shrinks towards zero as it approaches MCT
+            score = max(0.0, 1.0 - buffer_minutes / max(self.mct_minutes, 30))
+
+        if self.is_same_terminal is False:
+            score += 0.10
+        if self.is_interline:
+            score += 0.10
+
+        # Bag not seen at the connecting airport while the transfer window closes
+        if not self.bag_arrived and now >= inbound:
+            remaining = (self.outbound_scheduled - now) / 60
+            if remaining < self.mct_minutes:
+                score = max(score, 0.95)
+
+        return round(min(score, 1.0), 2)
+
+
+class BagJourneyIndex:
+    """In-memory per-tag journey state plus connection risk evaluation"""
+
+    def __init__(self):
+        self.bags: Dict[str, BagState] = {}
+        self.connections: Dict[str, List[ConnectionState]] = {}
+        # Keyed by (flight number, scheduled arrival): flight numbers repeat every day
+        self.by_inbound_flight: Dict[Tuple[str, float], List[ConnectionState]] = {}
+        self.pending_updates: Dict[int, ConnectionState] = {}
+        self.last_event_id = 0
+        self.last_connection_id = 0
+        self.events_applied = 0
+
+    def add_connection(self, row: Dict):
+        """Register an open connection for risk tracking"""
+        self.last_connection_id = max(self.last_connection_id, row['id'])
+        legs = self.connections.setdefault(row['bag_tag_number'], [])
+        if any(c.id == row['id'] for c in legs):
+            return
+        conn = ConnectionState(row)
+        legs.append(conn)
+        legs.sort(key=lambda c: c.sequence)
+        self.by_inbound_flight.setdefault((conn.inbound_flight, conn.inbound_scheduled), []).append(conn)
+
+    def current_connection(self, bag_tag_number: str) -> Optional[ConnectionState]:
+        """Return the connection the bag's leg pointer is on"""
+        legs = self.connections.get(bag_tag_number)
+        if not legs:
+            return None
+        leg = self.bags[bag_tag_number].leg if bag_tag_number in self.bags else 1
+        for conn in legs:
+            if conn.sequence >= leg and not conn.completed:
+                return conn
+        return None
+
+    def apply_scan(self, event: Dict, now: Optional[float] = None):
+        """Fold one scan event into the bag state and re-check its connection"""
+        tag = event['bag_tag_number']
+        scan_time = parse_ts(event['scan_timestamp'])
+        now = now if now is not None else time.time()
+
+        state = self.bags.get(tag)
+        if state is None:
+            state = self.bags[tag] = BagState()
+        self.last_event_id = max(self.last_event_id, event['id'])
+        self.events_applied += 1
+
+        # Out-of-order scans never move the bag backwards
+        if scan_time < state.last_scan_time:
+            return
+        state.last_scan_id = event['id']
+        state.last_scan_time = scan_time
+        state.scan_type = sys.intern(event['scan_type'])
+        state.location = sys.intern(event['location_code'])
+        if event.get('flight_number'):
+            state.flight_number = sys.intern(event['flight_number'])
+
+        conn = self.current_connection(tag)
+        if conn is None or state.location != conn.airport:
+            return
+
+        if state.scan_type in INBOUND_SCAN_TYPES:
+            conn.bag_arrived = True
+            if conn.inbound_actual is None:
+                conn.inbound_actual = scan_time
+        elif state.scan_type in OUTBOUND_SCAN_TYPES and state.flight_number == conn.outbound_flight:
+            conn.completed = True
+            state.leg = conn.sequence + 1
+
+        self.evaluate(conn, now)
+
+    def apply_inbound_arrival(self, flight_number: str, arrival_scheduled: str, arrival_actual: str,
+                              now: Optional[float] = None):
+        """Re-evaluate every connection fed by an inbound flight that just landed"""
+        arrived = parse_ts(arrival_actual)
+        now = now if now is not None else time.time()
+        for conn in self.by_inbound_flight.get((flight_number, parse_ts(arrival_scheduled)), []):
+            if conn.inbound_actual is None:
+                conn.inbound_actual = arrived
+                self.evaluate(conn, now)
+
+    def awaiting_arrival(self) -> List[int]:
+        """Ids of one tracked connection per inbound flight that has no actual arrival yet"""
+        ids = []
+        for legs in self.by_inbound_flight.values():
+            waiting = next((c for c in legs if c.inbound_actual is None and not c.completed), None)
+            if waiting is not None:
+                ids.append(waiting.id)
+        return ids
+
+    def evict(self, now: float, bag_idle_seconds: float) -> Tuple[int, int]:
+        """Drop completed (and already written) connections and idle bags; returns (connections, bags)"""
+        evicted_connections = 0
+        for tag in list(self.connections):
+            legs = self.connections[tag]
+            keep = [c for c in legs if not c.completed or c.id in self.pending_updates]
+            # Connections whose outbound left long ago can no longer be missed or made
+            keep = [c for c in keep if c.outbound_scheduled + bag_idle_seconds > now]
+            evicted_connections += len(legs) - len(keep)
+            if keep:
+                self.connections[tag] = keep
+            else:
+                del self.connections[tag]
+
+        tracked = {c.id for legs in self.connections.values() for c in legs}
+        for key in list(self.by_inbound_flight):
+            legs = [c for c in self.by_inbound_flight[key] if c.id in tracked]
+            if legs:
+                self.by_inbound_flight[key] = legs
+            else:
+                del self.by_inbound_flight[key]
+
+        idle = [tag for tag, state in self.bags.items()
+                if tag not in self.connections and now - state.last_scan_time > bag_idle_seconds]
+        for tag in idle:
+            del self.bags[tag]
+        return evicted_connections, len(idle)
+
+    def sweep(self, now: Optional[float] = None):
+        """Re-evaluate connections whose transfer window is closing without scans"""
+        now = now if now is not None else time.time()
+        for legs in self.connections.values():
+            for conn in legs:
+                if not conn.completed and not conn.bag_arrived:
+                    self.evaluate(conn, now)
+
+    def evaluate(self, conn: ConnectionState, now: float):
+        """Score a connection and queue a write when its risk changed"""
+        score = conn.evaluate(now)
+        level = risk_level_for(score)
+        if score != conn.risk_score or level != conn.risk_level:
+            conn.risk_score = score
+            conn.risk_level = level
+            self.pending_updates[conn.id] = conn
+
+    def at_risk(self, min_level: str = 'HIGH') -> List[ConnectionState]:
+        """List tracked connections at or above a risk level"""
+        threshold = next(t for t, level in RISK_LEVELS if level == min_level)
+        return [
+            conn for legs in self.connections.values() for conn in legs
+            if conn.risk_score is not None and conn.risk_score >= threshold and not conn.completed
+        ]
+
+
+def load_open_connections(index: BagJourneyIndex) -> int:
+    """Load PENDING/IN_TRANSIT connections created after the last one loaded"""
+    loaded = 0
+    while True:
+        response = supabase.table('baggage_connections').select(
+            'id, bag_tag_number, connection_sequence, connection_airport, '
+            'inbound_flight_number, inbound_arrival_scheduled, inbound_arrival_actual, '
+            'outbound_flight_number, outbound_departure_scheduled, mct_minutes, '
+            'is_same_terminal, is_interline, transfer_status, connection_risk_score, risk_level'
+        ).in_('transfer_status', OPEN_TRANSFER_STATUSES).gt('id', index.last_connection_id) \
+            .order('id').limit(PAGE_SIZE).execute()
+
+        for row in response.data:
+            index.add_connection(row)
+        loaded += len(response.data)
+        if len(response.data) < PAGE_SIZE:
+            return loaded
+
+
+def apply_inbound_arrivals(index: BagJourneyIndex) -> int:
+    """Apply inbound_arrival_actual values recorded since the connections were loaded"""
+    ids = index.awaiting_arrival()
+    applied = 0
+    for start in range(0, len(ids), 200):
+        response = supabase.table('baggage_connections').select(
+            'inbound_flight_number, inbound_arrival_scheduled, inbound_arrival_actual'
+        ).in_('id', ids[start:start + 200]).not_.is_('inbound_arrival_actual', None).execute()
+        for row in response.data:
+            index.apply_inbound_arrival(row['inbound_flight_number'], row['inbound_arrival_scheduled'],
+                                        row['inbound_arrival_actual'])
+            applied += 1
+    return applied
+
+
+def fetch_new_scan_events(after_id: int) -> List[Dict]:
+    """Fetch the next page of scan events after the last one applied"""
+    response = supabase.table('baggage_scan_events').select(
+        'id, bag_tag_number, scan_timestamp, scan_type, location_code, flight_number'
+    ).gt('id', after_id).order('id').limit(PAGE_SIZE).execute()
+    return response.data
+
+
+def flush_risk_updates(index: BagJourneyIndex) -> int:
+    """Write changed risk scores back to baggage_connections, one update per distinct set of values
+
+    Only rows still PENDING / IN_TRANSIT are written, so a MISSED, REROUTED or
+    PROTECTED status set by another agent since the snapshot is left alone.
+    """
+    if not index.pending_updates:
+        return 0
+
+    assessed_at = format_ts(time.time())
+    groups: Dict[Tuple, List[int]] = {}
+    for conn in index.pending_updates.values():
+        status = 'COMPLETED' if conn.completed else ('IN_TRANSIT' if conn.bag_arrived else 'PENDING')
+        groups.setdefault((conn.risk_score, conn.risk_level, status), []).append(conn.id)
+
+    written = 0
+    for (risk_score, risk_level, status), ids in groups.items():
+        for start in range(0, len(ids), UPDATE_CHUNK):
+            chunk = ids[start:start + UPDATE_CHUNK]
+            try:
+                supabase.table('baggage_connections').update({
+                    'connection_risk_score': risk_score,
+                    'risk_level': risk_level,
+                    'risk_assessed_at': assessed_at,
+                    'risk_assessed_by_agent': AGENT_CODE,
+                    'transfer_status': status,
+                    'updated_at': assessed_at,
+                }).in_('id', chunk).in_('transfer_status', OPEN_TRANSFER_STATUSES).execute()
+                for connection_id in chunk:
+                    index.pending_updates.pop(connection_id, None)
+                written += len(chunk)
+            except Exception as e:
+                print(f"  ⚠️  Error updating connections {chunk[0]}..{chunk[-1]}: {str(e)}")
+    return written
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Real-time bag journey state and misconnect detection')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between scan event polls')
+    parser.add_argument('--sweep-interval', type=float, default=30.0,
+                        help='Seconds between sweeps (no-scan windows, new connections, inbound arrivals, eviction)')
+    parser.add_argument('--bag-idle-hours', type=float, default=6.0,
+                        help='Evict bags with no open connection after this long without scans')
+    parser.add_argument('--start-after-id', type=int, default=None, help='Replay scan events after this id')
+    args = parser.parse_args()
+
+    print("🧳 Starting Bag Journey Index...")
+    print()
+
+    index = BagJourneyIndex()
+
+    print("📊 Loading open connections...")
+    loaded = load_open_connections(index)
+    print(f"   Tracking {loaded} connections for {len(index.connections)} bags")
+
+    if args.start_after_id is not None:
+        index.last_event_id = args.start_after_id
+    else:
+        latest = supabase.table('baggage_scan_events').select('id').order('id', desc=True).limit(1).execute()
+        index.last_event_id = latest.data[0]['id'] if latest.data else 0
+    print(f"   Tailing baggage_scan_events after id {index.last_event_id}")
+    print()
+
+    last_sweep = 0.0
+    try:
+        while True:
+            events = fetch_new_scan_events(index.last_event_id)
+            started = time.perf_counter()
+            for event in events:
+                index.apply_scan(event)
+            swept = time.time() - last_sweep >= args.sweep_interval
+            if swept:
+                try:
+                    added = load_open_connections(index)
+                    arrivals = apply_inbound_arrivals(index)
+                except Exception as e:
+                    added = arrivals = 0
+                    print(f"  ⚠️  Error polling connections: {str(e)}")
+                index.sweep()
+                last_sweep = time.time()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            written = flush_risk_updates(index)
+            if events or written:
+                print(f"🔄 Applied {len(events)} scans in {elapsed_ms:.1f} ms, "
+                      f"{written} risk updates, {len(index.bags)} bags tracked")
+            if swept:
+                connections, bags = index.evict(time.time(), args.bag_idle_hours * 3600)
+                if added or arrivals or connections or bags:
+                    print(f"🧹 {added} new connections, {arrivals} inbound arrivals, "
+                          f"evicted {connections} connections and {bags} bags")
+
+            if len(events) < PAGE_SIZE:
+                time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        flush_risk_updates(index)
+        print()
+        print("=" * 60)
+        print("📈 SUMMARY")
+        print("=" * 60)
+        print(f"Scan events applied:       {index.events_applied}")
+        print(f"Bags tracked:              {len(index.bags)}")
+        print(f"Connections at risk:       {len(index.at_risk())}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
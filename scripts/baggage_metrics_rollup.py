@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Incremental Baggage Performance Metrics Rollup
+
+This script maintains baggage_performance_metrics incrementally instead of
+recomputing it with GROUP BY over every scan event, exception and connection.
+Daily counters are kept in memory per (metric_date, aggregation_level, scope)
+and updated as rows arrive; WEEKLY and MONTHLY rows are derived from the daily
+counters rather than rescanned.
+
+Late-arriving events land in their own day and re-flush it. Exceptions and
+connections are tracked per row, so when a row changes status its previous
+contribution is subtracted before the new one is added.
+
+A flush writes absolute totals for every dirty row together with the source
+watermarks they cover in one transaction (apply_baggage_metrics_flush, Baggage
+Migration 010), which numbers the flush in baggage_metrics_rollup_state. The
+per-row contributions and the distinct-bag sets of open days go to a state
+file tagged with the same number: it is written to <state>.pending before the
+call and moved into place after it. A restart keeps whichever file matches the
+committed flush, seeds daily windows from the stored DAILY rows and resumes
+from its watermarks, so nothing already counted is replayed, even when the
+previous run died mid-flush. Without a matching state file the rollup rebuilds
+every window from the full source history instead; totals are absolute, so
+the rebuild overwrites rather than adds.
+
+Usage:
+    python scripts/baggage_metrics_rollup.py
+    python scripts/baggage_metrics_rollup.py --flush-interval 60 --late-window-days 3
+    python scripts/baggage_metrics_rollup.py --state .rollup_state/baggage_metrics_rollup.json
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Tuple, Optional, Set, Callable
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+# aggregation_level -> scope column on baggage_performance_metrics
+# (AIRLINE has no dedicated column, so its scope lives in metadata.airline_code)
+SCOPE_COLUMNS = {
+    'SYSTEM': None,
+    'AIRLINE': None,
+    'AIRPORT': 'airport_code',
+    'FLIGHT': 'flight_number',
+    'ROUTE': 'route_code',
+    'STATION': 'station_code',
+    'GROUND_HANDLER': 'ground_handler_code',
+}
+
+# baggage_exceptions.exception_type -> mishandling counter column
+EXCEPTION_COLUMNS = {
+    'DELAYED': 'delayed_bags',
+    'LOST': 'lost_bags',
+    'DAMAGED': 'damaged_bags',
+    'PILFERED': 'pilfered_bags',
+    'MISDIRECTED': 'misdirected_bags',
+    'OFFLOADED': 'offloaded_bags',
+    'SHORT_CHECKED': 'short_checked_bags',
+    'RUSH_TAG_MISSED': 'rush_tag_missed',
+    'INTERLINE_MISCONNECTION': 'interline_misconnections',
+}
+
+# Counter columns that can be summed from daily rows into weekly/monthly rows
+ADDITIVE_COLUMNS = [
+    'total_bags_handled', 'total_scan_events', 'total_mishandled_bags',
+    *EXCEPTION_COLUMNS.values(),
+    'total_connections', 'successful_connections', 'missed_connections',
+    'high_risk_connections_identified', 'interventions_triggered', 'interventions_successful',
+    'total_interline_transfers',
+]
+
+PAGE_SIZE = 1000
+DEFAULT_STATE_PATH = os.path.join('.rollup_state', 'baggage_metrics_rollup.json')
+ROLLUP_NAME = 'baggage_metrics_rollup'
+EPOCH = '1970-01-01T00:00:00+00:00'
+Key = Tuple[str, str, str, Optional[str]]  # (metric_date, metric_period, aggregation_level, scope)
+
+
+def parse_day(value: Optional[str]) -> Optional[str]:
+    """Return the UTC calendar date of a timestamptz string"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc).date().isoformat()
+
+
+def week_start(day: str) -> str:
+    """Monday of the ISO week containing day"""
+    d = date.fromisoformat(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def month_start(day: str) -> str:
+    """First day of the month containing day"""
+    return day[:8] + '01'
+
+
+def bag_hash(tag: str) -> int:
+    """Stable 64-bit bag id (hash() of str changes between processes)"""
+    return int.from_bytes(hashlib.blake2b(tag.encode(), digest_size=8).digest(), 'big')
+
+
+def airline_of(flight_number: Optional[str]) -> Optional[str]:
+    """Marketing carrier code from a flight number such as CM101"""
+    return flight_number[:2] if flight_number and len(flight_number) > 2 else None
+
+
+class DailyWindow:
+    """Counters for one (metric_date, aggregation_level, scope)"""
+    __slots__ = ('counters', 'bags', 'sealed')
+
+    def __init__(self):
+        self.counters = Counter()
+        self.bags: Optional[Set[int]] = set()
+        self.sealed = False
+
+
+class MetricsRollup:
+    """Incrementally maintained DAILY/WEEKLY/MONTHLY baggage KPIs"""
+
+    def __init__(self, late_window_days: int = 2, history_loader: Optional[Callable[[str], None]] = None):
+        self.late_window_days = late_window_days
+        self.history_loader = history_loader
+        self.loaded_days: Set[str] = set()
+        self.daily: Dict[Tuple[str, str, Optional[str]], DailyWindow] = {}
+        self.contributions: Dict[Tuple[str, int], List[Tuple[Tuple[str, str, Optional[str]], Counter]]] = {}
+        self.bag_routes: Dict[str, str] = {}
+        self.dirty: Set[Key] = set()
+        self.flush_seq = 0
+
+    def window(self, day: str, level: str, scope: Optional[str]) -> DailyWindow:
+        """Get or create the daily window for a scope"""
+        self.ensure_day(day)
+        key = (day, level, scope)
+        win = self.daily.get(key)
+        if win is None:
+            win = self.daily[key] = DailyWindow()
+        return win
+
+    def ensure_day(self, day: str):
+        """Seed a day from its stored DAILY rows before it is first changed or summed"""
+        if self.history_loader is not None and day not in self.loaded_days:
+            self.history_loader(day)
+            self.loaded_days.add(day)
+
+    def touch(self, day: str, level: str, scope: Optional[str]):
+        """Mark the daily row and the weekly/monthly rows derived from it as dirty"""
+        self.dirty.add((day, 'DAILY', level, scope))
+        self.dirty.add((week_start(day), 'WEEKLY', level, scope))
+        self.dirty.add((month_start(day), 'MONTHLY', level, scope))
+
+    def scan_scopes(self, event: Dict) -> List[Tuple[str, Optional[str]]]:
+        """Aggregation scopes a scan event contributes to"""
+        scopes = [('SYSTEM', None)]
+        location = event.get('location_code')
+        flight = event.get('flight_number')
+        if airline_of(flight):
+            scopes.append(('AIRLINE', airline_of(flight)))
+        if location:
+            scopes.append(('AIRPORT', location))
+            if event.get('terminal'):
+                scopes.append(('STATION', f"{location}-{event['terminal']}"))
+        if flight:
+            scopes.append(('FLIGHT', flight))
+        if event.get('handler_code'):
+            scopes.append(('GROUND_HANDLER', event['handler_code']))
+        route = self.bag_routes.get(event['bag_tag_number'])
+        if route:
+            scopes.append(('ROUTE', route))
+        return scopes
+
+    def apply_scan(self, event: Dict):
+        """Count a scan event (inserts only, so late events just land in their own day)"""
+        day = parse_day(event['scan_timestamp'])
+        bag = bag_hash(event['bag_tag_number'])
+        for level, scope in self.scan_scopes(event):
+            win = self.window(day, level, scope)
+            win.counters['total_scan_events'] += 1
+            if not win.sealed and bag not in win.bags:
+                win.bags.add(bag)
+                win.counters['total_bags_handled'] += 1
+            self.touch(day, level, scope)
+
+    def replace_contribution(self, source: str, row_id: int, day: Optional[str],
+                             scopes: List[Tuple[str, Optional[str]]], delta: Counter):
+        """Swap a mutable row's previous contribution for its current one"""
+        # Load every affected day first, so a failed load leaves nothing half-applied
+        previous = self.contributions.get((source, row_id), [])
+        for affected in {key[0] for key, _ in previous} | ({day} if day else set()):
+            self.ensure_day(affected)
+
+        for (old_day, level, scope), old_delta in self.contributions.pop((source, row_id), []):
+            self.window(old_day, level, scope).counters.subtract(old_delta)
+            self.touch(old_day, level, scope)
+
+        if day is None or not delta:
+            return
+        applied = []
+        for level, scope in scopes:
+            self.window(day, level, scope).counters.update(delta)
+            self.touch(day, level, scope)
+            applied.append(((day, level, scope), delta))
+        self.contributions[(source, row_id)] = applied
+
+    def apply_exception(self, row: Dict):
+        """Count a baggage_exceptions row by mishandling category"""
+        delta = Counter()
+        column = EXCEPTION_COLUMNS.get(row['exception_type'])
+        if column:
+            delta[column] += 1
+            delta['total_mishandled_bags'] += 1
+
+        scopes = [('SYSTEM', None)]
+        if row.get('flight_number'):
+            scopes.append(('FLIGHT', row['flight_number']))
+        if airline_of(row.get('flight_number')):
+            scopes.append(('AIRLINE', airline_of(row['flight_number'])))
+        location = row.get('incident_location') or row.get('last_known_location')
+        if location:
+            scopes.append(('AIRPORT', location))
+        self.replace_contribution('exception', row['id'], parse_day(row['reported_at']), scopes, delta)
+
+    def apply_connection(self, row: Dict):
+        """Count a baggage_connections row by its current transfer outcome"""
+        delta = Counter({'total_connections': 1})
+        if row.get('transfer_status') in ('COMPLETED', 'PROTECTED', 'EXPEDITED'):
+            delta['successful_connections'] += 1
+        elif row.get('transfer_status') in ('MISSED', 'OFFLOADED'):
+            delta['missed_connections'] += 1
+        if row.get('connection_risk_score') is not None and float(row['connection_risk_score']) >= 0.70:
+            delta['high_risk_connections_identified'] += 1
+        if row.get('intervention_triggered'):
+            delta['interventions_triggered'] += 1
+            if row.get('transfer_status') in ('COMPLETED', 'PROTECTED', 'EXPEDITED'):
+                delta['interventions_successful'] += 1
+        if row.get('is_interline'):
+            delta['total_interline_transfers'] += 1
+
+        scopes = [
+            ('SYSTEM', None),
+            ('AIRPORT', row['connection_airport']),
+            ('FLIGHT', row['outbound_flight_number']),
+        ]
+        if airline_of(row['outbound_flight_number']):
+            scopes.append(('AIRLINE', airline_of(row['outbound_flight_number'])))
+        if row.get('ground_handler'):
+            scopes.append(('GROUND_HANDLER', row['ground_handler']))
+        self.replace_contribution('connection', row['id'], parse_day(row['outbound_departure_scheduled']), scopes, delta)
+
+    def seal_old_windows(self, today: str):
+        """Drop distinct-bag sets for days past the late-arrival window"""
+        cutoff = (date.fromisoformat(today) - timedelta(days=self.late_window_days)).isoformat()
+        for (day, _, _), win in self.daily.items():
+            if day < cutoff and not win.sealed:
+                win.bags = None
+                win.sealed = True
+
+    def counters_for(self, key: Key) -> Counter:
+        """Daily counters, or the sum of daily counters for a weekly/monthly key"""
+        day, period, level, scope = key
+        if period == 'DAILY':
+            win = self.daily.get((day, level, scope))
+            return win.counters if win else Counter()
+
+        start = date.fromisoformat(day)
+        if period == 'WEEKLY':
+            end = start + timedelta(days=7)
+        else:
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        total = Counter()
+        d = start
+        while d < end:
+            self.ensure_day(d.isoformat())
+            win = self.daily.get((d.isoformat(), level, scope))
+            if win:
+                total.update({c: win.counters[c] for c in ADDITIVE_COLUMNS if win.counters[c]})
+            d += timedelta(days=1)
+        return total
+
+    def save_state(self, path: str, watermarks: Dict, flush_seq: int):
+        """Persist what a restart needs to continue without recounting"""
+        state = {
+            'flush_seq': flush_seq,
+            'watermarks': watermarks,
+            'contributions': [
+                [source, row_id, [[day, level, scope, dict(delta)] for (day, level, scope), delta in applied]]
+                for (source, row_id), applied in self.contributions.items()
+            ],
+            'open_bags': [
+                [day, level, scope, sorted(win.bags)]
+                for (day, level, scope), win in self.daily.items() if not win.sealed
+            ],
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+    def restore_state(self, state: Dict) -> Dict:
+        """Restore contributions, open-day bag sets and the flush number; returns the watermarks"""
+        self.flush_seq = state['flush_seq']
+        for source, row_id, applied in state['contributions']:
+            self.contributions[(source, row_id)] = [
+                ((day, level, scope), Counter(delta)) for day, level, scope, delta in applied
+            ]
+        for day, level, scope, bags in state['open_bags']:
+            win = self.window(day, level, scope)
+            win.bags = set(bags)
+            win.sealed = False
+        return state['watermarks']
+
+
+def build_metric_row(key: Key, counters: Counter) -> Dict:
+    """Turn counters into a baggage_performance_metrics row with derived rates"""
+    day, period, level, scope = key
+    row = {
+        'metric_date': day,
+        'metric_period': period,
+        'aggregation_level': level,
+        'metric_calculated_at': datetime.now(timezone.utc).isoformat(),
+    }
+    for column in ADDITIVE_COLUMNS:
+        row[column] = int(counters[column])
+
+    column = SCOPE_COLUMNS[level]
+    if column:
+        row[column] = scope
+    elif level == 'AIRLINE':
+        row['metadata'] = {'airline_code': scope}
+
+    if counters['total_bags_handled']:
+        row['mishandling_rate_per_1000'] = round(1000 * counters['total_mishandled_bags'] / counters['total_bags_handled'], 3)
+    decided = counters['successful_connections'] + counters['missed_connections']
+    if decided:
+        row['connection_success_rate'] = round(100 * counters['successful_connections'] / decided, 2)
+    if counters['interventions_triggered']:
+        row['intervention_success_rate'] = round(100 * counters['interventions_successful'] / counters['interventions_triggered'], 2)
+    return row
+
+
+def row_key(row: Dict) -> Key:
+    """Identify an existing metrics row by (date, period, level, scope)"""
+    level = row['aggregation_level']
+    column = SCOPE_COLUMNS.get(level)
+    if column:
+        scope = row.get(column)
+    elif level == 'AIRLINE':
+        scope = (row.get('metadata') or {}).get('airline_code')
+    else:
+        scope = None
+    return (row['metric_date'], row['metric_period'], level, scope)
+
+
+def flush(rollup: MetricsRollup, state_path: str, watermarks: Dict) -> int:
+    """Write every dirty metric row and the watermarks they cover in one transaction
+
+    The state file for the new flush number is written to <state>.pending
+    first and moved into place once the call has committed; dirty keys are
+    only cleared then, so a failed flush is retried in full.
+    """
+    if not rollup.dirty:
+        return 0
+
+    dirty = list(rollup.dirty)
+    rows = [build_metric_row(key, rollup.counters_for(key)) for key in dirty]
+    flush_seq = rollup.flush_seq + 1
+    rollup.save_state(state_path + '.pending', watermarks, flush_seq)
+
+    supabase.rpc('apply_baggage_metrics_flush', {
+        'p_rollup_name': ROLLUP_NAME,
+        'p_flush_seq': flush_seq,
+        'p_watermarks': watermarks,
+        'p_rows': rows,
+    }).execute()
+
+    os.replace(state_path + '.pending', state_path)
+    rollup.flush_seq = flush_seq
+    rollup.dirty.difference_update(dirty)
+    return len(dirty)
+
+
+def committed_flush_seq() -> int:
+    """Number of the last flush committed to baggage_metrics_rollup_state (0 if none)"""
+    response = supabase.table('baggage_metrics_rollup_state').select('flush_seq').eq(
+        'rollup_name', ROLLUP_NAME
+    ).execute()
+    return response.data[0]['flush_seq'] if response.data else 0
+
+
+def load_matching_state(state_path: str, flush_seq: int) -> Optional[Dict]:
+    """The state file (or the pending one from an interrupted flush) written for flush_seq"""
+    for path in (state_path + '.pending', state_path):
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('flush_seq') == flush_seq:
+            return state
+    return None
+
+
+def load_daily_history(rollup: MetricsRollup, since: str, until: Optional[str] = None):
+    """Seed sealed daily windows from stored DAILY rows so weekly/monthly sums stay complete"""
+    offset = 0
+    while True:
+        query = supabase.table('baggage_performance_metrics').select('*').eq(
+            'metric_period', 'DAILY'
+        ).gte('metric_date', since).is_('agent_code', None)
+        if until is not None:
+            query = query.lte('metric_date', until)
+        response = query.order('id').range(offset, offset + PAGE_SIZE - 1).execute()
+        for row in response.data:
+            day, _, level, scope = row_key(row)
+            key = (day, level, scope)
+            win = rollup.daily.get(key)
+            if win is None:
+                win = rollup.daily[key] = DailyWindow()
+            win.counters = Counter({c: row[c] for c in ADDITIVE_COLUMNS if row.get(c)})
+            win.bags = None
+            win.sealed = True
+        if len(response.data) < PAGE_SIZE:
+            return
+        offset += PAGE_SIZE
+
+
+def load_bag_routes(rollup: MetricsRollup, tags: List[str]):
+    """Cache origin-destination routes for bags not seen before"""
+    missing = [t for t in set(tags) if t not in rollup.bag_routes]
+    for start in range(0, len(missing), 200):
+        response = supabase.table('baggage_items').select(
+            'bag_tag_number, origin_airport, destination_airport'
+        ).in_('bag_tag_number', missing[start:start + 200]).execute()
+        for item in response.data:
+            rollup.bag_routes[item['bag_tag_number']] = f"{item['origin_airport']}-{item['destination_airport']}"
+
+
+def fetch_changed(table: str, columns: str, since: List) -> List[Dict]:
+    """Fetch rows of a mutable table after an (updated_at, id) watermark.
+
+    Paging on the pair keeps rows that share the boundary timestamp.
+    """
+    updated_at, row_id = since
+    response = supabase.table(table).select(columns).or_(
+        f'updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt.{row_id})'
+    ).order('updated_at').order('id').limit(PAGE_SIZE).execute()
+    return response.data
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Incremental baggage_performance_metrics rollup')
+    parser.add_argument('--flush-interval', type=float, default=60.0, help='Seconds between metric flushes')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between source polls')
+    parser.add_argument('--late-window-days', type=int, default=2, help='Days late scan events are still de-duplicated')
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help='Watermark/contribution state file')
+    args = parser.parse_args()
+
+    print("📈 Starting Baggage Metrics Rollup...")
+    print()
+
+    flush_seq = committed_flush_seq()
+    state = load_matching_state(args.state, flush_seq)
+    if state is not None:
+        today = date.today().isoformat()
+        since_day = min(week_start(today), month_start(today))
+
+        # Days outside the seeded range are loaded when an update first touches them
+        rollup = MetricsRollup(
+            late_window_days=args.late_window_days,
+            history_loader=lambda day: load_daily_history(rollup, day, day),
+        )
+        print(f"📊 Loading DAILY history since {since_day}...")
+        load_daily_history(rollup, since_day)
+        d = date.fromisoformat(since_day)
+        while d <= date.today():
+            rollup.loaded_days.add(d.isoformat())
+            d += timedelta(days=1)
+        watermarks = rollup.restore_state(state)
+        print(f"   Seeded {len(rollup.daily)} daily windows, resuming after scan {watermarks['scan_id']}")
+    else:
+        # No record of what the stored rows already contain: rebuild from all events
+        rollup = MetricsRollup(late_window_days=args.late_window_days)
+        rollup.flush_seq = flush_seq
+        watermarks = {'scan_id': 0, 'exceptions': [EPOCH, 0], 'connections': [EPOCH, 0]}
+        print(f"📊 No state at {args.state} for flush {flush_seq}: rebuilding from the full event history")
+    print()
+
+    last_flush = time.time()
+
+    try:
+        while True:
+            try:
+                scans = supabase.table('baggage_scan_events').select(
+                    'id, bag_tag_number, scan_timestamp, location_code, terminal, flight_number, handler_code'
+                ).gt('id', watermarks['scan_id']).order('id').limit(PAGE_SIZE).execute().data
+                load_bag_routes(rollup, [s['bag_tag_number'] for s in scans])
+                for scan in scans:
+                    rollup.apply_scan(scan)
+                    watermarks['scan_id'] = scan['id']
+
+                exceptions = fetch_changed(
+                    'baggage_exceptions',
+                    'id, exception_type, flight_number, reported_at, incident_location, last_known_location, updated_at',
+                    watermarks['exceptions'],
+                )
+                for row in exceptions:
+                    rollup.apply_exception(row)
+                    watermarks['exceptions'] = [row['updated_at'], row['id']]
+
+                connections = fetch_changed(
+                    'baggage_connections',
+                    'id, connection_airport, outbound_flight_number, outbound_departure_scheduled, transfer_status, '
+                    'connection_risk_score, intervention_triggered, is_interline, ground_handler, updated_at',
+                    watermarks['connections'],
+                )
+                for row in connections:
+                    rollup.apply_connection(row)
+                    watermarks['connections'] = [row['updated_at'], row['id']]
+
+                if time.time() - last_flush >= args.flush_interval:
+                    # A failed flush is retried at the next interval, not on every poll
+                    last_flush = time.time()
+                    rollup.seal_old_windows(date.today().isoformat())
+                    written = flush(rollup, args.state, watermarks)
+                    if written:
+                        print(f"🔄 Flushed {written} metric rows ({len(rollup.daily)} daily windows in memory)")
+            except Exception as e:
+                print(f"  ⚠️  Error in rollup cycle: {str(e)}")
+                time.sleep(args.poll_interval)
+                continue
+
+            if max(len(scans), len(exceptions), len(connections)) < PAGE_SIZE:
+                time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        print()
+        try:
+            written = flush(rollup, args.state, watermarks)
+            print(f"✅ Final flush wrote {written} metric rows")
+        except Exception as e:
+            print(f"  ⚠️  Error in final flush (resumes from flush {rollup.flush_seq}): {str(e)}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
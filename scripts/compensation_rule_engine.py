@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Compensation Rule Engine
+
+This script adjudicates open baggage_claims against baggage_compensation_rules
+in bulk. Instead of looking up a rule per claim, the active rule set is
+compiled once:
+
+  - Effective windows are resolved in advance. A rule that is superseded
+    (supersedes_rule_id) ends where its successor starts, so each supersedes
+    chain yields non-overlapping intervals.
+  - Rules are indexed by (jurisdiction, exception_type, route_type), with '*'
+    for rules that list no exception or route types. Each key holds sorted
+    interval boundaries, and each segment holds its candidate rules in
+    precedence order (country-specific before '*', newest first).
+  - Depreciation rates, excluded items and special-item caps become
+    rule × item-category matrices.
+
+A batch of claims is then evaluated with NumPy. Claim dates are located with
+searchsorted, country and min_delay_hours are applied as masks, and claimed
+items are flattened, depreciated and summed back per claim with bincount.
+Each claim receives its applicable rule, liability cap, depreciated amount,
+payable amount and approval tier (AUTO, ADJUSTER, MANAGER, EXECUTIVE, or NO_RULE).
+
+Claim inputs: the jurisdiction comes from applicable_jurisdiction, and the
+exception type and flight date from the linked baggage_exceptions row (falling
+back to claim_type and claim_submitted_at). The delay is taken from the
+exception's reported_at → resolved_at (or now). route_type and country_code
+come from the claim metadata.
+
+Claims already decided by an adjuster (APPROVED, PARTIALLY_APPROVED, or with
+claim_reviewed_at set) are not evaluated. --apply writes only the adjudication
+columns through apply_claim_adjudications (Baggage Migration 008), so other claim
+fields are never overwritten; approved_amount_usd is set for AUTO claims only.
+
+Usage:
+    python scripts/compensation_rule_engine.py            # evaluate open claims and print a summary
+    python scripts/compensation_rule_engine.py --apply    # write rule, cap, depreciation and approval back
+    python scripts/compensation_rule_engine.py --as-of 2025-06-30
+
+Requirements:
+    pip install supabase python-dotenv numpy
+"""
+
+import os
+import time
+import argparse
+from collections import Counter
+from datetime import date, datetime, timezone
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+# Claims in these states are already adjudicated
+CLOSED_CLAIM_STATUSES = ['DENIED', 'PAID', 'CLOSED']
+
+# Claims in these states carry an adjuster's decision, which the engine must not override
+DECIDED_CLAIM_STATUSES = ['APPROVED', 'PARTIALLY_APPROVED']
+
+# baggage_claims.applicable_jurisdiction → baggage_compensation_rules.jurisdiction
+JURISDICTION_ALIASES = {'EU_261': 'EU261', 'DOT_DOMESTIC': 'DOT_USA'}
+
+# baggage_claims.claim_type → exception type, when the claim has no linked exception
+CLAIM_TYPE_EXCEPTIONS = {
+    'DELAYED_BAG': 'DELAYED', 'LOST_BAG': 'LOST', 'DAMAGED_BAG': 'DAMAGED', 'PILFERED_BAG': 'PILFERED',
+    'INTERIM_EXPENSES': 'DELAYED',
+}
+
+# Route type assumed when the claim metadata has none
+DEFAULT_ROUTE_TYPES = {'DOT_USA': 'domestic'}
+DEFAULT_ROUTE_TYPE = 'international'
+
+# Age assumed for claimed items without a purchase_date
+DEFAULT_ITEM_AGE_YEARS = 1.0
+
+APPROVAL_TIERS = np.array(['NO_RULE', 'AUTO', 'ADJUSTER', 'MANAGER', 'EXECUTIVE'])
+WILDCARD = '*'
+FAR_FUTURE = np.iinfo(np.int32).max
+PAGE_SIZE = 1000
+UPDATE_CHUNK = 500
+
+# Columns read for evaluation
+CLAIM_COLUMNS = (
+    'id, claim_number, exception_number, bag_tag_number, passenger_pnr, passenger_name, claim_type, '
+    'claim_status, claimed_amount_usd, applicable_jurisdiction, claim_submitted_at, claimed_items, metadata'
+)
+
+
+def day_number(value) -> int:
+    """Date / ISO string to days since epoch"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def as_float(value, default: float) -> float:
+    return default if value is None else float(value)
+
+
+class CompiledRules:
+    """Rule set compiled into interval lookup tables and rule × category matrices"""
+
+    def __init__(self, rules: List[Dict]):
+        self.rules = rules
+        n = len(rules)
+        self.codes = np.array([r['rule_code'] for r in rules] + [None], dtype=object)
+        self.max_liability = np.array([as_float(r.get('max_liability_usd'), np.inf) for r in rules] + [np.nan])
+        self.auto_under = np.array([as_float(r.get('auto_approve_under_usd'), -np.inf) for r in rules] + [-np.inf])
+        self.manager_above = np.array([as_float(r.get('manager_approval_required_above_usd'), np.inf) for r in rules] + [np.inf])
+        self.executive_above = np.array([as_float(r.get('executive_approval_required_above_usd'), np.inf) for r in rules] + [np.inf])
+        self.min_delay = np.array([as_float(r.get('min_delay_hours'), 0.0) for r in rules])
+        self.countries = [set(r.get('applicable_countries') or [WILDCARD]) for r in rules]
+        self.start, self.end = self._effective_windows(rules)
+        self._compile_categories(rules)
+        self.tables = self._compile_tables()
+        self.no_rule = n   # Index of the sentinel row appended to the per-rule arrays
+
+    @staticmethod
+    def _effective_windows(rules: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """[start, end) day intervals with every superseded rule ending where its successor starts"""
+        index = {r['id']: i for i, r in enumerate(rules)}
+        start = np.array([day_number(r['effective_from']) for r in rules], dtype=np.int64)
+        end = np.array([day_number(r['effective_to']) + 1 if r.get('effective_to') else FAR_FUTURE
+                        for r in rules], dtype=np.int64)
+        for i, rule in enumerate(rules):
+            seen = {i}
+            successor, predecessor = i, index.get(rule.get('supersedes_rule_id'))
+            while predecessor is not None and predecessor not in seen:
+                end[predecessor] = min(end[predecessor], start[successor])
+                seen.add(predecessor)
+                successor, predecessor = predecessor, index.get(rules[predecessor].get('supersedes_rule_id'))
+        return start, end
+
+    def _compile_categories(self, rules: List[Dict]):
+        categories = set()
+        for r in rules:
+            categories |= set((r.get('depreciation_rules') or {}).keys())
+            categories |= set(r.get('excluded_items') or [])
+            categories |= set((r.get('special_items') or {}).keys())
+        self.categories = {c: i + 1 for i, c in enumerate(sorted(categories))}   # 0 = uncategorized
+
+        shape = (len(rules) + 1, len(self.categories) + 1)
+        self.rate = np.zeros(shape)
+        self.excluded = np.zeros(shape, dtype=bool)
+        self.item_cap = np.full(shape, np.inf)
+        for i, r in enumerate(rules):
+            for category, rate in (r.get('depreciation_rules') or {}).items():
+                self.rate[i, self.categories[category]] = float(rate)
+            for category in r.get('excluded_items') or []:
+                self.excluded[i, self.categories[category]] = True
+            for category, spec in (r.get('special_items') or {}).items():
+                if spec.get('depreciation') is not None:
+                    self.rate[i, self.categories[category]] = float(spec['depreciation'])
+                if spec.get('max_value') is not None:
+                    self.item_cap[i, self.categories[category]] = float(spec['max_value'])
+
+    def _compile_tables(self) -> Dict[Tuple[str, str, str], Tuple[np.ndarray, List[np.ndarray]]]:
+        """(jurisdiction, exception_type, route_type) → (segment boundaries, candidates per segment)"""
+        members: Dict[Tuple[str, str, str], List[int]] = {}
+        for i, r in enumerate(self.rules):
+            if self.end[i] <= self.start[i]:
+                continue   # Fully superseded
+            for exception_type in r.get('exception_types') or [WILDCARD]:
+                for route_type in r.get('applicable_route_types') or [WILDCARD]:
+                    members.setdefault((r['jurisdiction'], exception_type, route_type), []).append(i)
+
+        tables = {}
+        for key, rule_ids in members.items():
+            bounds = np.unique(np.concatenate([self.start[rule_ids], self.end[rule_ids]]))
+            precedence = sorted(rule_ids, key=lambda i: (WILDCARD in self.countries[i], -self.start[i]))
+            segments = [
+                np.array([i for i in precedence if self.start[i] <= lo and self.end[i] >= hi], dtype=np.int64)
+                for lo, hi in zip(bounds[:-1], bounds[1:])
+            ]
+            tables[key] = (bounds, segments)
+        return tables
+
+    def match(self, jurisdiction: np.ndarray, exception_type: np.ndarray, route_type: np.ndarray,
+              country: np.ndarray, day: np.ndarray, delay_hours: np.ndarray) -> np.ndarray:
+        """Index of the applicable rule per claim (self.no_rule when none applies)"""
+        rule = np.full(len(day), self.no_rule, dtype=np.int64)
+        for use_type, use_route in ((True, True), (True, False), (False, True), (False, False)):
+            pending = np.flatnonzero(rule == self.no_rule)
+            if not len(pending):
+                break
+            types = exception_type[pending] if use_type else np.full(len(pending), WILDCARD, dtype=object)
+            routes = route_type[pending] if use_route else np.full(len(pending), WILDCARD, dtype=object)
+            groups: Dict[Tuple[str, str, str], List[int]] = {}
+            for claim, key in zip(pending, zip(jurisdiction[pending], types, routes)):
+                groups.setdefault(key, []).append(claim)
+
+            for key, claims in groups.items():
+                if key not in self.tables:
+                    continue
+                bounds, segments = self.tables[key]
+                claims = np.asarray(claims)
+                segment = np.searchsorted(bounds, day[claims], side='right') - 1
+                inside = (segment >= 0) & (segment < len(segments))
+                for s in np.unique(segment[inside]):
+                    in_segment = claims[inside & (segment == s)]
+                    for candidate in segments[s]:
+                        open_claims = in_segment[rule[in_segment] == self.no_rule]
+                        if not len(open_claims):
+                            break
+                        allowed = self.countries[candidate]
+                        ok = delay_hours[open_claims] >= self.min_delay[candidate]
+                        if WILDCARD not in allowed:
+                            ok &= np.isin(country[open_claims], list(allowed))
+                        rule[open_claims[ok]] = candidate
+        return rule
+
+    def evaluate(self, batch: 'ClaimBatch') -> Dict[str, np.ndarray]:
+        """Rule, cap, depreciated and payable amounts and approval tier for every claim in the batch"""
+        rule = self.match(batch.jurisdiction, batch.exception_type, batch.route_type,
+                          batch.country, batch.day, batch.delay_hours)
+
+        # Item-level depreciation, summed back per claim
+        item_rule = rule[batch.item_claim]
+        category = np.array([self.categories.get(c, 0) for c in batch.item_category], dtype=np.int64)
+        rate = np.where(np.isnan(batch.item_rate), self.rate[item_rule, category], batch.item_rate)
+        residual = np.clip(1.0 - rate * batch.item_age_years, 0.0, 1.0)
+        value = np.minimum(batch.item_value * residual, self.item_cap[item_rule, category])
+        value[self.excluded[item_rule, category]] = 0.0
+
+        n = len(rule)
+        has_items = np.bincount(batch.item_claim, minlength=n) > 0
+        items_total = np.bincount(batch.item_claim, weights=batch.item_value, minlength=n)
+        depreciated = np.where(has_items, np.bincount(batch.item_claim, weights=value, minlength=n), batch.claimed)
+        depreciated = np.minimum(depreciated, batch.claimed)
+        cap = self.max_liability[rule]
+        payable = np.where(rule == self.no_rule, 0.0, np.minimum(depreciated, cap))
+
+        tier = np.select(
+            [rule == self.no_rule, payable < self.auto_under[rule],
+             payable > self.executive_above[rule], payable > self.manager_above[rule]],
+            [0, 1, 4, 3], default=2,
+        )
+        return {
+            'rule_code': self.codes[rule],
+            'liability_cap_usd': cap,
+            'depreciation_applied_usd': np.where(has_items, np.maximum(items_total - depreciated, 0.0), 0.0),
+            'depreciated_usd': depreciated,
+            'payable_usd': payable,
+            'approval_tier': APPROVAL_TIERS[tier],
+        }
+
+
+class ClaimBatch:
+    """Column arrays for a batch of claims plus their flattened claimed_items"""
+
+    def __init__(self, claims: List[Dict], exceptions: Dict[str, Dict], now: Optional[datetime] = None):
+        now = now or datetime.now(timezone.utc)
+        n = len(claims)
+        self.jurisdiction = np.empty(n, dtype=object)
+        self.exception_type = np.empty(n, dtype=object)
+        self.route_type = np.empty(n, dtype=object)
+        self.country = np.empty(n, dtype=object)
+        self.day = np.zeros(n, dtype=np.int64)
+        self.delay_hours = np.zeros(n)
+        self.claimed = np.zeros(n)
+
+        item_claim, item_category, item_value, item_rate, item_age = [], [], [], [], []
+        for i, claim in enumerate(claims):
+            exception = exceptions.get(claim.get('exception_number')) or {}
+            metadata = claim.get('metadata') or {}
+            jurisdiction = JURISDICTION_ALIASES.get(claim['applicable_jurisdiction'], claim['applicable_jurisdiction'])
+            self.jurisdiction[i] = jurisdiction
+            self.exception_type[i] = exception.get('exception_type') or CLAIM_TYPE_EXCEPTIONS.get(claim['claim_type'], WILDCARD)
+            self.route_type[i] = metadata.get('route_type') or DEFAULT_ROUTE_TYPES.get(jurisdiction, DEFAULT_ROUTE_TYPE)
+            self.country[i] = metadata.get('country_code')
+            self.day[i] = day_number(exception.get('flight_date') or claim['claim_submitted_at'])
+            self.claimed[i] = float(claim['claimed_amount_usd'])
+            if exception.get('reported_at'):
+                reported = datetime.fromisoformat(exception['reported_at'].replace('Z', '+00:00'))
+                resolved = exception.get('resolved_at')
+                resolved = datetime.fromisoformat(resolved.replace('Z', '+00:00')) if resolved else now
+                self.delay_hours[i] = (resolved - reported).total_seconds() / 3600
+
+            for item in claim.get('claimed_items') or []:
+                item_claim.append(i)
+                item_category.append(item.get('item_category'))
+                item_value.append(float(item.get('value_usd') or 0))
+                item_rate.append(np.nan if item.get('depreciation_rate') is None else float(item['depreciation_rate']))
+                purchased = item.get('purchase_date')
+                item_age.append((self.day[i] - day_number(purchased)) / 365.25 if purchased else DEFAULT_ITEM_AGE_YEARS)
+
+        self.item_claim = np.array(item_claim, dtype=np.int64)
+        self.item_category = item_category
+        self.item_value = np.array(item_value)
+        self.item_rate = np.array(item_rate)
+        self.item_age_years = np.maximum(np.array(item_age), 0.0)
+
+
+def fetch_rules(as_of: date) -> List[Dict]:
+    """Fetch every rule in effect by as_of, including expired ones (older claims still fall under them)"""
+    return supabase.table('baggage_compensation_rules').select('*') \
+        .lte('effective_from', as_of.isoformat()).order('effective_from').execute().data
+
+
+def fetch_open_claims() -> List[Dict]:
+    rows = []
+    offset = 0
+    while True:
+        response = supabase.table('baggage_claims').select(CLAIM_COLUMNS) \
+            .not_.in_('claim_status', CLOSED_CLAIM_STATUSES + DECIDED_CLAIM_STATUSES) \
+            .is_('claim_reviewed_at', None) \
+            .order('id').range(offset, offset + PAGE_SIZE - 1).execute()
+        rows.extend(response.data)
+        if len(response.data) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_exceptions(exception_numbers: List[str]) -> Dict[str, Dict]:
+    exceptions = {}
+    numbers = [n for n in set(exception_numbers) if n]
+    for start in range(0, len(numbers), 200):
+        response = supabase.table('baggage_exceptions').select(
+            'exception_number, exception_type, flight_date, reported_at, resolved_at'
+        ).in_('exception_number', numbers[start:start + 200]).execute()
+        for row in response.data:
+            exceptions[row['exception_number']] = row
+    return exceptions
+
+
+def adjudication_rows(claims: List[Dict], result: Dict[str, np.ndarray]) -> List[Dict]:
+    """Adjudication columns per claim_number, in the shape apply_claim_adjudications expects"""
+    evaluated_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for i, claim in enumerate(claims):
+        tier = str(result['approval_tier'][i])
+        cap = result['liability_cap_usd'][i]
+        payable = round(float(result['payable_usd'][i]), 2)
+        rows.append({
+            'claim_number': claim['claim_number'],
+            'rule_code': result['rule_code'][i],
+            'liability_cap_usd': round(float(cap), 2) if np.isfinite(cap) else None,
+            'depreciation_applied_usd': round(float(result['depreciation_applied_usd'][i]), 2),
+            'auto_approved': tier == 'AUTO',
+            'requires_manual_review': tier in ('NO_RULE', 'MANAGER', 'EXECUTIVE'),
+            'payable_usd': payable,
+            'adjudication': {
+                'approval_tier': tier,
+                'payable_usd': payable,
+                'depreciated_usd': round(float(result['depreciated_usd'][i]), 2),
+                'evaluated_at': evaluated_at,
+            },
+        })
+    return rows
+
+
+def bulk_update(rows: List[Dict]) -> int:
+    """Update the adjudication columns in chunks (Baggage Migration 008); claims decided meanwhile are skipped"""
+    written = 0
+    for i in range(0, len(rows), UPDATE_CHUNK):
+        chunk = rows[i:i + UPDATE_CHUNK]
+        try:
+            response = supabase.rpc('apply_claim_adjudications', {'p_rows': chunk}).execute()
+            written += response.data or 0
+        except Exception as e:
+            print(f"  ⚠️  Error updating claims {i}-{i + len(chunk) - 1}: {str(e)}")
+    return written
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Vectorized adjudication of baggage claims against compensation rules')
+    parser.add_argument('--as-of', type=date.fromisoformat, default=date.today(), help='Ignore rules taking effect after this date')
+    parser.add_argument('--apply', action='store_true', help='Write the evaluation back to baggage_claims')
+    args = parser.parse_args()
+
+    print("⚖️  Starting Compensation Rule Engine...")
+    print()
+
+    print("📊 Compiling rules...")
+    started = time.perf_counter()
+    compiled = CompiledRules(fetch_rules(args.as_of))
+    superseded = int(np.sum(compiled.end <= compiled.start))
+    print(f"   {len(compiled.rules)} rules ({superseded} fully superseded) → {len(compiled.tables)} lookup keys, "
+          f"{len(compiled.categories)} item categories in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print()
+
+    print("📥 Loading open claims...")
+    claims = fetch_open_claims()
+    exceptions = fetch_exceptions([c.get('exception_number') for c in claims])
+    print(f"   {len(claims)} claims, {len(exceptions)} linked exceptions")
+    print()
+    if not claims:
+        return
+
+    started = time.perf_counter()
+    batch = ClaimBatch(claims, exceptions)
+    result = compiled.evaluate(batch)
+    elapsed = time.perf_counter() - started
+    print(f"⚡ Evaluated {len(claims)} claims ({len(batch.item_value)} items) in {elapsed * 1000:.1f} ms")
+    for tier, count in sorted(Counter(result['approval_tier']).items()):
+        print(f"   {tier:<10} {count:>7}")
+    print(f"   Payable total: ${result['payable_usd'].sum():,.2f} of ${batch.claimed.sum():,.2f} claimed")
+    print()
+
+    if args.apply:
+        print("💾 Writing adjudication...")
+        written = bulk_update(adjudication_rows(claims, result))
+        print(f"   Updated {written}/{len(claims)} claims")
+        print()
+
+    print("✅ Adjudication complete")
+
+
+if __name__ == "__main__":
+    main()
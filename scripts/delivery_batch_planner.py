@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Baggage Delivery Batch Planner
+
+This script plans one day of last-mile baggage deliveries per station and
+groups them into courier batches instead of routing each delivery on its own.
+
+  1. Pending deliveries for the day (SCHEDULED, with a courier or airline
+     delivery method and geocoded coordinates) are grouped by station. The
+     station is the linked exception's last_known_location, or
+     metadata.station.
+  2. The depot is either given with --depot or estimated from
+     distance_from_airport_km: a least-squares fit of the point whose
+     haversine distance to every delivery matches the recorded distance.
+  3. Pairwise haversine distances are computed in one NumPy broadcast. A
+     time-window-aware nearest-neighbour construction opens a batch, keeps
+     appending the feasible stop with the earliest service start until the
+     batch is full or nothing fits, then opens the next batch.
+  4. Local search: 2-opt within each batch, then relocation of single stops
+     into batches that serve their nearest neighbours. A move is kept only if
+     it shortens the distance and every time window still holds.
+  5. Batch id, stop sequence and planned ETA are written to each delivery's
+     metadata.courier_batch in bulk through apply_delivery_batches (Baggage
+     Migration 013), by id and only while the delivery is still SCHEDULED.
+
+Usage:
+    python scripts/delivery_batch_planner.py                          # plan today, print batches
+    python scripts/delivery_batch_planner.py --date 2025-11-10 --apply
+    python scripts/delivery_batch_planner.py --station PTY --depot 9.0714,-79.3835 --batch-size 10
+
+Requirements:
+    pip install supabase python-dotenv numpy
+"""
+
+import os
+import time
+import argparse
+from datetime import date, datetime, timezone
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+PLANNED_METHODS = ['COURIER_SERVICE', 'AIRLINE_DELIVERY']
+
+EARTH_RADIUS_KM = 6371.0
+AVERAGE_SPEED_KMH = 35.0
+SERVICE_MINUTES = 8.0
+
+# Courier shift, in minutes after midnight; also the window for deliveries without one
+SHIFT_START = 8 * 60
+SHIFT_END = 20 * 60
+
+DEFAULT_BATCH_SIZE = 12
+RELOCATE_NEIGHBOURS = 8
+UPDATE_CHUNK = 200
+PAGE_SIZE = 1000
+
+DELIVERY_COLUMNS = (
+    'id, exception_number, delivery_latitude, delivery_longitude, distance_from_airport_km, '
+    'delivery_time_window_start, delivery_time_window_end, flexible_delivery, metadata'
+)
+
+
+def haversine_matrix(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Pairwise great-circle distances (km) between all points
+
+    Uses cos(a - b) = cos a cos b + sin a sin b, so the n² part is outer
+    products plus a single arcsin instead of per-pair sin/cos.
+    """
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat, sin_lat = np.cos(lat), np.sin(lat)
+    cos_lon, sin_lon = np.cos(lon), np.sin(lon)
+    cos_dlat = np.outer(cos_lat, cos_lat) + np.outer(sin_lat, sin_lat)
+    cos_dlon = np.outer(cos_lon, cos_lon) + np.outer(sin_lon, sin_lon)
+    a = (1 - cos_dlat) / 2 + np.outer(cos_lat, cos_lat) * (1 - cos_dlon) / 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_from(lat0: float, lon0: float, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Great-circle distances (km) from one point to each of the others"""
+    lat0, lon0, lat, lon = np.radians(lat0), np.radians(lon0), np.radians(lat), np.radians(lon)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def estimate_depot(lat: np.ndarray, lon: np.ndarray, distance_km: np.ndarray) -> Tuple[float, float]:
+    """Point whose distance to each delivery best matches distance_from_airport_km (Gauss-Newton)"""
+    known = ~np.isnan(distance_km)
+    guess = np.array([lat.mean(), lon.mean()])
+    if known.sum() < 3:
+        return float(guess[0]), float(guess[1])
+    lat, lon, distance_km = lat[known], lon[known], distance_km[known]
+    step = 1e-4
+    for _ in range(20):
+        residual = haversine_from(guess[0], guess[1], lat, lon) - distance_km
+        jacobian = np.column_stack([
+            (haversine_from(guess[0] + step, guess[1], lat, lon) - distance_km - residual) / step,
+            (haversine_from(guess[0], guess[1] + step, lat, lon) - distance_km - residual) / step,
+        ])
+        delta, *_ = np.linalg.lstsq(jacobian, -residual, rcond=None)
+        guess += delta
+        if np.abs(delta).max() < 1e-6:
+            break
+    return float(guess[0]), float(guess[1])
+
+
+def minutes(value: Optional[str], default: float) -> float:
+    """'HH:MM[:SS]' to minutes after midnight"""
+    if not value:
+        return default
+    hours, mins = value.split(':')[:2]
+    return int(hours) * 60 + int(mins)
+
+
+class StationPlan:
+    """Courier batches for one station's deliveries; index 0 of every matrix is the depot"""
+
+    def __init__(self, deliveries: List[Dict], depot: Tuple[float, float], batch_size: int):
+        self.deliveries = deliveries
+        self.batch_size = batch_size
+        lat = np.array([depot[0]] + [float(d['delivery_latitude']) for d in deliveries])
+        lon = np.array([depot[1]] + [float(d['delivery_longitude']) for d in deliveries])
+        self.distance = haversine_matrix(lat, lon)
+        self.travel = self.distance / AVERAGE_SPEED_KMH * 60
+        flexible = [bool(d.get('flexible_delivery')) for d in deliveries]
+        self.window_start = np.array([SHIFT_START] + [
+            SHIFT_START if f else max(SHIFT_START, minutes(d.get('delivery_time_window_start'), SHIFT_START))
+            for d, f in zip(deliveries, flexible)
+        ], dtype=float)
+        self.window_end = np.array([SHIFT_END] + [
+            SHIFT_END if f else minutes(d.get('delivery_time_window_end'), SHIFT_END)
+            for d, f in zip(deliveries, flexible)
+        ], dtype=float)
+        self.routes: List[List[int]] = []
+        self.unassigned: List[int] = []
+        # Plain lists for the per-stop loops of the local search
+        self._window_start = self.window_start.tolist()
+        self._window_end = self.window_end.tolist()
+
+    def construct(self):
+        """Nearest-neighbour construction by earliest feasible service start"""
+        candidates = np.arange(1, len(self.deliveries) + 1)
+        window_start, window_end = self.window_start, self.window_end
+        back = self.travel[:, 0] + SERVICE_MINUTES
+        while len(candidates):
+            route, current, clock = [], 0, float(SHIFT_START)
+            while len(route) < self.batch_size and len(candidates):
+                start = np.maximum(clock + self.travel[current, candidates], window_start[candidates])
+                # Earliest start first; distance breaks ties between equally early stops
+                score = start + self.distance[current, candidates] * 1e-3
+                score[(start > window_end[candidates]) | (start + back[candidates] > SHIFT_END)] = np.inf
+                pick = int(np.argmin(score))
+                if score[pick] == np.inf:
+                    break
+                best = int(candidates[pick])
+                route.append(best)
+                candidates = np.delete(candidates, pick)
+                clock = float(start[pick]) + SERVICE_MINUTES
+                current = best
+            if not route:
+                # Nothing left fits a fresh batch: the remaining windows cannot be met today
+                self.unassigned = [int(i) for i in candidates]
+                break
+            self.routes.append(route)
+
+    def schedule(self, route: List[int]) -> Optional[List[float]]:
+        """Service start per stop, or None if a window (or the shift end) is violated"""
+        travel, window_start, window_end = self.travel, self._window_start, self._window_end
+        clock, current, starts = float(SHIFT_START), 0, []
+        for stop in route:
+            start = max(clock + travel[current, stop], window_start[stop])
+            if start > window_end[stop]:
+                return None
+            starts.append(start)
+            clock, current = start + SERVICE_MINUTES, stop
+        if clock + travel[current, 0] > SHIFT_END:
+            return None
+        return starts
+
+    def length(self, route: List[int]) -> float:
+        distance = self.distance
+        path = [0] + route + [0]
+        return sum(distance[a, b] for a, b in zip(path, path[1:]))
+
+    def two_opt(self, route: List[int]) -> List[int]:
+        """Reverse segments while that shortens the route and keeps it feasible"""
+        distance = self.distance
+        improved = True
+        while improved:
+            improved = False
+            path = [0] + route + [0]
+            for i in range(1, len(path) - 2):
+                for j in range(i + 1, len(path) - 1):
+                    # Reversing path[i..j] swaps edges (i-1, i) and (j, j+1) for (i-1, j) and (i, j+1)
+                    a, b, c, d = path[i - 1], path[i], path[j], path[j + 1]
+                    if distance[a, c] + distance[b, d] < distance[a, b] + distance[c, d] - 1e-9:
+                        candidate = path[1:i] + path[i:j + 1][::-1] + path[j + 1:-1]
+                        if self.schedule(candidate) is not None:
+                            route, improved = candidate, True
+                            break
+                if improved:
+                    break
+        return route
+
+    def relocate(self) -> int:
+        """Move single stops into the batch of one of their nearest neighbours when that saves distance"""
+        distance = self.distance
+        owner = {stop: r for r, route in enumerate(self.routes) for stop in route}
+        n = len(self.deliveries)
+        k = min(RELOCATE_NEIGHBOURS, n - 1)
+        if k <= 0:
+            return 0
+        neighbours = (np.argpartition(self.distance[1:, 1:], k, axis=1)[:, :k + 1] + 1).tolist()
+        moved = 0
+        for stop in range(1, n + 1):
+            if stop not in owner:
+                continue
+            source = owner[stop]
+            path = [0] + self.routes[source] + [0]
+            i = path.index(stop)
+            saving = distance[path[i - 1], stop] + distance[stop, path[i + 1]] - distance[path[i - 1], path[i + 1]]
+            without = path[1:i] + path[i + 1:-1]
+
+            options = []
+            for target in {owner.get(nb) for nb in neighbours[stop - 1]}:
+                if target is None or target == source or len(self.routes[target]) >= self.batch_size:
+                    continue
+                target_path = [0] + self.routes[target] + [0]
+                for position in range(len(target_path) - 1):
+                    a, b = target_path[position], target_path[position + 1]
+                    gain = saving - (distance[a, stop] + distance[stop, b] - distance[a, b])
+                    if gain > 1e-9:
+                        options.append((gain, target, position))
+
+            for gain, target, position in sorted(options, reverse=True):
+                candidate = self.routes[target][:position] + [stop] + self.routes[target][position:]
+                if self.schedule(candidate) is not None and (not without or self.schedule(without) is not None):
+                    self.routes[source], self.routes[target] = without, candidate
+                    owner[stop] = target
+                    moved += 1
+                    break
+        self.routes = [r for r in self.routes if r]
+        return moved
+
+    def solve(self) -> int:
+        self.construct()
+        self.routes = [self.two_opt(route) for route in self.routes]
+        moved = self.relocate()
+        self.routes = [self.two_opt(route) for route in self.routes]
+        return moved
+
+    def total_km(self) -> float:
+        return sum(self.length(route) for route in self.routes)
+
+
+def fetch_deliveries(day: date) -> List[Dict]:
+    """Fetch the day's geocoded deliveries that are still waiting to be dispatched"""
+    rows = []
+    offset = 0
+    while True:
+        response = supabase.table('baggage_delivery_attempts').select(DELIVERY_COLUMNS) \
+            .eq('delivery_scheduled_date', day.isoformat()).eq('attempt_status', 'SCHEDULED') \
+            .in_('delivery_method', PLANNED_METHODS) \
+            .not_.is_('delivery_latitude', 'null').not_.is_('delivery_longitude', 'null') \
+            .order('id').range(offset, offset + PAGE_SIZE - 1).execute()
+        rows.extend(response.data)
+        if len(response.data) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_stations(exception_numbers: List[str]) -> Dict[str, str]:
+    """exception_number → station the bag is at"""
+    stations = {}
+    numbers = [n for n in set(exception_numbers) if n]
+    for start in range(0, len(numbers), 200):
+        response = supabase.table('baggage_exceptions').select(
+            'exception_number, last_known_location, incident_location'
+        ).in_('exception_number', numbers[start:start + 200]).execute()
+        for row in response.data:
+            station = row.get('last_known_location') or row.get('incident_location')
+            if station:
+                stations[row['exception_number']] = station.upper()
+    return stations
+
+
+def group_by_station(deliveries: List[Dict], stations: Dict[str, str]) -> Dict[str, List[Dict]]:
+    groups: Dict[str, List[Dict]] = {}
+    for delivery in deliveries:
+        station = stations.get(delivery.get('exception_number')) or (delivery.get('metadata') or {}).get('station')
+        groups.setdefault((station or 'UNKNOWN').upper(), []).append(delivery)
+    return groups
+
+
+def assignment_rows(station: str, day: date, plan: StationPlan) -> List[Dict]:
+    """Batch assignments by delivery id, in the shape apply_delivery_batches expects"""
+    planned_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for number, route in enumerate(plan.routes, start=1):
+        batch_id = f"{station}-{day.strftime('%y%m%d')}-{number:03d}"
+        for sequence, (stop, start) in enumerate(zip(route, plan.schedule(route)), start=1):
+            rows.append({
+                'id': plan.deliveries[stop - 1]['id'],
+                'courier_batch': {
+                    'batch_id': batch_id,
+                    'sequence': sequence,
+                    'planned_eta': f"{int(start) // 60:02d}:{int(start) % 60:02d}",
+                    'planned_at': planned_at,
+                },
+            })
+    return rows
+
+
+def bulk_update(rows: List[Dict]) -> int:
+    """Write batch assignments in chunks (Baggage Migration 013); deliveries dispatched meanwhile are skipped"""
+    written = 0
+    for i in range(0, len(rows), UPDATE_CHUNK):
+        chunk = rows[i:i + UPDATE_CHUNK]
+        try:
+            response = supabase.rpc('apply_delivery_batches', {'p_rows': chunk}).execute()
+            written += response.data or 0
+        except Exception as e:
+            print(f"  ⚠️  Error updating deliveries {i}-{i + len(chunk) - 1}: {str(e)}")
+    return written
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Plan courier batches for the day\'s baggage deliveries')
+    parser.add_argument('--date', type=date.fromisoformat, default=date.today(), help='Delivery date')
+    parser.add_argument('--station', help='Only plan this station')
+    parser.add_argument('--depot', help='Depot coordinates as LAT,LON (default: estimated per station)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Maximum stops per courier batch')
+    parser.add_argument('--apply', action='store_true', help='Write batch assignments back')
+    args = parser.parse_args()
+
+    print("🚚 Starting Delivery Batch Planner...")
+    print()
+
+    deliveries = fetch_deliveries(args.date)
+    groups = group_by_station(deliveries, fetch_stations([d.get('exception_number') for d in deliveries]))
+    if args.station:
+        groups = {s: g for s, g in groups.items() if s == args.station.upper()}
+    print(f"📦 {sum(map(len, groups.values()))} deliveries on {args.date} across {len(groups)} stations")
+    print()
+
+    rows = []
+    for station, station_deliveries in sorted(groups.items()):
+        started = time.perf_counter()
+        if args.depot:
+            depot = tuple(float(v) for v in args.depot.split(','))
+        else:
+            depot = estimate_depot(
+                np.array([float(d['delivery_latitude']) for d in station_deliveries]),
+                np.array([float(d['delivery_longitude']) for d in station_deliveries]),
+                np.array([float(d['distance_from_airport_km']) if d.get('distance_from_airport_km') is not None
+                          else np.nan for d in station_deliveries]),
+            )
+        plan = StationPlan(station_deliveries, depot, args.batch_size)
+        moved = plan.solve()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"📍 {station}: {len(station_deliveries)} deliveries → {len(plan.routes)} batches, "
+              f"{plan.total_km():.1f} km, {moved} relocations in {elapsed_ms:.0f} ms "
+              f"(depot {depot[0]:.4f},{depot[1]:.4f})")
+        if plan.unassigned:
+            print(f"   ⚠️  {len(plan.unassigned)} deliveries cannot meet their window today")
+        rows.extend(assignment_rows(station, args.date, plan))
+    print()
+
+    if args.apply and rows:
+        print("💾 Writing batch assignments...")
+        written = bulk_update(rows)
+        print(f"   Updated {written}/{len(rows)} deliveries")
+        print()
+
+    print("✅ Planning complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Baggage Exception Triage Queue
+
+This script keeps every open baggage_exceptions row in memory, ordered by a
+configurable composite priority, so agents asking "what should I work next at
+station X" are answered without re-querying and re-sorting the open set.
+
+  - One indexed binary heap per station (last_known_location, falling back to
+    incident_location). The heap tracks each exception's position, so insert,
+    re-prioritize and removal are O(log n).
+  - Exception changes (new reports, enrichment, closure) are polled by
+    updated_at, which Baggage Migration 009 keeps current with a trigger. The
+    open set is also reconciled against the table every --reconcile-interval,
+    in case a change slips past the watermark. New baggage_scan_events for
+    queued bags move the exception to the scanned station and refresh
+    last_scan_time.
+  - Queue depth and age histograms are kept per station and exception type.
+
+The priority is an ordered list of fields, most significant first:
+    severity         CRITICAL > HIGH > MEDIUM > LOW
+    passenger_tier   CHAIRMAN > PLATINUM > GOLD > SILVER > GENERAL > none
+    reported_at      oldest first
+    claim_value_usd  highest first
+    last_scan_time   stalest first (bags with no scan come first)
+
+Usage:
+    python scripts/exception_triage_queue.py                        # serve on 127.0.0.1:8765
+    python scripts/exception_triage_queue.py --priority severity claim_value_usd reported_at
+    python scripts/exception_triage_queue.py --once --station PTY   # print the top of one queue
+
+    GET /next?station=PTY&n=10      next N exceptions for a station
+    GET /stats                      depth and age histograms per station / exception type
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+# Exceptions in these states still need an agent
+OPEN_STATUSES = ['OPEN', 'INVESTIGATING', 'LOCATED', 'IN_TRANSIT_TO_PASSENGER']
+
+SEVERITY_RANK = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
+TIER_RANK = {'CHAIRMAN': 0, 'PLATINUM': 1, 'GOLD': 2, 'SILVER': 3, 'GENERAL': 4}
+
+DEFAULT_PRIORITY = ['severity', 'passenger_tier', 'reported_at', 'claim_value_usd']
+
+# Upper bounds (hours) of the age histogram buckets; the last bucket is open-ended
+AGE_BUCKETS_HOURS = [1, 4, 12, 24, 72]
+
+UNKNOWN_STATION = 'UNKNOWN'
+PAGE_SIZE = 1000
+
+EXCEPTION_COLUMNS = (
+    'id, exception_number, bag_tag_number, exception_type, severity, status, passenger_tier, '
+    'reported_at, claim_value_usd, last_known_location, incident_location, last_scan_time, '
+    'assigned_to, flight_number, updated_at'
+)
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """ISO timestamp to epoch seconds"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+# Each field maps a row to a sort component where smaller is more urgent
+PRIORITY_FIELDS = {
+    'severity': lambda row: SEVERITY_RANK.get(row.get('severity') or 'MEDIUM', 2),
+    'passenger_tier': lambda row: TIER_RANK.get(row.get('passenger_tier'), len(TIER_RANK)),
+    'reported_at': lambda row: parse_time(row.get('reported_at')) or 0.0,
+    'claim_value_usd': lambda row: -float(row.get('claim_value_usd') or 0),
+    'last_scan_time': lambda row: parse_time(row.get('last_scan_time')) or 0.0,
+}
+
+
+def priority_key(fields: List[str]):
+    """Build a key function for the given field order; ties break on exception id"""
+    extractors = [PRIORITY_FIELDS[f] for f in fields]
+
+    def key(row: Dict) -> Tuple:
+        return tuple(extract(row) for extract in extractors) + (row['id'],)
+    return key
+
+
+def station_of(row: Dict) -> str:
+    return (row.get('last_known_location') or row.get('incident_location') or UNKNOWN_STATION).upper()
+
+
+class IndexedHeap:
+    """Binary min-heap of (key, id) with a position index for O(log n) update and removal"""
+
+    def __init__(self):
+        self.heap: List[Tuple[Tuple, int]] = []
+        self.position: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self.position
+
+    def push(self, item_id: int, key: Tuple):
+        """Insert, or re-prioritize if already present"""
+        if item_id in self.position:
+            i = self.position[item_id]
+            old = self.heap[i][0]
+            self.heap[i] = (key, item_id)
+            if key < old:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+            return
+        self.heap.append((key, item_id))
+        self.position[item_id] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def remove(self, item_id: int):
+        i = self.position.pop(item_id, None)
+        if i is None:
+            return
+        last = self.heap.pop()
+        if i < len(self.heap):
+            self.heap[i] = last
+            self.position[last[1]] = i
+            self._sift_up(i)
+            self._sift_down(self.position[last[1]])
+
+    def smallest(self, n: int) -> List[int]:
+        """Ids of the n smallest entries without popping: best-first walk from the root, O(n log n)"""
+        result = []
+        frontier = IndexedHeap()
+        if self.heap:
+            frontier.push(0, self.heap[0][0])
+        while frontier.heap and len(result) < n:
+            i = frontier.heap[0][1]
+            frontier.remove(i)
+            result.append(self.heap[i][1])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self.heap):
+                    frontier.push(child, self.heap[child][0])
+        return result
+
+    def _swap(self, i: int, j: int):
+        self.heap[i], self.heap[j] = self.heap[j], self.heap[i]
+        self.position[self.heap[i][1]] = i
+        self.position[self.heap[j][1]] = j
+
+    def _sift_up(self, i: int):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self.heap[i][0] >= self.heap[parent][0]:
+                return
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int):
+        size = len(self.heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and self.heap[child][0] < self.heap[smallest][0]:
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+
+class TriageQueue:
+    """Open exceptions partitioned into one indexed heap per station"""
+
+    def __init__(self, priority: List[str]):
+        self.key = priority_key(priority)
+        self.rows: Dict[int, Dict] = {}
+        self.station: Dict[int, str] = {}
+        self.by_tag: Dict[str, int] = {}
+        self.heaps: Dict[str, IndexedHeap] = {}
+        self.depth: Dict[Tuple[str, str], int] = {}
+        self.lock = threading.Lock()
+
+    def upsert(self, row: Dict):
+        """Insert a new exception, re-prioritize a changed one, or drop it once closed"""
+        if row.get('status') not in OPEN_STATUSES:
+            self.remove(row['id'])
+            return
+        current = self.rows.get(row['id'])
+        if current is not None and (parse_time(current.get('last_scan_time')) or 0) > (parse_time(row.get('last_scan_time')) or 0):
+            # A scan already applied here is newer than the stored row
+            row = {**row, 'last_known_location': current['last_known_location'], 'last_scan_time': current['last_scan_time']}
+        station = station_of(row)
+        previous = self.station.get(row['id'])
+        if previous is not None and previous != station:
+            self.remove(row['id'])
+        elif previous is not None:
+            self._count(previous, self.rows[row['id']]['exception_type'], -1)
+
+        self.rows[row['id']] = row
+        self.station[row['id']] = station
+        if row.get('bag_tag_number'):
+            self.by_tag[row['bag_tag_number']] = row['id']
+        self.heaps.setdefault(station, IndexedHeap()).push(row['id'], self.key(row))
+        self._count(station, row['exception_type'], 1)
+
+    def remove(self, exception_id: int):
+        station = self.station.pop(exception_id, None)
+        if station is None:
+            return
+        row = self.rows.pop(exception_id)
+        if self.by_tag.get(row.get('bag_tag_number')) == exception_id:
+            del self.by_tag[row['bag_tag_number']]
+        self.heaps[station].remove(exception_id)
+        if not self.heaps[station]:
+            del self.heaps[station]
+        self._count(station, row['exception_type'], -1)
+
+    def apply_scan(self, scan: Dict) -> bool:
+        """Move a queued exception to the station its bag was last scanned at"""
+        exception_id = self.by_tag.get(scan['bag_tag_number'])
+        if exception_id is None:
+            return False
+        row = self.rows[exception_id]
+        if row.get('last_scan_time') and parse_time(scan['scan_timestamp']) <= parse_time(row['last_scan_time']):
+            return False
+        self.upsert({**row, 'last_known_location': scan['location_code'], 'last_scan_time': scan['scan_timestamp']})
+        return True
+
+    def next_for(self, station: str, n: int) -> List[Dict]:
+        heap = self.heaps.get(station.upper())
+        if not heap:
+            return []
+        return [self.rows[i] for i in heap.smallest(n)]
+
+    def stats(self, now: Optional[float] = None) -> Dict:
+        """Depth and age histogram per station and exception type"""
+        now = now or time.time()
+        labels = [f"<{h}h" for h in AGE_BUCKETS_HOURS] + [f">={AGE_BUCKETS_HOURS[-1]}h"]
+        stations: Dict[str, Dict] = {}
+        for exception_id, row in self.rows.items():
+            entry = stations.setdefault(self.station[exception_id], {}).setdefault(
+                row['exception_type'], {'depth': 0, 'age_histogram': dict.fromkeys(labels, 0)}
+            )
+            entry['depth'] += 1
+            age_hours = (now - (parse_time(row.get('reported_at')) or now)) / 3600
+            bucket = next((i for i, h in enumerate(AGE_BUCKETS_HOURS) if age_hours < h), len(AGE_BUCKETS_HOURS))
+            entry['age_histogram'][labels[bucket]] += 1
+        return {'total': len(self.rows), 'stations': stations}
+
+    def _count(self, station: str, exception_type: str, delta: int):
+        key = (station, exception_type)
+        self.depth[key] = self.depth.get(key, 0) + delta
+        if not self.depth[key]:
+            del self.depth[key]
+
+
+def fetch_exceptions(updated_since: Optional[str] = None) -> List[Dict]:
+    """Fetch open exceptions (or every exception changed since a watermark)"""
+    rows = []
+    offset = 0
+    while True:
+        query = supabase.table('baggage_exceptions').select(EXCEPTION_COLUMNS)
+        if updated_since:
+            query = query.gt('updated_at', updated_since)
+        else:
+            query = query.in_('status', OPEN_STATUSES)
+        response = query.order('id').range(offset, offset + PAGE_SIZE - 1).execute()
+        rows.extend(response.data)
+        if len(response.data) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_scans(created_since: str, after_id: int) -> List[Dict]:
+    """Fetch scan events after the (created_at, id) watermark"""
+    return supabase.table('baggage_scan_events').select(
+        'id, bag_tag_number, location_code, scan_timestamp, created_at'
+    ).or_(f'created_at.gt."{created_since}",and(created_at.eq."{created_since}",id.gt.{after_id})') \
+        .order('created_at').order('id').limit(PAGE_SIZE).execute().data
+
+
+def reconcile(queue: TriageQueue) -> Tuple[int, int]:
+    """Reload the open set; returns (refreshed, dropped)"""
+    rows = fetch_exceptions()
+    open_ids = {row['id'] for row in rows}
+    with queue.lock:
+        stale = [exception_id for exception_id in queue.rows if exception_id not in open_ids]
+        for exception_id in stale:
+            queue.remove(exception_id)
+        for row in rows:
+            queue.upsert(row)
+    return len(rows), len(stale)
+
+
+def follow_changes(queue: TriageQueue, watermark: str, poll_interval: float, reconcile_interval: float,
+                   stop: threading.Event):
+    """Apply exception changes and new scans until stopped, reconciling the open set periodically"""
+    exceptions_since = scans_since = watermark
+    scans_after_id = 0
+    last_reconcile = time.monotonic()
+    while not stop.is_set():
+        if time.monotonic() - last_reconcile >= reconcile_interval:
+            try:
+                refreshed, dropped = reconcile(queue)
+                if dropped:
+                    print(f"   🧹 Reconciled {refreshed} open exceptions, dropped {dropped} no longer open")
+            except Exception as e:
+                print(f"  ⚠️  Error reconciling open exceptions: {str(e)}")
+            last_reconcile = time.monotonic()
+        try:
+            changed = fetch_exceptions(updated_since=exceptions_since)
+            scans = fetch_scans(scans_since, scans_after_id)
+        except Exception as e:
+            print(f"  ⚠️  Error polling changes: {str(e)}")
+            stop.wait(poll_interval)
+            continue
+
+        with queue.lock:
+            for row in changed:
+                queue.upsert(row)
+            moved = sum(queue.apply_scan(scan) for scan in scans)
+        if changed:
+            exceptions_since = max(r['updated_at'] for r in changed)
+        if scans:
+            scans_since, scans_after_id = scans[-1]['created_at'], scans[-1]['id']
+        if changed or moved:
+            print(f"   🔄 {len(changed)} exception changes, {moved} relocated by scans ({len(queue.rows)} open)")
+        if len(scans) < PAGE_SIZE:
+            stop.wait(poll_interval)
+
+
+def make_handler(queue: TriageQueue):
+    class TriageHandler(BaseHTTPRequestHandler):
+        """GET /next?station=XXX&n=10 and GET /stats"""
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            with queue.lock:
+                if url.path == '/next' and params.get('station'):
+                    n = int(params.get('n', ['10'])[0])
+                    body, status = queue.next_for(params['station'][0], n), 200
+                elif url.path == '/stats':
+                    body, status = queue.stats(), 200
+                else:
+                    body, status = {'error': 'use /next?station=XXX&n=10 or /stats'}, 404
+            payload = json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return TriageHandler
+
+
+def print_queue(queue: TriageQueue, station: str, n: int):
+    print(f"📋 Next {n} at {station.upper()}:")
+    for row in queue.next_for(station, n):
+        print(f"   {row['exception_number']:<14} {row['exception_type']:<24} {row.get('severity') or '-':<9}"
+              f"{row.get('passenger_tier') or '-':<10} {row['reported_at']}")
+    print()
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='In-memory triage queue for open baggage exceptions')
+    parser.add_argument('--priority', nargs='+', default=DEFAULT_PRIORITY, choices=list(PRIORITY_FIELDS),
+                        help='Priority fields, most significant first')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to serve on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to serve on')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between change polls')
+    parser.add_argument('--reconcile-interval', type=float, default=600.0,
+                        help='Seconds between full reloads of the open set')
+    parser.add_argument('--once', action='store_true', help='Load, print stats and exit')
+    parser.add_argument('--station', help='With --once, print the top of this station queue')
+    parser.add_argument('-n', type=int, default=10, help='With --once, exceptions to print')
+    args = parser.parse_args()
+
+    print("🧳 Starting Baggage Exception Triage Queue...")
+    print(f"   Priority: {' → '.join(args.priority)}")
+    print()
+
+    queue = TriageQueue(args.priority)
+    watermark = datetime.now(timezone.utc).isoformat()
+
+    print("📊 Loading open exceptions...")
+    started = time.perf_counter()
+    for row in fetch_exceptions():
+        queue.upsert(row)
+    print(f"   Queued {len(queue.rows)} exceptions across {len(queue.heaps)} stations "
+          f"in {(time.perf_counter() - started):.2f}s")
+    for (station, exception_type), depth in sorted(queue.depth.items()):
+        print(f"   {station:<8} {exception_type:<24} {depth:>6}")
+    print()
+
+    if args.once:
+        if args.station:
+            print_queue(queue, args.station, args.n)
+        return
+
+    stop = threading.Event()
+    threading.Thread(target=follow_changes, args=(queue, watermark, args.poll_interval, args.reconcile_interval, stop), daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(queue))
+    print(f"🌐 Serving on http://{args.host}:{args.port}/next?station=XXX&n=10")
+    print()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stop.set()
+        server.server_close()
+        print()
+        print(f"✅ Stopped with {len(queue.rows)} open exceptions queued")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Interline SLA Deadline Tracker
+
+Each interline_bag_messages row carries three SLA deadlines:
+
+    sla_notification_deadline   15 min   met once the partner has the message (RECEIVED or later)
+    sla_response_deadline       60 min   met once custody is acknowledged (ACKNOWLEDGED or later)
+    sla_recovery_deadline       24 h     met once the message is reconciled or PROCESSED
+
+Rather than repeatedly scanning the table for past-due rows, this script loads
+the open messages once and puts every deadline (plus a near-breach warning
+ahead of it) on a hierarchical timing wheel. It then follows new and
+acknowledged messages incrementally, paging on (updated_at, id); updated_at
+is kept current by the Baggage Migration 007 trigger. Scheduling is O(1) and
+each timer moves through at most one slot per wheel level, so CPU per tick and
+memory per outstanding deadline stay flat no matter how many timers are
+pending. A satisfied stage is not removed from the wheel: when its timer fires
+it is checked against the message state and dropped.
+
+Breaches fire on the second they are due. sla_met / sla_violation_reason are
+written in batches, grouped by outcome so that each group is a single update
+by id. Breaches are re-read from the table just before they are written, and
+messages without any SLA deadline are not tracked.
+
+Usage:
+    python scripts/interline_sla_tracker.py                    # track until interrupted
+    python scripts/interline_sla_tracker.py --quiet            # summaries only, no per-event lines
+    python scripts/interline_sla_tracker.py --flush-interval 10
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import time
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+# Stage → (deadline column, statuses that satisfy it, flag that satisfies it,
+#          timestamp of satisfaction, near-breach lead in seconds)
+SLA_STAGES = {
+    'notification': ('sla_notification_deadline', {'RECEIVED', 'ACKNOWLEDGED', 'PROCESSED'}, None,
+                     'message_received_at', 5 * 60),
+    'response': ('sla_response_deadline', {'ACKNOWLEDGED', 'PROCESSED'}, 'custody_acknowledged',
+                 'liability_transferred_at', 15 * 60),
+    'recovery': ('sla_recovery_deadline', {'PROCESSED'}, 'reconciled',
+                 'reconciled_at', 2 * 3600),
+}
+STAGES = list(SLA_STAGES)
+
+# Messages in these states will never satisfy an outstanding stage
+TERMINAL_STATUSES = {'FAILED', 'EXPIRED'}
+
+MESSAGE_COLUMNS = (
+    'id, message_id, message_type, partner_airline_code, bag_tag_number, message_status, '
+    'custody_acknowledged, reconciled, message_received_at, liability_transferred_at, reconciled_at, '
+    'message_processed_at, sla_notification_deadline, sla_response_deadline, sla_recovery_deadline, '
+    'sla_met, updated_at'
+)
+
+PAGE_SIZE = 1000
+UPDATE_CHUNK = 200
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """ISO timestamp to epoch seconds"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+class TimingWheel:
+    """Hierarchical timing wheel with 1-second ticks
+
+    Level l has SLOTS slots of SLOTS**l ticks each. A timer waits in the
+    coarsest level that can hold it. When the wheel reaches the start of
+    that slot, the timer is cascaded to a finer level, and it fires from
+    level 0 on its exact tick.
+    """
+
+    BITS = 6
+    SLOTS = 1 << BITS
+    LEVELS = 5   # 64**5 seconds ≈ 34 years of range
+
+    def __init__(self, now: float):
+        self.tick = int(now)
+        self.wheels: List[List[List[Tuple[int, tuple]]]] = [
+            [[] for _ in range(self.SLOTS)] for _ in range(self.LEVELS)
+        ]
+        self.size = 0
+
+    def schedule(self, when: float, item: tuple, due: Optional[List[tuple]] = None):
+        """Add a timer; timers already due go straight to `due` when given"""
+        at = -int(-when // 1)   # ceil: never fire early
+        delta = at - self.tick
+        if delta <= 0:
+            if due is not None:
+                due.append(item)
+                return
+            at, delta = self.tick + 1, 1
+        level = 0
+        while level < self.LEVELS - 1 and delta >= 1 << (self.BITS * (level + 1)):
+            level += 1
+        slot = (at >> (self.BITS * level)) & (self.SLOTS - 1)
+        self.wheels[level][slot].append((at, item))
+        self.size += 1
+
+    def advance(self, now: float) -> List[tuple]:
+        """Move the wheel to `now` and return every timer that came due, in order"""
+        due: List[tuple] = []
+        target = int(now)
+        while self.tick < target:
+            self.tick += 1
+            for level in range(self.LEVELS - 1, 0, -1):
+                if self.tick & ((1 << (self.BITS * level)) - 1) == 0:
+                    slot = (self.tick >> (self.BITS * level)) & (self.SLOTS - 1)
+                    entries, self.wheels[level][slot] = self.wheels[level][slot], []
+                    self.size -= len(entries)
+                    for at, item in entries:
+                        self.schedule(at, item, due)
+            entries, self.wheels[0][self.tick & (self.SLOTS - 1)] = self.wheels[0][self.tick & (self.SLOTS - 1)], []
+            self.size -= len(entries)
+            due.extend(item for _, item in entries)
+        return due
+
+
+class SLATracker:
+    """Outstanding SLA stages per message, driven by a timing wheel"""
+
+    def __init__(self, now: float, quiet: bool = False):
+        self.wheel = TimingWheel(now)
+        self.messages: Dict[int, Dict] = {}
+        self.deadlines: Dict[int, Dict[str, float]] = {}
+        self.breaches: Dict[int, List[str]] = {}
+        self.pending_writes: Dict[int, Tuple[bool, Optional[str]]] = {}
+        self.events = Counter()
+        self.quiet = quiet
+
+    def ingest(self, row: Dict, now: float):
+        """Track a new message or apply a change (acknowledgement, processing, reconciliation)"""
+        if row['id'] not in self.messages and (row.get('sla_met') is not None or row['id'] in self.pending_writes):
+            return   # Already decided, by an earlier run, another writer or an unflushed outcome
+        first_seen = row['id'] not in self.messages
+        self.messages[row['id']] = row
+
+        if first_seen:
+            self.deadlines[row['id']] = {}
+            due: List[tuple] = []
+            for stage, (column, _, _, _, lead) in SLA_STAGES.items():
+                deadline = parse_time(row.get(column))
+                if deadline is None:
+                    continue
+                self.deadlines[row['id']][stage] = deadline
+                if deadline - lead > now:
+                    self.wheel.schedule(deadline - lead, (row['id'], stage, True))
+                self.wheel.schedule(deadline, (row['id'], stage, False), due)
+            if not self.deadlines[row['id']]:
+                # No SLA deadlines on this message: nothing to track or record
+                del self.messages[row['id']], self.deadlines[row['id']]
+                return
+            for item in due:
+                self._fire(item, now)
+        if row['id'] in self.messages:
+            self._settle(row['id'], now)
+
+    def advance(self, now: float):
+        for item in self.wheel.advance(now):
+            self._fire(item, now)
+
+    def _satisfied_at(self, row: Dict, stage: str) -> Optional[float]:
+        """When the stage was satisfied (None if it has not been)"""
+        _, statuses, flag, timestamp, _ = SLA_STAGES[stage]
+        if row['message_status'] not in statuses and not (flag and row.get(flag)):
+            return None
+        return (parse_time(row.get(timestamp)) or parse_time(row.get('message_processed_at'))
+                or parse_time(row.get('updated_at')) or 0.0)
+
+    def _fire(self, item: tuple, now: float):
+        message_id, stage, warning = item
+        row = self.messages.get(message_id)
+        if row is None or stage in self.breaches.get(message_id, []):
+            return
+        if self._satisfied_at(row, stage) is not None:
+            return
+        if warning:
+            if now >= self.deadlines[message_id][stage]:
+                return   # Caught up past the deadline; the breach timer reports it
+            self.events['near_breach'] += 1
+            self._log('⏳', row, f"{stage} deadline in {(self.deadlines[message_id][stage] - now) / 60:.0f} min")
+            return
+        self.events['breach'] += 1
+        self.breaches.setdefault(message_id, []).append(stage)
+        self._log('🚨', row, f"{stage} deadline missed")
+        self._record(message_id, False)
+        self._settle(message_id, now)
+
+    def _settle(self, message_id: int, now: float):
+        """Record the outcome and stop tracking once every stage is met or breached"""
+        row = self.messages[message_id]
+        breached = self.breaches.setdefault(message_id, [])
+        for stage, deadline in self.deadlines[message_id].items():
+            if stage in breached:
+                continue
+            satisfied = self._satisfied_at(row, stage)
+            if satisfied is not None and satisfied > deadline:
+                breached.append(stage)   # Satisfied, but only after the deadline
+                self.events['late'] += 1
+            elif satisfied is None and row['message_status'] not in TERMINAL_STATUSES:
+                return   # Still outstanding
+            elif satisfied is None:
+                breached.append(stage)
+        self._record(message_id, not breached)
+        self.events['met' if not breached else 'closed_with_breach'] += 1
+        del self.messages[message_id], self.deadlines[message_id], self.breaches[message_id]
+
+    def evaluate(self, row: Dict, now: float) -> Tuple[List[str], bool]:
+        """(breached stages, any stage still outstanding) from a message row alone"""
+        breached, outstanding = [], False
+        for stage, (column, _, _, _, _) in SLA_STAGES.items():
+            deadline = parse_time(row.get(column))
+            if deadline is None:
+                continue
+            satisfied = self._satisfied_at(row, stage)
+            if satisfied is not None:
+                if satisfied > deadline:
+                    breached.append(stage)
+            elif now >= deadline or row['message_status'] in TERMINAL_STATUSES:
+                breached.append(stage)
+            else:
+                outstanding = True
+        return breached, outstanding
+
+    def recheck_breaches(self, now: float):
+        """Re-read messages about to be written as breached before writing them.
+
+        A stage can be satisfied by an UPDATE the change poll has not seen yet;
+        the current row decides, not the tracker's copy.
+        """
+        ids = [message_id for message_id, (met, _) in self.pending_writes.items() if not met]
+        for start in range(0, len(ids), UPDATE_CHUNK):
+            response = supabase.table('interline_bag_messages').select(MESSAGE_COLUMNS) \
+                .in_('id', ids[start:start + UPDATE_CHUNK]).execute()
+            for row in response.data:
+                breached, outstanding = self.evaluate(row, now)
+                if breached:
+                    reason = '; '.join(f"{stage} deadline missed" for stage in sorted(breached, key=STAGES.index))
+                    self.pending_writes[row['id']] = (False, reason)
+                    if row['id'] in self.messages:
+                        self.messages[row['id']] = row
+                        self.breaches[row['id']] = breached
+                    continue
+
+                self.events['breach_cleared'] += 1
+                self._log('✅', row, "breach cleared on re-read")
+                del self.pending_writes[row['id']]
+                if row['id'] in self.messages:
+                    self.messages[row['id']] = row
+                    self.breaches[row['id']] = []
+                    self._settle(row['id'], now)
+                elif outstanding:
+                    self.ingest(row, now)
+                else:
+                    self.pending_writes[row['id']] = (True, None)
+
+    def _record(self, message_id: int, met: bool):
+        breached = sorted(self.breaches.get(message_id, []), key=STAGES.index)
+        reason = None if met else '; '.join(f"{stage} deadline missed" for stage in breached)
+        self.pending_writes[message_id] = (met, reason)
+
+    def _log(self, icon: str, row: Dict, text: str):
+        if not self.quiet:
+            print(f"   {icon} {row['message_id']} {row['message_type']} {row['partner_airline_code']} "
+                  f"{row['bag_tag_number']}: {text}")
+
+    def flush(self) -> int:
+        """Write recorded outcomes, one update per (sla_met, reason) group"""
+        try:
+            self.recheck_breaches(time.time())
+        except Exception as e:
+            print(f"  ⚠️  Error re-reading breached messages, deferring their writes: {str(e)}")
+            return 0
+        groups: Dict[Tuple[bool, Optional[str]], List[int]] = {}
+        for message_id, outcome in self.pending_writes.items():
+            groups.setdefault(outcome, []).append(message_id)
+        written = 0
+        for (met, reason), ids in groups.items():
+            for start in range(0, len(ids), UPDATE_CHUNK):
+                chunk = ids[start:start + UPDATE_CHUNK]
+                try:
+                    supabase.table('interline_bag_messages').update({
+                        'sla_met': met,
+                        'sla_violation_reason': reason,
+                    }).in_('id', chunk).execute()
+                    for message_id in chunk:
+                        del self.pending_writes[message_id]
+                    written += len(chunk)
+                except Exception as e:
+                    print(f"  ⚠️  Error writing SLA outcome for {len(chunk)} messages: {str(e)}")
+        return written
+
+
+def fetch_messages() -> List[Dict]:
+    """Fetch every undecided message"""
+    rows = []
+    offset = 0
+    while True:
+        response = supabase.table('interline_bag_messages').select(MESSAGE_COLUMNS) \
+            .is_('sla_met', 'null').order('id').range(offset, offset + PAGE_SIZE - 1).execute()
+        rows.extend(response.data)
+        if len(response.data) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_changed_messages(updated_since: str, after_id: int) -> List[Dict]:
+    """Fetch the next page of messages changed after the (updated_at, id) watermark.
+
+    Paging on the pair keeps messages that share the boundary timestamp, which
+    a strict updated_at > watermark poll would skip.
+    """
+    return supabase.table('interline_bag_messages').select(MESSAGE_COLUMNS) \
+        .or_(f'updated_at.gt."{updated_since}",and(updated_at.eq."{updated_since}",id.gt.{after_id})') \
+        .order('updated_at').order('id').limit(PAGE_SIZE).execute().data
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Timing-wheel SLA tracker for interline bag messages')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between change polls')
+    parser.add_argument('--flush-interval', type=float, default=5.0, help='Seconds between outcome writes')
+    parser.add_argument('--quiet', action='store_true', help='Only print periodic summaries')
+    args = parser.parse_args()
+
+    print("⏱️  Starting Interline SLA Deadline Tracker...")
+    print()
+
+    now = time.time()
+    tracker = SLATracker(now, quiet=args.quiet)
+    watermark = datetime.now(timezone.utc).isoformat()
+
+    print("📊 Loading open messages...")
+    started = time.perf_counter()
+    for row in fetch_messages():
+        tracker.ingest(row, now)
+    print(f"   Tracking {len(tracker.messages)} messages, {tracker.wheel.size} timers "
+          f"in {(time.perf_counter() - started):.2f}s")
+    print()
+
+    messages_since, messages_after_id = watermark, 0
+    next_poll = next_flush = time.time()
+    try:
+        while True:
+            now = time.time()
+            try:
+                tracker.advance(now)
+
+                if now >= next_poll:
+                    next_poll = now + args.poll_interval
+                    changed = fetch_changed_messages(messages_since, messages_after_id)
+                    for row in changed:
+                        tracker.ingest(row, now)
+                    if changed:
+                        messages_since, messages_after_id = changed[-1]['updated_at'], changed[-1]['id']
+                    if len(changed) == PAGE_SIZE:
+                        next_poll = now   # More changes are waiting; fetch the next page on the next tick
+
+                if now >= next_flush:
+                    next_flush = now + args.flush_interval
+                    if tracker.pending_writes:
+                        written = tracker.flush()
+                        print(f"   💾 {written} outcomes written | tracking {len(tracker.messages)} messages, "
+                              f"{tracker.wheel.size} timers | {dict(tracker.events)}")
+            except Exception as e:
+                print(f"  ⚠️  Error in tracking loop: {str(e)}")
+
+            # Sleep to the next whole second so deadlines fire on time
+            time.sleep(max(0.0, 1.0 - (time.time() % 1.0)))
+    except KeyboardInterrupt:
+        print()
+    finally:
+        # Breach outcomes recorded since the last flush are written before exiting
+        written = tracker.flush()
+        print(f"✅ Stopped: {written} final outcomes written, {len(tracker.messages)} messages still open")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Job Profiler
+
+Shared --profile mode for the Python jobs (migrate_priority_workflows.py, the
+map_*_to_data.py mappers, test_neo4j.py). With --profile, each stage of a job
+gets:
+
+  - a cProfile run (all stages are merged into one .pstats file)
+  - tracemalloc peak / net allocation, and the top-N allocating lines
+  - external round trips timed separately from Python time: Supabase (and any
+    other httpx request) and Neo4j queries, counted and timed per stage
+  - a wall-clock stack sampler whose output is written in collapsed-stack
+    format ("stage;outer;inner count"), ready for flamegraph.pl or speedscope
+
+and --memory-budget-mb aborts the run (exit 1) as soon as the tracemalloc
+peak goes over the budget: the sampler checks it every sample and interrupts
+the main thread, so a job that blows its budget stops there instead of running
+to the end. Memory is reported in MiB throughout. Without either option every
+hook is a no-op.
+
+Reports go to .profiles/<job>-<timestamp>.{pstats,collapsed,json}.
+
+Usage (from a job):
+    parser = argparse.ArgumentParser()
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    with JobProfiler.from_args('map_agents_to_data', args) as profiler:
+        with profiler.stage('fetch'):
+            ...
+
+    python scripts/map_agents_to_data.py --profile --memory-budget-mb 512
+    flamegraph.pl .profiles/map_agents_to_data-*.collapsed > flame.svg
+
+Requirements:
+    Standard library only (httpx / neo4j calls are timed when those packages are installed)
+"""
+
+import os
+import sys
+import json
+import _thread
+import time
+import pstats
+import cProfile
+import argparse
+import functools
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from typing import List, Dict, Optional, Tuple
+
+DEFAULT_PROFILE_DIR = ".profiles"
+SAMPLE_INTERVAL = 0.005
+TOP_N = 15
+MIB = 1024 * 1024
+
+# (module, attribute path, kind) of calls that leave the process
+ROUND_TRIP_HOOKS = [
+    ('httpx', 'Client.send', 'http'),
+    ('neo4j', 'Session.run', 'neo4j'),
+    ('neo4j', 'Transaction.run', 'neo4j'),
+    ('neo4j', 'Result.consume', 'neo4j'),
+    ('neo4j', 'Result.single', 'neo4j'),
+    ('neo4j', 'Result.data', 'neo4j'),
+]
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Add the shared --profile options to a job's argument parser"""
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', action='store_true', help='Profile CPU, memory and round trips per stage')
+    group.add_argument('--profile-dir', default=DEFAULT_PROFILE_DIR, help='Where profile reports are written')
+    group.add_argument('--profile-top', type=int, default=TOP_N, help='Rows in the function/allocation reports')
+    group.add_argument('--memory-budget-mb', type=float, default=None,
+                       help='Abort the run if the traced Python heap peaks above this many MiB (implies --profile)')
+
+
+class StageStats:
+    __slots__ = ('name', 'wall', 'cpu', 'round_trips', 'peak', 'net', 'top_allocations')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.round_trips: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        self.peak = 0
+        self.net = 0
+        self.top_allocations: List[Tuple[str, int]] = []
+
+    @property
+    def round_trip_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.round_trips.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'wall_s': round(self.wall, 4),
+            'cpu_s': round(self.cpu, 4),
+            'round_trip_s': round(self.round_trip_seconds, 4),
+            'python_s': round(max(self.wall - self.round_trip_seconds, 0.0), 4),
+            'round_trips': {kind: {'count': c, 'seconds': round(s, 4)} for kind, (c, s) in self.round_trips.items()},
+            'peak_bytes': self.peak,
+            'net_bytes': self.net,
+            'top_allocations': [{'line': line, 'bytes': size} for line, size in self.top_allocations],
+        }
+
+
+class NullProfiler:
+    """Stand-in used when --profile is off"""
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class JobProfiler:
+    """Per-stage cProfile, tracemalloc, round-trip timing and stack sampling"""
+
+    def __init__(self, job: str, out_dir: str = DEFAULT_PROFILE_DIR, top: int = TOP_N,
+                 memory_budget_mb: Optional[float] = None, sample_interval: float = SAMPLE_INTERVAL):
+        self.job = job
+        self.out_dir = out_dir
+        self.top = top
+        self.budget = int(memory_budget_mb * MIB) if memory_budget_mb else None
+        self.sample_interval = sample_interval
+        self.stages: List[StageStats] = []
+        self.stack: List[StageStats] = []
+        self.profile = cProfile.Profile()
+        self.samples: Counter = Counter()
+        self.peak = 0
+        self.budget_stage: Optional[str] = None
+        self._interrupted = False
+        self._local = threading.local()
+        self._patches = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._target_thread = threading.get_ident()
+        self._supabase_host = urlparse(os.getenv("VITE_SUPABASE_URL") or os.getenv("SUPABASE_URL") or '').hostname
+
+    @classmethod
+    def from_args(cls, job: str, args: argparse.Namespace):
+        # A memory budget needs tracemalloc, so it turns profiling on by itself
+        if not (getattr(args, 'profile', False) or getattr(args, 'memory_budget_mb', None)):
+            return NullProfiler()
+        return cls(job, args.profile_dir, args.profile_top, args.memory_budget_mb)
+
+    # ------------------------------------------------------------------ hooks
+
+    def _record_round_trip(self, kind: str, seconds: float):
+        with self._lock:
+            for stage in self.stack:
+                entry = stage.round_trips[kind]
+                entry[0] += 1
+                entry[1] += seconds
+
+    def _patch(self, owner, attr: str, kind: str):
+        original = getattr(owner, attr)
+        profiler = self
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            # Only the outermost external call is timed (Result.single calls consume, etc.)
+            if getattr(profiler._local, 'depth', 0):
+                return original(*args, **kwargs)
+            label = kind
+            if kind == 'http' and len(args) > 1 and hasattr(args[1], 'url'):
+                host = args[1].url.host
+                label = 'supabase' if host == profiler._supabase_host else f"http:{host}"
+            profiler._local.depth = 1
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                profiler._local.depth = 0
+                profiler._record_round_trip(label, time.perf_counter() - start)
+
+        setattr(owner, attr, timed)
+        self._patches.append((owner, attr, original))
+
+    def _install_hooks(self):
+        for module_name, path, kind in ROUND_TRIP_HOOKS:
+            try:
+                module = __import__(module_name)
+            except ImportError:
+                continue
+            owner_name, attr = path.split('.')
+            owner = getattr(module, owner_name, None)
+            if owner is not None and hasattr(owner, attr):
+                self._patch(owner, attr, kind)
+
+    def _remove_hooks(self):
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches = []
+
+    # --------------------------------------------------------------- sampling
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._target_thread)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            with self._lock:
+                prefix = [self.job] + [s.name for s in self.stack]
+            self.samples[';'.join(prefix + names[::-1])] += 1
+
+            if self.budget and self.budget_stage is None:
+                current_peak = tracemalloc.get_traced_memory()[1]
+                if current_peak > self.budget:
+                    self._budget_exceeded('/'.join(prefix[1:]) or self.job, current_peak)
+
+    def _budget_exceeded(self, stage: str, peak: int):
+        """Record the first stage over budget and abort the job's main thread"""
+        with self._lock:
+            if self.budget_stage is not None:
+                return
+            self.budget_stage = stage
+            print(f"  ⚠️  Memory budget exceeded in {stage}: "
+                  f"{peak / MIB:.1f} MiB > {self.budget / MIB:.1f} MiB, aborting")
+            # KeyboardInterrupt is not an Exception, so the jobs' per-batch
+            # `except Exception` handlers don't swallow it; __exit__ turns it into exit 1
+            if self._target_thread == threading.main_thread().ident:
+                self._interrupted = True
+                _thread.interrupt_main()
+
+    # ----------------------------------------------------------------- stages
+
+    def __enter__(self):
+        tracemalloc.start()
+        self._install_hooks()
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name='job-profiler-sampler', daemon=True)
+        self._sampler.start()
+        return self
+
+    @contextmanager
+    def stage(self, name: str):
+        stats = StageStats('/'.join([s.name for s in self.stack] + [name]))
+        outermost = not self.stack
+        # Snapshots are slow on big heaps: allocation reports are kept for
+        # outermost stages only, and taken while cProfile is off. Peaks are
+        # also per outermost stage; nested stages report the running peak.
+        snapshot = tracemalloc.take_snapshot() if outermost else None
+        current_before, _ = tracemalloc.get_traced_memory()
+        if outermost:
+            tracemalloc.reset_peak()
+        with self._lock:
+            self.stack.append(stats)
+        wall, cpu = time.perf_counter(), time.process_time()
+        if outermost:
+            self.profile.enable()
+        try:
+            yield stats
+        finally:
+            if outermost:
+                self.profile.disable()
+            stats.wall = time.perf_counter() - wall
+            stats.cpu = time.process_time() - cpu
+            with self._lock:
+                self.stack.pop()
+            current, peak = tracemalloc.get_traced_memory()
+            stats.peak = peak
+            stats.net = current - current_before
+            self.peak = max(self.peak, peak)
+            if snapshot is not None:
+                stats.top_allocations = self._top_allocations(snapshot)
+            self.stages.append(stats)
+            if self.budget and peak > self.budget and self.budget_stage is None:
+                self._budget_exceeded(stats.name, peak)
+
+    def _top_allocations(self, since) -> List[Tuple[str, int]]:
+        ignored = {tracemalloc.__file__, __file__}
+        rows = []
+        for stat in tracemalloc.take_snapshot().compare_to(since, 'lineno'):
+            frame = stat.traceback[0]
+            if stat.size_diff <= 0 or frame.filename in ignored:
+                continue
+            rows.append((f"{frame.filename}:{frame.lineno}", stat.size_diff))
+            if len(rows) == self.top:
+                break
+        return rows
+
+    # ---------------------------------------------------------------- reports
+
+    def _top_functions(self) -> List[Tuple[str, int, float, float]]:
+        stats = pstats.Stats(self.profile)
+        rows = []
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append((f"{func} ({os.path.basename(filename)}:{line})", calls, tottime, cumtime))
+        rows.sort(key=lambda r: -r[2])
+        return rows[:self.top]
+
+    def report(self) -> Dict:
+        total_wall = time.perf_counter() - self._started
+        round_trips = defaultdict(lambda: [0, 0.0])
+        for stage in self.stages:
+            if '/' in stage.name:
+                continue
+            for kind, (count, seconds) in stage.round_trips.items():
+                round_trips[kind][0] += count
+                round_trips[kind][1] += seconds
+        try:
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        except ImportError:
+            max_rss = None
+        return {
+            'job': self.job,
+            'wall_s': round(total_wall, 4),
+            'peak_traced_bytes': self.peak,
+            'max_rss_bytes': max_rss,
+            'memory_budget_bytes': self.budget,
+            'budget_exceeded_in': self.budget_stage,
+            'round_trips': {kind: {'count': c, 'seconds': round(s, 4)} for kind, (c, s) in round_trips.items()},
+            'stages': [s.to_dict() for s in self.stages],
+            'top_functions': [{'function': f, 'calls': c, 'tottime_s': round(t, 4), 'cumtime_s': round(cu, 4)}
+                              for f, c, t, cu in self._top_functions()],
+        }
+
+    def write(self, report: Dict) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{self.job}-{time.strftime('%Y%m%d-%H%M%S')}")
+        self.profile.dump_stats(base + '.pstats')
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        with open(base + '.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        return base
+
+    def print_report(self, report: Dict, base: str):
+        print()
+        print("=" * 80)
+        print(f"⏱️  PROFILE: {self.job}  ({report['wall_s']:.2f}s wall)")
+        print("=" * 80)
+        print(f"{'Stage':<32}{'wall s':>9}{'cpu s':>9}{'round trips':>13}{'rt s':>9}{'python s':>10}{'peak MiB':>10}")
+        for stage in report['stages']:
+            trips = sum(r['count'] for r in stage['round_trips'].values())
+            print(f"{stage['name'][:31]:<32}{stage['wall_s']:>9.3f}{stage['cpu_s']:>9.3f}{trips:>13}"
+                  f"{stage['round_trip_s']:>9.3f}{stage['python_s']:>10.3f}{stage['peak_bytes'] / MIB:>10.1f}")
+
+        if report['round_trips']:
+            print()
+            print("🌐 Round trips:")
+            for kind, entry in sorted(report['round_trips'].items()):
+                mean_ms = entry['seconds'] / entry['count'] * 1000 if entry['count'] else 0
+                print(f"   {kind}: {entry['count']} calls, {entry['seconds']:.3f}s (mean {mean_ms:.1f} ms)")
+
+        print()
+        print(f"🔥 Top {len(report['top_functions'])} functions by own time:")
+        for row in report['top_functions']:
+            print(f"   {row['tottime_s']:>8.3f}s {row['calls']:>9}  {row['function']}")
+
+        allocations = Counter()
+        for stage in self.stages:
+            if '/' not in stage.name:
+                allocations.update(dict(stage.top_allocations))
+        if allocations:
+            print()
+            print("🧠 Top allocations (net, by line):")
+            for line, size in allocations.most_common(self.top):
+                print(f"   {size / MIB:>8.2f} MiB  {line}")
+
+        print()
+        rss = f", max RSS {report['max_rss_bytes'] / MIB:.1f} MiB" if report['max_rss_bytes'] else ''
+        print(f"💾 Peak traced heap {report['peak_traced_bytes'] / MIB:.1f} MiB{rss}")
+        print(f"📁 {base}.pstats · {base}.collapsed · {base}.json")
+        print("=" * 80)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        try:
+            if self._sampler is not None:
+                self._sampler.join()
+            if self._interrupted and exc_type is not KeyboardInterrupt:
+                # The budget interrupt is still pending: take it here, not halfway through the report
+                time.sleep(0.05)
+        except KeyboardInterrupt:
+            if not self._interrupted:
+                raise
+            exc_type = KeyboardInterrupt
+        if self._sampler is not None:
+            self._sampler.join()
+        self._remove_hooks()
+        _, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        if self.budget and self.peak > self.budget and self.budget_stage is None:
+            self.budget_stage = self.job
+        aborted = self._interrupted and exc_type is KeyboardInterrupt
+        report = self.report()
+        tracemalloc.stop()
+        base = self.write(report)
+        self.print_report(report, base)
+
+        if self.budget_stage is not None and (exc_type is None or aborted):
+            print(f"\n❌ Peak memory {self.peak / MIB:.1f} MiB exceeded the "
+                  f"{self.budget / MIB:.1f} MiB budget (first in {self.budget_stage})")
+            raise SystemExit(1)
+        return False
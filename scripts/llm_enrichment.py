@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+LLM Enrichment Pipeline
+
+This script classifies workflow_versions and agents with an LLM, filling the
+fields that are otherwise hand-seeded:
+
+  workflow_versions: agentic_potential, autonomy_level, transformation_theme, ai_enabler_type
+  agents:            autonomy_level, metadata.ai_enabler_type
+
+To keep cost and wall time down on thousands of rows:
+
+  - many rows are classified per request (--batch-size)
+  - responses are cached per row in a local SQLite file keyed by a content hash
+    of the model, prompt version and the row's input fields, so unchanged rows
+    are never re-sent
+  - requests run with bounded concurrency behind a token bucket that limits
+    both requests and estimated tokens per minute
+  - only the id and the enriched fields are written back: rows with identical
+    new values share one UPDATE ... WHERE id IN (...), so other columns are
+    never rewritten, and metadata keys are merged in with metadata || patch
+    (merge_agent_metadata, Migration 017) so keys other jobs write to the same
+    metadata (agent_network_analytics.py's network) are kept
+
+--stub swaps in a deterministic local client for tests and dry runs.
+
+Usage:
+    python scripts/llm_enrichment.py --entity workflow_versions --stub --dry-run
+    python scripts/llm_enrichment.py --entity agents --batch-size 25 --concurrency 4
+
+Requirements:
+    pip install supabase python-dotenv anthropic
+    ANTHROPIC_API_KEY must be set unless --stub is used
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Tuple
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+DEFAULT_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-5-haiku-latest")
+PROMPT_VERSION = 1
+CACHE_PATH = ".llm_enrichment_cache.sqlite"
+UPDATE_CHUNK = 500
+
+TRANSFORMATION_THEMES = [
+    'Customer Experience',
+    'Operational Efficiency',
+    'Revenue Optimization',
+    'Safety & Compliance',
+    'Workforce Augmentation',
+    'Sustainability',
+]
+
+AI_ENABLER_TYPES = [
+    'NLP',
+    'Computer Vision',
+    'Predictive Analytics',
+    'Optimization',
+    'Generative AI',
+    'Conversational AI',
+    'Robotic Process Automation',
+]
+
+# Per entity: input fields sent to the model, and output fields with their allowed values
+ENTITY_SPECS = {
+    'workflow_versions': {
+        'inputs': ['workflow_name', 'domain', 'subdomain', 'complexity', 'technology_stack',
+                   'expected_roi_levers', 'operational_metrics_targeted'],
+        'outputs': {
+            'agentic_potential': range(1, 6),
+            'autonomy_level': range(1, 6),
+            'transformation_theme': TRANSFORMATION_THEMES,
+            'ai_enabler_type': AI_ENABLER_TYPES,
+        },
+        'metadata_outputs': [],
+        'metadata_rpc': None,
+    },
+    'agents': {
+        'inputs': ['code', 'name', 'description', 'category_code'],
+        'outputs': {
+            'autonomy_level': range(1, 6),
+            'ai_enabler_type': AI_ENABLER_TYPES,
+        },
+        'metadata_outputs': ['ai_enabler_type'],
+        'metadata_rpc': 'merge_agent_metadata',
+    },
+}
+
+SYSTEM_PROMPT = """You classify airline workflows and AI agents for an agentic transformation program.
+For every item, return an object with the item's "key" and each requested field.
+Integer scales are 1 (lowest) to 5 (highest). Categorical fields must use one of the allowed values exactly.
+Respond with a JSON array only."""
+
+ITEMS_START = "<items>"
+ITEMS_END = "</items>"
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """Per-row classification results keyed by content hash"""
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (hash TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        self.lock = threading.Lock()
+
+    def get_many(self, hashes: List[str]) -> Dict[str, Dict]:
+        found = {}
+        with self.lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT hash, result FROM responses WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((h, json.loads(r)) for h, r in rows)
+        return found
+
+    def put_many(self, results: Dict[str, Dict]):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO responses (hash, result) VALUES (?, ?)",
+                [(h, json.dumps(r)) for h, r in results.items()],
+            )
+            self.conn.commit()
+
+
+def content_hash(entity: str, item: Dict, model: str) -> str:
+    """Hash of everything that determines a row's classification"""
+    payload = json.dumps([model, PROMPT_VERSION, entity, item], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_prompt(entity: str, items: List[Dict]) -> str:
+    """One prompt classifying a batch of rows"""
+    outputs = ENTITY_SPECS[entity]['outputs']
+    fields = []
+    for name, allowed in outputs.items():
+        if isinstance(allowed, range):
+            fields.append(f"- {name}: integer {allowed.start}-{allowed.stop - 1}")
+        else:
+            fields.append(f"- {name}: one of {json.dumps(allowed)}")
+    return (
+        f"Classify each {entity.replace('_', ' ')} item below.\n"
+        f"Fields:\n" + "\n".join(fields) + "\n\n"
+        f"{ITEMS_START}\n{json.dumps(items, default=str)}\n{ITEMS_END}"
+    )
+
+
+def parse_results(entity: str, text: str) -> Dict[str, Dict]:
+    """Extract valid per-key results from a model response, dropping anything malformed"""
+    match = re.search(r'\[.*\]', text, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        items = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+
+    outputs = ENTITY_SPECS[entity]['outputs']
+    results = {}
+    for item in items:
+        if not isinstance(item, dict) or 'key' not in item:
+            continue
+        result = {}
+        for name, allowed in outputs.items():
+            value = item.get(name)
+            if isinstance(allowed, range):
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    continue
+            if value in allowed:
+                result[name] = value
+        if len(result) == len(outputs):
+            results[str(item['key'])] = result
+    return results
+
+
+class AnthropicClient:
+    """Messages API client returning response text and token usage"""
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        import anthropic
+        self.client = anthropic.Anthropic()
+        self.model = model
+
+    def complete(self, system: str, prompt: str, max_tokens: int) -> Tuple[str, int]:
+        response = self.client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=[{'role': 'user', 'content': prompt}],
+        )
+        text = ''.join(block.text for block in response.content if block.type == 'text')
+        return text, response.usage.input_tokens + response.usage.output_tokens
+
+
+class StubClient:
+    """Deterministic local client: answers derive from a hash of each item"""
+
+    def __init__(self, entity: str):
+        self.entity = entity
+        self.model = 'stub'
+
+    def complete(self, system: str, prompt: str, max_tokens: int) -> Tuple[str, int]:
+        block = prompt[prompt.index(ITEMS_START) + len(ITEMS_START):prompt.index(ITEMS_END)]
+        answers = []
+        for item in json.loads(block):
+            content = {k: v for k, v in item.items() if k != 'key'}
+            digest = int(hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest(), 16)
+            answer = {'key': item['key']}
+            for name, allowed in ENTITY_SPECS[self.entity]['outputs'].items():
+                options = list(allowed)
+                answer[name] = options[digest % len(options)]
+                digest //= len(options)
+            answers.append(answer)
+        return json.dumps(answers), len(prompt) // 4
+
+
+class EnrichmentPipeline:
+    """Cache lookup, batched classification and bulk write-back for one entity"""
+
+    def __init__(self, entity: str, client, cache: ResponseCache, batch_size: int = 20,
+                 concurrency: int = 4, requests_per_minute: float = 50, tokens_per_minute: float = 50000):
+        self.entity = entity
+        self.spec = ENTITY_SPECS[entity]
+        self.client = client
+        self.cache = cache
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.stats = {'rows': 0, 'cached': 0, 'classified': 0, 'failed': 0, 'requests': 0, 'tokens': 0}
+        self.stats_lock = threading.Lock()
+
+    def _classify_batch(self, batch: List[Tuple[str, Dict]]) -> Dict[str, Dict]:
+        """Send one batch and return results keyed by content hash"""
+        items = [dict(item, key=str(i)) for i, (_, item) in enumerate(batch)]
+        prompt = build_prompt(self.entity, items)
+        max_tokens = 60 * len(items) + 200
+        self.request_bucket.acquire()
+        self.token_bucket.acquire(len(prompt) // 4 + max_tokens)
+
+        text, tokens = self.client.complete(SYSTEM_PROMPT, prompt, max_tokens)
+        by_key = parse_results(self.entity, text)
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['tokens'] += tokens
+        return {batch[int(k)][0]: v for k, v in by_key.items() if k.isdigit() and int(k) < len(batch)}
+
+    def run(self, rows: List[Dict]) -> Dict[int, Dict]:
+        """Classify rows, returning results keyed by row id"""
+        hashed = []
+        for row in rows:
+            item = {field: row.get(field) for field in self.spec['inputs']}
+            hashed.append((row['id'], content_hash(self.entity, item, self.client.model), item))
+        self.stats['rows'] = len(hashed)
+
+        cached = self.cache.get_many([h for _, h, _ in hashed])
+        self.stats['cached'] = sum(1 for _, h, _ in hashed if h in cached)
+
+        # Identical content is only classified once
+        pending: Dict[str, Dict] = {}
+        for _, h, item in hashed:
+            if h not in cached:
+                pending.setdefault(h, item)
+        work = list(pending.items())
+        batches = [work[i:i + self.batch_size] for i in range(0, len(work), self.batch_size)]
+
+        fresh: Dict[str, Dict] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(self._classify_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"  ⚠️  Batch failed: {str(e)}")
+                    continue
+                self.cache.put_many(results)
+                fresh.update(results)
+
+        self.stats['classified'] = len(fresh)
+        self.stats['failed'] = len(pending) - len(fresh)
+        results = {**cached, **fresh}
+        return {row_id: results[h] for row_id, h, _ in hashed if h in results}
+
+    def apply(self, rows: List[Dict], results: Dict[int, Dict]) -> List[Dict]:
+        """id plus the changed enriched columns, and changed metadata keys under metadata_patch"""
+        changed = []
+        for row in rows:
+            result = results.get(row['id'])
+            if not result:
+                continue
+            updated = {}
+            metadata = row.get('metadata') or {}
+            patch = {}
+            for name, value in result.items():
+                if name in self.spec['metadata_outputs']:
+                    if metadata.get(name) != value:
+                        patch[name] = value
+                elif row.get(name) != value:
+                    updated[name] = value
+            if patch:
+                updated['metadata_patch'] = patch
+            if updated:
+                changed.append({'id': row['id'], **updated})
+        return changed
+
+
+def fetch_rows(entity: str) -> List[Dict]:
+    """Fetch every row of an entity table page by page"""
+    rows, offset = [], 0
+    while True:
+        page = supabase.table(entity).select('*').order('id').range(offset, offset + 999).execute().data
+        rows.extend(page)
+        if len(page) < 1000:
+            return rows
+        offset += 1000
+
+
+def bulk_update(entity: str, rows: List[Dict]) -> int:
+    """Write the enriched fields only: one update per distinct set of column values, metadata keys merged by RPC"""
+    groups: Dict[str, List[int]] = {}
+    patches = []
+    for row in rows:
+        values = {k: v for k, v in row.items() if k not in ('id', 'metadata_patch')}
+        if values:
+            groups.setdefault(json.dumps(values, sort_keys=True, default=str), []).append(row['id'])
+        if row.get('metadata_patch'):
+            patches.append({'id': row['id'], 'patch': row['metadata_patch']})
+
+    written = set()
+    for i in range(0, len(patches), UPDATE_CHUNK):
+        chunk = patches[i:i + UPDATE_CHUNK]
+        try:
+            supabase.rpc(ENTITY_SPECS[entity]['metadata_rpc'], {'p_patches': chunk}).execute()
+            written.update(p['id'] for p in chunk)
+        except Exception as e:
+            print(f"  ⚠️  Error merging {entity} metadata {chunk[0]['id']}..{chunk[-1]['id']}: {str(e)}")
+
+    for key, ids in groups.items():
+        values = json.loads(key)
+        for i in range(0, len(ids), UPDATE_CHUNK):
+            chunk = ids[i:i + UPDATE_CHUNK]
+            try:
+                supabase.table(entity).update(values).in_('id', chunk).execute()
+                written.update(chunk)
+            except Exception as e:
+                print(f"  ⚠️  Error updating {entity} rows {chunk[0]}..{chunk[-1]}: {str(e)}")
+    return len(written)
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Batched, cached LLM classification of workflows and agents')
+    parser.add_argument('--entity', choices=sorted(ENTITY_SPECS), default='workflow_versions')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='Anthropic model name')
+    parser.add_argument('--stub', action='store_true', help='Use the deterministic local client')
+    parser.add_argument('--batch-size', type=int, default=20, help='Rows classified per request')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight')
+    parser.add_argument('--rpm', type=float, default=50, help='Requests per minute')
+    parser.add_argument('--tpm', type=float, default=50000, help='Estimated tokens per minute')
+    parser.add_argument('--cache', default=CACHE_PATH, help='Response cache file')
+    parser.add_argument('--dry-run', action='store_true', help='Classify without writing back')
+    args = parser.parse_args()
+
+    print(f"🤖 Enriching {args.entity}...")
+    print()
+
+    client = StubClient(args.entity) if args.stub else AnthropicClient(args.model)
+    pipeline = EnrichmentPipeline(args.entity, client, ResponseCache(args.cache), args.batch_size,
+                                  args.concurrency, args.rpm, args.tpm)
+
+    started = time.perf_counter()
+    rows = fetch_rows(args.entity)
+    results = pipeline.run(rows)
+    changed = pipeline.apply(rows, results)
+    written = 0 if args.dry_run else bulk_update(args.entity, changed)
+    elapsed = time.perf_counter() - started
+
+    stats = pipeline.stats
+    print("=" * 60)
+    print("📈 SUMMARY")
+    print("=" * 60)
+    print(f"Rows:                {stats['rows']}")
+    print(f"Cache hits:          {stats['cached']}")
+    print(f"Newly classified:    {stats['classified']}")
+    print(f"Unclassified:        {stats['failed']}")
+    print(f"Requests / tokens:   {stats['requests']} / {stats['tokens']}")
+    print(f"Rows changed:        {len(changed)}{' (dry run)' if args.dry_run else f', {written} written'}")
+    print(f"Wall time:           {elapsed:.2f}s")
+    print()
+
+
+if __name__ == "__main__":
+    main()
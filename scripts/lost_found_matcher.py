@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Lost & Found Matching Engine
+
+This script matches lost_found_inventory items against open baggage_claims
+without scanning every claim. Open claims are held in three indexes:
+
+  - inverted indexes over categorical attributes (type, size, colors, brand, material)
+  - a trigram index over bag descriptions / distinctive features and passenger names
+    (matched against the found item's bag_description and name_tag_text)
+  - a digit n-gram index over bag tag numbers for partial or misread tags
+
+Claims carry no physical description of their own, so each claim is profiled
+from its baggage_exceptions row (bag_description, distinctive_features,
+bag_color, bag_brand) plus optional bag_type / bag_size / bag_material keys
+in the claim's metadata.
+
+Usage:
+    python scripts/lost_found_matcher.py            # match pending items, then keep following changes
+    python scripts/lost_found_matcher.py --once     # single pass
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import re
+import time
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Set, Tuple, Optional
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+# Claims in these states are no longer looking for a bag
+CLOSED_CLAIM_STATUSES = ['DENIED', 'PAID', 'CLOSED']
+
+# Score weights per signal (sum to 1.0)
+MATCH_WEIGHTS = {
+    'bag_tag': 0.40,
+    'bag_color': 0.12,
+    'bag_brand': 0.10,
+    'bag_type': 0.06,
+    'bag_size': 0.04,
+    'bag_material': 0.04,
+    'description': 0.16,
+    'name_tag': 0.08,
+}
+
+CATEGORICAL_FIELDS = ['bag_color', 'bag_brand', 'bag_type', 'bag_size', 'bag_material']
+
+# Trigrams shared by more than this share of claims carry no signal
+COMMON_GRAM_RATIO = 0.20
+
+MIN_MATCH_SCORE = 0.35
+TAG_GRAM = 4
+PAGE_SIZE = 1000
+
+
+def normalize(value: Optional[str]) -> Optional[str]:
+    """Lower-case and collapse whitespace for categorical comparison"""
+    if not value:
+        return None
+    return ' '.join(value.lower().split())
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """Character trigrams of each word in text"""
+    grams = set()
+    for word in re.findall(r'[a-z0-9]+', (text or '').lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def tag_digits(tag: Optional[str]) -> str:
+    """Numeric part of a bag tag (drops airline prefix and separators)"""
+    return re.sub(r'[^0-9]', '', tag or '')
+
+
+def tag_similarity(found: str, claimed: str) -> float:
+    """Similarity between a partial/misread tag and a full tag"""
+    if not found or not claimed:
+        return 0.0
+    if found == claimed:
+        return 1.0
+    if len(found) >= TAG_GRAM and found in claimed:
+        return 0.6 + 0.4 * len(found) / len(claimed)
+
+    # Levenshtein distance for misread digits
+    previous = list(range(len(claimed) + 1))
+    for i, a in enumerate(found, 1):
+        current = [i]
+        for j, b in enumerate(claimed, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b)))
+        previous = current
+    distance = previous[-1]
+    return max(0.0, 1.0 - distance / 3) if distance <= 2 else 0.0
+
+
+class ClaimProfile:
+    """Matchable attributes of one open claim"""
+    __slots__ = ('claim_id', 'claim_number', 'bag_tag_number', 'tag', 'attributes', 'description_grams', 'name_grams')
+
+    def __init__(self, claim: Dict, exception: Optional[Dict]):
+        exception = exception or {}
+        metadata = claim.get('metadata') or {}
+        self.claim_id = claim['id']
+        self.claim_number = claim['claim_number']
+        self.bag_tag_number = claim['bag_tag_number']
+        self.tag = tag_digits(claim['bag_tag_number'])
+        self.attributes = {
+            'bag_color': normalize(exception.get('bag_color') or metadata.get('bag_color')),
+            'bag_brand': normalize(exception.get('bag_brand') or metadata.get('bag_brand')),
+            'bag_type': normalize(metadata.get('bag_type')),
+            'bag_size': normalize(metadata.get('bag_size')),
+            'bag_material': normalize(metadata.get('bag_material')),
+        }
+        description = ' '.join([exception.get('bag_description') or ''] + (exception.get('distinctive_features') or []))
+        self.description_grams = trigrams(description)
+        self.name_grams = trigrams(claim.get('passenger_name'))
+
+
+class ClaimIndex:
+    """Inverted, trigram and tag indexes over open claims"""
+
+    def __init__(self):
+        self.claims: Dict[int, ClaimProfile] = {}
+        self.categorical: Dict[str, Dict[str, Set[int]]] = {f: defaultdict(set) for f in CATEGORICAL_FIELDS}
+        self.description_grams: Dict[str, Set[int]] = defaultdict(set)
+        self.name_grams: Dict[str, Set[int]] = defaultdict(set)
+        self.tag_grams: Dict[str, Set[int]] = defaultdict(set)
+
+    def add(self, profile: ClaimProfile):
+        """Index a claim (re-indexes if it was already present)"""
+        self.remove(profile.claim_id)
+        self.claims[profile.claim_id] = profile
+        for field, value in profile.attributes.items():
+            if value:
+                self.categorical[field][value].add(profile.claim_id)
+        for gram in profile.description_grams:
+            self.description_grams[gram].add(profile.claim_id)
+        for gram in profile.name_grams:
+            self.name_grams[gram].add(profile.claim_id)
+        for gram in self._tag_grams(profile.tag):
+            self.tag_grams[gram].add(profile.claim_id)
+
+    def remove(self, claim_id: int):
+        """Drop a claim from every index"""
+        profile = self.claims.pop(claim_id, None)
+        if profile is None:
+            return
+        for field, value in profile.attributes.items():
+            if value:
+                self._discard(self.categorical[field], value, claim_id)
+        for gram in profile.description_grams:
+            self._discard(self.description_grams, gram, claim_id)
+        for gram in profile.name_grams:
+            self._discard(self.name_grams, gram, claim_id)
+        for gram in self._tag_grams(profile.tag):
+            self._discard(self.tag_grams, gram, claim_id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[int]], key: str, claim_id: int):
+        postings = index.get(key)
+        if postings is not None:
+            postings.discard(claim_id)
+            if not postings:
+                del index[key]
+
+    @staticmethod
+    def _tag_grams(tag: str) -> Set[str]:
+        return {tag[i:i + TAG_GRAM] for i in range(len(tag) - TAG_GRAM + 1)}
+
+    def _gram_overlap(self, index: Dict[str, Set[int]], grams: Set[str]) -> Dict[int, float]:
+        """Share of the query's informative trigrams each claim contains"""
+        limit = max(1, int(len(self.claims) * COMMON_GRAM_RATIO))
+        useful = [g for g in grams if 0 < len(index.get(g, ())) <= limit]
+        if not useful:
+            return {}
+        hits: Dict[int, int] = defaultdict(int)
+        for gram in useful:
+            for claim_id in index[gram]:
+                hits[claim_id] += 1
+        return {claim_id: count / len(useful) for claim_id, count in hits.items()}
+
+    def match(self, item: Dict, limit: int = 10) -> List[Tuple[ClaimProfile, float, List[str]]]:
+        """Rank open claims for a found item"""
+        scores: Dict[int, float] = defaultdict(float)
+        reasons: Dict[int, List[str]] = defaultdict(list)
+
+        found_tag = tag_digits(item.get('bag_tag_number'))
+        if found_tag:
+            candidates = set()
+            for gram in self._tag_grams(found_tag):
+                candidates |= self.tag_grams.get(gram, set())
+            for claim_id in candidates:
+                similarity = tag_similarity(found_tag, self.claims[claim_id].tag)
+                if similarity:
+                    scores[claim_id] += MATCH_WEIGHTS['bag_tag'] * similarity
+                    reasons[claim_id].append('exact_tag' if similarity == 1.0 else 'fuzzy_tag')
+
+        item_values = {
+            'bag_color': {normalize(item.get('bag_color')), normalize(item.get('bag_color_secondary'))},
+            'bag_brand': {normalize(item.get('bag_brand'))},
+            'bag_type': {normalize(item.get('bag_type'))},
+            'bag_size': {normalize(item.get('bag_size'))},
+            'bag_material': {normalize(item.get('bag_material'))},
+        }
+        for field, values in item_values.items():
+            matched: Set[int] = set()
+            for value in values - {None}:
+                matched |= self.categorical[field].get(value, set())
+            for claim_id in matched:
+                scores[claim_id] += MATCH_WEIGHTS[field]
+                reasons[claim_id].append(field)
+
+        item_description = ' '.join([item.get('bag_description') or ''] + (item.get('distinctive_features') or []))
+        for claim_id, overlap in self._gram_overlap(self.description_grams, trigrams(item_description)).items():
+            scores[claim_id] += MATCH_WEIGHTS['description'] * overlap
+            if overlap >= 0.5:
+                reasons[claim_id].append('description')
+
+        for claim_id, overlap in self._gram_overlap(self.name_grams, trigrams(item.get('name_tag_text'))).items():
+            scores[claim_id] += MATCH_WEIGHTS['name_tag'] * overlap
+            if overlap >= 0.5:
+                reasons[claim_id].append('name_tag')
+
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [(self.claims[claim_id], round(score, 4), reasons[claim_id]) for claim_id, score in ranked]
+
+
+def claims_query():
+    return supabase.table('baggage_claims').select(
+        'id, claim_number, exception_number, bag_tag_number, passenger_name, claim_status, metadata, updated_at'
+    )
+
+
+def fetch_open_claims() -> List[Dict]:
+    """Fetch every claim that is still looking for a bag"""
+    rows = []
+    offset = 0
+    while True:
+        response = claims_query().not_.in_('claim_status', CLOSED_CLAIM_STATUSES) \
+            .order('id').range(offset, offset + PAGE_SIZE - 1).execute()
+        rows.extend(response.data)
+        if len(response.data) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_changed_claims(updated_since: str, after_id: int) -> List[Dict]:
+    """Fetch the next page of claims changed after the (updated_at, id) watermark.
+
+    updated_at is kept current by the Baggage Migration 011 trigger; paging on
+    the pair keeps claims that share the boundary timestamp.
+    """
+    return claims_query() \
+        .or_(f'updated_at.gt."{updated_since}",and(updated_at.eq."{updated_since}",id.gt.{after_id})') \
+        .order('updated_at').order('id').limit(PAGE_SIZE).execute().data
+
+
+def fetch_exceptions(exception_numbers: List[str]) -> Dict[str, Dict]:
+    """Fetch bag descriptions for the given exception numbers"""
+    exceptions = {}
+    numbers = [n for n in set(exception_numbers) if n]
+    for start in range(0, len(numbers), 200):
+        response = supabase.table('baggage_exceptions').select(
+            'exception_number, bag_description, distinctive_features, bag_color, bag_brand'
+        ).in_('exception_number', numbers[start:start + 200]).execute()
+        for row in response.data:
+            exceptions[row['exception_number']] = row
+    return exceptions
+
+
+def apply_claims(index: ClaimIndex, claims: List[Dict]):
+    """Add open claims to the index and remove closed ones"""
+    exceptions = fetch_exceptions([c.get('exception_number') for c in claims])
+    for claim in claims:
+        if claim['claim_status'] in CLOSED_CLAIM_STATUSES:
+            index.remove(claim['id'])
+        else:
+            index.add(ClaimProfile(claim, exceptions.get(claim.get('exception_number'))))
+
+
+def pending_items_query():
+    return supabase.table('lost_found_inventory').select(
+        'id, inventory_number, bag_tag_number, bag_type, bag_size, bag_color, bag_color_secondary, '
+        'bag_brand, bag_material, bag_description, distinctive_features, name_tag_text, created_at'
+    ).in_('matching_status', ['PENDING_MATCH', 'POTENTIAL_MATCHES_FOUND'])
+
+
+def fetch_pending_items() -> List[Dict]:
+    """Fetch every found item still waiting for a match"""
+    items, offset = [], 0
+    while True:
+        page = pending_items_query().order('id').range(offset, offset + PAGE_SIZE - 1).execute().data
+        items.extend(page)
+        if len(page) < PAGE_SIZE:
+            return items
+        offset += PAGE_SIZE
+
+
+def fetch_new_items(created_since: str, after_id: int) -> List[Dict]:
+    """Fetch the next page of pending items logged after the (created_at, id) watermark"""
+    return pending_items_query() \
+        .or_(f'created_at.gt."{created_since}",and(created_at.eq."{created_since}",id.gt.{after_id})') \
+        .order('created_at').order('id').limit(PAGE_SIZE).execute().data
+
+
+def save_matches(item: Dict, matches: List[Tuple[ClaimProfile, float, List[str]]]) -> bool:
+    """Write ranked candidates back to the inventory row"""
+    matches = [m for m in matches if m[1] >= MIN_MATCH_SCORE]
+    try:
+        supabase.table('lost_found_inventory').update({
+            'potential_matches': [
+                {'bag_tag_number': p.bag_tag_number, 'claim_number': p.claim_number,
+                 'match_score': score, 'match_reason': ', '.join(reasons)}
+                for p, score, reasons in matches
+            ],
+            'top_match_bag_tag': matches[0][0].bag_tag_number if matches else None,
+            'top_match_score': matches[0][1] if matches else None,
+            'matching_status': 'POTENTIAL_MATCHES_FOUND' if matches else 'PENDING_MATCH',
+        }).eq('id', item['id']).execute()
+        return True
+    except Exception as e:
+        print(f"  ⚠️  Error saving matches for {item['inventory_number']}: {str(e)}")
+        return False
+
+
+def match_items(index: ClaimIndex, items: List[Dict]) -> int:
+    """Match found items and persist candidates, returning how many had a match"""
+    matched = 0
+    for item in items:
+        started = time.perf_counter()
+        matches = index.match(item)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if save_matches(item, matches) and matches and matches[0][1] >= MIN_MATCH_SCORE:
+            matched += 1
+            top, score, reasons = matches[0]
+            print(f"   ✅ {item['inventory_number']} → {top.claim_number} ({score:.2f}: {', '.join(reasons)}) in {elapsed_ms:.2f} ms")
+    return matched
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Match lost_found_inventory items to open baggage claims')
+    parser.add_argument('--once', action='store_true', help='Match pending items once and exit')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between change polls')
+    args = parser.parse_args()
+
+    print("🔎 Starting Lost & Found Matching Engine...")
+    print()
+
+    index = ClaimIndex()
+    watermark = datetime.now(timezone.utc).isoformat()
+
+    print("📊 Indexing open claims...")
+    started = time.perf_counter()
+    apply_claims(index, fetch_open_claims())
+    print(f"   Indexed {len(index.claims)} claims in {(time.perf_counter() - started):.2f}s")
+
+    print("📊 Matching pending found items...")
+    items = fetch_pending_items()
+    matched = match_items(index, items)
+    print(f"   {matched}/{len(items)} items have candidate matches")
+    print()
+
+    if args.once:
+        return
+
+    claims_since = items_since = watermark
+    claims_after_id = items_after_id = 0
+    try:
+        while True:
+            changed_claims = fetch_changed_claims(claims_since, claims_after_id)
+            if changed_claims:
+                apply_claims(index, changed_claims)
+                claims_since, claims_after_id = changed_claims[-1]['updated_at'], changed_claims[-1]['id']
+
+            new_items = fetch_new_items(items_since, items_after_id)
+            if new_items:
+                match_items(index, new_items)
+                items_since, items_after_id = new_items[-1]['created_at'], new_items[-1]['id']
+            if max(len(changed_claims), len(new_items)) < PAGE_SIZE:
+                time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        print()
+        print(f"✅ Stopped with {len(index.claims)} open claims indexed")
+        print()
+
+
+if __name__ == "__main__":
+    main()
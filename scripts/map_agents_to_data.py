@@ -7,15 +7,20 @@ based on agent names, types, and capabilities.
 
 Usage:
     python scripts/map_agents_to_data.py
+    python scripts/map_agents_to_data.py --profile --memory-budget-mb 512
+    python scripts/shard_coordinator.py map_agents_to_data --workers 8   # sharded by id range
 
 Requirements:
     pip install supabase python-dotenv
 """
 
 import os
+import argparse
+from collections import Counter
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from typing import List, Dict
+from job_profiler import add_profile_arguments, JobProfiler
+from typing import List, Dict, Optional, Tuple
 
 # Load environment variables
 load_dotenv()
@@ -143,10 +148,16 @@ AGENT_MAPPING_RULES = {
 }
 
 
-def fetch_agents() -> List[Dict]:
-    """Fetch all active agents"""
-    response = supabase.table('agents').select('id, name, type, description, active').eq('active', True).execute()
-    return response.data
+# Shards for scripts/shard_coordinator.py are id ranges
+SHARD_COLUMN = 'id'
+
+
+def fetch_agents(id_range: Optional[Tuple[int, int]] = None) -> List[Dict]:
+    """Fetch all active agents (optionally only ids within an inclusive range)"""
+    query = supabase.table('agents').select('id, name, type, description, active').eq('active', True)
+    if id_range is not None:
+        query = query.gte('id', id_range[0]).lte('id', id_range[1])
+    return query.execute().data
 
 
 def fetch_data_entities() -> Dict[str, int]:
@@ -211,94 +222,134 @@ def create_mapping(agent_id: int, data_entity_id: int, mapping_details: Dict) ->
         return False
 
 
-def main():
-    """Main execution"""
-    print("🤖 Starting Agent-to-Data Entity Mapping...")
-    print()
-
-    # Fetch data
-    print("📊 Fetching agents...")
-    agents = fetch_agents()
-    print(f"   Found {len(agents)} active agents")
-
-    print("📊 Fetching data entities...")
-    data_entities = fetch_data_entities()
-    print(f"   Found {len(data_entities)} data entities")
-    print()
-
-    # Create mappings
-    total_mappings = 0
-    agents_mapped = 0
+def map_agents(agents: List[Dict], data_entities: Dict[str, int], verbose: bool = True) -> Dict[str, int]:
+    """Create mappings for the given agents and return counters"""
+    counters = Counter(agents=len(agents))
 
     for agent in agents:
         matches = match_agent_to_entities(agent)
 
         if matches:
-            agents_mapped += 1
-            print(f"🤖 {agent['name']}")
+            counters['agents_mapped'] += 1
+            if verbose:
+                print(f"🤖 {agent['name']}")
 
             for match in matches:
                 entity_id = data_entities.get(match['data_entity'])
                 if entity_id:
                     if create_mapping(agent['id'], entity_id, match):
-                        critical_marker = " [CRITICAL]" if match['is_critical'] else ""
-                        print(f"   ✅ → {match['data_entity']} ({match['access_pattern']}, {match['latency_requirement']}, {match['query_frequency']}){critical_marker}")
-                        total_mappings += 1
+                        if verbose:
+                            critical_marker = " [CRITICAL]" if match['is_critical'] else ""
+                            print(f"   ✅ → {match['data_entity']} ({match['access_pattern']}, {match['latency_requirement']}, {match['query_frequency']}){critical_marker}")
+                        counters['mappings_created'] += 1
                     else:
-                        print(f"   ❌ → {match['data_entity']} (failed)")
-            print()
+                        if verbose:
+                            print(f"   ❌ → {match['data_entity']} (failed)")
+                        counters['mappings_failed'] += 1
+            if verbose:
+                print()
 
-    # Summary
-    print("=" * 80)
-    print("📈 SUMMARY")
-    print("=" * 80)
-    print(f"Total Agents:              {len(agents)}")
-    print(f"Agents Mapped:             {agents_mapped}")
-    print(f"Agents Not Mapped:         {len(agents) - agents_mapped}")
-    print(f"Total Mappings Created:    {total_mappings}")
-    print()
+    return dict(counters)
 
-    # Show mapping distribution
-    print("📊 Mappings by Data Entity:")
-    try:
-        result = supabase.table('agent_data_mappings').select('data_entity_id').execute()
-        entity_counts = {}
-        for mapping in result.data:
-            entity_id = mapping['data_entity_id']
-            entity_counts[entity_id] = entity_counts.get(entity_id, 0) + 1
-
-        for code, entity_id in data_entities.items():
-            count = entity_counts.get(entity_id, 0)
-            if count > 0:
-                print(f"   {code}: {count} agents")
-    except Exception as e:
-        print(f"   (Could not fetch counts: {str(e)})")
 
-    print()
+def shard_keys() -> List[Tuple[int, int]]:
+    """(agent id, weight) for planning id-range shards"""
+    return [(agent['id'], 1) for agent in fetch_agents()]
 
-    # Show critical mappings
-    print("⚠️  Critical Real-time Agents:")
-    try:
-        result = supabase.table('agent_data_mappings').select('agent_id, data_entity_id').eq('is_critical', True).execute()
-        if result.data:
-            for mapping in result.data[:5]:  # Show first 5
-                agent = next((a for a in agents if a['id'] == mapping['agent_id']), None)
-                entity_code = next((code for code, eid in data_entities.items() if eid == mapping['data_entity_id']), None)
-                if agent and entity_code:
-                    print(f"   • {agent['name']} → {entity_code}")
-        else:
-            print("   (None configured)")
-    except Exception as e:
-        print(f"   (Could not fetch: {str(e)})")
 
+def run_shard(shard: Dict) -> Dict[str, int]:
+    """Map the agents of one shard (called in a worker process)"""
+    counters = map_agents(fetch_agents(tuple(shard['range'])), fetch_data_entities(), verbose=False)
+    if counters.get('mappings_failed'):
+        # Fail the shard so the coordinator's --resume retries it
+        raise RuntimeError(f"{counters['mappings_failed']} mapping(s) failed: {counters}")
+    return counters
+
+
+def run_mapping(profiler):
+    """Fetch, map and report, one profiler stage each"""
+    print("🤖 Starting Agent-to-Data Entity Mapping...")
     print()
-    print("✅ Agent mapping complete!")
-    print()
-    print("🎯 Next steps:")
-    print("   1. Refresh your Data Entities page (/data/entities)")
-    print("   2. You should now see both workflow AND agent counts")
-    print("   3. Click on any entity to see which agents consume it")
-    print()
+
+    # Fetch data
+    with profiler.stage('fetch'):
+        print("📊 Fetching agents...")
+        agents = fetch_agents()
+        print(f"   Found {len(agents)} active agents")
+
+        print("📊 Fetching data entities...")
+        data_entities = fetch_data_entities()
+        print(f"   Found {len(data_entities)} data entities")
+        print()
+
+    # Create mappings
+    with profiler.stage('map'):
+        counters = map_agents(agents, data_entities)
+        total_mappings = counters.get('mappings_created', 0)
+        agents_mapped = counters.get('agents_mapped', 0)
+
+    # Summary
+    with profiler.stage('report'):
+        print("=" * 80)
+        print("📈 SUMMARY")
+        print("=" * 80)
+        print(f"Total Agents:              {len(agents)}")
+        print(f"Agents Mapped:             {agents_mapped}")
+        print(f"Agents Not Mapped:         {len(agents) - agents_mapped}")
+        print(f"Total Mappings Created:    {total_mappings}")
+        print()
+
+        # Show mapping distribution
+        print("📊 Mappings by Data Entity:")
+        try:
+            result = supabase.table('agent_data_mappings').select('data_entity_id').execute()
+            entity_counts = {}
+            for mapping in result.data:
+                entity_id = mapping['data_entity_id']
+                entity_counts[entity_id] = entity_counts.get(entity_id, 0) + 1
+
+            for code, entity_id in data_entities.items():
+                count = entity_counts.get(entity_id, 0)
+                if count > 0:
+                    print(f"   {code}: {count} agents")
+        except Exception as e:
+            print(f"   (Could not fetch counts: {str(e)})")
+
+        print()
+
+        # Show critical mappings
+        print("⚠️  Critical Real-time Agents:")
+        try:
+            result = supabase.table('agent_data_mappings').select('agent_id, data_entity_id').eq('is_critical', True).execute()
+            if result.data:
+                for mapping in result.data[:5]:  # Show first 5
+                    agent = next((a for a in agents if a['id'] == mapping['agent_id']), None)
+                    entity_code = next((code for code, eid in data_entities.items() if eid == mapping['data_entity_id']), None)
+                    if agent and entity_code:
+                        print(f"   • {agent['name']} → {entity_code}")
+            else:
+                print("   (None configured)")
+        except Exception as e:
+            print(f"   (Could not fetch: {str(e)})")
+
+        print()
+        print("✅ Agent mapping complete!")
+        print()
+        print("🎯 Next steps:")
+        print("   1. Refresh your Data Entities page (/data/entities)")
+        print("   2. You should now see both workflow AND agent counts")
+        print("   3. Click on any entity to see which agents consume it")
+        print()
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Map agents to the data entities they use')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with JobProfiler.from_args('map_agents_to_data', args) as profiler:
+        run_mapping(profiler)
 
 
 if __name__ == "__main__":
@@ -7,15 +7,20 @@ based on workflow names, descriptions, and subdomain context.
 
 Usage:
     python scripts/map_workflows_to_data.py
+    python scripts/map_workflows_to_data.py --profile --memory-budget-mb 512
+    python scripts/shard_coordinator.py map_workflows_to_data --workers 8   # sharded by subdomain
 
 Requirements:
     pip install supabase python-dotenv
 """
 
 import os
+import argparse
+from collections import Counter
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from typing import List, Dict, Set
+from job_profiler import add_profile_arguments, JobProfiler
+from typing import List, Dict, Set, Optional, Tuple
 
 # Load environment variables
 load_dotenv()
@@ -95,10 +100,26 @@ MAPPING_RULES = {
 }
 
 
-def fetch_workflows() -> List[Dict]:
-    """Fetch all active workflows"""
-    response = supabase.table('workflows').select('id, name, description, subdomain_id').is_('archived_at', None).execute()
-    return response.data
+# Shards for scripts/shard_coordinator.py are sets of subdomains
+SHARD_COLUMN = 'subdomain_id'
+SHARD_CHUNK = 200
+
+
+def fetch_workflows(subdomain_ids: Optional[List] = None) -> List[Dict]:
+    """Fetch all active workflows (optionally only those in the given subdomains; None = no subdomain)"""
+    def query():
+        return supabase.table('workflows').select('id, name, description, subdomain_id').is_('archived_at', None)
+
+    if subdomain_ids is None:
+        return query().execute().data
+    ids = [i for i in subdomain_ids if i is not None]
+    rows = []
+    # Chunked to keep URLs short
+    for i in range(0, len(ids), SHARD_CHUNK):
+        rows.extend(query().in_('subdomain_id', ids[i:i + SHARD_CHUNK]).execute().data)
+    if None in subdomain_ids:
+        rows += query().is_('subdomain_id', None).execute().data
+    return rows
 
 
 def fetch_data_entities() -> Dict[str, int]:
@@ -147,78 +168,119 @@ def create_mapping(workflow_id: int, data_entity_id: int, mapping_details: Dict)
         return False
 
 
-def main():
-    """Main execution"""
-    print("🚀 Starting Workflow-to-Data Entity Mapping...")
-    print()
-
-    # Fetch data
-    print("📊 Fetching workflows...")
-    workflows = fetch_workflows()
-    print(f"   Found {len(workflows)} active workflows")
-
-    print("📊 Fetching data entities...")
-    data_entities = fetch_data_entities()
-    print(f"   Found {len(data_entities)} data entities")
-    print()
-
-    # Create mappings
-    total_mappings = 0
-    workflows_mapped = 0
+def map_workflows(workflows: List[Dict], data_entities: Dict[str, int], verbose: bool = True) -> Dict[str, int]:
+    """Create mappings for the given workflows and return counters"""
+    counters = Counter(workflows=len(workflows))
 
     for workflow in workflows:
         matches = match_workflow_to_entities(workflow)
 
         if matches:
-            workflows_mapped += 1
-            print(f"📌 {workflow['name']}")
+            counters['workflows_mapped'] += 1
+            if verbose:
+                print(f"📌 {workflow['name']}")
 
             for match in matches:
                 entity_id = data_entities.get(match['data_entity'])
                 if entity_id:
                     if create_mapping(workflow['id'], entity_id, match):
-                        print(f"   ✅ → {match['data_entity']} ({match['access_type']}, {match['latency_requirement']})")
-                        total_mappings += 1
+                        if verbose:
+                            print(f"   ✅ → {match['data_entity']} ({match['access_type']}, {match['latency_requirement']})")
+                        counters['mappings_created'] += 1
                     else:
-                        print(f"   ❌ → {match['data_entity']} (failed)")
-            print()
+                        if verbose:
+                            print(f"   ❌ → {match['data_entity']} (failed)")
+                        counters['mappings_failed'] += 1
+            if verbose:
+                print()
 
-    # Summary
-    print("=" * 60)
-    print("📈 SUMMARY")
-    print("=" * 60)
-    print(f"Total Workflows:           {len(workflows)}")
-    print(f"Workflows Mapped:          {workflows_mapped}")
-    print(f"Workflows Not Mapped:      {len(workflows) - workflows_mapped}")
-    print(f"Total Mappings Created:    {total_mappings}")
-    print()
+    return dict(counters)
 
-    # Show mapping distribution
-    print("📊 Mappings by Data Entity:")
-    response = supabase.rpc('get_workflow_counts_by_entity').execute()
 
-    # Alternative if RPC doesn't exist - query directly
-    try:
-        result = supabase.table('workflow_data_mappings').select('data_entity_id').execute()
-        entity_counts = {}
-        for mapping in result.data:
-            entity_id = mapping['data_entity_id']
-            entity_counts[entity_id] = entity_counts.get(entity_id, 0) + 1
-
-        for code, entity_id in data_entities.items():
-            count = entity_counts.get(entity_id, 0)
-            print(f"   {code}: {count} workflows")
-    except Exception as e:
-        print(f"   (Could not fetch counts: {str(e)})")
+def shard_keys() -> List[Tuple[Optional[int], int]]:
+    """(subdomain_id, active workflow count) for planning shards"""
+    counts = Counter(w['subdomain_id'] for w in fetch_workflows())
+    return list(counts.items())
 
+
+def run_shard(shard: Dict) -> Dict[str, int]:
+    """Map the workflows of one shard (called in a worker process)"""
+    counters = map_workflows(fetch_workflows(shard['keys']), fetch_data_entities(), verbose=False)
+    if counters.get('mappings_failed'):
+        # Fail the shard so the coordinator's --resume retries it
+        raise RuntimeError(f"{counters['mappings_failed']} mapping(s) failed: {counters}")
+    return counters
+
+
+def run_mapping(profiler):
+    """Fetch, map and report, one profiler stage each"""
+    print("🚀 Starting Workflow-to-Data Entity Mapping...")
     print()
-    print("✅ Mapping complete!")
-    print()
-    print("🎯 Next steps:")
-    print("   1. Refresh your Data Entities page (/data/entities)")
-    print("   2. You should now see workflow counts for each entity")
-    print("   3. Click on any entity to see which workflows use it")
-    print()
+
+    # Fetch data
+    with profiler.stage('fetch'):
+        print("📊 Fetching workflows...")
+        workflows = fetch_workflows()
+        print(f"   Found {len(workflows)} active workflows")
+
+        print("📊 Fetching data entities...")
+        data_entities = fetch_data_entities()
+        print(f"   Found {len(data_entities)} data entities")
+        print()
+
+    # Create mappings
+    with profiler.stage('map'):
+        counters = map_workflows(workflows, data_entities)
+        total_mappings = counters.get('mappings_created', 0)
+        workflows_mapped = counters.get('workflows_mapped', 0)
+
+    # Summary
+    with profiler.stage('report'):
+        print("=" * 60)
+        print("📈 SUMMARY")
+        print("=" * 60)
+        print(f"Total Workflows:           {len(workflows)}")
+        print(f"Workflows Mapped:          {workflows_mapped}")
+        print(f"Workflows Not Mapped:      {len(workflows) - workflows_mapped}")
+        print(f"Total Mappings Created:    {total_mappings}")
+        print()
+
+        # Show mapping distribution
+        print("📊 Mappings by Data Entity:")
+        response = supabase.rpc('get_workflow_counts_by_entity').execute()
+
+        # Alternative if RPC doesn't exist - query directly
+        try:
+            result = supabase.table('workflow_data_mappings').select('data_entity_id').execute()
+            entity_counts = {}
+            for mapping in result.data:
+                entity_id = mapping['data_entity_id']
+                entity_counts[entity_id] = entity_counts.get(entity_id, 0) + 1
+
+            for code, entity_id in data_entities.items():
+                count = entity_counts.get(entity_id, 0)
+                print(f"   {code}: {count} workflows")
+        except Exception as e:
+            print(f"   (Could not fetch counts: {str(e)})")
+
+        print()
+        print("✅ Mapping complete!")
+        print()
+        print("🎯 Next steps:")
+        print("   1. Refresh your Data Entities page (/data/entities)")
+        print("   2. You should now see workflow counts for each entity")
+        print("   3. Click on any entity to see which workflows use it")
+        print()
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Map workflows to the data entities they use')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with JobProfiler.from_args('map_workflows_to_data', args) as profiler:
+        run_mapping(profiler)
 
 
 if __name__ == "__main__":
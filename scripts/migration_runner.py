@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+"""
+Migration Runner
+
+This script works out which SQL files under supabase/migrations apply, in what
+order, and how long they take, without touching the remote Supabase project.
+
+  plan   Parses every migration into statements, records the tables, views,
+         functions and types each file creates and references, and builds a
+         dependency graph. Files whose names differ only by a variant suffix
+         (_FINAL / _FIXED / _MINIMAL / _CORRECTED / _UUID_FIX / _vN) are grouped,
+         and a dependency-ordered chain is resolved for a target file, picking
+         one variant per group. Variants that are not named that way are caught
+         as overlaps: files with the same numeric prefix that create the same
+         table, or that both seed a table neither creates (e.g.
+         005_WORKAROUND_use_existing_domains.sql and 005_baggage_workflows_UUID_FIX.sql).
+         A chain with overlapping files is an error until --prefer names the
+         file (or suffix) to keep; dependency cycles are errors too. Static
+         checks flag foreign keys without a matching index and row-by-row seed
+         loops (LOOP ... INSERT inside DO blocks).
+
+  apply  Applies the chain to a throwaway local Postgres: a fresh scratch
+         database is created (and dropped afterwards unless --keep), Supabase
+         roles and the auth/storage objects the migrations reference are
+         stubbed in, and each file runs in its own transaction with every
+         statement timed. Statements slower than --slow-ms and foreign keys
+         left without an index (from the catalog) are reported.
+
+Usage:
+    python scripts/migration_runner.py plan
+    python scripts/migration_runner.py plan --target 20251110010_materialized_analytics_views.sql
+    python scripts/migration_runner.py plan --dir supabase/migrations/baggage_migrations --prefer FINAL
+    python scripts/migration_runner.py plan --prefer 20251108_agent_network_complete.sql
+    python scripts/migration_runner.py apply --database-url postgresql://postgres@localhost:5432/postgres
+
+Requirements:
+    pip install psycopg2-binary
+    A local Postgres (e.g. `docker run -p 5432:5432 -e POSTGRES_HOST_AUTH_METHOD=trust postgres:15`)
+"""
+
+import os
+import re
+import time
+import argparse
+from collections import defaultdict
+from urllib.parse import urlparse
+from typing import List, Dict, Optional, Set, Tuple
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'supabase', 'migrations')
+
+# Files that are not part of any forward chain
+EXCLUDED_PATTERNS = [r'^rollback_', r'DIAGNOSTIC', r'^DIAGNOSE_', r'_remote_baseline\.sql$']
+
+VARIANT_SUFFIX = re.compile(r'_(FINAL|FIXED|fixed|MINIMAL|CORRECTED|UUID_FIX|v\d+)(?=\.sql$)')
+
+SLOW_STATEMENT_MS = 200
+
+SUPABASE_COMPAT_SQL = """
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN CREATE ROLE anon NOLOGIN; END IF;
+  IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN CREATE ROLE authenticated NOLOGIN; END IF;
+  IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN CREATE ROLE service_role NOLOGIN; END IF;
+END $$;
+
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE TABLE IF NOT EXISTS auth.users (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  email TEXT,
+  raw_user_meta_data JSONB DEFAULT '{}'::jsonb,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID LANGUAGE sql STABLE AS
+  $$ SELECT NULLIF(current_setting('request.jwt.claim.sub', true), '')::uuid $$;
+CREATE OR REPLACE FUNCTION auth.role() RETURNS TEXT LANGUAGE sql STABLE AS
+  $$ SELECT NULLIF(current_setting('request.jwt.claim.role', true), '') $$;
+
+CREATE SCHEMA IF NOT EXISTS storage;
+CREATE TABLE IF NOT EXISTS storage.buckets (
+  id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  public BOOLEAN DEFAULT false,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE TABLE IF NOT EXISTS storage.objects (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  bucket_id TEXT REFERENCES storage.buckets(id),
+  name TEXT,
+  owner UUID,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE OR REPLACE FUNCTION storage.foldername(name TEXT) RETURNS TEXT[] LANGUAGE sql IMMUTABLE AS
+  $$ SELECT (string_to_array(name, '/'))[1:array_length(string_to_array(name, '/'), 1) - 1] $$;
+"""
+
+OPTIONAL_EXTENSIONS = ['uuid-ossp', 'pgcrypto', 'pg_trgm']
+
+UNINDEXED_FK_SQL = """
+SELECT c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid)
+FROM pg_constraint c
+JOIN pg_namespace n ON n.oid = c.connamespace
+WHERE c.contype = 'f'
+  AND n.nspname = 'public'
+  AND NOT EXISTS (
+    SELECT 1 FROM pg_index i
+    WHERE i.indrelid = c.conrelid
+      AND (i.indkey::int2[])[0:cardinality(c.conkey) - 1] = c.conkey
+  )
+ORDER BY 1, 2
+"""
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def split_statements(sql: str) -> List[str]:
+    """Split SQL into statements, respecting comments, quotes and dollar-quoted bodies"""
+    statements = []
+    current = []
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if sql.startswith('/*', i):
+            depth, i = 1, i + 2
+            while i < n and depth:
+                if sql.startswith('/*', i):
+                    depth, i = depth + 1, i + 2
+                elif sql.startswith('*/', i):
+                    depth, i = depth - 1, i + 2
+                else:
+                    i += 1
+            current.append(' ')
+            continue
+        if ch in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if sql[end] == ch:
+                    if end + 1 < n and sql[end + 1] == ch:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+            continue
+        if ch == '$':
+            match = re.match(r'\$[A-Za-z_]*\$', sql[i:])
+            if match:
+                tag = match.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = n if end == -1 else end + len(tag)
+                current.append(sql[i:end])
+                i = end
+                continue
+        if ch == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += 1
+            continue
+        current.append(ch)
+        i += 1
+
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def object_name(raw: str) -> str:
+    name = raw.strip('"').lower()
+    return name[len('public.'):] if name.startswith('public.') else name
+
+
+CREATE_PATTERN = re.compile(
+    r'\bCREATE\s+(?:OR\s+REPLACE\s+)?(?:UNLOGGED\s+|TEMP(?:ORARY)?\s+)?'
+    r'(TABLE|VIEW|MATERIALIZED\s+VIEW|FUNCTION|TYPE)\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w."]+)',
+    re.IGNORECASE,
+)
+RELATION_REFERENCE = re.compile(
+    r'\b(?:FROM|JOIN|INTO|UPDATE|REFERENCES|ALTER\s+TABLE|TRUNCATE|ON)\s+(?:ONLY\s+)?'
+    r'(?:IF\s+EXISTS\s+)?([\w."]+)',
+    re.IGNORECASE,
+)
+CALL_REFERENCE = re.compile(r'\b([\w.]+)\s*\(')
+DROP_STATEMENT = re.compile(r'^\s*DROP\b', re.IGNORECASE)
+INDEX_PATTERN = re.compile(
+    r'\bCREATE\s+(?:UNIQUE\s+)?INDEX\b[^;]*?\bON\s+(?:ONLY\s+)?([\w."]+)\s*(?:USING\s+\w+\s*)?\(\s*"?(\w+)',
+    re.IGNORECASE,
+)
+COLUMN_FK = re.compile(r'^\s*"?(\w+)"?\s+[^,\n]*?\bREFERENCES\s+([\w."]+)', re.IGNORECASE | re.MULTILINE)
+TABLE_FK = re.compile(r'\bFOREIGN\s+KEY\s*\(\s*"?(\w+)', re.IGNORECASE)
+ADD_COLUMN_FK = re.compile(
+    r'\bALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?([\w."]+)\s+ADD\s+COLUMN\s+(?:IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?[^;]*?\bREFERENCES\b',
+    re.IGNORECASE,
+)
+KEY_COLUMN = re.compile(r'^\s*"?(\w+)"?\s+[^,\n]*?\b(?:PRIMARY\s+KEY|UNIQUE)\b', re.IGNORECASE | re.MULTILINE)
+TABLE_KEY = re.compile(r'\b(?:PRIMARY\s+KEY|UNIQUE)\s*\(\s*"?(\w+)', re.IGNORECASE)
+TABLE_CREATE = re.compile(r'\bCREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w."]+)', re.IGNORECASE)
+INSERT_TARGET = re.compile(r'\bINSERT\s+INTO\s+([\w."]+)', re.IGNORECASE)
+SEED_LOOP = re.compile(r'\bLOOP\b.*?\bINSERT\s+INTO\b.*?\bEND\s+LOOP\b', re.IGNORECASE | re.DOTALL)
+
+
+class MigrationFile:
+    """Statements plus created and referenced objects of one SQL file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path) as f:
+            self.statements = split_statements(f.read())
+        self.creates: Set[str] = set()
+        self.relations: Set[str] = set()
+        self.calls: Set[str] = set()
+        # (table, leading column) pairs from FKs and from indexes / keys
+        self.foreign_keys: Set[Tuple[str, str]] = set()
+        self.indexed: Set[Tuple[str, str]] = set()
+        self.tables: Set[str] = set()
+        self.inserts: Set[str] = set()
+        self.seed_loops = 0
+
+        for statement in self.statements:
+            for _, name in CREATE_PATTERN.findall(statement):
+                self.creates.add(object_name(name))
+            self.tables.update(object_name(n) for n in TABLE_CREATE.findall(statement))
+            self.inserts.update(object_name(n) for n in INSERT_TARGET.findall(statement))
+            if not DROP_STATEMENT.match(statement):
+                self.relations.update(object_name(n) for n in RELATION_REFERENCE.findall(statement))
+                self.calls.update(object_name(n) for n in CALL_REFERENCE.findall(statement))
+            self._scan_keys(statement)
+            if statement.upper().startswith('DO') and SEED_LOOP.search(statement):
+                self.seed_loops += 1
+
+    def _scan_keys(self, statement: str):
+        for table, column in INDEX_PATTERN.findall(statement):
+            self.indexed.add((object_name(table), column.lower()))
+        for table, column in ADD_COLUMN_FK.findall(statement):
+            self.foreign_keys.add((object_name(table), column.lower()))
+        for match in re.finditer(r'\bCREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w."]+)\s*\(', statement, re.IGNORECASE):
+            table = object_name(match.group(1))
+            body = table_body(statement, match.end() - 1)
+            for column, _ in COLUMN_FK.findall(body):
+                if column.upper() not in ('FOREIGN', 'CONSTRAINT'):
+                    self.foreign_keys.add((table, column.lower()))
+            for column in TABLE_FK.findall(body):
+                self.foreign_keys.add((table, column.lower()))
+            for column in KEY_COLUMN.findall(body) + TABLE_KEY.findall(body):
+                self.indexed.add((table, column.lower()))
+
+    def references(self, known: Set[str]) -> Set[str]:
+        """Objects created by some migration that this file uses but does not create"""
+        return ((self.relations | self.calls) & known) - self.creates
+
+    @property
+    def prefix(self) -> str:
+        return self.name.split('_', 1)[0]
+
+    def overlaps(self, other: 'MigrationFile') -> bool:
+        """Both files create the same table, or both seed a table neither of them creates"""
+        if self.prefix != other.prefix:
+            return False
+        if self.tables & other.tables:
+            return True
+        return bool((self.inserts & other.inserts) - self.tables - other.tables)
+
+
+def table_body(statement: str, open_paren: int) -> str:
+    depth = 0
+    for i in range(open_paren, len(statement)):
+        if statement[i] == '(':
+            depth += 1
+        elif statement[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return statement[open_paren + 1:i]
+    return statement[open_paren + 1:]
+
+
+# ============================================================================
+# DEPENDENCY GRAPH
+# ============================================================================
+
+class ChainError(Exception):
+    """A chain cannot be resolved: a dependency cycle, or overlapping files without a --prefer"""
+
+
+class MigrationGraph:
+    """Creator index, variant groups and chain resolution across migration files"""
+
+    def __init__(self, files: List[MigrationFile], prefer: Optional[List[str]] = None):
+        self.files = {f.name: f for f in files}
+        self.prefer = prefer or []
+        self.excluded: Set[str] = set()
+        self.creators: Dict[str, List[str]] = defaultdict(list)
+        for f in files:
+            for obj in f.creates:
+                self.creators[obj].append(f.name)
+        self.known = set(self.creators)
+
+    def variant_groups(self) -> List[List[str]]:
+        """Files sharing a base name once variant suffixes are stripped"""
+        return [sorted(g) for g in self._groups_by_base().values() if len(g) > 1]
+
+    def _rank(self, name: str) -> Tuple[int, str]:
+        if name in self.prefer:
+            return (self.prefer.index(name), name)
+        match = VARIANT_SUFFIX.search(name)
+        suffix = match.group(1) if match else ''
+        if suffix in self.prefer:
+            return (self.prefer.index(suffix), name)
+        return (len(self.prefer) + (1 if suffix else 0), name)
+
+    def _preferred(self, name: str) -> bool:
+        match = VARIANT_SUFFIX.search(name)
+        return name in self.prefer or bool(match and match.group(1) in self.prefer)
+
+    def _siblings(self, name: str) -> Set[str]:
+        base = VARIANT_SUFFIX.sub('', name)
+        return {n for n in self.files if VARIANT_SUFFIX.sub('', n) == base}
+
+    def dependencies(self, name: str, chosen: Set[str]) -> Set[str]:
+        """Files that must run before `name`, preferring files already in the chain"""
+        deps = set()
+        for obj in self.files[name].references(self.known):
+            candidates = [c for c in self.creators[obj]
+                          if c != name and c not in self._siblings(name) and c not in self.excluded]
+            if not candidates:
+                continue
+            already = [c for c in candidates if c in chosen]
+            deps.add(already[0] if already else min(candidates, key=self._rank))
+        return deps
+
+    def resolve(self, targets: List[str]) -> List[str]:
+        """Dependency-ordered chain ending with the targets (file name order breaks ties)"""
+        chosen: Set[str] = set()
+        order: List[str] = []
+        path: List[str] = []
+
+        def visit(name: str):
+            if name in chosen:
+                return
+            if name in path:
+                cycle = path[path.index(name):] + [name]
+                raise ChainError(f"Dependency cycle: {' → '.join(cycle)}")
+            path.append(name)
+            for dep in sorted(self.dependencies(name, chosen)):
+                visit(dep)
+            path.pop()
+            chosen.add(name)
+            order.append(name)
+
+        for target in sorted(targets):
+            visit(target)
+        return order
+
+    def overlap_groups(self, chain: List[str]) -> List[List[str]]:
+        """Sets of chain files that overlap one another (see MigrationFile.overlaps)"""
+        groups: List[Set[str]] = []
+        for i, a in enumerate(chain):
+            for b in chain[i + 1:]:
+                if not self.files[a].overlaps(self.files[b]):
+                    continue
+                joined = [g for g in groups if a in g or b in g]
+                merged = {a, b}.union(*joined)
+                groups = [g for g in groups if g not in joined] + [merged]
+        return [sorted(g) for g in groups]
+
+    def resolve_chain(self, targets: List[str], pinned: Optional[List[str]] = None) -> List[str]:
+        """resolve(), then drop all but the pinned or preferred file of every overlap group and resolve again"""
+        pinned = set(pinned or [])
+        while True:
+            chain = self.resolve([t for t in targets if t not in self.excluded])
+            unresolved = []
+            dropped = set()
+            for group in self.overlap_groups(chain):
+                keep = [n for n in group if n in pinned] or [n for n in group if self._preferred(n)]
+                if not keep:
+                    unresolved.append(group)
+                    continue
+                dropped |= set(group) - {min(keep, key=self._rank)}
+            if unresolved:
+                raise ChainError("Overlapping migrations in the chain (pass --prefer with the file to keep):\n"
+                                 + '\n'.join(f"   {', '.join(g)}" for g in unresolved))
+            if not dropped:
+                return chain
+            self.excluded |= dropped
+
+    def default_targets(self) -> List[str]:
+        """One file per variant group (the preferred one) plus every standalone file"""
+        targets = []
+        for base_group in self._groups_by_base().values():
+            targets.append(min(base_group, key=self._rank))
+        return targets
+
+    def _groups_by_base(self) -> Dict[str, List[str]]:
+        groups = defaultdict(list)
+        for name in self.files:
+            groups[VARIANT_SUFFIX.sub('', name)].append(name)
+        return groups
+
+
+def load_migrations(directory: str) -> List[MigrationFile]:
+    files = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.sql') or any(re.search(p, name) for p in EXCLUDED_PATTERNS):
+            continue
+        files.append(MigrationFile(os.path.join(directory, name)))
+    return files
+
+
+def static_findings(chain: List[MigrationFile]) -> List[str]:
+    """Unindexed foreign keys and row-by-row seed loops across a chain"""
+    findings = []
+    indexed = set().union(*(f.indexed for f in chain)) if chain else set()
+    for f in chain:
+        for table, column in sorted(f.foreign_keys - indexed):
+            findings.append(f"{f.name}: foreign key {table}.{column} has no index with it as leading column")
+        if f.seed_loops:
+            findings.append(f"{f.name}: {f.seed_loops} DO block(s) insert row by row inside a LOOP")
+    return findings
+
+
+# ============================================================================
+# APPLY
+# ============================================================================
+
+def scratch_database(database_url: str, allow_remote: bool):
+    """Create a uniquely named scratch database and return (admin conn, scratch url, name)"""
+    import psycopg2
+
+    parsed = urlparse(database_url)
+    if parsed.hostname not in ('localhost', '127.0.0.1', '::1', None) and not allow_remote:
+        raise SystemExit(f"Refusing to run against non-local host {parsed.hostname} (use --allow-remote)")
+
+    admin = psycopg2.connect(database_url)
+    admin.autocommit = True
+    name = f"migration_check_{int(time.time())}"
+    with admin.cursor() as cur:
+        cur.execute(f'CREATE DATABASE "{name}"')
+    return admin, parsed._replace(path='/' + name).geturl(), name
+
+
+def prepare_scratch(conn):
+    """Install available extensions and the Supabase compatibility objects"""
+    import psycopg2
+
+    with conn.cursor() as cur:
+        for extension in OPTIONAL_EXTENSIONS:
+            try:
+                cur.execute(f'CREATE EXTENSION IF NOT EXISTS "{extension}"')
+                conn.commit()
+            except psycopg2.Error:
+                conn.rollback()
+        cur.execute(SUPABASE_COMPAT_SQL)
+    conn.commit()
+
+
+def apply_files(conn, chain: List[MigrationFile], slow_ms: float) -> Tuple[bool, List[Tuple[float, str, str]]]:
+    """Run each file in its own transaction; returns (all applied, slow statements)"""
+    import psycopg2
+
+    slow: List[Tuple[float, str, str]] = []
+    for migration in chain:
+        started = time.perf_counter()
+        try:
+            with conn.cursor() as cur:
+                for statement in migration.statements:
+                    statement_started = time.perf_counter()
+                    cur.execute(statement)
+                    elapsed = (time.perf_counter() - statement_started) * 1000
+                    if elapsed >= slow_ms:
+                        slow.append((elapsed, migration.name, statement))
+            conn.commit()
+            print(f"   ✅ {migration.name:<70} {(time.perf_counter() - started) * 1000:>9.1f} ms "
+                  f"({len(migration.statements)} statements)")
+        except psycopg2.Error as e:
+            conn.rollback()
+            first_line = (e.pgerror or str(e)).strip().splitlines()[0]
+            print(f"   ❌ {migration.name}: {first_line}")
+            print(f"      {' '.join(statement.split())[:160]}")
+            return False, slow
+    return True, slow
+
+
+def drop_scratch(admin, scratch_name: str):
+    with admin.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{scratch_name}"')
+    admin.close()
+
+
+def apply_chain(chain: List[MigrationFile], database_url: str, slow_ms: float,
+                allow_remote: bool = False, keep: bool = False) -> bool:
+    """Apply files one transaction each, timing every statement"""
+    import psycopg2
+
+    admin, scratch_url, scratch_name = scratch_database(database_url, allow_remote)
+    print(f"🧪 Scratch database: {scratch_name}")
+    conn = psycopg2.connect(scratch_url)
+    try:
+        prepare_scratch(conn)
+        ok, slow = apply_files(conn, chain, slow_ms)
+
+        print()
+        if slow:
+            print(f"🐢 Statements slower than {slow_ms:.0f} ms:")
+            for elapsed, name, statement in sorted(slow, reverse=True)[:20]:
+                print(f"   {elapsed:>9.1f} ms  {name}: {' '.join(statement.split())[:100]}")
+            print()
+
+        with conn.cursor() as cur:
+            cur.execute(UNINDEXED_FK_SQL)
+            unindexed = cur.fetchall()
+        if unindexed:
+            print(f"🔑 Foreign keys without a supporting index ({len(unindexed)}):")
+            for table, constraint, definition in unindexed:
+                print(f"   {table}.{constraint}: {definition}")
+            print()
+    finally:
+        conn.close()
+        if keep:
+            admin.close()
+        else:
+            drop_scratch(admin, scratch_name)
+    return ok
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Dependency-ordered, timed migration runner')
+    parser.add_argument('command', choices=['plan', 'apply'])
+    parser.add_argument('--dir', default=MIGRATIONS_DIR, help='Directory of migration files')
+    parser.add_argument('--target', action='append', default=None, help='File(s) the chain must end with')
+    parser.add_argument('--files', nargs='+', default=None, help='Apply exactly these files in this order')
+    parser.add_argument('--prefer', nargs='*', default=[],
+                        help='Variant suffixes or file names to prefer, e.g. FINAL MINIMAL 005_baggage_workflows_UUID_FIX.sql')
+    parser.add_argument('--database-url', default=os.getenv('LOCAL_DATABASE_URL'), help='Local Postgres URL')
+    parser.add_argument('--slow-ms', type=float, default=SLOW_STATEMENT_MS, help='Slow statement threshold')
+    parser.add_argument('--allow-remote', action='store_true', help='Allow a non-local database host')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch database afterwards')
+    args = parser.parse_args()
+
+    migrations = load_migrations(args.dir)
+    graph = MigrationGraph(migrations, args.prefer)
+
+    if args.files:
+        chain_names = args.files
+    else:
+        try:
+            chain_names = graph.resolve_chain(args.target or graph.default_targets(), args.target)
+        except ChainError as e:
+            raise SystemExit(f"❌ {e}")
+    chain = [graph.files[name] for name in chain_names]
+
+    print(f"🗂️  {len(migrations)} migrations in {os.path.relpath(args.dir)}")
+    groups = graph.variant_groups()
+    if groups:
+        print()
+        print("🔀 Variant groups (one is chosen per chain):")
+        for group in groups:
+            chosen = [n for n in group if n in chain_names]
+            print(f"   {', '.join(group)}  → {chosen[0] if chosen else 'none'}")
+    if graph.excluded:
+        print()
+        print("✂️  Overlapping files left out of the chain (--prefer):")
+        for name in sorted(graph.excluded):
+            print(f"   {name}")
+
+    print()
+    print(f"⛓️  Chain ({len(chain)} files):")
+    for migration in chain:
+        deps = sorted(graph.dependencies(migration.name, set(chain_names)) & set(chain_names))
+        print(f"   {migration.name}" + (f"  ← {', '.join(deps)}" if deps else ''))
+
+    findings = static_findings(chain)
+    if findings:
+        print()
+        print(f"🔍 Static findings ({len(findings)}):")
+        for finding in findings:
+            print(f"   ⚠️  {finding}")
+    print()
+
+    if args.command == 'apply':
+        if not args.database_url:
+            raise SystemExit("--database-url (or LOCAL_DATABASE_URL) is required for apply")
+        ok = apply_chain(chain, args.database_url, args.slow_ms, args.allow_remote, args.keep)
+        print("✅ Chain applied cleanly" if ok else "❌ Chain failed")
+        print()
+
+
+if __name__ == "__main__":
+    main()
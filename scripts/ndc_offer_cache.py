@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+NDC Offer Cache
+
+This script implements the caching layer that ndc_offers is documented as
+("Cached NDC offers to reduce API calls"):
+
+  - a canonical query_hash over origin/destination, dates, cabin and passengers
+  - an in-process LRU in front of the ndc_offers table
+  - eviction driven by each offer's valid_until
+  - single-flight coalescing, so concurrent identical searches make one upstream call
+  - bulk pruning of expired ndc_offers rows
+
+Run as a script it drives a burst of concurrent searches against a local
+stand-in NDC endpoint and reports how many upstream calls were saved.
+
+Offers are stored under UNIQUE(airline_id, offer_id), so --use-table requires
+--airline-id (a NULL airline_id would never conflict and duplicate rows). Hit
+counts are added with increment_ndc_offer_request_counts (Migration 016).
+
+Usage:
+    python scripts/ndc_offer_cache.py                      # simulate against the local stand-in
+    python scripts/ndc_offer_cache.py --use-table --airline-id 1   # also read/write ndc_offers
+    python scripts/ndc_offer_cache.py --prune              # delete expired ndc_offers rows
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict, Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Callable, Optional
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+
+def compute_query_hash(origin: str, destination: str, departure_date: str,
+                       return_date: Optional[str] = None, cabin_class: Optional[str] = None,
+                       passengers: Optional[Dict[str, int]] = None) -> str:
+    """Canonical hash of an offer search, stored in ndc_offers.query_hash"""
+    pax = {ptc: int(count) for ptc, count in (passengers or {'ADT': 1}).items() if int(count) > 0}
+    canonical = {
+        'o': origin.strip().upper(),
+        'd': destination.strip().upper(),
+        'dep': str(departure_date)[:10],
+        'ret': str(return_date)[:10] if return_date else None,
+        'cabin': (cabin_class or 'ECONOMY').strip().upper(),
+        'pax': sorted(pax.items()),
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:32]
+
+
+def parse_ts(value: str) -> float:
+    """Parse a timestamptz string into epoch seconds"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+class LocalNDCEndpoint:
+    """Stand-in NDC AirShopping endpoint with realistic latency"""
+
+    def __init__(self, latency_seconds: float = 0.25, offer_ttl_minutes: int = 15):
+        self.latency_seconds = latency_seconds
+        self.offer_ttl_minutes = offer_ttl_minutes
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def air_shopping(self, search: Dict) -> List[Dict]:
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency_seconds)
+
+        rng = random.Random(compute_query_hash(**search))
+        valid_until = (datetime.now(timezone.utc) + timedelta(minutes=self.offer_ttl_minutes)).isoformat()
+        return [
+            {
+                'offer_id': f"OF-{rng.randrange(10**8):08d}",
+                'origin_iata': search['origin'].upper(),
+                'destination_iata': search['destination'].upper(),
+                'departure_date': search['departure_date'],
+                'return_date': search.get('return_date'),
+                'cabin_class': (search.get('cabin_class') or 'ECONOMY').upper(),
+                'offer_data': {'fare_family': family, 'segments': 1 + rng.randrange(2)},
+                'price_total': round(rng.uniform(150, 1200), 2),
+                'price_currency': 'USD',
+                'valid_until': valid_until,
+            }
+            for family in ('BASIC', 'CLASSIC', 'FULL')
+        ]
+
+
+class OfferCache:
+    """LRU + ndc_offers read-through cache with single-flight upstream calls"""
+
+    def __init__(self, upstream: Callable[[Dict], List[Dict]], max_entries: int = 10000,
+                 use_table: bool = True, airline_id: Optional[int] = None):
+        if use_table and airline_id is None:
+            raise ValueError("airline_id is required when reading and writing ndc_offers")
+        self.upstream = upstream
+        self.max_entries = max_entries
+        self.use_table = use_table
+        self.airline_id = airline_id
+        self.entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.inflight: Dict[str, Future] = {}
+        self.pending_request_counts: Counter = Counter()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def search(self, **search) -> List[Dict]:
+        """Return offers for a search, calling upstream at most once per concurrent burst"""
+        query_hash = compute_query_hash(**search)
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(query_hash)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(query_hash)
+                    self.stats['lru_hits'] += 1
+                    self.pending_request_counts[query_hash] += 1
+                    return entry[1]
+                del self.entries[query_hash]
+                self.stats['expired'] += 1
+
+            future = self.inflight.get(query_hash)
+            leader = future is None
+            if leader:
+                future = self.inflight[query_hash] = Future()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            offers = self._load(query_hash, search, now)
+            future.set_result(offers)
+            return offers
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(query_hash, None)
+
+    def _load(self, query_hash: str, search: Dict, now: float) -> List[Dict]:
+        """Fill a miss from ndc_offers, then from the upstream endpoint"""
+        offers = []
+        if self.use_table:
+            offers = supabase.table('ndc_offers').select('*') \
+                .eq('airline_id', self.airline_id).eq('query_hash', query_hash).gt(
+                'valid_until', datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+            ).execute().data
+            if offers:
+                with self.lock:
+                    self.stats['table_hits'] += 1
+                    self.pending_request_counts[query_hash] += 1
+
+        if not offers:
+            with self.lock:
+                self.stats['upstream_calls'] += 1
+            offers = self.upstream(search)
+            for offer in offers:
+                offer['query_hash'] = query_hash
+                if self.airline_id is not None:
+                    offer['airline_id'] = self.airline_id
+            if self.use_table and offers:
+                supabase.table('ndc_offers').upsert(offers, on_conflict='airline_id,offer_id').execute()
+
+        if offers:
+            expires_at = min(parse_ts(o['valid_until']) for o in offers)
+            with self.lock:
+                self.entries[query_hash] = (expires_at, offers)
+                self.entries.move_to_end(query_hash)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return offers
+
+    def evict_expired(self) -> int:
+        """Drop LRU entries whose earliest offer is past valid_until"""
+        now = time.time()
+        with self.lock:
+            expired = [h for h, (expires_at, _) in self.entries.items() if expires_at <= now]
+            for query_hash in expired:
+                del self.entries[query_hash]
+        return len(expired)
+
+    def flush_request_counts(self) -> int:
+        """Add cache hits to ndc_offers.request_count in one atomic call (Migration 016)"""
+        with self.lock:
+            pending = dict(self.pending_request_counts)
+            self.pending_request_counts.clear()
+        if not self.use_table or not pending:
+            return 0
+        try:
+            supabase.rpc('increment_ndc_offer_request_counts', {
+                'p_airline_id': self.airline_id,
+                'p_counts': pending,
+            }).execute()
+        except Exception:
+            # Put the hits back so the next flush retries them
+            with self.lock:
+                self.pending_request_counts.update(pending)
+            raise
+        return len(pending)
+
+
+def prune_expired_offers() -> int:
+    """Delete every expired ndc_offers row in one statement"""
+    now = datetime.now(timezone.utc).isoformat()
+    response = supabase.table('ndc_offers').delete().lt('valid_until', now).execute()
+    return len(response.data)
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='NDC offer cache with single-flight request coalescing')
+    parser.add_argument('--use-table', action='store_true', help='Read and write the ndc_offers table')
+    parser.add_argument('--airline-id', type=int, default=None, help='airlines.id to stamp on stored offers')
+    parser.add_argument('--requests', type=int, default=500, help='Simulated searches')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent searchers')
+    parser.add_argument('--prune', action='store_true', help='Delete expired ndc_offers rows and exit')
+    args = parser.parse_args()
+    if args.use_table and args.airline_id is None:
+        parser.error("--use-table requires --airline-id (ndc_offers is unique per airline_id, offer_id)")
+
+    if args.prune:
+        print("🧹 Pruning expired NDC offers...")
+        print(f"   ✅ Deleted {prune_expired_offers()} expired rows")
+        return
+
+    print("✈️  Simulating AI-platform offer searches...")
+    print()
+
+    endpoint = LocalNDCEndpoint()
+    cache = OfferCache(endpoint.air_shopping, use_table=args.use_table, airline_id=args.airline_id)
+
+    routes = [('PTY', 'MIA'), ('PTY', 'JFK'), ('PTY', 'LAX'), ('PTY', 'BOG'), ('PTY', 'GRU')]
+    rng = random.Random(42)
+    searches = []
+    for _ in range(args.requests):
+        origin, destination = rng.choice(routes)
+        searches.append({
+            'origin': origin,
+            'destination': destination,
+            'departure_date': f"2026-12-{rng.randrange(18, 22):02d}",
+            'cabin_class': rng.choice(['economy', 'BUSINESS']),
+            'passengers': {'ADT': rng.choice([1, 2])},
+        })
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda s: cache.search(**s), searches))
+    elapsed = time.perf_counter() - started
+    cache.flush_request_counts()
+
+    print("=" * 60)
+    print("📈 SUMMARY")
+    print("=" * 60)
+    print(f"Searches:                  {args.requests}")
+    print(f"Upstream NDC calls:        {endpoint.calls}")
+    print(f"LRU hits:                  {cache.stats['lru_hits']}")
+    print(f"Table hits:                {cache.stats['table_hits']}")
+    print(f"Coalesced (single-flight): {cache.stats['coalesced']}")
+    print(f"Wall time:                 {elapsed:.2f}s")
+    print()
+
+
+if __name__ == "__main__":
+    main()
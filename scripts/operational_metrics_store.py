@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Operational Metrics Time-Series Store
+
+This script replaces row-at-a-time handling of airline_operational_metrics with:
+
+  - a bulk loader that streams daily KPIs for many airlines through COPY into a
+    staging table and upserts them in one statement (instead of one INSERT per
+    day from a PL/pgSQL loop)
+  - a columnar cache holding each metric as a contiguous (airlines × days)
+    NumPy array on a dense daily grid, saved as .npy files that can be
+    memory-mapped back in
+  - vectorized rolling averages, weekly/monthly downsampling and
+    period-over-period deltas over that cache
+
+Missing days are NaN and are ignored by every aggregate.
+
+Usage:
+    python scripts/operational_metrics_store.py load --generate-days 730 --airline-ids 1 2 3
+    python scripts/operational_metrics_store.py cache --out .metrics_cache
+    python scripts/operational_metrics_store.py query --cache .metrics_cache --metric on_time_performance_pct --period M
+
+Requirements:
+    pip install supabase python-dotenv numpy psycopg2-binary
+    DATABASE_URL (Postgres connection string) is needed for the COPY loader
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import random
+import argparse
+from datetime import date, timedelta
+import numpy as np
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Iterable
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+PAGE_SIZE = 1000
+
+METRIC_COLUMNS = [
+    'on_time_performance_pct',
+    'cancellation_rate_pct',
+    'baggage_mishandling_per_1000',
+    'customer_satisfaction_score',
+    'nps_score',
+    'ai_booking_percentage',
+    'api_uptime_pct',
+    'avg_api_response_time_ms',
+]
+
+
+# ============================================================================
+# BULK LOADER
+# ============================================================================
+
+def bulk_load(rows: Iterable[Dict], database_url: Optional[str] = None) -> int:
+    """COPY rows into a staging table and upsert them on (airline_id, metric_date)"""
+    import psycopg2
+
+    columns = ['airline_id', 'metric_date'] + METRIC_COLUMNS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(['' if row.get(c) is None else row[c] for c in columns])
+        count += 1
+    buffer.seek(0)
+
+    column_list = ', '.join(columns)
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in METRIC_COLUMNS)
+    with psycopg2.connect(database_url or os.environ['DATABASE_URL']) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE staging_operational_metrics "
+                "(LIKE airline_operational_metrics INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cur.copy_expert(
+                f"COPY staging_operational_metrics ({column_list}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+            cur.execute(
+                f"INSERT INTO airline_operational_metrics ({column_list}) "
+                f"SELECT {column_list} FROM staging_operational_metrics "
+                f"ON CONFLICT (airline_id, metric_date) DO UPDATE SET {updates}"
+            )
+    return count
+
+
+def generate_daily_metrics(airline_ids: List[int], start: date, days: int, seed: int = 42) -> Iterable[Dict]:
+    """Synthetic daily KPIs in the same ranges as the Migration 008 baseline"""
+    rng = random.Random(seed)
+    for airline_id in airline_ids:
+        for offset in range(days):
+            yield {
+                'airline_id': airline_id,
+                'metric_date': (start + timedelta(days=offset)).isoformat(),
+                'on_time_performance_pct': round(85.5 + rng.uniform(-4, 4), 2),
+                'cancellation_rate_pct': round(1.8 + rng.uniform(-0.75, 0.75), 2),
+                'baggage_mishandling_per_1000': round(3.2 + rng.uniform(-1, 1), 2),
+                'customer_satisfaction_score': round(4.1 + rng.uniform(-0.3, 0.3), 2),
+                'nps_score': int(42 + rng.uniform(-8, 8)),
+                'ai_booking_percentage': round(0.8 + rng.uniform(-0.6, 0.6), 2),
+                'api_uptime_pct': round(99.2 + rng.uniform(-0.35, 0.35), 2),
+                'avg_api_response_time_ms': int(320 + rng.uniform(-90, 90)),
+            }
+
+
+# ============================================================================
+# COLUMNAR STORE
+# ============================================================================
+
+class MetricSeriesStore:
+    """Per-metric (airlines × days) float arrays on a dense daily grid"""
+
+    def __init__(self, airline_ids: List[int], start: np.datetime64, series: Dict[str, np.ndarray]):
+        self.airline_ids = list(airline_ids)
+        self.airline_index = {a: i for i, a in enumerate(self.airline_ids)}
+        self.start = np.datetime64(start, 'D')
+        self.series = series
+        self.days = next(iter(series.values())).shape[1] if series else 0
+        self.dates = self.start + np.arange(self.days)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> 'MetricSeriesStore':
+        """Scatter rows onto the grid in one pass per metric"""
+        airline_ids = sorted({r['airline_id'] for r in rows})
+        if not rows:
+            return cls([], np.datetime64('today', 'D'), {m: np.empty((0, 0)) for m in METRIC_COLUMNS})
+
+        dates = np.array([r['metric_date'][:10] for r in rows], dtype='datetime64[D]')
+        start = dates.min()
+        day_idx = (dates - start).astype(np.int64)
+        index = {a: i for i, a in enumerate(airline_ids)}
+        row_idx = np.array([index[r['airline_id']] for r in rows], dtype=np.int64)
+
+        series = {}
+        shape = (len(airline_ids), int(day_idx.max()) + 1)
+        for metric in METRIC_COLUMNS:
+            values = np.array([np.nan if r.get(metric) is None else float(r[metric]) for r in rows])
+            grid = np.full(shape, np.nan)
+            grid[row_idx, day_idx] = values
+            series[metric] = grid
+        return cls(airline_ids, start, series)
+
+    def save(self, path: str):
+        """Write one .npy file per metric plus a small index"""
+        os.makedirs(path, exist_ok=True)
+        for metric, grid in self.series.items():
+            np.save(os.path.join(path, f"{metric}.npy"), np.ascontiguousarray(grid))
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump({'airline_ids': self.airline_ids, 'start': str(self.start)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'MetricSeriesStore':
+        """Open a saved cache, memory-mapping the arrays by default"""
+        with open(os.path.join(path, 'index.json')) as f:
+            index = json.load(f)
+        series = {
+            metric: np.load(os.path.join(path, f"{metric}.npy"), mmap_mode='r' if mmap else None)
+            for metric in METRIC_COLUMNS
+        }
+        return cls(index['airline_ids'], np.datetime64(index['start']), series)
+
+    def _rows(self, metric: str, airline_ids: Optional[List[int]]) -> np.ndarray:
+        grid = self.series[metric]
+        if airline_ids is None:
+            return np.asarray(grid)
+        return np.asarray(grid[[self.airline_index[a] for a in airline_ids]])
+
+    def rolling_mean(self, metric: str, window: int, airline_ids: Optional[List[int]] = None) -> np.ndarray:
+        """Trailing window mean per day, ignoring missing days"""
+        values = self._rows(metric, airline_ids)
+        present = ~np.isnan(values)
+        sums = np.cumsum(np.where(present, values, 0.0), axis=1)
+        counts = np.cumsum(present, axis=1)
+        sums[:, window:] = sums[:, window:] - sums[:, :-window]
+        counts[:, window:] = counts[:, window:] - counts[:, :-window]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    def period_starts(self, period: str) -> np.ndarray:
+        """Start date of the week ('W', Monday-based) or month ('M') of each day"""
+        if period == 'W':
+            # 1970-01-01 was a Thursday, so shift by 3 days to align weeks on Monday
+            return ((self.dates - np.datetime64('1969-12-29')) // 7 * 7 + np.datetime64('1969-12-29')).astype('datetime64[D]')
+        if period == 'M':
+            return self.dates.astype('datetime64[M]').astype('datetime64[D]')
+        raise ValueError(f"Unknown period: {period}")
+
+    def downsample(self, metric: str, period: str, airline_ids: Optional[List[int]] = None):
+        """Mean per week/month; returns (period start dates, airlines × periods array)"""
+        values = self._rows(metric, airline_ids)
+        starts = self.period_starts(period)
+        boundaries = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+        present = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(present, values, 0.0), boundaries, axis=1)
+        counts = np.add.reduceat(present.astype(np.int64), boundaries, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return starts[boundaries], np.where(counts > 0, sums / counts, np.nan)
+
+    def period_over_period(self, metric: str, period: str, lag: int = 1,
+                           airline_ids: Optional[List[int]] = None):
+        """Absolute and percent change of each period's mean against `lag` periods earlier"""
+        starts, means = self.downsample(metric, period, airline_ids)
+        delta = np.full_like(means, np.nan)
+        pct = np.full_like(means, np.nan)
+        delta[:, lag:] = means[:, lag:] - means[:, :-lag]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct[:, lag:] = delta[:, lag:] / np.abs(means[:, :-lag]) * 100
+        return starts, delta, pct
+
+
+def fetch_metrics(airline_ids: Optional[List[int]] = None) -> List[Dict]:
+    """Fetch airline_operational_metrics rows page by page"""
+    rows, offset = [], 0
+    while True:
+        query = supabase.table('airline_operational_metrics').select(
+            'airline_id, metric_date, ' + ', '.join(METRIC_COLUMNS)
+        )
+        if airline_ids:
+            query = query.in_('airline_id', airline_ids)
+        page = query.order('id').range(offset, offset + PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Bulk loader and columnar cache for airline_operational_metrics')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    load_cmd = sub.add_parser('load', help='Bulk-load daily metrics via COPY')
+    load_cmd.add_argument('--generate-days', type=int, required=True, help='Days of synthetic history per airline')
+    load_cmd.add_argument('--airline-ids', type=int, nargs='+', required=True, help='airlines.id values to load')
+    load_cmd.add_argument('--end-date', default=None, help='Last day to generate (default yesterday)')
+
+    cache_cmd = sub.add_parser('cache', help='Build the columnar cache from the table')
+    cache_cmd.add_argument('--out', default='.metrics_cache', help='Cache directory')
+    cache_cmd.add_argument('--airline-ids', type=int, nargs='*', default=None, help='Limit to these airlines')
+
+    query_cmd = sub.add_parser('query', help='Trend query against the cache')
+    query_cmd.add_argument('--cache', default='.metrics_cache', help='Cache directory')
+    query_cmd.add_argument('--metric', default='on_time_performance_pct', choices=METRIC_COLUMNS)
+    query_cmd.add_argument('--period', default='M', choices=['W', 'M'], help='Downsampling period')
+    query_cmd.add_argument('--window', type=int, default=7, help='Rolling average window in days')
+    args = parser.parse_args()
+
+    if args.command == 'load':
+        end = date.fromisoformat(args.end_date) if args.end_date else date.today() - timedelta(days=1)
+        start = end - timedelta(days=args.generate_days - 1)
+        print(f"📥 Loading {args.generate_days} days for {len(args.airline_ids)} airlines via COPY...")
+        started = time.perf_counter()
+        count = bulk_load(generate_daily_metrics(args.airline_ids, start, args.generate_days))
+        print(f"   ✅ {count} rows upserted in {time.perf_counter() - started:.2f}s")
+
+    elif args.command == 'cache':
+        print("📦 Building columnar metrics cache...")
+        started = time.perf_counter()
+        rows = fetch_metrics(args.airline_ids)
+        store = MetricSeriesStore.from_rows(rows)
+        store.save(args.out)
+        print(f"   ✅ {len(rows)} rows → {len(store.airline_ids)} airlines × {store.days} days "
+              f"in {time.perf_counter() - started:.2f}s ({args.out})")
+
+    elif args.command == 'query':
+        store = MetricSeriesStore.load(args.cache)
+        started = time.perf_counter()
+        rolling = store.rolling_mean(args.metric, args.window)
+        starts, delta, pct = store.period_over_period(args.metric, args.period)
+        _, means = store.downsample(args.metric, args.period)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        print(f"📈 {args.metric} ({len(store.airline_ids)} airlines × {store.days} days, {elapsed_ms:.1f} ms)")
+        for i, airline_id in enumerate(store.airline_ids):
+            print(f"   Airline {airline_id}: latest {args.window}-day average {rolling[i, -1]:.2f}")
+            for j in range(max(0, len(starts) - 3), len(starts)):
+                change = f"{delta[i, j]:+.2f} ({pct[i, j]:+.1f}%)" if not np.isnan(delta[i, j]) else 'n/a'
+                print(f"      {starts[j]}  mean {means[i, j]:.2f}  change {change}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Passenger Preference Feature Store
+
+This script turns the five jsonb preference documents on passenger_preferences
+into fixed-width float32 feature vectors, so personalization can look up a
+passenger and compare them with passenger_preference_archetypes without
+parsing jsonb on every request.
+
+  - only rows with consent_for_personalization are encoded; rows whose consent
+    is withdrawn are removed from the store on the next update
+  - categoricals are dictionary-encoded into one-hot / multi-hot slots with a
+    fixed vocabulary (unknown values go to an "other" slot), so vector width
+    never changes
+  - vectors live in a memory-mapped .npy file, keyed by passenger_profile_id
+    through an in-memory dict (O(1) lookup)
+  - incremental updates page through rows changed after the stored
+    (updated_at, id) watermark; updated_at is kept current by the Migration
+    018 trigger, and paging on the pair keeps rows that share a timestamp
+
+The first block of every vector holds features that archetypes also describe
+(cabin, seat, meal, frequency, booking window, price sensitivity, assistance);
+archetype similarity is cosine similarity over that block.
+
+Usage:
+    python scripts/preference_feature_store.py build --airline-id 1
+    python scripts/preference_feature_store.py update --airline-id 1
+    python scripts/preference_feature_store.py match --airline-id 1 <passenger_profile_id> ...
+
+Requirements:
+    pip install supabase python-dotenv numpy
+"""
+
+import os
+import math
+import json
+import time
+import argparse
+import numpy as np
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple, Any
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+PAGE_SIZE = 1000
+DEFAULT_STORE_DIR = ".preference_store"
+
+PRICE_SENSITIVITY = {'very_low': 0.0, 'low': 0.25, 'moderate': 0.5, 'high': 0.75, 'very_high': 1.0}
+FREQUENCY_TRIPS = {'weekly': 52, 'monthly': 12, 'quarterly': 4, 'occasional': 2, 'yearly': 1, 'rare': 1}
+
+# (kind, feature name, vocabulary) — order fixes the vector layout; shared features come first
+SHARED_FEATURES = [
+    ('onehot', 'cabin', ['economy_basic', 'economy', 'economy_premium', 'business', 'first']),
+    ('onehot', 'seat', ['window', 'aisle', 'middle', 'together', 'any']),
+    ('multihot', 'meal', ['vegetarian', 'vegan', 'halal', 'kosher', 'gluten_free', 'light_meal', 'standard_meal']),
+    ('multihot', 'assistance', ['wheelchair', 'visual', 'hearing', 'unaccompanied_minor', 'infant']),
+    ('numeric', 'trips_per_year', None),
+    ('numeric', 'booking_window', None),
+    ('numeric', 'price_sensitivity', None),
+]
+
+PASSENGER_FEATURES = [
+    ('onehot', 'language', ['en', 'es', 'pt', 'fr']),
+    ('onehot', 'channel', ['email', 'sms', 'push', 'whatsapp']),
+    ('numeric', 'notify_flight_status', None),
+    ('numeric', 'notify_gate_changes', None),
+    ('numeric', 'notify_promotions', None),
+    ('numeric', 'notify_surveys', None),
+    ('numeric', 'allergy_count', None),
+    ('numeric', 'upgrade_propensity', None),
+    ('numeric', 'total_flights', None),
+]
+
+
+class FeatureLayout:
+    """Maps named features to fixed slots in a float32 vector"""
+
+    def __init__(self, features: List[Tuple[str, str, Optional[List[str]]]], shared_count: int):
+        self.slots: Dict[str, Tuple[str, int, Dict[str, int]]] = {}
+        self.labels: List[str] = []
+        self.shared_width = 0
+        for i, (kind, name, vocab) in enumerate(features):
+            if i == shared_count:
+                self.shared_width = len(self.labels)
+            if kind == 'numeric':
+                self.slots[name] = (kind, len(self.labels), {})
+                self.labels.append(name)
+            else:
+                codes = {value: j for j, value in enumerate(vocab + ['other'])}
+                self.slots[name] = (kind, len(self.labels), codes)
+                self.labels.extend(f"{name}={value}" for value in codes)
+        if not self.shared_width:
+            self.shared_width = len(self.labels)
+        self.width = len(self.labels)
+
+    def encode(self, values: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        vector = out if out is not None else np.zeros(self.width, dtype=np.float32)
+        vector[:] = 0
+        for name, value in values.items():
+            if value is None or name not in self.slots:
+                continue
+            kind, offset, codes = self.slots[name]
+            if kind == 'numeric':
+                vector[offset] = float(value)
+            else:
+                for item in (value if kind == 'multihot' else [value]):
+                    vector[offset + codes.get(normalize(item), codes['other'])] = 1.0
+        return vector
+
+
+LAYOUT = FeatureLayout(SHARED_FEATURES + PASSENGER_FEATURES, len(SHARED_FEATURES))
+
+
+def normalize(value: Any) -> str:
+    return str(value).strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def scale_trips(trips: Optional[float]) -> Optional[float]:
+    return None if trips is None else min(math.log1p(trips) / math.log1p(100), 1.0)
+
+
+def scale_days(days: Optional[float]) -> Optional[float]:
+    return None if days is None else min(math.log1p(days) / math.log1p(365), 1.0)
+
+
+def to_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def seat_from_text(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return None
+    text = normalize(text)
+    for seat in ('window', 'aisle', 'middle', 'together'):
+        if seat in text:
+            return seat
+    return 'any'
+
+
+def passenger_features(row: Dict) -> Dict[str, Any]:
+    """Logical features from one passenger_preferences row"""
+    seat = row.get('seat_preferences') or {}
+    meal = row.get('meal_preferences') or {}
+    service = row.get('service_preferences') or {}
+    notify = row.get('notification_preferences') or {}
+    travel = row.get('travel_patterns') or {}
+
+    frequency = travel.get('frequency')
+    trips = to_number(frequency)
+    if trips is None and frequency:
+        trips = FREQUENCY_TRIPS.get(normalize(frequency))
+    sensitivity = travel.get('price_sensitivity')
+    assistance = ['wheelchair' if 'wheelchair' in normalize(a) else a for a in service.get('special_assistance') or []]
+
+    return {
+        'cabin': travel.get('cabin_preference') or seat.get('location'),
+        'seat': seat_from_text(seat.get('aisle_window') or seat.get('position')),
+        'meal': (meal.get('dietary_restrictions') or []) + (meal.get('favorite_meals') or []),
+        'assistance': assistance,
+        'trips_per_year': scale_trips(trips),
+        'booking_window': scale_days(to_number(travel.get('booking_window_days'))),
+        'price_sensitivity': PRICE_SENSITIVITY.get(normalize(sensitivity)) if isinstance(sensitivity, str)
+        else to_number(sensitivity),
+        'language': service.get('preferred_language'),
+        'channel': service.get('communication_channel'),
+        'notify_flight_status': bool(notify.get('flight_status')),
+        'notify_gate_changes': bool(notify.get('gate_changes')),
+        'notify_promotions': bool(notify.get('promotions')),
+        'notify_surveys': bool(notify.get('surveys')),
+        'allergy_count': min(len(meal.get('allergies') or []), 5) / 5,
+        'upgrade_propensity': to_number(travel.get('upgrade_propensity')),
+        'total_flights': scale_trips(row.get('total_flights')),
+    }
+
+
+def archetype_features(row: Dict) -> Dict[str, Any]:
+    """Shared-block features from one passenger_preference_archetypes row"""
+    travel = row.get('travel_patterns') or {}
+    ancillary = row.get('ancillary_preferences') or {}
+    meal = ancillary.get('meal_preference')
+    return {
+        'cabin': travel.get('cabin_preference'),
+        'seat': seat_from_text(ancillary.get('seat_preference')),
+        'meal': [meal] if meal else [],
+        'assistance': ['wheelchair'] if ancillary.get('wheelchair_assistance') else [],
+        'trips_per_year': scale_trips(to_number(travel.get('avg_trips_per_year'))),
+        'booking_window': scale_days(to_number(travel.get('advance_booking_days'))),
+        'price_sensitivity': PRICE_SENSITIVITY.get(row.get('price_sensitivity') or ''),
+    }
+
+
+class PreferenceFeatureStore:
+    """Memory-mapped vector matrix with a profile id → row index"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index: Dict[str, int] = {}
+        self.free: List[int] = []
+        self.watermark: Optional[List] = None   # [updated_at, id] of the last row applied
+        self.vectors: Optional[np.ndarray] = None
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, 'vectors.npy')
+
+    def _allocate(self, capacity: int):
+        """Create or grow the memmap, copying existing rows"""
+        os.makedirs(self.path, exist_ok=True)
+        old = self.vectors
+        tmp_path = self.vectors_path + '.tmp'
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(capacity, LAYOUT.width))
+        if old is not None:
+            grown[:len(old)] = old
+            del old
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self.vectors_path)
+        self.vectors = np.load(self.vectors_path, mmap_mode='r+')
+
+    @classmethod
+    def open(cls, path: str) -> 'PreferenceFeatureStore':
+        store = cls(path)
+        with open(os.path.join(path, 'index.json')) as f:
+            meta = json.load(f)
+        if meta['labels'] != LAYOUT.labels:
+            raise ValueError("Feature layout changed; rebuild the store")
+        store.index = meta['index']
+        store.free = meta['free']
+        store.watermark = meta['watermark']
+        if isinstance(store.watermark, str):
+            # Stores written before the id tie-breaker: re-read rows at that timestamp
+            store.watermark = [store.watermark, 0]
+        store.vectors = np.load(store.vectors_path, mmap_mode='r+')
+        return store
+
+    def save(self):
+        self.vectors.flush()
+        with open(os.path.join(self.path, 'index.json'), 'w') as f:
+            json.dump({'labels': LAYOUT.labels, 'index': self.index, 'free': self.free,
+                       'watermark': self.watermark}, f)
+
+    def apply(self, rows: List[Dict]) -> Tuple[int, int]:
+        """Upsert consenting rows and drop non-consenting ones; returns (written, removed)"""
+        written = removed = 0
+        for row in rows:
+            key = str(row['passenger_profile_id'])
+            if not row.get('consent_for_personalization'):
+                slot = self.index.pop(key, None)
+                if slot is not None:
+                    self.vectors[slot] = 0
+                    self.free.append(slot)
+                    removed += 1
+                continue
+
+            slot = self.index.get(key)
+            if slot is None:
+                if self.free:
+                    slot = self.free.pop()
+                else:
+                    slot = len(self.index)
+                    if self.vectors is None or slot >= len(self.vectors):
+                        self._allocate(max(1024, 2 * (0 if self.vectors is None else len(self.vectors))))
+                self.index[key] = slot
+            LAYOUT.encode(passenger_features(row), out=self.vectors[slot])
+            written += 1
+
+        if rows:
+            newest = max((r['updated_at'], r['id']) for r in rows)
+            if self.watermark is None or newest > tuple(self.watermark):
+                self.watermark = list(newest)
+        return written, removed
+
+    def lookup(self, passenger_profile_id: str) -> Optional[np.ndarray]:
+        slot = self.index.get(str(passenger_profile_id))
+        return None if slot is None else np.asarray(self.vectors[slot])
+
+    def similarity(self, passenger_profile_ids: List[str], archetypes: np.ndarray) -> np.ndarray:
+        """Cosine similarity (passengers × archetypes) over the shared feature block"""
+        slots = [self.index[str(p)] for p in passenger_profile_ids]
+        passengers = np.asarray(self.vectors[slots, :LAYOUT.shared_width], dtype=np.float32)
+        passengers = passengers / np.maximum(np.linalg.norm(passengers, axis=1, keepdims=True), 1e-9)
+        return passengers @ archetypes.T
+
+
+def archetype_matrix(rows: List[Dict]) -> np.ndarray:
+    """Normalized shared-block vectors for every archetype"""
+    matrix = np.stack([LAYOUT.encode(archetype_features(r))[:LAYOUT.shared_width] for r in rows])
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-9)
+
+
+def preferences_query(airline_id: int):
+    return supabase.table('passenger_preferences').select(
+        'id, passenger_profile_id, seat_preferences, meal_preferences, service_preferences, '
+        'notification_preferences, travel_patterns, consent_for_personalization, total_flights, updated_at'
+    ).eq('airline_id', airline_id)
+
+
+def fetch_preferences(airline_id: int) -> List[Dict]:
+    """Page through the consenting rows of an airline for a full build"""
+    rows, offset = [], 0
+    while True:
+        page = preferences_query(airline_id).eq('consent_for_personalization', True) \
+            .order('id').range(offset, offset + PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_changed_preferences(airline_id: int, watermark: List) -> List[Dict]:
+    """Rows of any consent state changed after the (updated_at, id) watermark, so withdrawals are applied"""
+    rows = []
+    updated_since, after_id = watermark
+    while True:
+        page = preferences_query(airline_id) \
+            .or_(f'updated_at.gt."{updated_since}",and(updated_at.eq."{updated_since}",id.gt.{after_id})') \
+            .order('updated_at').order('id').limit(PAGE_SIZE).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        updated_since, after_id = page[-1]['updated_at'], page[-1]['id']
+
+
+def fetch_archetypes() -> List[Dict]:
+    response = supabase.table('passenger_preference_archetypes').select('*').order('id').execute()
+    return response.data
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Consent-aware passenger preference feature store')
+    parser.add_argument('command', choices=['build', 'update', 'match'])
+    parser.add_argument('profile_ids', nargs='*', help='passenger_profile_id values to match')
+    parser.add_argument('--airline-id', type=int, required=True, help='airlines.id of the store')
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR, help='Store directory')
+    args = parser.parse_args()
+
+    path = os.path.join(args.store, str(args.airline_id))
+    started = time.perf_counter()
+
+    if args.command == 'build':
+        print(f"🧩 Building preference feature store for airline {args.airline_id}...")
+        store = PreferenceFeatureStore(path)
+        store._allocate(1024)
+        written, _ = store.apply(fetch_preferences(args.airline_id))
+        store.save()
+        print(f"   ✅ {written} consenting passengers × {LAYOUT.width} features "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    elif args.command == 'update':
+        store = PreferenceFeatureStore.open(path)
+        watermark = store.watermark or ['1970-01-01T00:00:00+00:00', 0]
+        print(f"🔄 Applying changes since {watermark[0]} (id {watermark[1]})...")
+        written, removed = store.apply(fetch_changed_preferences(args.airline_id, watermark))
+        store.save()
+        print(f"   ✅ {written} updated, {removed} removed (consent withdrawn) "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    else:
+        store = PreferenceFeatureStore.open(path)
+        archetypes = fetch_archetypes()
+        known = [p for p in args.profile_ids if p in store.index]
+        for missing in set(args.profile_ids) - set(known):
+            print(f"   ⚠️  {missing}: not in store (unknown or no consent)")
+        if known:
+            scores = store.similarity(known, archetype_matrix(archetypes))
+            for profile_id, row in zip(known, scores):
+                best = int(np.argmax(row))
+                print(f"   👤 {profile_id}: {archetypes[best]['archetype_name']} ({row[best]:.2f})")
+    print()
+
+
+if __name__ == "__main__":
+    main()
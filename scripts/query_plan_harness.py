@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Query Plan Regression Harness
+
+This script records query plans and latency budgets for the heavy read paths:
+the get_* RPC functions, the v_* views and the agentic analytics views.
+
+  1. The migration chain (see scripts/migration_runner.py) is applied to a
+     scratch database on a local Postgres. The 20251108 agent network files
+     overlap, so the chain keeps 20251108_agent_network_complete.sql unless
+     --prefer names another file.
+  2. The catalog is scaled up: rows of the hot tables are cloned --scale times,
+     with unique text/uuid columns made distinct and foreign keys still pointing
+     at existing parents. Join tables, whose unique keys are all foreign keys,
+     get new pairs by pointing one key column at other (cloned) parent rows.
+  3. Each view runs under EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON). get_*
+     functions are plpgsql, so their inner statements are captured through
+     auto_explain with nested statement logging. get_* functions that need
+     arguments are listed and skipped.
+  4. Plans and median execution times are compared with the stored baseline.
+     The run fails when a relation that was index-scanned is now
+     sequentially scanned, or when latency regresses beyond the tolerance.
+  5. Index suggestions are derived from sequential scans whose filter or join
+     condition uses a column that has no index with it as the leading column.
+
+Usage:
+    python scripts/query_plan_harness.py --database-url postgresql://postgres@localhost:5432/postgres
+    python scripts/query_plan_harness.py --scale 50 --update-baseline
+    python scripts/query_plan_harness.py --only v_workflows_with_data get_ontology_tree
+    python scripts/query_plan_harness.py --prefer 20251108_agent_network_cascade.sql
+
+Requirements:
+    pip install psycopg2-binary
+    A local Postgres where the connecting user may LOAD 'auto_explain'
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+import statistics
+from typing import List, Dict, Optional, Set, Tuple
+
+from migration_runner import (
+    MIGRATIONS_DIR, MigrationGraph, ChainError, load_migrations, scratch_database,
+    prepare_scratch, apply_files, drop_scratch,
+)
+
+# Kept from each overlap group in the top-level chain when --prefer is not given
+DEFAULT_PREFER = ['20251108_agent_network_complete.sql']
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'supabase', 'query_baselines.json')
+
+# Tables cloned to build a scaled catalog, parents before children
+SCALED_TABLES = [
+    'domains', 'subdomains', 'workflows', 'workflow_versions', 'agents',
+    'agent_relationships', 'agent_collaborations', 'workflow_agents',
+    'data_entities', 'workflow_data_mappings', 'agent_data_mappings',
+    'systems', 'api_endpoints', 'content_syndication_feeds', 'branded_fare_families',
+]
+
+ANALYTICS_VIEWS = [
+    'ai_readiness_scorecard', 'workflow_agentic_potential', 'agent_utilization_metrics',
+    'cross_domain_complexity', 'api_health_dashboard', 'loyalty_personalization_readiness',
+    'content_syndication_coverage', 'ndc_adoption_metrics', 'knowledge_graph_metrics',
+]
+
+LATENCY_TOLERANCE = 0.5     # Fail when median time grows by more than 50%...
+LATENCY_MIN_DELTA_MS = 5.0  # ...and by more than this many milliseconds
+SEQ_SCAN_MIN_ROWS = 1000    # Sequential scans over fewer rows are not regressions
+
+SCAN_TYPES = {'Seq Scan', 'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan', 'Bitmap Index Scan'}
+COLUMN_REF = re.compile(r'(?:\b(\w+)\.)?\b([a-z_][a-z0-9_]*)\b\s*(?:=|<|>|<=|>=|<>|~~|IS\b|= ANY)')
+
+
+# ============================================================================
+# SCALED CATALOG
+# ============================================================================
+
+UNIQUE_INDEXES_SQL = """
+SELECT i.indexrelid, array_agg(a.attname ORDER BY a.attnum)
+FROM pg_index i
+JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+WHERE i.indrelid = %s::regclass AND i.indisunique
+GROUP BY i.indexrelid
+"""
+
+# Foreign key columns; the parent is only resolved for single-column keys
+FOREIGN_KEY_COLUMNS_SQL = """
+SELECT a.attname,
+       CASE WHEN cardinality(c.conkey) = 1 THEN c.confrelid::regclass::text END,
+       CASE WHEN cardinality(c.conkey) = 1 THEN fa.attname END
+FROM pg_constraint c
+JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey)
+LEFT JOIN pg_attribute fa ON fa.attrelid = c.confrelid AND fa.attnum = c.confkey[1]
+WHERE c.conrelid = %s::regclass AND c.contype = 'f'
+"""
+
+INSERTABLE_COLUMNS_SQL = """
+SELECT a.attname, format_type(a.atttypid, a.atttypmod),
+       a.attidentity <> '' OR pg_get_expr(d.adbin, d.adrelid) LIKE 'nextval(%%'
+FROM pg_attribute a
+LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped AND a.attgenerated = ''
+ORDER BY a.attnum
+"""
+
+
+def is_text(typ: str) -> bool:
+    return typ == 'text' or typ.startswith('character')
+
+
+def clone_plan(columns: Dict[str, str], unique_keys: List[List[str]],
+               foreign: Dict[str, Optional[Tuple[str, str]]]) -> Optional[Tuple[Set[str], Set[str]]]:
+    """(columns to regenerate, foreign key columns to re-point) that keep every unique key distinct
+
+    Foreign key columns are never regenerated: a fresh value would have no parent.
+    A key made only of foreign keys (a join table) gets new pairs by pointing one
+    of its columns at other parent rows. Returns None when some key cannot be kept
+    distinct.
+    """
+    regenerate, repoint = set(), set()
+    for key in unique_keys:
+        if any(c not in columns for c in key):
+            continue    # Includes a serial/identity column, which is fresh on every insert
+        own = {c for c in key if c not in foreign and (columns[c] == 'uuid' or is_text(columns[c]))}
+        if own:
+            regenerate |= own
+            continue
+        parented = [c for c in key if foreign.get(c)]
+        if not parented:
+            return None
+        if not repoint & set(parented):
+            repoint.add(parented[0])
+    return regenerate, repoint
+
+
+def scale_table(cur, table: str, scale: int) -> Optional[str]:
+    """Insert `scale` distinct copies of each row of a table; returns why it was skipped, if it was"""
+    cur.execute(INSERTABLE_COLUMNS_SQL, (table,))
+    columns = {name: typ for name, typ, generated in cur.fetchall() if not generated}
+    cur.execute(UNIQUE_INDEXES_SQL, (table,))
+    unique_keys = [list(key) for _, key in cur.fetchall()]
+    cur.execute(FOREIGN_KEY_COLUMNS_SQL, (table,))
+    foreign = {name: (parent, parent_column) if parent else None for name, parent, parent_column in cur.fetchall()}
+
+    plan = clone_plan(columns, unique_keys, foreign)
+    if plan is None:
+        return "unique key has no text/uuid or single-column foreign key column"
+    regenerate, repoint = plan
+
+    # Re-pointed columns take the parent at offset (row * scale + copy) modulo the parent count,
+    # so each copy of a row gets a different parent; pairs that already exist are skipped
+    ctes = [f'src AS (SELECT t.*, row_number() OVER () AS _rn FROM "{table}" t)']
+    joins = []
+    for i, name in enumerate(sorted(repoint)):
+        parent, parent_column = foreign[name]
+        cur.execute(f'SELECT count(*) FROM {parent}')
+        parents = cur.fetchone()[0]
+        if parents == 0:
+            return f"{parent} is empty"
+        ctes.append(f'p{i} AS (SELECT "{parent_column}" AS ref, row_number() OVER (ORDER BY "{parent_column}") - 1 AS rn '
+                    f'FROM {parent})')
+        joins.append(f'JOIN p{i} ON p{i}.rn = (src._rn * {scale} + g) % {parents}')
+
+    select = []
+    for name, typ in columns.items():
+        if name in repoint:
+            select.append(f'p{sorted(repoint).index(name)}.ref')
+        elif name in regenerate and typ == 'uuid':
+            select.append('gen_random_uuid()')
+        elif name in regenerate:
+            select.append(f'left(src."{name}" || \'-\' || g, {limit_of(typ)})')
+        else:
+            select.append(f'src."{name}"')
+    column_list = ', '.join(f'"{name}"' for name in columns)
+    cur.execute(
+        f'WITH {", ".join(ctes)} '
+        f'INSERT INTO "{table}" ({column_list}) '
+        f'SELECT {", ".join(select)} FROM src CROSS JOIN generate_series(1, {int(scale)}) AS g {" ".join(joins)} '
+        f'ON CONFLICT DO NOTHING'
+    )
+    return None
+
+
+def scale_catalog(conn, scale: int) -> Dict[str, int]:
+    """Clone rows of the hot tables `scale` times; returns final row counts"""
+    import psycopg2
+
+    counts = {}
+    with conn.cursor() as cur:
+        for table in SCALED_TABLES:
+            cur.execute("SELECT to_regclass(%s)", (f"public.{table}",))
+            if cur.fetchone()[0] is None:
+                continue
+            cur.execute("SAVEPOINT scale_table")
+            try:
+                skipped = scale_table(cur, table, scale)
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT scale_table")
+                skipped = (e.pgerror or str(e)).strip().splitlines()[0]
+            cur.execute("RELEASE SAVEPOINT scale_table")
+            if skipped:
+                print(f"   ⏭️  {table}: not scaled ({skipped})")
+            cur.execute(f'SELECT count(*) FROM "{table}"')
+            counts[table] = cur.fetchone()[0]
+        cur.execute("ANALYZE")
+    conn.commit()
+    return counts
+
+
+def limit_of(typ: str) -> int:
+    match = re.search(r'\((\d+)\)', typ)
+    return int(match.group(1)) if match else 1000000
+
+
+# ============================================================================
+# PLANS
+# ============================================================================
+
+def discover_targets(conn, only: Optional[List[str]]) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """(name, kind) for every zero-argument get_* function and v_*/analytics view,
+    plus the signatures of get_* functions skipped because they need arguments"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT p.proname, p.pronargs = p.pronargdefaults,
+                   p.proname || '(' || pg_get_function_identity_arguments(p.oid) || ')'
+            FROM pg_proc p JOIN pg_namespace n ON n.oid = p.pronamespace
+            WHERE n.nspname = 'public' AND p.proname LIKE 'get\\_%%'
+            ORDER BY 1, 3
+        """)
+        rows = [r for r in cur.fetchall() if not only or r[0] in only]
+        functions = [(name, 'function') for name, callable_, _ in rows if callable_]
+        skipped = [signature for _, callable_, signature in rows if not callable_]
+        cur.execute("""
+            SELECT viewname FROM pg_views WHERE schemaname = 'public'
+              AND (viewname LIKE 'v\\_%%' OR viewname = ANY(%s))
+            ORDER BY 1
+        """, (ANALYTICS_VIEWS,))
+        views = [(r[0], 'view') for r in cur.fetchall()]
+    targets = functions + views
+    return [t for t in targets if not only or t[0] in only], skipped
+
+
+def explain_view(conn, view: str) -> Tuple[List[Dict], float]:
+    with conn.cursor() as cur:
+        cur.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT * FROM "{view}"')
+        result = cur.fetchone()[0][0]
+    conn.rollback()
+    return [result['Plan']], result['Execution Time']
+
+
+def explain_function(conn, function: str) -> Tuple[List[Dict], float]:
+    """Run the function with auto_explain logging every nested statement plan as a notice"""
+    with conn.cursor() as cur:
+        cur.execute("LOAD 'auto_explain'")
+        for setting, value in (('log_min_duration', '0'), ('log_analyze', 'on'), ('log_buffers', 'on'),
+                               ('log_nested_statements', 'on'), ('log_format', 'json'), ('log_level', 'notice')):
+            cur.execute(f"SET auto_explain.{setting} = '{value}'")
+        # conn.notices keeps only the last 50 by default; a list keeps every nested plan
+        conn.notices = []
+        started = time.perf_counter()
+        cur.execute(f'SELECT "{function}"()')
+        elapsed = (time.perf_counter() - started) * 1000
+        cur.execute("SET auto_explain.log_min_duration = '-1'")
+    conn.rollback()
+
+    plans = []
+    for notice in conn.notices:
+        start = notice.find('{')
+        if start == -1:
+            continue
+        try:
+            plan = json.loads(notice[start:])
+        except json.JSONDecodeError:
+            continue
+        # The top-level "SELECT fn()" plan is only a Result node; keep the nested statements
+        if plan.get('Query Text', '').strip().rstrip(';') != f'SELECT "{function}"()':
+            plans.append(plan['Plan'])
+    return plans, elapsed
+
+
+def walk(node: Dict):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk(child)
+
+
+def summarize(plans: List[Dict]) -> Dict:
+    """Scan methods per relation, plus seq-scanned rows and the conditions touching them"""
+    scans: Dict[str, Set[str]] = {}
+    seq_rows: Dict[str, int] = {}
+    conditions: List[Tuple[str, str, str]] = []   # (relation, alias, condition text)
+    aliases: Dict[str, str] = {}
+
+    for plan in plans:
+        for node in walk(plan):
+            relation = node.get('Relation Name')
+            if relation:
+                aliases[node.get('Alias', relation)] = relation
+            if node['Node Type'] in SCAN_TYPES and relation:
+                scans.setdefault(relation, set()).add(node['Node Type'])
+                if node['Node Type'] == 'Seq Scan':
+                    rows = int(node.get('Actual Rows', 0) * node.get('Actual Loops', 1)
+                               + node.get('Rows Removed by Filter', 0))
+                    seq_rows[relation] = max(seq_rows.get(relation, 0), rows)
+                    if node.get('Filter'):
+                        conditions.append((relation, node.get('Alias', relation), node['Filter']))
+            for key in ('Hash Cond', 'Merge Cond', 'Join Filter'):
+                if node.get(key):
+                    conditions.append(('', '', node[key]))
+
+    return {
+        'scans': {r: sorted(t) for r, t in scans.items()},
+        'seq_rows': seq_rows,
+        'conditions': conditions,
+        'aliases': aliases,
+    }
+
+
+def suggest_indexes(summary: Dict, indexed: Set[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    """(table, column) pairs used in conditions on sequentially scanned relations without an index"""
+    seq_scanned = {r for r, types in summary['scans'].items() if 'Seq Scan' in types}
+    suggestions = set()
+    for relation, alias, condition in summary['conditions']:
+        for qualifier, column in COLUMN_REF.findall(condition):
+            table = summary['aliases'].get(qualifier) if qualifier else relation
+            if table in seq_scanned and (table, column) not in indexed:
+                suggestions.add((table, column))
+    return suggestions
+
+
+def leading_index_columns(conn) -> Set[Tuple[str, str]]:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT c.relname, a.attname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+            WHERE n.nspname = 'public'
+        """)
+        return set(cur.fetchall())
+
+
+def measure(conn, name: str, kind: str, runs: int) -> Dict:
+    """Median execution time over `runs` and the plan summary of the last run"""
+    timings, plans = [], []
+    for _ in range(runs):
+        plans, elapsed = explain_view(conn, name) if kind == 'view' else explain_function(conn, name)
+        timings.append(elapsed)
+    summary = summarize(plans)
+    return {
+        'kind': kind,
+        'median_ms': round(statistics.median(timings), 3),
+        'scans': summary['scans'],
+        'seq_rows': summary['seq_rows'],
+        '_summary': summary,
+    }
+
+
+def compare(name: str, current: Dict, baseline: Optional[Dict], tolerance: float) -> List[str]:
+    """Regressions of `current` against its baseline entry"""
+    if not baseline:
+        return []
+    problems = []
+    for relation, types in current['scans'].items():
+        before = set(baseline.get('scans', {}).get(relation, []))
+        if ('Seq Scan' in types and before and 'Seq Scan' not in before
+                and current['seq_rows'].get(relation, 0) >= SEQ_SCAN_MIN_ROWS):
+            problems.append(f"{name}: {relation} now sequentially scanned (was {', '.join(sorted(before))})")
+    delta = current['median_ms'] - baseline['median_ms']
+    if delta > LATENCY_MIN_DELTA_MS and current['median_ms'] > baseline['median_ms'] * (1 + tolerance):
+        problems.append(f"{name}: median {current['median_ms']:.1f} ms vs baseline {baseline['median_ms']:.1f} ms")
+    return problems
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='EXPLAIN ANALYZE regression harness for RPCs and views')
+    parser.add_argument('--database-url', default=os.getenv('LOCAL_DATABASE_URL'), help='Local Postgres URL')
+    parser.add_argument('--dir', default=MIGRATIONS_DIR, help='Directory of migration files')
+    parser.add_argument('--prefer', nargs='*', default=DEFAULT_PREFER,
+                        help=f"Variant suffixes or file names to prefer (default: {' '.join(DEFAULT_PREFER)})")
+    parser.add_argument('--scale', type=int, default=20, help='Copies of each hot-table row to add')
+    parser.add_argument('--runs', type=int, default=5, help='Executions per query (median is recorded)')
+    parser.add_argument('--tolerance', type=float, default=LATENCY_TOLERANCE, help='Allowed relative slowdown')
+    parser.add_argument('--only', nargs='+', default=None, help='Only these functions/views')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--allow-remote', action='store_true', help='Allow a non-local database host')
+    args = parser.parse_args()
+
+    if not args.database_url:
+        raise SystemExit("--database-url (or LOCAL_DATABASE_URL) is required")
+
+    import psycopg2
+
+    graph = MigrationGraph(load_migrations(args.dir), args.prefer)
+    try:
+        chain = [graph.files[n] for n in graph.resolve_chain(graph.default_targets())]
+    except ChainError as e:
+        raise SystemExit(f"❌ {e}")
+
+    admin, scratch_url, scratch_name = scratch_database(args.database_url, args.allow_remote)
+    print(f"🧪 Scratch database: {scratch_name}")
+    conn = psycopg2.connect(scratch_url)
+    failures: List[str] = []
+    try:
+        prepare_scratch(conn)
+        ok, _ = apply_files(conn, chain, slow_ms=float('inf'))
+        if not ok:
+            raise SystemExit("Migration chain failed; fix it before measuring plans")
+        print()
+
+        print(f"📈 Scaling catalog ×{args.scale}...")
+        for table, count in scale_catalog(conn, args.scale).items():
+            print(f"   {table:<32} {count:>9} rows")
+        print()
+
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+
+        indexed = leading_index_columns(conn)
+        results, suggestions = {}, set()
+        targets, skipped = discover_targets(conn, args.only)
+        if skipped:
+            print(f"⏭️  {len(skipped)} get_* functions need arguments and are not measured:")
+            for signature in skipped:
+                print(f"   {signature}")
+            print()
+
+        print("🔬 Measuring plans...")
+        for name, kind in targets:
+            try:
+                result = measure(conn, name, kind, args.runs)
+            except psycopg2.Error as e:
+                conn.rollback()
+                print(f"   ❌ {name}: {(e.pgerror or str(e)).strip().splitlines()[0]}")
+                failures.append(f"{name}: failed to execute")
+                continue
+            summary = result.pop('_summary')
+            results[name] = result
+            suggestions |= suggest_indexes(summary, indexed)
+            problems = compare(name, result, baseline.get(name), args.tolerance)
+            failures.extend(problems)
+            seq = [r for r, t in result['scans'].items() if 'Seq Scan' in t]
+            print(f"   {'❌' if problems else '✅'} {name:<40} {result['median_ms']:>9.1f} ms"
+                  + (f"  seq: {', '.join(sorted(seq))}" if seq else ''))
+        print()
+
+        if suggestions:
+            print("💡 Suggested indexes:")
+            for table, column in sorted(suggestions):
+                print(f"   CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table}({column});")
+            print()
+
+        if args.update_baseline:
+            with open(args.baseline, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write('\n')
+            print(f"💾 Baseline written to {os.path.relpath(args.baseline)}")
+            print()
+    finally:
+        conn.close()
+        drop_scratch(admin, scratch_name)
+
+    if failures and not args.update_baseline:
+        print(f"❌ {len(failures)} regressions:")
+        for failure in failures:
+            print(f"   {failure}")
+        raise SystemExit(1)
+    print("✅ No plan or latency regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Materialized Analytics View Refresh Scheduler
+
+This script keeps the mv_* materialized equivalents of the agentic analytics
+views (Migration 010) current. Each cycle it reads analytics_view_staleness,
+which compares the last write time of every base table (tracked by
+statement-level triggers) with each view's last refresh, and refreshes only
+the views that are affected, several at a time.
+
+Refresh duration and staleness per view are recorded in
+analytics_view_refresh_state by the refresh_analytics_view() RPC.
+
+Usage:
+    python scripts/refresh_analytics_views.py --once
+    python scripts/refresh_analytics_views.py --interval 60
+    python scripts/refresh_analytics_views.py --once --force
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+
+def fetch_staleness() -> List[Dict]:
+    """Fetch refresh state and pending source changes for every view"""
+    response = supabase.table('analytics_view_staleness').select('*').order('view_name').execute()
+    return response.data
+
+
+def refresh_view(view_name: str) -> Dict:
+    """Refresh one materialized view through the RPC"""
+    response = supabase.rpc('refresh_analytics_view', {'p_view_name': view_name}).execute()
+    data = response.data
+    return data[0] if isinstance(data, list) else data
+
+
+def record_error(view_name: str, error: str):
+    """Store a failed refresh on the view's state row"""
+    try:
+        supabase.table('analytics_view_refresh_state').update(
+            {'last_refresh_error': error[:1000]}
+        ).eq('view_name', view_name).execute()
+    except Exception as e:
+        print(f"  ⚠️  Could not record error for {view_name}: {str(e)}")
+
+
+def refresh_cycle(force: bool, workers: int) -> int:
+    """Refresh every view that needs it, returning how many were refreshed"""
+    views = fetch_staleness()
+    due = [v for v in views if force or v['needs_refresh']]
+    if not due:
+        return 0
+
+    for view in due:
+        reason = ', '.join(view.get('changed_tables') or []) or ('forced' if force else 'max staleness reached')
+        print(f"   ⏳ {view['view_name']} ({reason})")
+
+    refreshed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(refresh_view, v['view_name']): v['view_name'] for v in due}
+        for future in as_completed(futures):
+            view_name = futures[future]
+            try:
+                state = future.result()
+                refreshed += 1
+                print(f"   ✅ {view_name} refreshed in {float(state['last_refresh_ms']):.0f} ms")
+            except Exception as e:
+                record_error(view_name, str(e))
+                print(f"   ❌ {view_name} failed: {str(e)}")
+    return refreshed
+
+
+def print_staleness():
+    """Show refresh duration and staleness per view"""
+    print("📊 Materialized view status:")
+    for view in fetch_staleness():
+        duration = f"{float(view['last_refresh_ms']):.0f} ms" if view.get('last_refresh_ms') is not None else 'n/a'
+        staleness = view.get('staleness_seconds')
+        marker = " [PENDING]" if view['needs_refresh'] else ""
+        print(f"   {view['view_name']:<36} refresh {duration:>9}   age {staleness if staleness is not None else 'n/a'}s{marker}")
+    print()
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Refresh materialized analytics views whose base tables changed')
+    parser.add_argument('--once', action='store_true', help='Run a single refresh cycle and exit')
+    parser.add_argument('--force', action='store_true', help='Refresh every view regardless of changes')
+    parser.add_argument('--interval', type=float, default=60.0, help='Seconds between refresh cycles')
+    parser.add_argument('--workers', type=int, default=4, help='Views refreshed in parallel')
+    args = parser.parse_args()
+
+    print("🔄 Starting Analytics View Refresh Scheduler...")
+    print()
+
+    try:
+        while True:
+            started = time.perf_counter()
+            refreshed = refresh_cycle(args.force, args.workers)
+            if refreshed:
+                print(f"🔄 Refreshed {refreshed} views in {time.perf_counter() - started:.2f}s")
+                print()
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print()
+
+    print_staleness()
+
+
+if __name__ == "__main__":
+    main()
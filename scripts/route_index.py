@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Route Search Index
+
+This script loads airline_routes into per-airport adjacency arrays and
+precomputes every valid nonstop, one-stop and two-stop itinerary, so
+origin-destination searches ("all one-stop itineraries via PTY under N
+minutes") are answered from memory instead of self-joining airline_routes.
+
+Connection times use the minimum connection time (MCT) per connecting airport
+as recorded in baggage_connections.mct_minutes, falling back to
+DEFAULT_MCT_MINUTES. The seed network only stores hub-outbound rows (PTY → X),
+so unless --one-way is given each route is assumed to be operated in both
+directions when no explicit return row exists.
+
+When routes change, only itineraries from origins that can reach the changed
+leg within two legs are rebuilt. --watch follows airline_routes by the
+server-side (updated_at, id) of each row and picks up deleted routes from the
+syndication_source_removals log (both maintained by Migration 011 triggers).
+
+Usage:
+    python scripts/route_index.py PTY LAX
+    python scripts/route_index.py MIA BOG --max-stops 1 --max-minutes 600 --via PTY
+    python scripts/route_index.py --watch
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import time
+import argparse
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Tuple, Optional, Set
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+DEFAULT_MCT_MINUTES = 45
+MAX_LEGS = 3
+PAGE_SIZE = 1000
+
+# Itinerary: (total_minutes, airports along the way, route ids per leg)
+Itinerary = Tuple[int, Tuple[str, ...], Tuple[int, ...]]
+
+
+class RouteIndex:
+    """Adjacency arrays plus precomputed itineraries keyed by airport code"""
+
+    def __init__(self, mct_minutes: Optional[Dict[str, int]] = None, assume_return_routes: bool = True):
+        self.mct_minutes = mct_minutes or {}
+        self.assume_return_routes = assume_return_routes
+        self.airports: List[str] = []
+        self.airport_ids: Dict[str, int] = {}
+        self.routes: Dict[int, Dict] = {}
+        # adjacency[origin_id] -> list of (destination_id, travel_minutes, route_id)
+        self.adjacency: List[List[Tuple[int, int, int]]] = []
+        self.reverse: List[Set[int]] = []
+        # itineraries[origin][destination] -> itineraries sorted by total minutes
+        self.itineraries: Dict[str, Dict[str, List[Itinerary]]] = {}
+
+    def _airport_id(self, code: str) -> int:
+        airport_id = self.airport_ids.get(code)
+        if airport_id is None:
+            airport_id = self.airport_ids[code] = len(self.airports)
+            self.airports.append(code)
+            self.adjacency.append([])
+            self.reverse.append(set())
+        return airport_id
+
+    def _rebuild_adjacency(self):
+        """Rebuild adjacency arrays from the route rows"""
+        for edges in self.adjacency:
+            edges.clear()
+        for sources in self.reverse:
+            sources.clear()
+
+        explicit = {(r['origin_airport_code'], r['destination_airport_code']) for r in self.routes.values()}
+        for route in self.routes.values():
+            if not route.get('travel_time_minutes'):
+                continue
+            legs = [(route['origin_airport_code'], route['destination_airport_code'])]
+            if self.assume_return_routes and (legs[0][1], legs[0][0]) not in explicit:
+                legs.append((legs[0][1], legs[0][0]))
+            for origin, destination in legs:
+                o, d = self._airport_id(origin), self._airport_id(destination)
+                self.adjacency[o].append((d, route['travel_time_minutes'], route['id']))
+                self.reverse[d].add(o)
+
+        for edges in self.adjacency:
+            edges.sort(key=lambda e: e[1])
+
+    def mct(self, airport: str) -> int:
+        return self.mct_minutes.get(airport, DEFAULT_MCT_MINUTES)
+
+    def _build_from(self, origin_id: int):
+        """Enumerate every itinerary of up to MAX_LEGS legs starting at origin"""
+        found: Dict[str, List[Itinerary]] = {}
+        stack = [(origin_id, 0, (self.airports[origin_id],), ())]
+        while stack:
+            airport_id, minutes, path, route_ids = stack.pop()
+            for destination_id, travel, route_id in self.adjacency[airport_id]:
+                destination = self.airports[destination_id]
+                if destination in path:
+                    continue
+                connection = self.mct(self.airports[airport_id]) if route_ids else 0
+                total = minutes + connection + travel
+                itinerary = (total, path + (destination,), route_ids + (route_id,))
+                found.setdefault(destination, []).append(itinerary)
+                if len(itinerary[2]) < MAX_LEGS:
+                    stack.append((destination_id, total, itinerary[1], itinerary[2]))
+
+        for itineraries in found.values():
+            itineraries.sort()
+        self.itineraries[self.airports[origin_id]] = found
+
+    def load(self, routes: List[Dict]):
+        """Build the full index from airline_routes rows"""
+        self.routes = {r['id']: r for r in routes}
+        for route in routes:
+            self._airport_id(route['origin_airport_code'])
+            self._airport_id(route['destination_airport_code'])
+        self._rebuild_adjacency()
+        self.itineraries.clear()
+        for origin_id in range(len(self.airports)):
+            self._build_from(origin_id)
+
+    def apply_changes(self, changed: List[Dict], removed_ids: Optional[List[int]] = None) -> int:
+        """Apply changed/removed routes and rebuild only the affected origins"""
+        touched = set()
+        for route_id in removed_ids or []:
+            route = self.routes.pop(route_id, None)
+            if route:
+                touched.update((route['origin_airport_code'], route['destination_airport_code']))
+        for route in changed:
+            old = self.routes.get(route['id'])
+            if old:
+                touched.update((old['origin_airport_code'], old['destination_airport_code']))
+            self.routes[route['id']] = route
+            touched.update((route['origin_airport_code'], route['destination_airport_code']))
+        if not touched:
+            return 0
+
+        for code in touched:
+            self._airport_id(code)
+        self._rebuild_adjacency()
+
+        # Any origin within MAX_LEGS - 1 hops of a touched airport may route through it
+        affected = {self.airport_ids[code] for code in touched}
+        frontier = set(affected)
+        for _ in range(MAX_LEGS - 1):
+            frontier = {src for airport_id in frontier for src in self.reverse[airport_id]} - affected
+            affected |= frontier
+        for origin_id in affected:
+            self._build_from(origin_id)
+        return len(affected)
+
+    def search(self, origin: str, destination: str, max_stops: int = 2,
+               max_minutes: Optional[int] = None, via: Optional[str] = None) -> List[Itinerary]:
+        """Itineraries between two airports, shortest first"""
+        results = []
+        for itinerary in self.itineraries.get(origin, {}).get(destination, []):
+            total, path, _ = itinerary
+            if max_minutes is not None and total > max_minutes:
+                break
+            if len(path) - 2 > max_stops:
+                continue
+            if via and via not in path[1:-1]:
+                continue
+            results.append(itinerary)
+        return results
+
+
+def routes_query():
+    return supabase.table('airline_routes').select(
+        'id, airline_id, origin_airport_code, destination_airport_code, travel_time_minutes, '
+        'frequency_weekly, hub_connection, updated_at'
+    )
+
+
+def fetch_routes() -> List[Dict]:
+    """Fetch every airline route"""
+    routes, offset = [], 0
+    while True:
+        page = routes_query().order('id').range(offset, offset + PAGE_SIZE - 1).execute().data
+        routes.extend(page)
+        if len(page) < PAGE_SIZE:
+            return routes
+        offset += PAGE_SIZE
+
+
+def fetch_changed_routes(updated_since: str, after_id: int) -> List[Dict]:
+    """Fetch the next page of routes changed after the (updated_at, id) watermark"""
+    return routes_query() \
+        .or_(f'updated_at.gt."{updated_since}",and(updated_at.eq."{updated_since}",id.gt.{after_id})') \
+        .order('updated_at').order('id').limit(PAGE_SIZE).execute().data
+
+
+def fetch_route_removals(after_id: int) -> List[Dict]:
+    """Fetch the next page of deleted routes from the Migration 011 removal log"""
+    return supabase.table('syndication_source_removals').select('id, row_id') \
+        .eq('source_table', 'airline_routes').gt('id', after_id) \
+        .order('id').limit(PAGE_SIZE).execute().data
+
+
+def last_route_removal_id() -> int:
+    """Id of the newest airline_routes entry in the removal log (0 if none)"""
+    response = supabase.table('syndication_source_removals').select('id') \
+        .eq('source_table', 'airline_routes').order('id', desc=True).limit(1).execute()
+    return response.data[0]['id'] if response.data else 0
+
+
+def fetch_mct_minutes() -> Dict[str, int]:
+    """Largest MCT recorded per connecting airport in baggage_connections"""
+    mct = {}
+    after_id = 0
+    while True:
+        page = supabase.table('baggage_connections').select('id, connection_airport, mct_minutes') \
+            .not_.is_('mct_minutes', 'null').gt('id', after_id) \
+            .order('id').limit(PAGE_SIZE).execute().data
+        for row in page:
+            airport = row['connection_airport']
+            mct[airport] = max(mct.get(airport, 0), row['mct_minutes'])
+        if len(page) < PAGE_SIZE:
+            return mct
+        after_id = page[-1]['id']
+
+
+def print_itineraries(index: RouteIndex, itineraries: List[Itinerary]):
+    for total, path, _ in itineraries:
+        stops = len(path) - 2
+        label = 'nonstop' if stops == 0 else f"{stops} stop{'s' if stops > 1 else ''}"
+        print(f"   • {' → '.join(path)}  {total // 60}h{total % 60:02d}m ({label})")
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Precomputed connection builder over airline_routes')
+    parser.add_argument('origin', nargs='?', help='Origin airport code')
+    parser.add_argument('destination', nargs='?', help='Destination airport code')
+    parser.add_argument('--max-stops', type=int, default=2, help='Maximum connections (0-2)')
+    parser.add_argument('--max-minutes', type=int, default=None, help='Maximum total journey minutes')
+    parser.add_argument('--via', default=None, help='Require a connection at this airport')
+    parser.add_argument('--one-way', action='store_true', help='Do not assume return routes')
+    parser.add_argument('--watch', action='store_true', help='Keep the index current as routes change')
+    args = parser.parse_args()
+
+    print("🗺️  Building route index...")
+    started = time.perf_counter()
+    index = RouteIndex(fetch_mct_minutes(), assume_return_routes=not args.one_way)
+    routes = fetch_routes()
+    index.load(routes)
+    pairs = sum(len(d) for d in index.itineraries.values())
+    print(f"   {len(routes)} routes, {len(index.airports)} airports, {pairs} O&D pairs "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print()
+
+    if args.origin and args.destination:
+        started = time.perf_counter()
+        results = index.search(args.origin.upper(), args.destination.upper(),
+                               args.max_stops, args.max_minutes, args.via.upper() if args.via else None)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        print(f"✈️  {args.origin.upper()} → {args.destination.upper()}: {len(results)} itineraries ({elapsed_us:.0f} µs)")
+        print_itineraries(index, results)
+        print()
+
+    if args.watch:
+        # Start from the newest row the index was built from, by the server's clock
+        newest = max(routes, key=lambda r: (r['updated_at'] or '', r['id']), default=None)
+        updated_since, after_id = (newest['updated_at'], newest['id']) if newest else ('1970-01-01T00:00:00+00:00', 0)
+        removal_id = last_route_removal_id()
+        print("👀 Watching airline_routes for changes...")
+        try:
+            while True:
+                changed = []
+                while True:
+                    page = fetch_changed_routes(updated_since, after_id)
+                    if page:
+                        changed.extend(page)
+                        updated_since, after_id = page[-1]['updated_at'], page[-1]['id']
+                    if len(page) < PAGE_SIZE:
+                        break
+
+                removed_ids = []
+                while True:
+                    page = fetch_route_removals(removal_id)
+                    if page:
+                        removed_ids.extend(r['row_id'] for r in page)
+                        removal_id = page[-1]['id']
+                    if len(page) < PAGE_SIZE:
+                        break
+
+                # Route ids are never reused, so a removed id cannot come back as a change
+                removed = set(removed_ids)
+                changed = [r for r in changed if r['id'] not in removed]
+                if changed or removed:
+                    rebuilt = index.apply_changes(changed, removed_ids)
+                    print(f"🔄 {len(changed)} routes changed, {len(removed)} removed, "
+                          f"rebuilt itineraries for {rebuilt} origins")
+                time.sleep(10)
+        except KeyboardInterrupt:
+            print()
+
+
+if __name__ == "__main__":
+    main()
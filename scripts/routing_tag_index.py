@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Routing Tag Sortation Index
+
+This script precompiles the active baggage_routing_tags legs into in-memory
+hash maps so that scanners and ramp teams never have to query per bag:
+
+  - (bag_tag_number, routing_sequence) → leg, plus bag_tag_number → the
+    sequence of the leg flying a given flight. A scanner reading a tag on an
+    inbound flight gets the next leg (flight, destination, transfer terminal)
+    in O(1).
+  - (flight_number, flight_date) → the legs booked on that flight, with
+    short-connect and rush-tag candidate lists kept sorted by
+    mct_buffer_minutes. "All tight transfers off this inbound flight" is a
+    dictionary lookup followed by a slice.
+
+A short-connect candidate is a transferring leg whose buffer is below
+SHORT_CONNECT_BUFFER_MINUTES (the idx_routing_mct_buffer threshold) or whose
+short_connect_flag is set. A rush-tag candidate is a leg whose connection
+cannot meet MCT (negative buffer), or one already rush-tagged but not yet
+transferred. The index refreshes incrementally, paging on (updated_at, id)
+(kept current by the Baggage Migration 012 trigger), so new or re-routed
+tags replace their old entries in place. A full reload every
+--reconcile-interval seconds drops legs whose change was missed.
+
+Usage:
+    python scripts/routing_tag_index.py                                   # serve on 127.0.0.1:8766
+    python scripts/routing_tag_index.py --once --flight CM101 --date 2025-11-10
+
+    GET /next?tag=0230123456&flight=CM101       next leg after the flight the bag is on
+    GET /tight?flight=CM101&date=2025-11-10     short-connect transfers off an inbound flight
+    GET /rush?flight=CM101&date=2025-11-10      rush-tag candidates off an inbound flight
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import json
+import time
+import bisect
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+# Legs in these states can still be sorted or transferred
+ACTIVE_ROUTING_STATUSES = ['PLANNED', 'IN_PROGRESS', 'TRANSFERRED']
+
+# Matches the idx_routing_mct_buffer partial index
+SHORT_CONNECT_BUFFER_MINUTES = 15
+
+PAGE_SIZE = 1000
+
+ROUTING_COLUMNS = (
+    'id, bag_tag_number, routing_sequence, flight_number, flight_date, operating_carrier, '
+    'origin_airport, destination_airport, final_destination_airport, is_final_leg, connection_type, '
+    'connection_time_minutes, mct_minutes, mct_buffer_minutes, transfer_required, transfer_airport, '
+    'transfer_terminal, requires_terminal_change, short_connect_flag, rush_tag_applied, '
+    'bag_transferred_next_leg, routing_status, updated_at'
+)
+
+FlightKey = Tuple[str, str]
+LegKey = Tuple[str, int]
+
+
+class RoutingLeg:
+    """One routing leg, reduced to what sortation needs"""
+
+    __slots__ = ('row_id', 'tag', 'sequence', 'flight', 'flight_date', 'carrier', 'origin', 'destination',
+                 'final_destination', 'is_final', 'connection_type', 'buffer', 'transfer_airport',
+                 'transfer_terminal', 'terminal_change', 'short_connect', 'rush', 'status')
+
+    def __init__(self, row: Dict):
+        self.row_id = row['id']
+        self.tag = row['bag_tag_number']
+        self.sequence = row['routing_sequence']
+        self.flight = row['flight_number']
+        self.flight_date = row['flight_date']
+        self.carrier = row['operating_carrier']
+        self.origin = row['origin_airport']
+        self.destination = row['destination_airport']
+        self.final_destination = row['final_destination_airport']
+        self.is_final = bool(row.get('is_final_leg'))
+        self.connection_type = row.get('connection_type')
+        self.buffer = row.get('mct_buffer_minutes')
+        self.transfer_airport = row.get('transfer_airport')
+        self.transfer_terminal = row.get('transfer_terminal')
+        self.terminal_change = bool(row.get('requires_terminal_change'))
+        transferring = bool(row.get('transfer_required')) and not self.is_final
+        self.short_connect = transferring and (
+            bool(row.get('short_connect_flag'))
+            or (self.buffer is not None and self.buffer < SHORT_CONNECT_BUFFER_MINUTES)
+        )
+        self.rush = transferring and not row.get('bag_transferred_next_leg') and (
+            bool(row.get('rush_tag_applied')) or (self.buffer is not None and self.buffer < 0)
+        )
+        self.status = row['routing_status']
+
+    @property
+    def key(self) -> LegKey:
+        return (self.tag, self.sequence)
+
+    @property
+    def flight_key(self) -> FlightKey:
+        return (self.flight, self.flight_date)
+
+    @property
+    def sort_key(self) -> Tuple:
+        # Unknown buffers sort last
+        return (self.buffer if self.buffer is not None else float('inf'), self.tag, self.sequence)
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RoutingTagIndex:
+    """Active legs keyed by (tag, sequence) and by (flight, date), with buffer-sorted candidate lists"""
+
+    def __init__(self):
+        self.legs: Dict[LegKey, RoutingLeg] = {}
+        self.row_ids: Dict[int, LegKey] = {}
+        self.tag_flights: Dict[str, Dict[str, int]] = {}
+        self.flights: Dict[FlightKey, set] = {}
+        self.short_connects: Dict[FlightKey, List[Tuple]] = {}
+        self.rush_candidates: Dict[FlightKey, List[Tuple]] = {}
+        self.lock = threading.Lock()
+
+    def apply(self, row: Dict):
+        """Add, replace or drop a leg from a routing tag row"""
+        previous = self.row_ids.get(row['id'])
+        if previous is not None:
+            self.remove(previous)
+        if row['routing_status'] not in ACTIVE_ROUTING_STATUSES:
+            return
+
+        leg = RoutingLeg(row)
+        if leg.key in self.legs:
+            self.remove(leg.key)
+        self.legs[leg.key] = leg
+        self.row_ids[row['id']] = leg.key
+        self.tag_flights.setdefault(leg.tag, {})[leg.flight] = leg.sequence
+        self.flights.setdefault(leg.flight_key, set()).add(leg.key)
+        if leg.short_connect:
+            bisect.insort(self.short_connects.setdefault(leg.flight_key, []), leg.sort_key)
+        if leg.rush:
+            bisect.insort(self.rush_candidates.setdefault(leg.flight_key, []), leg.sort_key)
+
+    def remove(self, key: LegKey):
+        leg = self.legs.pop(key, None)
+        if leg is None:
+            return
+        if self.row_ids.get(leg.row_id) == key:
+            del self.row_ids[leg.row_id]
+        flights = self.tag_flights.get(leg.tag, {})
+        if flights.get(leg.flight) == leg.sequence:
+            del flights[leg.flight]
+            if not flights:
+                del self.tag_flights[leg.tag]
+        self._discard(self.flights, leg.flight_key, key)
+        for lists, member in ((self.short_connects, leg.short_connect), (self.rush_candidates, leg.rush)):
+            if member:
+                entries = lists[leg.flight_key]
+                del entries[bisect.bisect_left(entries, leg.sort_key)]
+                if not entries:
+                    del lists[leg.flight_key]
+
+    @staticmethod
+    def _discard(index: Dict, key, member):
+        members = index.get(key)
+        if members is not None:
+            members.discard(member)
+            if not members:
+                del index[key]
+
+    def next_leg(self, tag: str, flight: Optional[str] = None) -> Optional[RoutingLeg]:
+        """Leg after the one flying `flight` (or the first active leg when no flight is given)"""
+        flights = self.tag_flights.get(tag)
+        if not flights:
+            return None
+        if flight is None:
+            return self.legs.get((tag, min(flights.values())))
+        sequence = flights.get(flight)
+        return self.legs.get((tag, sequence + 1)) if sequence is not None else None
+
+    def tight_transfers(self, flight: str, flight_date: str, limit: Optional[int] = None) -> List[Dict]:
+        return self._with_onward(self.short_connects.get((flight, flight_date), [])[:limit])
+
+    def rush_tags(self, flight: str, flight_date: str, limit: Optional[int] = None) -> List[Dict]:
+        return self._with_onward(self.rush_candidates.get((flight, flight_date), [])[:limit])
+
+    def _with_onward(self, entries: List[Tuple]) -> List[Dict]:
+        """Inbound legs (tightest first) with the onward leg each bag must make"""
+        result = []
+        for _, tag, sequence in entries:
+            inbound = self.legs[(tag, sequence)]
+            onward = self.legs.get((tag, sequence + 1))
+            result.append({
+                'bag_tag_number': tag,
+                'mct_buffer_minutes': inbound.buffer,
+                'transfer_airport': inbound.transfer_airport or inbound.destination,
+                'transfer_terminal': inbound.transfer_terminal,
+                'requires_terminal_change': inbound.terminal_change,
+                'connection_type': inbound.connection_type,
+                'onward_flight': onward.flight if onward else None,
+                'onward_destination': onward.destination if onward else None,
+            })
+        return result
+
+
+def fetch_routing_tags() -> List[Dict]:
+    """Fetch every active leg"""
+    rows = []
+    offset = 0
+    while True:
+        response = supabase.table('baggage_routing_tags').select(ROUTING_COLUMNS) \
+            .in_('routing_status', ACTIVE_ROUTING_STATUSES).order('id') \
+            .range(offset, offset + PAGE_SIZE - 1).execute()
+        rows.extend(response.data)
+        if len(response.data) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_changed_routing_tags(updated_since: str, after_id: int) -> List[Dict]:
+    """Fetch the next page of legs changed after the (updated_at, id) watermark.
+
+    updated_at is kept current by the Baggage Migration 012 trigger; paging on
+    the pair keeps legs that share the boundary timestamp.
+    """
+    return supabase.table('baggage_routing_tags').select(ROUTING_COLUMNS) \
+        .or_(f'updated_at.gt."{updated_since}",and(updated_at.eq."{updated_since}",id.gt.{after_id})') \
+        .order('updated_at').order('id').limit(PAGE_SIZE).execute().data
+
+
+def reconcile(index: RoutingTagIndex) -> Tuple[int, int]:
+    """Reload the active legs; returns (refreshed, dropped)"""
+    rows = fetch_routing_tags()
+    active_ids = {row['id'] for row in rows}
+    with index.lock:
+        stale = [key for row_id, key in index.row_ids.items() if row_id not in active_ids]
+        for key in stale:
+            index.remove(key)
+        for row in rows:
+            index.apply(row)
+    return len(rows), len(stale)
+
+
+def follow_changes(index: RoutingTagIndex, watermark: str, poll_interval: float, reconcile_interval: float,
+                   stop: threading.Event):
+    """Apply added and changed routing tags until stopped, reconciling the active legs periodically"""
+    updated_since, after_id = watermark, 0
+    last_reconcile = time.monotonic()
+    while not stop.is_set():
+        if time.monotonic() - last_reconcile >= reconcile_interval:
+            try:
+                refreshed, dropped = reconcile(index)
+                if dropped:
+                    print(f"   🧹 Reconciled {refreshed} active legs, dropped {dropped} no longer active")
+            except Exception as e:
+                print(f"  ⚠️  Error reconciling routing tags: {str(e)}")
+            last_reconcile = time.monotonic()
+        try:
+            changed = fetch_changed_routing_tags(updated_since, after_id)
+        except Exception as e:
+            print(f"  ⚠️  Error polling routing tags: {str(e)}")
+            stop.wait(poll_interval)
+            continue
+        if changed:
+            started = time.perf_counter()
+            with index.lock:
+                for row in changed:
+                    index.apply(row)
+            updated_since, after_id = changed[-1]['updated_at'], changed[-1]['id']
+            print(f"   🔄 Applied {len(changed)} routing changes in {(time.perf_counter() - started) * 1000:.1f} ms "
+                  f"({len(index.legs)} active legs)")
+        if len(changed) < PAGE_SIZE:
+            stop.wait(poll_interval)
+
+
+def make_handler(index: RoutingTagIndex):
+    class RoutingHandler(BaseHTTPRequestHandler):
+        """GET /next, /tight and /rush"""
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            limit = int(params['limit']) if 'limit' in params else None
+            with index.lock:
+                if url.path == '/next' and 'tag' in params:
+                    leg = index.next_leg(params['tag'], params.get('flight'))
+                    body, status = (leg.as_dict(), 200) if leg else ({'error': 'no active next leg'}, 404)
+                elif url.path in ('/tight', '/rush') and 'flight' in params and 'date' in params:
+                    lookup = index.tight_transfers if url.path == '/tight' else index.rush_tags
+                    body, status = lookup(params['flight'], params['date'], limit), 200
+                else:
+                    body, status = {'error': 'use /next?tag=&flight=, /tight?flight=&date= or /rush?flight=&date='}, 404
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return RoutingHandler
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='In-memory sortation and short-connect index over routing tags')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to serve on')
+    parser.add_argument('--port', type=int, default=8766, help='Port to serve on')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between change polls')
+    parser.add_argument('--reconcile-interval', type=float, default=600.0,
+                        help='Seconds between full reloads of the active legs')
+    parser.add_argument('--once', action='store_true', help='Build, print and exit')
+    parser.add_argument('--flight', help='With --once, print tight transfers off this inbound flight')
+    parser.add_argument('--date', help='With --once, flight date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    print("🏷️  Starting Routing Tag Sortation Index...")
+    print()
+
+    index = RoutingTagIndex()
+    watermark = datetime.now(timezone.utc).isoformat()
+
+    print("📊 Loading active routing legs...")
+    started = time.perf_counter()
+    for row in fetch_routing_tags():
+        index.apply(row)
+    print(f"   Indexed {len(index.legs)} legs for {len(index.tag_flights)} bags on {len(index.flights)} flights "
+          f"in {(time.perf_counter() - started):.2f}s")
+    print(f"   Short-connect candidates: {sum(map(len, index.short_connects.values()))}, "
+          f"rush-tag candidates: {sum(map(len, index.rush_candidates.values()))}")
+    print()
+
+    if args.once:
+        if args.flight and args.date:
+            print(f"⏱️  Tight transfers off {args.flight} {args.date}:")
+            for transfer in index.tight_transfers(args.flight, args.date):
+                print(f"   {transfer['bag_tag_number']:<12} buffer {transfer['mct_buffer_minutes']!s:>5} min → "
+                      f"{transfer['onward_flight'] or '?'} ({transfer['transfer_airport']})")
+            print()
+        return
+
+    stop = threading.Event()
+    threading.Thread(target=follow_changes, args=(index, watermark, args.poll_interval, args.reconcile_interval, stop), daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+    print(f"🌐 Serving on http://{args.host}:{args.port}/tight?flight=XX000&date=YYYY-MM-DD")
+    print()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stop.set()
+        server.server_close()
+        print()
+        print(f"✅ Stopped with {len(index.legs)} active legs indexed")
+        print()
+
+
+if __name__ == "__main__":
+    main()
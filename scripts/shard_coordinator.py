@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Shard Coordinator
+
+Runs a catalog migration or mapping job across a process pool. The job's rows
+are partitioned on the job's SHARD_COLUMN:
+
+  subdomain_id  Subdomains are bin-packed (largest first) into --shards groups
+                of roughly equal workflow counts.
+  id            Ids are split into --shards contiguous ranges of equal size.
+
+Each worker is a fresh (spawned) process that imports the job module, so it
+gets its own Supabase client and Neo4j driver; nothing is shared between
+shards. Per-shard status, counters, errors and timings are written to
+.shard_state/<job>.json as shards finish, and --resume reruns only the shards
+that failed or never completed. Once every shard is done the counters are
+summed and the job's finalize_shards() (if any) runs the cross-shard steps.
+
+A job module exposes:
+    SHARD_COLUMN            'subdomain_id' or 'id'
+    shard_keys()            [(key, weight), ...]
+    run_shard(shard)        {counter: value, ...}
+    finalize_shards(totals) optional
+
+Usage:
+    python scripts/shard_coordinator.py map_workflows_to_data --workers 8
+    python scripts/shard_coordinator.py map_agents_to_data --workers 4 --shards 16
+    python scripts/shard_coordinator.py migrate_priority_workflows --workers 4
+    python scripts/shard_coordinator.py migrate_priority_workflows --resume
+
+Requirements:
+    pip install supabase neo4j python-dotenv
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import traceback
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPTS_DIR)
+
+# Job modules live in scripts/ and the repo root; spawned workers re-import
+# this module, so the path is set up at import time rather than in main()
+for path in (SCRIPTS_DIR, REPO_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+JOBS = {
+    'map_workflows_to_data': 'map_workflows_to_data',
+    'map_agents_to_data': 'map_agents_to_data',
+    'migrate_priority_workflows': 'migrate_priority_workflows',
+}
+
+STATE_DIR = os.path.join(REPO_ROOT, '.shard_state')
+
+
+def plan_by_key(keys: List[Tuple], shard_count: int, column: str) -> List[Dict]:
+    """Longest-processing-time bin packing of (key, weight) pairs"""
+    bins = [{'keys': [], 'weight': 0} for _ in range(min(shard_count, len(keys)) or 1)]
+    for key, weight in sorted(keys, key=lambda kw: -kw[1]):
+        target = min(bins, key=lambda b: b['weight'])
+        target['keys'].append(key)
+        target['weight'] += weight
+    return [
+        {'name': f"shard-{i:03d}", 'column': column, 'keys': b['keys'], 'weight': b['weight']}
+        for i, b in enumerate(bins) if b['keys']
+    ]
+
+
+def plan_by_range(keys: List[Tuple], shard_count: int, column: str) -> List[Dict]:
+    """Contiguous id ranges holding roughly equal weight"""
+    ids = sorted(k for k, _ in keys)
+    if not ids:
+        return []
+    shard_count = min(shard_count, len(ids))
+    bounds = [round(i * len(ids) / shard_count) for i in range(shard_count + 1)]
+    shards = []
+    for i in range(shard_count):
+        lo = ids[bounds[i]]
+        # Ranges butt up against each other so ids added since planning are covered
+        hi = ids[bounds[i + 1]] - 1 if i + 1 < shard_count else ids[-1]
+        shards.append({
+            'name': f"shard-{i:03d}",
+            'column': column,
+            'range': [lo, hi],
+            'weight': bounds[i + 1] - bounds[i],
+        })
+    return shards
+
+
+def plan_shards(module, shard_count: int) -> List[Dict]:
+    """Partition the job's rows on its SHARD_COLUMN"""
+    keys = module.shard_keys()
+    if module.SHARD_COLUMN == 'id':
+        return plan_by_range(keys, shard_count, module.SHARD_COLUMN)
+    return plan_by_key(keys, shard_count, module.SHARD_COLUMN)
+
+
+def run_shard(module_name: str, shard: Dict) -> Dict:
+    """Worker entry point: import the job in this process and run one shard"""
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    counters = module.run_shard(shard)
+    return {'counters': dict(counters or {}), 'elapsed': round(time.perf_counter() - start, 3)}
+
+
+def state_path(job: str) -> str:
+    return os.path.join(STATE_DIR, f"{job}.json")
+
+
+def load_state(job: str) -> Optional[Dict]:
+    path = state_path(job)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(job: str, state: Dict):
+    """Write the state file atomically so a killed run never leaves it half-written"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp = state_path(job) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(tmp, state_path(job))
+
+
+def describe(shard: Dict) -> str:
+    if 'range' in shard:
+        return f"{shard['column']} {shard['range'][0]}..{shard['range'][1]}"
+    return f"{len(shard['keys'])} {shard['column']} value(s)"
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Run a migration/mapping job sharded across a process pool')
+    parser.add_argument('job', choices=sorted(JOBS))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='Worker processes')
+    parser.add_argument('--shards', type=int, default=None, help='Number of shards (default: 2 x workers)')
+    parser.add_argument('--resume', action='store_true', help='Rerun only failed/unfinished shards of the last run')
+    args = parser.parse_args()
+
+    module_name = JOBS[args.job]
+    module = importlib.import_module(module_name)
+
+    state = load_state(args.job) if args.resume else None
+    if args.resume and state is None:
+        print(f"❌ No saved state for {args.job} in {os.path.relpath(STATE_DIR)}")
+        sys.exit(1)
+
+    if state is None:
+        shard_count = args.shards or args.workers * 2
+        print(f"🧩 Planning {shard_count} shards for {args.job} on {module.SHARD_COLUMN}...")
+        shards = plan_shards(module, shard_count)
+        state = {
+            'job': args.job,
+            'column': module.SHARD_COLUMN,
+            'planned_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'shards': {s['name']: {'shard': s, 'status': 'pending'} for s in shards},
+        }
+        save_state(args.job, state)
+
+    todo = [entry['shard'] for entry in state['shards'].values() if entry['status'] != 'done']
+    print(f"🚀 {len(todo)} of {len(state['shards'])} shards to run with {args.workers} workers")
+    print()
+
+    start = time.perf_counter()
+    # spawn (not fork): each worker builds its own clients instead of inheriting sockets
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        futures = {pool.submit(run_shard, module_name, shard): shard for shard in todo}
+        for future in as_completed(futures):
+            shard = futures[future]
+            entry = state['shards'][shard['name']]
+            try:
+                result = future.result()
+                entry.update(status='done', counters=result['counters'], elapsed=result['elapsed'], error=None)
+                print(f"   ✅ {shard['name']} ({describe(shard)}) in {result['elapsed']:.1f}s  {result['counters']}")
+            except Exception as e:
+                entry.update(status='failed', error=''.join(traceback.format_exception_only(type(e), e)).strip())
+                print(f"   ⚠️  Error in {shard['name']} ({describe(shard)}): {str(e)}")
+            save_state(args.job, state)
+    wall = time.perf_counter() - start
+
+    failed = [name for name, entry in state['shards'].items() if entry['status'] != 'done']
+    totals = Counter()
+    for entry in state['shards'].values():
+        if entry['status'] == 'done':
+            totals.update(entry.get('counters') or {})
+    busy = sum(state['shards'][s['name']].get('elapsed') or 0 for s in todo if state['shards'][s['name']]['status'] == 'done')
+
+    print()
+    print("=" * 60)
+    print(f"✨ {args.job}: {len(state['shards']) - len(failed)}/{len(state['shards'])} shards done in {wall:.1f}s")
+    if wall > 0 and busy:
+        print(f"   Shard time {busy:.1f}s → {busy / wall:.1f}x parallel speedup")
+    for key, value in sorted(totals.items()):
+        print(f"   {key}: {value}")
+    print("=" * 60)
+
+    if failed:
+        print(f"\n❌ {len(failed)} shard(s) failed: {', '.join(failed)}")
+        print(f"   Rerun just those with: python scripts/shard_coordinator.py {args.job} --resume")
+        sys.exit(1)
+
+    if hasattr(module, 'finalize_shards'):
+        module.finalize_shards(dict(totals))
+    state['completed_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    save_state(args.job, state)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Content Syndication Publisher
+
+This script generates the documents behind content_syndication_feeds. Each
+feed's content_types map to source tables:
+
+  fares            → branded_fare_families
+  schedules        → airline_routes
+  aircraft_config  → aircraft_configurations
+  amenities        → aircraft_configurations
+  loyalty          → ffp_tiers
+
+Feeds are published when next_publish_at is due. Every source row becomes one
+fragment cached on disk per feed; a publish only regenerates fragments for rows
+changed since last_published_at, then streams the document to disk fragment by
+fragment, so large feeds are never built in memory. Feeds with no source
+changes are rescheduled without regenerating.
+
+Change detection relies on Migration 011: BEFORE UPDATE triggers keep
+updated_at current on the source tables, and deleted or deactivated rows are
+logged to syndication_source_removals, so removals are dropped without
+rescanning every source id.
+
+JSON-LD (feed_type json_ld / schema_org) and NDC-style JSON (ndc) are produced.
+Generation time, item counts and validation results are written back
+(Migration 011 adds the tracking columns).
+
+Usage:
+    python scripts/syndication_publisher.py --once
+    python scripts/syndication_publisher.py --interval 60 --out feeds/
+    python scripts/syndication_publisher.py --once --force --feed-id 3
+
+Requirements:
+    pip install supabase python-dotenv
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple, Callable
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+PAGE_SIZE = 1000
+MAX_VALIDATION_ERRORS = 50
+
+PUBLISH_INTERVALS = {
+    'real_time': timedelta(minutes=1),
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'on_change': timedelta(minutes=1),  # Polled; regenerated only when sources changed
+}
+
+CONTENT_SOURCES = {
+    'fares': 'branded_fare_families',
+    'schedules': 'airline_routes',
+    'aircraft_config': 'aircraft_configurations',
+    'amenities': 'aircraft_configurations',
+    'loyalty': 'ffp_tiers',
+}
+
+
+# ============================================================================
+# FRAGMENT BUILDERS
+# ============================================================================
+
+def jsonld_fare(row: Dict, base: str) -> Dict:
+    node = dict(row.get('schema_org_markup') or {})
+    node.pop('@context', None)
+    node.update({
+        '@type': node.get('@type', 'Offer'),
+        '@id': f"{base}#fare-{row['fare_family_code']}",
+        'name': row['fare_family_name'],
+        'description': row.get('ai_description_optimized') or row.get('marketing_description'),
+        'category': row.get('cabin_class'),
+        'itemOffered': {'@type': 'Service', 'name': row['fare_family_name'],
+                        'additionalProperty': property_values(row.get('included_amenities') or {})},
+    })
+    return node
+
+
+def jsonld_route(row: Dict, base: str) -> Dict:
+    return {
+        '@type': 'Flight',
+        '@id': f"{base}#route-{row['origin_airport_code']}-{row['destination_airport_code']}",
+        'name': f"{row['origin_airport_code']} to {row['destination_airport_code']}",
+        'departureAirport': {'@type': 'Airport', 'iataCode': row['origin_airport_code'], 'name': row.get('origin_city')},
+        'arrivalAirport': {'@type': 'Airport', 'iataCode': row['destination_airport_code'], 'name': row.get('destination_city')},
+        'estimatedFlightDuration': f"PT{row['travel_time_minutes']}M" if row.get('travel_time_minutes') else None,
+        'aircraft': ', '.join(row.get('aircraft_types') or []) or None,
+        'additionalProperty': property_values({'frequency_weekly': row.get('frequency_weekly'),
+                                               'distance_km': row.get('distance_km')}),
+    }
+
+
+def jsonld_aircraft(row: Dict, base: str) -> Dict:
+    return {
+        '@type': 'Product',
+        '@id': f"{base}#aircraft-{row['id']}",
+        'name': row['aircraft_type'],
+        'description': row.get('ai_friendly_description'),
+        'additionalProperty': property_values({
+            'total_seats': row.get('total_seats'),
+            'wifi': row.get('wifi_type') if row.get('wifi_available') else 'None',
+            'power_outlets': row.get('power_outlets'),
+            'entertainment': row.get('ife_type') if row.get('ife_available') else 'None',
+            'extra_legroom_seats': row.get('extra_legroom_seats'),
+            **{f"{cabin}_seats": seats for cabin, seats in (row.get('cabin_classes') or {}).items()},
+        }),
+    }
+
+
+def jsonld_tier(row: Dict, base: str) -> Dict:
+    return {
+        '@type': 'MemberProgramTier',
+        '@id': f"{base}#tier-{row['tier_code']}",
+        'name': row['tier_name'],
+        'hasTierBenefit': [name for name, value in (row.get('benefits') or {}).items() if value],
+        'hasTierRequirement': property_values(row.get('qualification_criteria') or {}),
+    }
+
+
+def property_values(values: Dict) -> List[Dict]:
+    return [{'@type': 'PropertyValue', 'name': k, 'value': v} for k, v in values.items() if v is not None]
+
+
+def ndc_fare(row: Dict, base: str) -> Dict:
+    return {
+        'PriceClassID': row['fare_family_code'],
+        'Name': row['fare_family_name'],
+        'CabinType': row.get('cabin_class'),
+        'Desc': row.get('marketing_description'),
+        'ServiceDefinitions': row.get('included_amenities') or {},
+        **(row.get('ndc_metadata') or {}),
+    }
+
+
+def ndc_route(row: Dict, base: str) -> Dict:
+    return {
+        'MarketingCarrierFlightSegmentID': f"{row['origin_airport_code']}{row['destination_airport_code']}",
+        'Dep': {'IATA_LocationCode': row['origin_airport_code']},
+        'Arrival': {'IATA_LocationCode': row['destination_airport_code']},
+        'Duration': f"PT{row['travel_time_minutes']}M" if row.get('travel_time_minutes') else None,
+        'WeeklyFrequency': row.get('frequency_weekly'),
+        'AircraftTypes': row.get('aircraft_types') or [],
+    }
+
+
+def ndc_aircraft(row: Dict, base: str) -> Dict:
+    return {
+        'DatedOperatingLegRef': row.get('configuration_code'),
+        'AircraftTypeName': row['aircraft_type'],
+        'SeatCount': row.get('total_seats'),
+        'CabinTypes': row.get('cabin_classes') or {},
+        'Amenities': {'Wifi': row.get('wifi_type'), 'Power': row.get('power_outlets'), 'IFE': row.get('ife_type')},
+    }
+
+
+def ndc_tier(row: Dict, base: str) -> Dict:
+    return {
+        'LoyaltyProgramTierCode': row['tier_code'],
+        'TierName': row['tier_name'],
+        'TierPriority': row.get('tier_level'),
+        'Benefits': row.get('benefits') or {},
+    }
+
+
+BUILDERS: Dict[str, Dict[str, Callable[[Dict, str], Dict]]] = {
+    'json_ld': {'fares': jsonld_fare, 'schedules': jsonld_route, 'aircraft_config': jsonld_aircraft,
+                'amenities': jsonld_aircraft, 'loyalty': jsonld_tier},
+    'ndc': {'fares': ndc_fare, 'schedules': ndc_route, 'aircraft_config': ndc_aircraft,
+            'amenities': ndc_aircraft, 'loyalty': ndc_tier},
+}
+
+REQUIRED_FIELDS = {
+    'json_ld': ['@type', '@id', 'name'],
+    'ndc': [],
+}
+
+NDC_SECTIONS = {
+    'fares': 'PriceClassList',
+    'schedules': 'FlightSegmentList',
+    'aircraft_config': 'EquipmentList',
+    'amenities': 'EquipmentList',
+    'loyalty': 'LoyaltyProgramTierList',
+}
+
+
+def feed_format(feed: Dict) -> Optional[str]:
+    return {'json_ld': 'json_ld', 'schema_org': 'json_ld', 'ndc': 'ndc'}.get(feed.get('feed_type'))
+
+
+def feed_content_types(feed: Dict) -> List[str]:
+    """Feed content types, keeping the first one per source table"""
+    seen, types = set(), []
+    for content_type in feed.get('content_types') or []:
+        table = CONTENT_SOURCES.get(content_type)
+        if table is None or table not in seen:
+            types.append(content_type)
+            seen.add(table)
+    return types
+
+
+def validate_fragment(fmt: str, content_type: str, row_id: int, fragment: Dict) -> List[str]:
+    errors = []
+    for field in REQUIRED_FIELDS[fmt]:
+        if field not in fragment or fragment[field] in (None, ''):
+            errors.append(f"{content_type}/{row_id}: missing {field}")
+    if fmt == 'json_ld' and fragment.get('@type') == 'Flight' and not fragment.get('estimatedFlightDuration'):
+        errors.append(f"{content_type}/{row_id}: missing estimatedFlightDuration")
+    return errors
+
+
+# ============================================================================
+# FRAGMENT STORE
+# ============================================================================
+
+class FragmentStore:
+    """One JSON fragment per source row, per feed and content type"""
+
+    def __init__(self, root: str, feed_id: int):
+        self.root = os.path.join(root, '.fragments', str(feed_id))
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.root)
+
+    def reset(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _dir(self, content_type: str) -> str:
+        path = os.path.join(self.root, content_type)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def ids(self, content_type: str) -> List[int]:
+        return sorted(int(name[:-5]) for name in os.listdir(self._dir(content_type)) if name.endswith('.json'))
+
+    def put(self, content_type: str, row_id: int, fragment: Dict):
+        with open(os.path.join(self._dir(content_type), f"{row_id}.json"), 'w') as f:
+            json.dump(fragment, f, default=str, separators=(',', ':'))
+
+    def remove(self, content_type: str, row_id: int):
+        try:
+            os.remove(os.path.join(self._dir(content_type), f"{row_id}.json"))
+        except FileNotFoundError:
+            pass
+
+    def read(self, content_type: str, row_id: int) -> str:
+        with open(os.path.join(self._dir(content_type), f"{row_id}.json")) as f:
+            return f.read()
+
+
+# ============================================================================
+# PUBLISHING
+# ============================================================================
+
+def fetch_source_rows(table: str, airline_id: int, changed_since: Optional[str] = None) -> List[Dict]:
+    """Active source rows for an airline, optionally only those changed since a timestamp"""
+    rows, offset = [], 0
+    while True:
+        query = supabase.table(table).select('*').eq('airline_id', airline_id)
+        if table != 'airline_routes':
+            query = query.eq('active', True)
+        if changed_since:
+            query = query.gt('updated_at', changed_since)
+        page = query.order('id').range(offset, offset + PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_removed_ids(table: str, airline_id: int, since: str) -> List[int]:
+    """Source rows deleted or deactivated since a timestamp (Migration 011 removal log)"""
+    ids, offset = [], 0
+    while True:
+        page = supabase.table('syndication_source_removals').select('row_id') \
+            .eq('source_table', table).eq('airline_id', airline_id).gt('removed_at', since) \
+            .order('id').range(offset, offset + PAGE_SIZE - 1).execute().data
+        ids.extend(r['row_id'] for r in page)
+        if len(page) < PAGE_SIZE:
+            return ids
+        offset += PAGE_SIZE
+
+
+def refresh_fragments(feed: Dict, fmt: str, store: FragmentStore, full: bool) -> Tuple[int, List[str]]:
+    """Regenerate fragments for changed rows and drop removed ones; returns (changed, warnings)"""
+    changed = 0
+    warnings = []
+    changed_since = None if full else feed.get('last_published_at')
+    base = feed['feed_url']
+
+    for content_type in feed_content_types(feed):
+        table = CONTENT_SOURCES.get(content_type)
+        if not table:
+            warnings.append(f"{content_type}: no source table, skipped")
+            continue
+        builder = BUILDERS[fmt][content_type]
+
+        # Removals first: a row deactivated and then reactivated is still in the changed set below
+        if changed_since:
+            stored_ids = set(store.ids(content_type))
+            for row_id in fetch_removed_ids(table, feed['airline_id'], changed_since):
+                if row_id in stored_ids:
+                    store.remove(content_type, row_id)
+                    stored_ids.discard(row_id)
+                    changed += 1
+
+        for row in fetch_source_rows(table, feed['airline_id'], changed_since):
+            store.put(content_type, row['id'], builder(row, base))
+            changed += 1
+    return changed, warnings
+
+
+def write_document(feed: Dict, fmt: str, store: FragmentStore, path: str) -> Tuple[int, List[str]]:
+    """Stream fragments into the feed document, validating as they pass; returns (items, errors)"""
+    errors = []
+    items = 0
+    content_types = [c for c in feed_content_types(feed) if c in CONTENT_SOURCES]
+    tmp_path = path + '.tmp'
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    with open(tmp_path, 'w') as out:
+        if fmt == 'json_ld':
+            out.write('{"@context":"https://schema.org","@id":%s,"name":%s,"dateModified":%s,"@graph":[' % (
+                json.dumps(feed['feed_url']), json.dumps(feed['feed_name']),
+                json.dumps(datetime.now(timezone.utc).isoformat())))
+        else:
+            out.write('{"FeedName":%s,"Timestamp":%s' % (
+                json.dumps(feed['feed_name']), json.dumps(datetime.now(timezone.utc).isoformat())))
+
+        first = True
+        for content_type in content_types:
+            if fmt == 'ndc':
+                out.write(',"%s":[' % NDC_SECTIONS[content_type])
+                first = True
+            for row_id in store.ids(content_type):
+                fragment = store.read(content_type, row_id)
+                if len(errors) < MAX_VALIDATION_ERRORS:
+                    errors.extend(validate_fragment(fmt, content_type, row_id, json.loads(fragment)))
+                out.write(fragment if first else ',' + fragment)
+                first = False
+                items += 1
+            if fmt == 'ndc':
+                out.write(']')
+        out.write(']}' if fmt == 'json_ld' else '}')
+
+    os.replace(tmp_path, path)
+    return items, errors[:MAX_VALIDATION_ERRORS]
+
+
+def output_path(out_dir: str, feed: Dict) -> str:
+    name = os.path.basename(urlparse(feed['feed_url']).path) or f"feed-{feed['id']}.json"
+    return os.path.join(out_dir, str(feed['airline_id']), name)
+
+
+def publish_feed(feed: Dict, out_dir: str, force: bool = False) -> Optional[Dict]:
+    """Publish one feed and return the columns to write back"""
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    next_publish_at = (started_at + PUBLISH_INTERVALS.get(feed.get('update_frequency'), timedelta(days=1))).isoformat()
+
+    fmt = feed_format(feed)
+    if fmt is None:
+        return {
+            'validation_status': 'error',
+            'validation_errors': [f"Unsupported feed_type: {feed.get('feed_type')}"],
+            'next_publish_at': next_publish_at,
+        }
+
+    store = FragmentStore(out_dir, feed['id'])
+    path = output_path(out_dir, feed)
+    full = force or not feed.get('last_published_at') or not store.exists() or not os.path.exists(path)
+    if full:
+        store.reset()
+
+    changed, warnings = refresh_fragments(feed, fmt, store, full)
+    if not changed and not full:
+        return {'next_publish_at': next_publish_at}
+
+    items, errors = write_document(feed, fmt, store, path)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    previous = feed.get('avg_response_time_ms')
+    average = elapsed_ms if previous is None else 0.7 * float(previous) + 0.3 * elapsed_ms
+
+    return {
+        'last_published_at': started_at.isoformat(),
+        'next_publish_at': next_publish_at,
+        'validation_status': 'error' if errors else ('warning' if warnings else 'valid'),
+        'validation_errors': errors + warnings,
+        'avg_response_time_ms': round(average),
+        'last_generation_ms': round(elapsed_ms, 2),
+        'last_generated_items': items,
+        'last_changed_items': changed,
+    }
+
+
+def fetch_due_feeds(force: bool = False, feed_id: Optional[int] = None) -> List[Dict]:
+    """Active feeds whose next_publish_at has passed (or was never set)"""
+    query = supabase.table('content_syndication_feeds').select('*').eq('active', True)
+    if feed_id is not None:
+        query = query.eq('id', feed_id)
+    feeds = query.order('id').execute().data
+    if force:
+        return feeds
+    now = datetime.now(timezone.utc).isoformat()
+    return [f for f in feeds if not f.get('next_publish_at') or f['next_publish_at'] <= now]
+
+
+def publish_cycle(out_dir: str, force: bool, feed_id: Optional[int]) -> int:
+    published = 0
+    for feed in fetch_due_feeds(force, feed_id):
+        try:
+            update = publish_feed(feed, out_dir, force)
+        except Exception as e:
+            print(f"   ❌ {feed['feed_name']}: {str(e)}")
+            update = {'validation_status': 'error', 'validation_errors': [str(e)[:500]]}
+
+        if 'last_generated_items' in update:
+            published += 1
+            print(f"   📰 {feed['feed_name']}: {update['last_generated_items']} items "
+                  f"({update['last_changed_items']} changed) in {update['last_generation_ms']:.0f} ms "
+                  f"[{update['validation_status']}]")
+        try:
+            supabase.table('content_syndication_feeds').update(update).eq('id', feed['id']).execute()
+        except Exception as e:
+            print(f"  ⚠️  Error updating {feed['feed_name']}: {str(e)}")
+    return published
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Publish content syndication feeds from changed source rows')
+    parser.add_argument('--out', default='feeds', help='Directory for generated feed documents')
+    parser.add_argument('--once', action='store_true', help='Run a single publish cycle and exit')
+    parser.add_argument('--force', action='store_true', help='Fully regenerate every feed regardless of schedule')
+    parser.add_argument('--feed-id', type=int, default=None, help='Only publish this feed')
+    parser.add_argument('--interval', type=float, default=60.0, help='Seconds between publish cycles')
+    args = parser.parse_args()
+
+    print("📰 Starting Content Syndication Publisher...")
+    print()
+
+    try:
+        while True:
+            published = publish_cycle(args.out, args.force, args.feed_id)
+            if published:
+                print(f"📰 Published {published} feeds")
+                print()
+            if args.once:
+                break
+            args.force = False
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Workflow Version Store
+
+workflow_versions keeps every version as a full copy of every attribute, so
+it grows with edit count rather than with change size. This script keeps the
+same history in workflow_version_deltas (Migration 012) instead:
+
+  - versions are numbered 1..n per workflow in creation order
+  - each version stores only the fields that changed since the previous one;
+    every CHECKPOINT_INTERVAL-th version (and the first) also stores a full
+    snapshot
+  - a version is rebuilt from the nearest cached version or checkpoint at or
+    below it, then its deltas; rebuilt versions go into an LRU cache so walks
+    along the same chain reuse each other
+  - "what changed between v3 and v9" reads the deltas of v4..v9 and, for the
+    old values of just those fields, walks back from v3; no full rows are read
+  - push sends only new versions to Neo4j: each node is copied from its
+    predecessor inside the graph and patched with the delta, and the workflow
+    remembers the last pushed version number. migrate_priority_workflows.py
+    writes WorkflowVersion nodes the same way.
+
+Usage:
+    python scripts/workflow_version_store.py build
+    python scripts/workflow_version_store.py show <workflow_id> 5
+    python scripts/workflow_version_store.py diff <workflow_id> 3 9
+    python scripts/workflow_version_store.py history <workflow_id> agentic_potential
+    python scripts/workflow_version_store.py push
+    python scripts/workflow_version_store.py stats
+
+Requirements:
+    pip install supabase python-dotenv neo4j
+"""
+
+import os
+import json
+import argparse
+from collections import OrderedDict, defaultdict
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple, Any, Iterable, Callable
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Supabase client
+supabase: Client = create_client(
+    os.getenv("VITE_SUPABASE_URL"),
+    os.getenv("VITE_SUPABASE_ANON_KEY")
+)
+
+PAGE_SIZE = 1000
+UPSERT_CHUNK = 500
+PUSH_CHUNK = 500
+CHECKPOINT_INTERVAL = 8
+SNAPSHOT_CACHE_SIZE = 512
+STORE_TABLE = 'workflow_version_deltas'
+
+# Row columns that identify a version rather than describe it
+META_FIELDS = {'id', 'workflow_id', 'created_at', 'updated_at'}
+
+# WorkflowVersion properties written by migrate_priority_workflows.py
+GRAPH_FIELDS = [
+    'workflow_name', 'domain', 'subdomain', 'agentic_potential', 'complexity', 'autonomy_level',
+    'transformation_theme', 'ai_enabler_type', 'expected_roi_levers', 'operational_metrics_targeted',
+    'technology_stack', 'agent_collaboration_pattern', 'implementation_wave',
+]
+
+_MISSING = object()
+
+
+class VersionEntry:
+    """One stored version: the changed fields, plus a full snapshot on checkpoints"""
+    __slots__ = ('version_number', 'version_id', 'is_checkpoint', 'snapshot', 'delta')
+
+    def __init__(self, version_number: int, version_id: str, is_checkpoint: bool,
+                 delta: Dict[str, Any], snapshot: Optional[Dict[str, Any]] = None):
+        self.version_number = version_number
+        self.version_id = version_id
+        self.is_checkpoint = is_checkpoint
+        self.delta = delta
+        self.snapshot = snapshot
+
+    def to_row(self, workflow_id: str) -> Dict:
+        return {
+            'workflow_id': workflow_id,
+            'version_number': self.version_number,
+            'version_id': self.version_id,
+            'is_checkpoint': self.is_checkpoint,
+            'snapshot': self.snapshot if self.is_checkpoint else None,
+            'delta': self.delta,
+            'changed_fields': sorted(self.delta),
+        }
+
+
+def version_fields(row: Dict) -> Dict[str, Any]:
+    return {k: v for k, v in row.items() if k not in META_FIELDS}
+
+
+def encode_chain(rows: List[Dict], interval: int = CHECKPOINT_INTERVAL,
+                 previous: Optional[Dict[str, Any]] = None, start: int = 1) -> List[VersionEntry]:
+    """Delta-encode consecutive version rows of one workflow.
+
+    `previous` holds the fields of version start-1 when appending to an
+    existing chain; the first version of a chain carries every field.
+    """
+    entries = []
+    for number, row in enumerate(rows, start=start):
+        fields = version_fields(row)
+        if previous is None:
+            delta = dict(fields)
+        else:
+            delta = {k: fields.get(k) for k in fields.keys() | previous.keys()
+                     if fields.get(k, _MISSING) != previous.get(k, _MISSING)}
+        checkpoint = (number - 1) % interval == 0
+        entries.append(VersionEntry(number, str(row['id']), checkpoint, delta, fields if checkpoint else None))
+        previous = fields
+    return entries
+
+
+class VersionStore:
+    """Delta chains per workflow with cached reconstruction and field-level diffs"""
+
+    def __init__(self, snapshot_loader: Optional[Callable[[str, int], Dict]] = None,
+                 cache_size: int = SNAPSHOT_CACHE_SIZE):
+        self.chains: Dict[str, List[VersionEntry]] = defaultdict(list)
+        self.snapshot_loader = snapshot_loader
+        self.cache: "OrderedDict[Tuple[str, int], Dict]" = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def append(self, workflow_id: str, entry: VersionEntry):
+        chain = self.chains[workflow_id]
+        if entry.version_number != len(chain) + 1:
+            raise ValueError(f"{workflow_id}: expected version {len(chain) + 1}, got {entry.version_number}")
+        chain.append(entry)
+
+    def reset(self, workflow_id: str):
+        """Forget a workflow's chain and its cached versions"""
+        self.chains[workflow_id] = []
+        for key in [k for k in self.cache if k[0] == workflow_id]:
+            del self.cache[key]
+
+    def latest(self, workflow_id: str) -> int:
+        return len(self.chains.get(workflow_id, ()))
+
+    def entry(self, workflow_id: str, number: int) -> VersionEntry:
+        chain = self.chains.get(workflow_id, ())
+        if not 1 <= number <= len(chain):
+            raise KeyError(f"{workflow_id} has no version {number} (latest is {len(chain)})")
+        return chain[number - 1]
+
+    def _remember(self, key: Tuple[str, int], fields: Dict):
+        self.cache[key] = fields
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _snapshot(self, workflow_id: str, entry: VersionEntry) -> Optional[Dict]:
+        if entry.snapshot is None and self.snapshot_loader is not None:
+            entry.snapshot = self.snapshot_loader(workflow_id, entry.version_number)
+        return entry.snapshot
+
+    def fields_at(self, workflow_id: str, number: int) -> Dict[str, Any]:
+        """All fields of a version, rebuilt from the nearest cached version or checkpoint"""
+        key = (workflow_id, number)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.misses += 1
+
+        self.entry(workflow_id, number)
+        chain = self.chains[workflow_id]
+        base = number
+        fields = None
+        while base > 0:
+            if (workflow_id, base) in self.cache:
+                fields = dict(self.cache[(workflow_id, base)])
+                break
+            entry = chain[base - 1]
+            if entry.is_checkpoint:
+                snapshot = self._snapshot(workflow_id, entry)
+                if snapshot is not None:
+                    fields = dict(snapshot)
+                    break
+            base -= 1
+        if fields is None:
+            # No snapshot available: version 1 carries every field
+            base, fields = 0, {}
+
+        for entry in chain[base:number]:
+            fields.update(entry.delta)
+        self._remember(key, fields)
+        return fields
+
+    def reconstruct(self, workflow_id: str, number: int) -> Dict[str, Any]:
+        """A version as a workflow_versions-shaped row"""
+        row = dict(self.fields_at(workflow_id, number))
+        row['id'] = self.entry(workflow_id, number).version_id
+        row['workflow_id'] = workflow_id
+        row['version_number'] = number
+        return row
+
+    def field_values(self, workflow_id: str, number: int, fields: Iterable[str]) -> Dict[str, Any]:
+        """Values of selected fields at a version, walking deltas backwards (no snapshots loaded)"""
+        wanted = set(fields)
+        if (workflow_id, number) in self.cache:
+            cached = self.cache[(workflow_id, number)]
+            return {f: cached.get(f) for f in wanted}
+
+        chain = self.chains[workflow_id]
+        values = {}
+        for entry in reversed(chain[:number]):
+            for field in [f for f in wanted if f in entry.delta]:
+                values[field] = entry.delta[field]
+                wanted.discard(field)
+            if not wanted:
+                break
+            if entry.is_checkpoint and entry.snapshot is not None:
+                for field in wanted:
+                    values[field] = entry.snapshot.get(field)
+                wanted = set()
+                break
+        for field in wanted:
+            values[field] = None
+        return values
+
+    def diff(self, workflow_id: str, old: int, new: int) -> Dict[str, Tuple[Any, Any]]:
+        """{field: (value at old, value at new)} for fields that differ"""
+        self.entry(workflow_id, old)
+        self.entry(workflow_id, new)
+        if old == new:
+            return {}
+        low, high = min(old, new), max(old, new)
+        chain = self.chains[workflow_id]
+
+        touched = {}
+        for entry in chain[low:high]:
+            touched.update(entry.delta)
+        before = self.field_values(workflow_id, low, touched)
+
+        changes = {}
+        for field in sorted(touched):
+            if before.get(field) != touched[field]:
+                changes[field] = (before.get(field), touched[field]) if old < new else (touched[field], before.get(field))
+        return changes
+
+    def history(self, workflow_id: str, field: str) -> List[Tuple[int, Any]]:
+        """(version_number, new value) for every version that changed a field"""
+        return [(e.version_number, e.delta[field]) for e in self.chains.get(workflow_id, ()) if field in e.delta]
+
+    def stats(self) -> Dict[str, int]:
+        versions = sum(len(chain) for chain in self.chains.values())
+        checkpoints = sum(e.is_checkpoint for chain in self.chains.values() for e in chain)
+        delta_bytes = sum(len(json.dumps(e.delta, default=str)) for chain in self.chains.values() for e in chain)
+        return {'workflows': len(self.chains), 'versions': versions, 'checkpoints': checkpoints,
+                'delta_bytes': delta_bytes, 'cache_hits': self.hits, 'cache_misses': self.misses}
+
+
+def group_versions(rows: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """workflow_versions rows grouped by workflow, in creation order"""
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[str(row['workflow_id'])].append(row)
+    for chain_rows in grouped.values():
+        chain_rows.sort(key=lambda r: (str(r.get('created_at') or ''), str(r['id'])))
+    return grouped
+
+
+def fetch_versions(workflow_ids: Optional[List[str]] = None) -> Dict[str, List[Dict]]:
+    """workflow_versions grouped by workflow, in creation order"""
+    rows = []
+    offset = 0
+    while True:
+        query = supabase.table('workflow_versions').select('*')
+        if workflow_ids:
+            query = query.in_('workflow_id', workflow_ids)
+        page = query.range(offset, offset + PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    return group_versions(rows)
+
+
+def fetch_snapshot(workflow_id: str, version_number: int) -> Optional[Dict]:
+    result = supabase.table(STORE_TABLE).select('snapshot') \
+        .eq('workflow_id', workflow_id).eq('version_number', version_number).execute()
+    return result.data[0]['snapshot'] if result.data else None
+
+
+def fetch_store(workflow_ids: Optional[List[str]] = None) -> VersionStore:
+    """Load delta chains (without snapshots; checkpoints are fetched on first use)"""
+    store = VersionStore(snapshot_loader=fetch_snapshot)
+    offset = 0
+    while True:
+        query = supabase.table(STORE_TABLE).select('workflow_id, version_number, version_id, is_checkpoint, delta')
+        if workflow_ids:
+            query = query.in_('workflow_id', workflow_ids)
+        page = query.order('workflow_id').order('version_number') \
+            .range(offset, offset + PAGE_SIZE - 1).execute().data
+        for row in page:
+            store.append(str(row['workflow_id']), VersionEntry(
+                row['version_number'], str(row['version_id']), row['is_checkpoint'], row['delta'] or {}))
+        if len(page) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    return store
+
+
+def write_entries(rows: List[Dict]):
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        chunk = rows[i:i + UPSERT_CHUNK]
+        supabase.table(STORE_TABLE).upsert(chunk, on_conflict='workflow_id,version_number').execute()
+
+
+def replace_chain(workflow_id: str, rows: List[Dict]):
+    """Delete and rewrite one workflow's chain atomically (Migration 012)"""
+    supabase.rpc('replace_workflow_version_chain', {
+        'p_workflow_id': workflow_id,
+        'p_rows': json.loads(json.dumps(rows, default=str)),
+    }).execute()
+
+
+def build(store: VersionStore, versions: Dict[str, List[Dict]],
+          interval: int) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+    """Encode versions not yet in the store; returns (rows to append, full chains to replace per workflow)"""
+    rows = []
+    rewritten = {}
+    for workflow_id, chain_rows in versions.items():
+        encoded = store.latest(workflow_id)
+        stored_ids = [e.version_id for e in store.chains.get(workflow_id, ())]
+        source_ids = [str(r['id']) for r in chain_rows[:encoded]]
+        if stored_ids != source_ids:
+            # History was edited or reordered: re-encode the whole chain and replace the stored one
+            print(f"  ⚠️  {workflow_id}: stored chain no longer matches workflow_versions, re-encoding")
+            store.reset(workflow_id)
+            rewritten[workflow_id] = []
+            encoded = 0
+        if encoded == len(chain_rows):
+            continue
+        previous = dict(store.fields_at(workflow_id, encoded)) if encoded else None
+        target = rewritten[workflow_id] if workflow_id in rewritten else rows
+        for entry in encode_chain(chain_rows[encoded:], interval, previous, start=encoded + 1):
+            store.append(workflow_id, entry)
+            target.append(entry.to_row(workflow_id))
+    return rows, rewritten
+
+
+def graph_value(value: Any) -> Any:
+    """Neo4j properties cannot hold maps; store those (and lists of maps) as JSON text"""
+    if isinstance(value, dict) or (isinstance(value, list) and any(isinstance(v, (dict, list)) for v in value)):
+        return json.dumps(value, default=str)
+    return value
+
+
+PUSH_VERSIONS_QUERY = """
+UNWIND $rows AS row
+MATCH (w:Workflow {id: row.workflow_id})
+MERGE (v:WorkflowVersion {id: row.version_id})
+WITH w, v, row
+OPTIONAL MATCH (prev:WorkflowVersion {id: row.previous_id})
+FOREACH (_ IN CASE WHEN prev IS NULL THEN [] ELSE [1] END | SET v += properties(prev))
+SET v += row.changes,
+    v.id = row.version_id,
+    v.version_number = row.version_number
+MERGE (w)-[:HAS_VERSION]->(v)
+FOREACH (_ IN CASE WHEN prev IS NULL THEN [] ELSE [1] END | MERGE (prev)-[:NEXT_VERSION]->(v))
+WITH w, max(row.version_number) AS pushed
+SET w.version_watermark = pushed
+"""
+
+
+def push(store: VersionStore, session) -> Dict[str, int]:
+    """Send versions newer than each workflow's graph watermark, as deltas only.
+
+    Versions are pushed in layers by version number so every node's predecessor
+    already exists when it is copied.
+    """
+    watermarks = {r['id']: r['watermark'] or 0 for r in session.run(
+        "MATCH (w:Workflow) RETURN w.id AS id, w.version_watermark AS watermark")}
+
+    layers = defaultdict(list)
+    for workflow_id, chain in store.chains.items():
+        if workflow_id not in watermarks:
+            continue
+        for entry in chain[watermarks[workflow_id]:]:
+            previous_id = chain[entry.version_number - 2].version_id if entry.version_number > 1 else None
+            layers[entry.version_number].append({
+                'workflow_id': workflow_id,
+                'version_id': entry.version_id,
+                'previous_id': previous_id,
+                'version_number': entry.version_number,
+                'changes': {k: graph_value(v) for k, v in entry.delta.items() if k in GRAPH_FIELDS},
+            })
+
+    counters = {'versions': 0, 'properties': 0}
+    for number in sorted(layers):
+        rows = layers[number]
+        for i in range(0, len(rows), PUSH_CHUNK):
+            session.run(PUSH_VERSIONS_QUERY, rows=rows[i:i + PUSH_CHUNK])
+        counters['versions'] += len(rows)
+        counters['properties'] += sum(len(r['changes']) for r in rows)
+    return counters
+
+
+def print_row(row: Dict):
+    for key in sorted(row):
+        print(f"   {key}: {row[key]}")
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Delta-encoded workflow_versions history')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = sub.add_parser('build', help='Encode new workflow_versions into the delta store')
+    build_parser.add_argument('--interval', type=int, default=CHECKPOINT_INTERVAL, help='Versions per checkpoint')
+    build_parser.add_argument('--workflow', action='append', default=None, help='Only these workflow ids')
+    build_parser.add_argument('--dry-run', action='store_true', help='Encode without writing')
+
+    show_parser = sub.add_parser('show', help='Rebuild one version')
+    show_parser.add_argument('workflow_id')
+    show_parser.add_argument('version', type=int)
+
+    diff_parser = sub.add_parser('diff', help='Fields changed between two versions')
+    diff_parser.add_argument('workflow_id')
+    diff_parser.add_argument('old', type=int)
+    diff_parser.add_argument('new', type=int)
+
+    history_parser = sub.add_parser('history', help='Every change to one field')
+    history_parser.add_argument('workflow_id')
+    history_parser.add_argument('field')
+
+    push_parser = sub.add_parser('push', help='Push new versions to Neo4j as deltas')
+    push_parser.add_argument('--workflow', action='append', default=None, help='Only these workflow ids')
+
+    sub.add_parser('stats', help='Storage size of the delta store vs full copies')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        print("🗜️  Encoding workflow version history...")
+        store = fetch_store(args.workflow)
+        versions = fetch_versions(args.workflow)
+        appended, rewritten = build(store, versions, args.interval)
+        rows = appended + [r for chain in rewritten.values() for r in chain]
+        full_bytes = sum(len(json.dumps(r, default=str)) for chain in versions.values() for r in chain)
+        stored_bytes = sum(len(json.dumps(r['delta'], default=str)) + len(json.dumps(r['snapshot'], default=str))
+                           for r in rows)
+        print(f"   {sum(len(c) for c in versions.values())} versions across {len(versions)} workflows")
+        print(f"   {len(rows)} new entries ({sum(r['is_checkpoint'] for r in rows)} checkpoints), "
+              f"{len(rewritten)} chains re-encoded")
+        if not args.dry_run:
+            for workflow_id, chain in rewritten.items():
+                replace_chain(workflow_id, chain)
+            write_entries(appended)
+        print(f"✅ Encoded {len(rows)} versions" + (" (dry run)" if args.dry_run else ""))
+        if rows and full_bytes:
+            print(f"   Full copies: {full_bytes:,} bytes · new entries: {stored_bytes:,} bytes")
+
+    elif args.command == 'show':
+        store = fetch_store([args.workflow_id])
+        print(f"📄 {args.workflow_id} v{args.version}")
+        print_row(store.reconstruct(args.workflow_id, args.version))
+
+    elif args.command == 'diff':
+        store = fetch_store([args.workflow_id])
+        changes = store.diff(args.workflow_id, args.old, args.new)
+        print(f"🔍 {args.workflow_id}: v{args.old} → v{args.new} ({len(changes)} fields changed)")
+        for field, (before, after) in changes.items():
+            print(f"   {field}: {before!r} → {after!r}")
+
+    elif args.command == 'history':
+        store = fetch_store([args.workflow_id])
+        print(f"🕘 {args.workflow_id}.{args.field}")
+        for number, value in store.history(args.workflow_id, args.field):
+            print(f"   v{number}: {value!r}")
+
+    elif args.command == 'push':
+        from neo4j import GraphDatabase
+        store = fetch_store(args.workflow)
+        driver = GraphDatabase.driver(
+            os.getenv("NEO4J_URI"),
+            auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+        )
+        try:
+            with driver.session() as session:
+                counters = push(store, session)
+        finally:
+            driver.close()
+        print(f"✅ Pushed {counters['versions']} WorkflowVersion deltas ({counters['properties']} properties)")
+
+    elif args.command == 'stats':
+        store = fetch_store()
+        stats = store.stats()
+        print("📊 Workflow version store")
+        for key in ('workflows', 'versions', 'checkpoints', 'delta_bytes'):
+            print(f"   {key}: {stats[key]:,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+/*
+  Migration 010: Materialized Analytics Views
+
+  Purpose: Serve the Migration 009 analytics views from precomputed rows instead of
+  recomputing multi-table GROUP BYs and jsonb extraction on every dashboard hit
+
+  Objects Created:
+  - mv_* materialized views: one per Migration 009 view, with a unique key index
+    so they can be refreshed CONCURRENTLY (readers are never blocked)
+  - analytics_view_refresh_state: base tables, last refresh time and duration per view
+  - analytics_source_changes: last write time per base table, maintained by
+    statement-level triggers (one row update per statement, not per row)
+  - refresh_analytics_view(view_name): refreshes one view and records its duration
+  - analytics_view_staleness: staleness and pending source changes per view
+
+  Refresh scheduling is done by scripts/refresh_analytics_views.py, which refreshes
+  only the views whose base tables changed since their last refresh.
+
+  Dependencies: Migration 009 (analytics views)
+*/
+
+-- ============================================================================
+-- MATERIALIZED VIEWS
+-- ============================================================================
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_ai_readiness_scorecard AS
+  SELECT * FROM ai_readiness_scorecard;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_ai_readiness_scorecard_key
+  ON mv_ai_readiness_scorecard(airline_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_workflow_agentic_potential AS
+  SELECT * FROM workflow_agentic_potential;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_workflow_agentic_potential_key
+  ON mv_workflow_agentic_potential(workflow_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_agent_utilization_metrics AS
+  SELECT * FROM agent_utilization_metrics;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_agent_utilization_metrics_key
+  ON mv_agent_utilization_metrics(agent_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_cross_domain_complexity AS
+  SELECT * FROM cross_domain_complexity;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_cross_domain_complexity_key
+  ON mv_cross_domain_complexity(workflow_id);
+
+-- api_health_dashboard exposes no endpoint id, so it has no guaranteed unique key
+-- and is refreshed non-concurrently (it is a single small join)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_api_health_dashboard AS
+  SELECT * FROM api_health_dashboard;
+CREATE INDEX IF NOT EXISTS idx_mv_api_health_dashboard_airline
+  ON mv_api_health_dashboard(airline_id, performance_tier);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_loyalty_personalization_readiness AS
+  SELECT * FROM loyalty_personalization_readiness;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_loyalty_personalization_readiness_key
+  ON mv_loyalty_personalization_readiness(airline_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_content_syndication_coverage AS
+  SELECT * FROM content_syndication_coverage;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_content_syndication_coverage_key
+  ON mv_content_syndication_coverage(airline_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_ndc_adoption_metrics AS
+  SELECT * FROM ndc_adoption_metrics;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_ndc_adoption_metrics_key
+  ON mv_ndc_adoption_metrics(airline_id);
+
+-- ============================================================================
+-- REFRESH STATE & CHANGE TRACKING
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS analytics_view_refresh_state (
+  view_name TEXT PRIMARY KEY,
+  materialized_view TEXT NOT NULL UNIQUE,
+  base_tables TEXT[] NOT NULL,
+  supports_concurrent BOOLEAN NOT NULL DEFAULT true,
+  max_staleness INTERVAL NOT NULL DEFAULT INTERVAL '1 day', -- Forces a refresh for time-windowed views
+  last_refreshed_at TIMESTAMPTZ,
+  last_refresh_ms NUMERIC(12,2),
+  last_refresh_error TEXT,
+  refresh_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+COMMENT ON TABLE analytics_view_refresh_state IS 'Refresh bookkeeping for the materialized analytics views (base tables, last refresh, duration)';
+
+CREATE TABLE IF NOT EXISTS analytics_source_changes (
+  table_name TEXT PRIMARY KEY,
+  changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE analytics_source_changes IS 'Last write time per analytics base table, maintained by statement-level triggers';
+
+INSERT INTO analytics_view_refresh_state (view_name, materialized_view, base_tables, supports_concurrent, max_staleness, last_refreshed_at) VALUES
+  ('ai_readiness_scorecard', 'mv_ai_readiness_scorecard',
+    ARRAY['airlines', 'systems', 'api_endpoints', 'ai_platform_integrations', 'content_syndication_feeds', 'branded_fare_families', 'airline_operational_metrics'],
+    true, INTERVAL '1 day', NOW()), -- 30-day metric window moves daily
+  ('workflow_agentic_potential', 'mv_workflow_agentic_potential',
+    ARRAY['workflows', 'domains', 'subdomains', 'workflow_agents', 'workflow_cross_domain_bridges', 'workflow_system_dependencies'],
+    true, INTERVAL '7 days', NOW()),
+  ('agent_utilization_metrics', 'mv_agent_utilization_metrics',
+    ARRAY['agents', 'agent_categories', 'agent_relationships', 'workflow_agents', 'workflows'],
+    true, INTERVAL '7 days', NOW()),
+  ('cross_domain_complexity', 'mv_cross_domain_complexity',
+    ARRAY['workflows', 'domains', 'workflow_cross_domain_bridges', 'workflow_agents', 'agents', 'workflow_system_dependencies'],
+    true, INTERVAL '7 days', NOW()),
+  ('api_health_dashboard', 'mv_api_health_dashboard',
+    ARRAY['api_endpoints', 'systems', 'airlines'],
+    false, INTERVAL '1 hour', NOW()),
+  ('loyalty_personalization_readiness', 'mv_loyalty_personalization_readiness',
+    ARRAY['airlines', 'ffp_tiers', 'systems', 'api_endpoints', 'ai_platform_integrations', 'passenger_preferences'],
+    true, INTERVAL '7 days', NOW()),
+  ('content_syndication_coverage', 'mv_content_syndication_coverage',
+    ARRAY['airlines', 'content_syndication_feeds', 'branded_fare_families'],
+    true, INTERVAL '7 days', NOW()),
+  ('ndc_adoption_metrics', 'mv_ndc_adoption_metrics',
+    ARRAY['airlines', 'systems', 'api_endpoints'],
+    true, INTERVAL '7 days', NOW())
+ON CONFLICT (view_name) DO UPDATE SET
+  materialized_view = EXCLUDED.materialized_view,
+  base_tables = EXCLUDED.base_tables,
+  supports_concurrent = EXCLUDED.supports_concurrent,
+  max_staleness = EXCLUDED.max_staleness,
+  updated_at = NOW();
+
+CREATE OR REPLACE FUNCTION mark_analytics_source_changed()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO analytics_source_changes (table_name, changed_at)
+  VALUES (TG_TABLE_NAME, NOW())
+  ON CONFLICT (table_name) DO UPDATE SET changed_at = EXCLUDED.changed_at;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One statement-level trigger per base table that exists in this database
+DO $$
+DECLARE
+  v_table TEXT;
+BEGIN
+  FOR v_table IN SELECT DISTINCT unnest(base_tables) FROM analytics_view_refresh_state LOOP
+    IF to_regclass('public.' || v_table) IS NOT NULL THEN
+      EXECUTE format('DROP TRIGGER IF EXISTS trigger_analytics_source_changed ON %I', v_table);
+      EXECUTE format(
+        'CREATE TRIGGER trigger_analytics_source_changed
+           AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+           FOR EACH STATEMENT EXECUTE FUNCTION mark_analytics_source_changed()',
+        v_table
+      );
+    ELSE
+      RAISE NOTICE 'Skipping change tracking for missing table %', v_table;
+    END IF;
+  END LOOP;
+END $$;
+
+-- ============================================================================
+-- REFRESH FUNCTION
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION refresh_analytics_view(p_view_name TEXT)
+RETURNS analytics_view_refresh_state
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_state analytics_view_refresh_state;
+  v_started TIMESTAMPTZ := clock_timestamp();
+BEGIN
+  SELECT * INTO v_state FROM analytics_view_refresh_state WHERE view_name = p_view_name;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Unknown analytics view: %', p_view_name;
+  END IF;
+
+  IF v_state.supports_concurrent THEN
+    EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', v_state.materialized_view);
+  ELSE
+    EXECUTE format('REFRESH MATERIALIZED VIEW %I', v_state.materialized_view);
+  END IF;
+
+  -- Refresh start is recorded so changes committed during the refresh still count as pending
+  UPDATE analytics_view_refresh_state
+  SET last_refreshed_at = v_started,
+      last_refresh_ms = EXTRACT(EPOCH FROM (clock_timestamp() - v_started)) * 1000,
+      last_refresh_error = NULL,
+      refresh_count = refresh_count + 1,
+      updated_at = NOW()
+  WHERE view_name = p_view_name
+  RETURNING * INTO v_state;
+
+  RETURN v_state;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION refresh_analytics_view(TEXT) IS 'Refreshes one materialized analytics view (concurrently when it has a unique key) and records the refresh duration';
+
+-- ============================================================================
+-- STALENESS VIEW
+-- ============================================================================
+
+CREATE OR REPLACE VIEW analytics_view_staleness AS
+SELECT
+  s.view_name,
+  s.materialized_view,
+  s.supports_concurrent,
+  s.last_refreshed_at,
+  s.last_refresh_ms,
+  s.last_refresh_error,
+  s.refresh_count,
+  EXTRACT(EPOCH FROM (NOW() - s.last_refreshed_at))::integer AS staleness_seconds,
+  MAX(c.changed_at) AS last_source_change_at,
+  ARRAY_AGG(c.table_name ORDER BY c.table_name) FILTER (WHERE c.changed_at >= s.last_refreshed_at) AS changed_tables,
+  (
+    s.last_refreshed_at IS NULL
+    OR COALESCE(MAX(c.changed_at) >= s.last_refreshed_at, false)
+    OR NOW() - s.last_refreshed_at > s.max_staleness
+  ) AS needs_refresh
+FROM analytics_view_refresh_state s
+LEFT JOIN analytics_source_changes c ON c.table_name = ANY(s.base_tables)
+GROUP BY s.view_name;
+
+COMMENT ON VIEW analytics_view_staleness IS 'Per-view refresh age, duration and pending base-table changes for the materialized analytics layer';
+
+-- ============================================================================
+-- SUMMARY
+-- ============================================================================
+-- Materialized views: 8 (mv_<view name> for every Migration 009 view)
+-- Dashboards should read mv_* instead of the plain views.
+-- Run scripts/refresh_analytics_views.py to keep them current.
@@ -0,0 +1,108 @@
+/*
+  Migration 011: Syndication Publisher Tracking
+
+  Purpose: Record feed generation results written by scripts/syndication_publisher.py
+
+  Changes:
+  - content_syndication_feeds.last_generation_ms: wall time of the last generation
+  - content_syndication_feeds.last_generated_items: items in the last published document
+  - content_syndication_feeds.last_changed_items: fragments regenerated in the last run
+  - Partial index on next_publish_at for the publisher's due-feed query
+  - BEFORE UPDATE triggers keeping updated_at current on the feed source tables
+    (branded_fare_families, airline_routes, aircraft_configurations, ffp_tiers),
+    which the publisher's change detection relies on
+  - syndication_source_removals: log of source rows deleted or deactivated,
+    written by AFTER triggers, so a publish drops removed fragments without
+    scanning every source id
+  - 'policies' removed from the content_types default (it has no source table)
+
+  avg_response_time_ms is maintained by the publisher as a moving average of
+  generation time; validation_status / validation_errors hold the result of the
+  last generation.
+
+  Dependencies: Migration 003 (content_syndication_feeds and source tables),
+                Migration 008 (airline_routes)
+*/
+
+ALTER TABLE content_syndication_feeds
+  ADD COLUMN IF NOT EXISTS last_generation_ms NUMERIC(12,2),
+  ADD COLUMN IF NOT EXISTS last_generated_items INTEGER,
+  ADD COLUMN IF NOT EXISTS last_changed_items INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_content_feeds_next_publish
+  ON content_syndication_feeds(next_publish_at)
+  WHERE active = true;
+
+COMMENT ON COLUMN content_syndication_feeds.last_generation_ms IS 'Wall time of the last feed generation in milliseconds';
+COMMENT ON COLUMN content_syndication_feeds.last_generated_items IS 'Number of items in the last published feed document';
+COMMENT ON COLUMN content_syndication_feeds.last_changed_items IS 'Fragments regenerated (changed or removed source rows) in the last generation';
+
+-- ============================================================================
+-- SOURCE CHANGE TRACKING
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION set_updated_at_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS syndication_source_removals (
+  id BIGSERIAL PRIMARY KEY,
+  source_table TEXT NOT NULL,
+  row_id BIGINT NOT NULL,
+  airline_id BIGINT,
+  removed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_syndication_source_removals_lookup
+  ON syndication_source_removals(source_table, airline_id, removed_at);
+
+-- Deleted rows, and rows whose active flag goes from true to false
+CREATE OR REPLACE FUNCTION log_syndication_source_removal()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    INSERT INTO syndication_source_removals (source_table, row_id, airline_id)
+    VALUES (TG_TABLE_NAME, OLD.id, OLD.airline_id);
+    RETURN OLD;
+  END IF;
+  IF to_jsonb(OLD) ? 'active' AND (to_jsonb(OLD)->>'active')::boolean IS TRUE
+     AND (to_jsonb(NEW)->>'active')::boolean IS NOT TRUE THEN
+    INSERT INTO syndication_source_removals (source_table, row_id, airline_id)
+    VALUES (TG_TABLE_NAME, NEW.id, NEW.airline_id);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+  source TEXT;
+BEGIN
+  FOREACH source IN ARRAY ARRAY['branded_fare_families', 'airline_routes', 'aircraft_configurations', 'ffp_tiers']
+  LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_updated_at ON %I', source, source);
+    EXECUTE format('CREATE TRIGGER trg_%s_updated_at BEFORE UPDATE ON %I
+                    FOR EACH ROW EXECUTE FUNCTION set_updated_at_timestamp()', source, source);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_syndication_removal ON %I', source, source);
+    EXECUTE format('CREATE TRIGGER trg_%s_syndication_removal AFTER DELETE OR UPDATE ON %I
+                    FOR EACH ROW EXECUTE FUNCTION log_syndication_source_removal()', source, source);
+  END LOOP;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_branded_fare_families_updated ON branded_fare_families(airline_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_airline_routes_updated ON airline_routes(airline_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_aircraft_configurations_updated ON aircraft_configurations(airline_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_ffp_tiers_updated ON ffp_tiers(airline_id, updated_at);
+
+-- 'policies' has no source table; feeds listing it could never validate cleanly
+ALTER TABLE content_syndication_feeds
+  ALTER COLUMN content_types SET DEFAULT ARRAY['fares', 'schedules', 'amenities', 'aircraft_config'];
+UPDATE content_syndication_feeds
+  SET content_types = array_remove(content_types, 'policies')
+  WHERE 'policies' = ANY(content_types);
+
+COMMENT ON TABLE syndication_source_removals IS 'Feed source rows deleted or deactivated, read by scripts/syndication_publisher.py';
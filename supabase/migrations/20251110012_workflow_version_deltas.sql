@@ -0,0 +1,85 @@
+/*
+  Migration 012: Workflow Version Deltas
+
+  Purpose: Compact, delta-encoded history of workflow_versions, written and read
+  by scripts/workflow_version_store.py
+
+  Objects Created:
+  - workflow_version_deltas: one row per workflow version, numbered 1..n per
+    workflow in creation order. Every row holds the fields that changed since
+    the previous version (delta, changed_fields); every CHECKPOINT_INTERVAL-th
+    row (and the first) also holds a full snapshot of the version.
+  - GIN index on changed_fields so "which versions touched field X" is an
+    index lookup
+  - replace_workflow_version_chain(UUID, JSONB): swaps a workflow's whole chain
+    in one transaction, for chains re-encoded after their history was edited
+
+  Any version is rebuilt from the nearest checkpoint at or below it plus the
+  deltas after that checkpoint. "What changed between v3 and v9" reads only the
+  delta column of rows 4..9 (and, for the old values, deltas at or below v3).
+
+  Dependencies: workflows, workflow_versions
+*/
+
+CREATE TABLE IF NOT EXISTS workflow_version_deltas (
+  workflow_id UUID NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+  version_number INTEGER NOT NULL,
+  version_id UUID NOT NULL,
+  is_checkpoint BOOLEAN NOT NULL DEFAULT false,
+  snapshot JSONB,
+  delta JSONB NOT NULL DEFAULT '{}'::jsonb,
+  changed_fields TEXT[] NOT NULL DEFAULT '{}',
+  encoded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (workflow_id, version_number),
+  CONSTRAINT workflow_version_deltas_checkpoint_snapshot
+    CHECK (is_checkpoint = (snapshot IS NOT NULL))
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_workflow_version_deltas_version
+  ON workflow_version_deltas(version_id);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_version_deltas_checkpoints
+  ON workflow_version_deltas(workflow_id, version_number)
+  WHERE is_checkpoint;
+
+CREATE INDEX IF NOT EXISTS idx_workflow_version_deltas_changed_fields
+  ON workflow_version_deltas USING GIN (changed_fields);
+
+COMMENT ON TABLE workflow_version_deltas IS 'Delta-encoded workflow_versions history with periodic full checkpoints';
+COMMENT ON COLUMN workflow_version_deltas.delta IS 'Fields whose value differs from the previous version, with their new values';
+COMMENT ON COLUMN workflow_version_deltas.snapshot IS 'Full version fields; set on checkpoint rows only';
+
+-- ============================================================================
+-- CHAIN REPLACEMENT
+-- ============================================================================
+
+-- Deleting first frees the version_ids a re-encoded chain moves to new numbers
+-- and drops rows above the new chain length
+CREATE OR REPLACE FUNCTION replace_workflow_version_chain(p_workflow_id UUID, p_rows JSONB)
+RETURNS INTEGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_written INTEGER;
+BEGIN
+  DELETE FROM workflow_version_deltas WHERE workflow_id = p_workflow_id;
+
+  INSERT INTO workflow_version_deltas
+    (workflow_id, version_number, version_id, is_checkpoint, snapshot, delta, changed_fields)
+  SELECT p_workflow_id, r.version_number, r.version_id, r.is_checkpoint, r.snapshot, r.delta, r.changed_fields
+  FROM jsonb_to_recordset(p_rows) AS r(
+    version_number INTEGER,
+    version_id UUID,
+    is_checkpoint BOOLEAN,
+    snapshot JSONB,
+    delta JSONB,
+    changed_fields TEXT[]
+  );
+
+  GET DIAGNOSTICS v_written = ROW_COUNT;
+  RETURN v_written;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION replace_workflow_version_chain(UUID, JSONB) IS 'Replaces every delta row of one workflow in a single transaction';
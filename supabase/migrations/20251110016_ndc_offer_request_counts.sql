@@ -0,0 +1,34 @@
+/*
+  Migration 016: NDC Offer Request Counts
+
+  Purpose: Let scripts/ndc_offer_cache.py add cache hits to
+  ndc_offers.request_count atomically, in one call per flush, instead of a
+  read-modify-write per row that loses concurrent increments
+
+  Changes:
+  - increment_ndc_offer_request_counts(BIGINT, JSONB): adds {query_hash: hits}
+    to request_count for one airline's offers
+
+  Dependencies: Migration 003 (ndc_offers)
+*/
+
+CREATE OR REPLACE FUNCTION increment_ndc_offer_request_counts(p_airline_id BIGINT, p_counts JSONB)
+RETURNS INTEGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_updated INTEGER;
+BEGIN
+  UPDATE ndc_offers o
+  SET request_count = COALESCE(o.request_count, 1) + c.hits::integer
+  FROM jsonb_each_text(p_counts) AS c(query_hash, hits)
+  WHERE o.airline_id = p_airline_id
+    AND o.query_hash = c.query_hash;
+
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+  RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION increment_ndc_offer_request_counts(BIGINT, JSONB) IS 'Atomically adds cache hits per query_hash to ndc_offers.request_count';
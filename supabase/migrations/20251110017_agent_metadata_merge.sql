@@ -0,0 +1,34 @@
+/*
+  Migration 017: Agent Metadata Merge
+
+  Purpose: Let scripts that annotate agents.metadata (llm_enrichment.py writes
+  ai_enabler_type, agent_network_analytics.py writes network) add their keys
+  with a jsonb merge instead of writing back a whole metadata snapshot, so
+  neither run drops keys the other wrote in between
+
+  Changes:
+  - merge_agent_metadata(JSONB): sets metadata = metadata || patch for each
+    {id, patch} element; keys not in the patch are left as they are
+
+  Dependencies: agents (20251108 agent network migrations)
+*/
+
+CREATE OR REPLACE FUNCTION merge_agent_metadata(p_patches JSONB)
+RETURNS INTEGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_updated INTEGER;
+BEGIN
+  UPDATE agents a
+  SET metadata = COALESCE(a.metadata, '{}'::jsonb) || p.patch
+  FROM jsonb_to_recordset(p_patches) AS p(id INTEGER, patch JSONB)
+  WHERE a.id = p.id;
+
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+  RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION merge_agent_metadata(JSONB) IS 'Merges per-agent key patches into agents.metadata';
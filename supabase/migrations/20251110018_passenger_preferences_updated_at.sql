@@ -0,0 +1,34 @@
+/*
+  Migration 018: Passenger Preferences updated_at Trigger
+
+  Purpose: Keep passenger_preferences.updated_at current on every UPDATE, so
+  scripts/preference_feature_store.py update sees preference edits and consent
+  withdrawals made by plain UPDATEs, and let it page changes on
+  (updated_at, id) per airline
+
+  Changes:
+  - set_updated_at_timestamp(): generic BEFORE UPDATE trigger function
+    (same definition as Migration 011)
+  - trg_passenger_preferences_updated_at on passenger_preferences
+  - Index on passenger_preferences(airline_id, updated_at, id) for the
+    change poll
+
+  Dependencies: Migration 003 (passenger_preferences)
+*/
+
+CREATE OR REPLACE FUNCTION set_updated_at_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_passenger_preferences_updated_at ON passenger_preferences;
+CREATE TRIGGER trg_passenger_preferences_updated_at
+  BEFORE UPDATE ON passenger_preferences
+  FOR EACH ROW
+  EXECUTE FUNCTION set_updated_at_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_passenger_preferences_updated
+  ON passenger_preferences(airline_id, updated_at, id);
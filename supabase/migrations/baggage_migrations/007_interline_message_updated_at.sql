@@ -0,0 +1,31 @@
+/*
+  Migration 007: Interline Message updated_at Trigger
+
+  Purpose: Keep interline_bag_messages.updated_at current on every UPDATE, so
+  scripts/interline_sla_tracker.py sees acknowledgements, receipts and
+  reconciliations made by plain UPDATEs (partner integrations, manual fixes)
+
+  Changes:
+  - set_updated_at_timestamp(): generic BEFORE UPDATE trigger function
+  - trg_interline_bag_messages_updated_at on interline_bag_messages
+  - Index on updated_at for the tracker's change poll
+
+  Dependencies: Baggage Migration 003 part 2 (interline_bag_messages)
+*/
+
+CREATE OR REPLACE FUNCTION set_updated_at_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_interline_bag_messages_updated_at ON interline_bag_messages;
+CREATE TRIGGER trg_interline_bag_messages_updated_at
+  BEFORE UPDATE ON interline_bag_messages
+  FOR EACH ROW
+  EXECUTE FUNCTION set_updated_at_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_interline_bag_messages_updated_at
+  ON interline_bag_messages(updated_at);
@@ -0,0 +1,53 @@
+/*
+  Migration 008: Claim Adjudication Updates
+
+  Purpose: Let scripts/compensation_rule_engine.py write its evaluation back to
+  baggage_claims in one statement per batch, touching only the adjudication
+  columns. Upserting whole claim rows could null out approved_amount_usd on
+  claims an adjuster had already decided.
+
+  Changes:
+  - apply_claim_adjudications(JSONB): UPDATE of rule_code, liability_cap_usd,
+    depreciation_applied_usd, auto_approved, requires_manual_review and
+    metadata.adjudication by claim_number. approved_amount_usd is set only for
+    AUTO claims. Claims that are closed or carry a human decision are skipped.
+
+  Dependencies: Baggage Migration 003 part 2 (baggage_claims)
+*/
+
+CREATE OR REPLACE FUNCTION apply_claim_adjudications(p_rows JSONB)
+RETURNS INTEGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_updated INTEGER;
+BEGIN
+  UPDATE baggage_claims c
+  SET rule_code = r.rule_code,
+      liability_cap_usd = r.liability_cap_usd,
+      depreciation_applied_usd = r.depreciation_applied_usd,
+      auto_approved = r.auto_approved,
+      requires_manual_review = r.requires_manual_review,
+      approved_amount_usd = CASE WHEN r.auto_approved THEN r.payable_usd ELSE c.approved_amount_usd END,
+      metadata = COALESCE(c.metadata, '{}'::jsonb) || jsonb_build_object('adjudication', r.adjudication)
+  FROM jsonb_to_recordset(p_rows) AS r(
+    claim_number TEXT,
+    rule_code TEXT,
+    liability_cap_usd NUMERIC,
+    depreciation_applied_usd NUMERIC,
+    auto_approved BOOLEAN,
+    requires_manual_review BOOLEAN,
+    payable_usd NUMERIC,
+    adjudication JSONB
+  )
+  WHERE c.claim_number = r.claim_number
+    AND c.claim_status NOT IN ('APPROVED', 'PARTIALLY_APPROVED', 'DENIED', 'PAID', 'CLOSED')
+    AND c.claim_reviewed_at IS NULL;
+
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+  RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION apply_claim_adjudications(JSONB) IS 'Writes compensation rule engine results to undecided baggage_claims by claim_number';
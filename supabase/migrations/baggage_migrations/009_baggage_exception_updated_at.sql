@@ -0,0 +1,36 @@
+/*
+  Migration 009: Baggage Exception updated_at Trigger
+
+  Purpose: Keep baggage_exceptions.updated_at current on every UPDATE, so
+  scripts/exception_triage_queue.py sees closures and enrichment made by plain
+  UPDATEs, and let its scan poll page on (created_at, id)
+
+  Changes:
+  - set_updated_at_timestamp(): generic BEFORE UPDATE trigger function
+    (same definition as Migration 007)
+  - trg_baggage_exceptions_updated_at on baggage_exceptions
+  - Index on baggage_exceptions(updated_at) for the change poll
+  - Index on baggage_scan_events(created_at, id) for the scan poll
+
+  Dependencies: Baggage Migration 003 (baggage_exceptions, baggage_scan_events)
+*/
+
+CREATE OR REPLACE FUNCTION set_updated_at_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_baggage_exceptions_updated_at ON baggage_exceptions;
+CREATE TRIGGER trg_baggage_exceptions_updated_at
+  BEFORE UPDATE ON baggage_exceptions
+  FOR EACH ROW
+  EXECUTE FUNCTION set_updated_at_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_baggage_exceptions_updated_at
+  ON baggage_exceptions(updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_scan_events_created_id
+  ON baggage_scan_events(created_at, id);
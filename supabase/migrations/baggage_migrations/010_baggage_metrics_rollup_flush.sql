@@ -0,0 +1,153 @@
+/*
+  Migration 010: Baggage Metrics Rollup Flush
+
+  Purpose: Let scripts/baggage_metrics_rollup.py write a flush (absolute metric
+  totals plus the source watermarks they cover) in one transaction, so an
+  interrupted flush leaves either all of it or none of it, and keep
+  baggage_connections.updated_at current so the rollup's change poll sees
+  transfer_status updates made by other agents.
+
+  Changes:
+  - set_updated_at_timestamp(): generic BEFORE UPDATE trigger function
+    (same definition as Migration 007)
+  - trg_baggage_connections_updated_at on baggage_connections
+  - Index on baggage_connections(updated_at, id) for the change poll
+  - baggage_metrics_rollup_state: flush sequence number and watermarks per
+    rollup, written with the metric rows
+  - apply_baggage_metrics_flush(TEXT, BIGINT, JSONB, JSONB): updates or inserts
+    each metric row by (metric_date, metric_period, aggregation_level, scope)
+    and records the flush. Scope columns are matched with IS NOT DISTINCT FROM,
+    since NULLs never collide in the table's UNIQUE constraint.
+
+  Dependencies: Baggage Migration 003 (baggage_connections),
+  003 part 2 (baggage_performance_metrics)
+*/
+
+CREATE OR REPLACE FUNCTION set_updated_at_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_baggage_connections_updated_at ON baggage_connections;
+CREATE TRIGGER trg_baggage_connections_updated_at
+  BEFORE UPDATE ON baggage_connections
+  FOR EACH ROW
+  EXECUTE FUNCTION set_updated_at_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_connections_updated_id
+  ON baggage_connections(updated_at, id);
+
+CREATE TABLE IF NOT EXISTS baggage_metrics_rollup_state (
+  rollup_name TEXT PRIMARY KEY,
+  flush_seq BIGINT NOT NULL,
+  watermarks JSONB NOT NULL DEFAULT '{}'::jsonb,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE baggage_metrics_rollup_state IS 'Last committed flush of each incremental baggage_performance_metrics rollup';
+
+CREATE OR REPLACE FUNCTION apply_baggage_metrics_flush(
+  p_rollup_name TEXT,
+  p_flush_seq BIGINT,
+  p_watermarks JSONB,
+  p_rows JSONB
+)
+RETURNS INTEGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_updated INTEGER;
+  v_inserted INTEGER;
+BEGIN
+  UPDATE baggage_performance_metrics m
+  SET total_bags_handled = i.total_bags_handled,
+      total_scan_events = i.total_scan_events,
+      total_mishandled_bags = i.total_mishandled_bags,
+      delayed_bags = i.delayed_bags,
+      lost_bags = i.lost_bags,
+      damaged_bags = i.damaged_bags,
+      pilfered_bags = i.pilfered_bags,
+      misdirected_bags = i.misdirected_bags,
+      offloaded_bags = i.offloaded_bags,
+      short_checked_bags = i.short_checked_bags,
+      rush_tag_missed = i.rush_tag_missed,
+      interline_misconnections = i.interline_misconnections,
+      total_connections = i.total_connections,
+      successful_connections = i.successful_connections,
+      missed_connections = i.missed_connections,
+      high_risk_connections_identified = i.high_risk_connections_identified,
+      interventions_triggered = i.interventions_triggered,
+      interventions_successful = i.interventions_successful,
+      total_interline_transfers = i.total_interline_transfers,
+      mishandling_rate_per_1000 = i.mishandling_rate_per_1000,
+      connection_success_rate = i.connection_success_rate,
+      intervention_success_rate = i.intervention_success_rate,
+      metric_calculated_at = i.metric_calculated_at,
+      updated_at = NOW(),
+      metadata = COALESCE(m.metadata, '{}'::jsonb) || COALESCE(i.metadata, '{}'::jsonb)
+  FROM jsonb_populate_recordset(NULL::baggage_performance_metrics, p_rows) i
+  WHERE m.metric_date = i.metric_date
+    AND m.metric_period = i.metric_period
+    AND m.aggregation_level = i.aggregation_level
+    AND m.agent_code IS NULL
+    AND m.airport_code IS NOT DISTINCT FROM i.airport_code
+    AND m.flight_number IS NOT DISTINCT FROM i.flight_number
+    AND m.route_code IS NOT DISTINCT FROM i.route_code
+    AND m.station_code IS NOT DISTINCT FROM i.station_code
+    AND m.ground_handler_code IS NOT DISTINCT FROM i.ground_handler_code
+    AND (i.aggregation_level <> 'AIRLINE' OR m.metadata->>'airline_code' = i.metadata->>'airline_code');
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+  INSERT INTO baggage_performance_metrics (
+    metric_date, metric_period, aggregation_level,
+    airport_code, flight_number, route_code, station_code, ground_handler_code,
+    total_bags_handled, total_scan_events, total_mishandled_bags,
+    delayed_bags, lost_bags, damaged_bags, pilfered_bags, misdirected_bags, offloaded_bags,
+    short_checked_bags, rush_tag_missed, interline_misconnections,
+    total_connections, successful_connections, missed_connections,
+    high_risk_connections_identified, interventions_triggered, interventions_successful,
+    total_interline_transfers, mishandling_rate_per_1000, connection_success_rate,
+    intervention_success_rate, metric_calculated_at, metadata
+  )
+  SELECT
+    i.metric_date, i.metric_period, i.aggregation_level,
+    i.airport_code, i.flight_number, i.route_code, i.station_code, i.ground_handler_code,
+    i.total_bags_handled, i.total_scan_events, i.total_mishandled_bags,
+    i.delayed_bags, i.lost_bags, i.damaged_bags, i.pilfered_bags, i.misdirected_bags, i.offloaded_bags,
+    i.short_checked_bags, i.rush_tag_missed, i.interline_misconnections,
+    i.total_connections, i.successful_connections, i.missed_connections,
+    i.high_risk_connections_identified, i.interventions_triggered, i.interventions_successful,
+    i.total_interline_transfers, i.mishandling_rate_per_1000, i.connection_success_rate,
+    i.intervention_success_rate, i.metric_calculated_at, i.metadata
+  FROM jsonb_populate_recordset(NULL::baggage_performance_metrics, p_rows) i
+  WHERE NOT EXISTS (
+    SELECT 1 FROM baggage_performance_metrics m
+    WHERE m.metric_date = i.metric_date
+      AND m.metric_period = i.metric_period
+      AND m.aggregation_level = i.aggregation_level
+      AND m.agent_code IS NULL
+      AND m.airport_code IS NOT DISTINCT FROM i.airport_code
+      AND m.flight_number IS NOT DISTINCT FROM i.flight_number
+      AND m.route_code IS NOT DISTINCT FROM i.route_code
+      AND m.station_code IS NOT DISTINCT FROM i.station_code
+      AND m.ground_handler_code IS NOT DISTINCT FROM i.ground_handler_code
+      AND (i.aggregation_level <> 'AIRLINE' OR m.metadata->>'airline_code' = i.metadata->>'airline_code')
+  );
+  GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+  INSERT INTO baggage_metrics_rollup_state (rollup_name, flush_seq, watermarks, updated_at)
+  VALUES (p_rollup_name, p_flush_seq, p_watermarks, NOW())
+  ON CONFLICT (rollup_name) DO UPDATE
+  SET flush_seq = EXCLUDED.flush_seq,
+      watermarks = EXCLUDED.watermarks,
+      updated_at = EXCLUDED.updated_at;
+
+  RETURN v_updated + v_inserted;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION apply_baggage_metrics_flush(TEXT, BIGINT, JSONB, JSONB) IS 'Writes absolute baggage_performance_metrics totals and the rollup watermarks they cover in one transaction';
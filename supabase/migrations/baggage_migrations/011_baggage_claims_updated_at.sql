@@ -0,0 +1,33 @@
+/*
+  Migration 011: Baggage Claims updated_at Trigger
+
+  Purpose: Keep baggage_claims.updated_at current on every UPDATE, so
+  scripts/lost_found_matcher.py sees status changes made by plain UPDATEs
+  (adjusters, apply_claim_adjudications) and can page its change poll on
+  (updated_at, id)
+
+  Changes:
+  - set_updated_at_timestamp(): generic BEFORE UPDATE trigger function
+    (same definition as Migration 007)
+  - trg_baggage_claims_updated_at on baggage_claims
+  - Index on baggage_claims(updated_at, id) for the change poll
+
+  Dependencies: Baggage Migration 003 part 2 (baggage_claims)
+*/
+
+CREATE OR REPLACE FUNCTION set_updated_at_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_baggage_claims_updated_at ON baggage_claims;
+CREATE TRIGGER trg_baggage_claims_updated_at
+  BEFORE UPDATE ON baggage_claims
+  FOR EACH ROW
+  EXECUTE FUNCTION set_updated_at_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_claims_updated_id
+  ON baggage_claims(updated_at, id);
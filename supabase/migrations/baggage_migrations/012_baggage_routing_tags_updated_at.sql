@@ -0,0 +1,32 @@
+/*
+  Migration 012: Baggage Routing Tags updated_at Trigger
+
+  Purpose: Keep baggage_routing_tags.updated_at current on every UPDATE, so
+  scripts/routing_tag_index.py sees re-routes, rush tags and status changes
+  made by plain UPDATEs, and can page its change poll on (updated_at, id)
+
+  Changes:
+  - set_updated_at_timestamp(): generic BEFORE UPDATE trigger function
+    (same definition as Migration 007)
+  - trg_baggage_routing_tags_updated_at on baggage_routing_tags
+  - Index on baggage_routing_tags(updated_at, id) for the change poll
+
+  Dependencies: Baggage Migration 003 part 2 (baggage_routing_tags)
+*/
+
+CREATE OR REPLACE FUNCTION set_updated_at_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_baggage_routing_tags_updated_at ON baggage_routing_tags;
+CREATE TRIGGER trg_baggage_routing_tags_updated_at
+  BEFORE UPDATE ON baggage_routing_tags
+  FOR EACH ROW
+  EXECUTE FUNCTION set_updated_at_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_routing_updated_id
+  ON baggage_routing_tags(updated_at, id);
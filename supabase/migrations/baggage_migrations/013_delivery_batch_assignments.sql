@@ -0,0 +1,40 @@
+/*
+  Migration 013: Delivery Batch Assignments
+
+  Purpose: Let scripts/delivery_batch_planner.py write courier batch
+  assignments back to baggage_delivery_attempts in one statement per batch,
+  touching only metadata.courier_batch. Upserting whole delivery rows from the
+  planner's snapshot could overwrite addresses, windows or statuses changed
+  after it was read.
+
+  Changes:
+  - apply_delivery_batches(JSONB): sets metadata.courier_batch by id. Deliveries
+    no longer SCHEDULED (dispatched, delivered or cancelled meanwhile) are
+    skipped.
+
+  Dependencies: Baggage Migration 003 part 2 (baggage_delivery_attempts)
+*/
+
+CREATE OR REPLACE FUNCTION apply_delivery_batches(p_rows JSONB)
+RETURNS INTEGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_updated INTEGER;
+BEGIN
+  UPDATE baggage_delivery_attempts d
+  SET metadata = COALESCE(d.metadata, '{}'::jsonb) || jsonb_build_object('courier_batch', r.courier_batch)
+  FROM jsonb_to_recordset(p_rows) AS r(
+    id BIGINT,
+    courier_batch JSONB
+  )
+  WHERE d.id = r.id
+    AND d.attempt_status = 'SCHEDULED';
+
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+  RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION apply_delivery_batches(JSONB) IS 'Writes courier batch assignments to still-scheduled baggage_delivery_attempts by id';
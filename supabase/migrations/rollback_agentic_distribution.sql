@@ -3,9 +3,11 @@
 
   ⚠️  WARNING: This script will completely remove all agentic distribution data.
 
-  Use this script to rollback migrations 001-009 in case of issues.
+  Use this script to rollback migrations 001-012 and 016-018 in case of issues.
+  013-015 changed baggage tables and now live in baggage_migrations/ (as
+  007-009); they are not rolled back here.
 
-  Rollback Order: 009 → 008 → 007 → 006 → 005 → 004 → 003 → 002 → 001
+  Rollback Order: 018 → 017 → 016 → 012 → 011 → 010 → 009 → 008 → 007 → 006 → 005 → 004 → 003 → 002 → 001
   (Reverse order to respect foreign key dependencies)
 
   Execution:
@@ -43,6 +45,140 @@ BEGIN
   PERFORM pg_sleep(3);
 END $$;
 
+-- ============================================================================
+-- MIGRATION 018 ROLLBACK: Drop Passenger Preferences updated_at Trigger
+-- ============================================================================
+
+-- set_updated_at_timestamp() is shared with Migration 011 and the baggage
+-- migrations, so it is left in place
+DO $$
+BEGIN
+  IF to_regclass('public.passenger_preferences') IS NOT NULL THEN
+    DROP TRIGGER IF EXISTS trg_passenger_preferences_updated_at ON passenger_preferences;
+  END IF;
+END $$;
+
+DROP INDEX IF EXISTS idx_passenger_preferences_updated;
+
+DO $$
+BEGIN
+  RAISE NOTICE '✓ Migration 018 rolled back: passenger_preferences updated_at trigger dropped';
+  RAISE NOTICE '';
+END $$;
+
+-- ============================================================================
+-- MIGRATION 017 ROLLBACK: Drop Agent Metadata Merge
+-- ============================================================================
+
+DROP FUNCTION IF EXISTS merge_agent_metadata(JSONB);
+
+DO $$
+BEGIN
+  RAISE NOTICE '✓ Migration 017 rolled back: merge_agent_metadata dropped';
+  RAISE NOTICE '';
+END $$;
+
+-- ============================================================================
+-- MIGRATION 016 ROLLBACK: Drop NDC Offer Request Counts
+-- ============================================================================
+
+DROP FUNCTION IF EXISTS increment_ndc_offer_request_counts(BIGINT, JSONB);
+
+DO $$
+BEGIN
+  RAISE NOTICE '✓ Migration 016 rolled back: increment_ndc_offer_request_counts dropped';
+  RAISE NOTICE '';
+END $$;
+
+-- ============================================================================
+-- MIGRATION 012 ROLLBACK: Drop Workflow Version Deltas
+-- ============================================================================
+
+DROP FUNCTION IF EXISTS replace_workflow_version_chain(UUID, JSONB);
+DROP TABLE IF EXISTS workflow_version_deltas;
+
+DO $$
+BEGIN
+  RAISE NOTICE '✓ Migration 012 rolled back: workflow_version_deltas dropped';
+  RAISE NOTICE '';
+END $$;
+
+-- ============================================================================
+-- MIGRATION 011 ROLLBACK: Drop Syndication Publisher Tracking
+-- ============================================================================
+
+DROP INDEX IF EXISTS idx_content_feeds_next_publish;
+
+DO $$
+DECLARE
+  source TEXT;
+BEGIN
+  FOREACH source IN ARRAY ARRAY['branded_fare_families', 'airline_routes', 'aircraft_configurations', 'ffp_tiers']
+  LOOP
+    IF to_regclass('public.' || source) IS NOT NULL THEN
+      EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_syndication_removal ON %I', source, source);
+      EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_updated_at ON %I', source, source);
+      EXECUTE format('DROP INDEX IF EXISTS idx_%s_updated', source);
+    END IF;
+  END LOOP;
+END $$;
+
+DROP FUNCTION IF EXISTS log_syndication_source_removal();
+DROP TABLE IF EXISTS syndication_source_removals CASCADE;
+
+DO $$
+BEGIN
+  IF to_regclass('public.content_syndication_feeds') IS NOT NULL THEN
+    ALTER TABLE content_syndication_feeds
+      DROP COLUMN IF EXISTS last_generation_ms,
+      DROP COLUMN IF EXISTS last_generated_items,
+      DROP COLUMN IF EXISTS last_changed_items;
+  END IF;
+  RAISE NOTICE '✓ Migration 011 rolled back: syndication tracking columns dropped';
+  RAISE NOTICE '';
+END $$;
+
+-- ============================================================================
+-- MIGRATION 010 ROLLBACK: Drop Materialized Analytics Layer
+-- ============================================================================
+
+DO $$
+DECLARE
+  v_table TEXT;
+BEGIN
+  RAISE NOTICE '═══════════════════════════════════════';
+  RAISE NOTICE 'Rolling back Migration 010: Materialized Analytics Views';
+  RAISE NOTICE '═══════════════════════════════════════';
+
+  IF to_regclass('public.analytics_view_refresh_state') IS NOT NULL THEN
+    FOR v_table IN SELECT DISTINCT unnest(base_tables) FROM analytics_view_refresh_state LOOP
+      IF to_regclass('public.' || v_table) IS NOT NULL THEN
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_analytics_source_changed ON %I', v_table);
+      END IF;
+    END LOOP;
+  END IF;
+END $$;
+
+DROP VIEW IF EXISTS analytics_view_staleness;
+DROP FUNCTION IF EXISTS refresh_analytics_view(TEXT);
+DROP FUNCTION IF EXISTS mark_analytics_source_changed();
+DROP TABLE IF EXISTS analytics_source_changes;
+DROP TABLE IF EXISTS analytics_view_refresh_state;
+DROP MATERIALIZED VIEW IF EXISTS mv_ndc_adoption_metrics;
+DROP MATERIALIZED VIEW IF EXISTS mv_content_syndication_coverage;
+DROP MATERIALIZED VIEW IF EXISTS mv_loyalty_personalization_readiness;
+DROP MATERIALIZED VIEW IF EXISTS mv_api_health_dashboard;
+DROP MATERIALIZED VIEW IF EXISTS mv_cross_domain_complexity;
+DROP MATERIALIZED VIEW IF EXISTS mv_agent_utilization_metrics;
+DROP MATERIALIZED VIEW IF EXISTS mv_workflow_agentic_potential;
+DROP MATERIALIZED VIEW IF EXISTS mv_ai_readiness_scorecard;
+
+DO $$
+BEGIN
+  RAISE NOTICE '✓ Migration 010 rolled back: 8 materialized views dropped';
+  RAISE NOTICE '';
+END $$;
+
 -- ============================================================================
 -- MIGRATION 009 ROLLBACK: Drop Analytics Views
 -- ============================================================================
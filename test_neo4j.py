@@ -1,25 +1,38 @@
 import os
+import sys
+import argparse
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from job_profiler import add_profile_arguments, JobProfiler
+
 load_dotenv()
 
 uri = os.getenv("NEO4J_URI")
 user = os.getenv("NEO4J_USER")
 password = os.getenv("NEO4J_PASSWORD")
 
+parser = argparse.ArgumentParser(description='Check the Neo4j connection')
+add_profile_arguments(parser)
+args = parser.parse_args()
+
 print(f"Testing Neo4j connection...")
 print(f"URI: {uri}")
 print(f"User: {user}")
 print(f"Password: {'*' * len(password)}")
 
-try:
-    driver = GraphDatabase.driver(uri, auth=(user, password))
-    with driver.session() as session:
-        result = session.run("RETURN 1 as test")
-        print(f"\n✅ SUCCESS! Connected to Neo4j")
-        print(f"Test query result: {result.single()['test']}")
-    driver.close()
-except Exception as e:
-    print(f"\n❌ FAILED! Error: {e}")
-    print(f"\nPlease reset your Neo4j password at: https://console.neo4j.io")
+with JobProfiler.from_args('test_neo4j', args) as profiler:
+    try:
+        with profiler.stage('connect'):
+            driver = GraphDatabase.driver(uri, auth=(user, password))
+            driver.verify_connectivity()
+        with profiler.stage('query'):
+            with driver.session() as session:
+                result = session.run("RETURN 1 as test")
+                print(f"\n✅ SUCCESS! Connected to Neo4j")
+                print(f"Test query result: {result.single()['test']}")
+        driver.close()
+    except Exception as e:
+        print(f"\n❌ FAILED! Error: {e}")
+        print(f"\nPlease reset your Neo4j password at: https://console.neo4j.io")